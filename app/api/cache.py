@@ -1,20 +1,134 @@
+import asyncio
 import logging
+import time
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass, replace
 from datetime import date
 
 import msgspec
 import redis
 
 from app.api.constants import (
+    CACHE_INVALIDATION_RECONNECT_SECONDS,
+    CLOSED_DAY_TTL,
     DEFAULT_TTL,
+    L1_CACHE_MAX_BYTES,
+    L1_SHAPES_TTL,
+    L1_STATS_TTL,
+    L1_VEHICLES_TTL,
     LONG_TTL,
     LONG_TTL_THRESHOLD_DAYS,
     REDIS_KEY_VEHICLES_CACHE,
+    STATS_STALE_TTL,
     VEHICLES_CACHE_TTL,
 )
-from app.platform.redis.connection import get_client
+from app.api.local_cache import LocalCache
+from app.api.response import EncodedBody, encode_body
+from app.api.single_flight import SingleFlight, SingleFlightMetrics
+from app.platform.redis.connection import get_async_client
+from app.shared.models.enums import CacheInvalidationReason
+from app.shared.redis import serializer
+from app.shared.redis.constants import CACHE_INVALIDATION_CHANNEL, REDIS_KEY_STATS_DAY_PREFIX
+from app.shared.redis.schemas import CacheInvalidationMessage
 
 logger = logging.getLogger(__name__)
 
+_flights = SingleFlight()
+_local = LocalCache(L1_CACHE_MAX_BYTES)
+
+# L1 key prefixes each invalidation drops
+_INVALIDATED_PREFIXES: dict[CacheInvalidationReason, str] = {
+    CacheInvalidationReason.GTFS_RELOADED: "",
+    CacheInvalidationReason.DAY_CLOSED: "stats:",
+}
+
+
+@dataclass(slots=True)
+class CacheTierMetrics:
+    """Snapshot of the response cache lookups of this worker, in L1 (in-process) and then L2 (Redis)."""
+
+    l1_hits: int = 0
+    l1_misses: int = 0
+    l2_hits: int = 0
+    l2_misses: int = 0
+    l1_entries: int = 0
+    l1_bytes: int = 0
+
+    @property
+    def l1_hit_ratio(self) -> float:
+        lookups = self.l1_hits + self.l1_misses
+        return self.l1_hits / lookups if lookups else 0.0
+
+    @property
+    def l2_hit_ratio(self) -> float:
+        """Of the lookups L1 missed."""
+        lookups = self.l2_hits + self.l2_misses
+        return self.l2_hits / lookups if lookups else 0.0
+
+
+_tiers = CacheTierMetrics()
+
+
+def single_flight_metrics() -> SingleFlightMetrics:
+    return _flights.metrics()
+
+
+def cache_tier_metrics() -> CacheTierMetrics:
+    return replace(_tiers, l1_entries=len(_local), l1_bytes=_local.size)
+
+
+async def _get_tiered(key: str, description: str) -> tuple[bytes | None, bool]:
+    """The value of `key` from L1 or else Redis, and whether it came from L1."""
+    value = _local.get(key)
+    if value is not None:
+        _tiers.l1_hits += 1
+        return value, True
+    _tiers.l1_misses += 1
+    try:
+        client = get_async_client()
+        value = await client.get(key)  # type: ignore[assignment]
+    except redis.RedisError:
+        logger.warning("Redis read failed for %s", description, exc_info=True)
+        return None, False
+    if value is None:
+        _tiers.l2_misses += 1
+    else:
+        _tiers.l2_hits += 1
+    return value, False
+
+
+def _invalidate(message: CacheInvalidationMessage) -> None:
+    dropped = _local.invalidate(_INVALIDATED_PREFIXES[message.reason])
+    logger.info("Dropped %d in-process cache entries (%s %s)", dropped, message.reason, message.service_date or "")
+
+
+async def listen_for_invalidations(
+    on_message: Callable[[CacheInvalidationMessage], None] = lambda message: None,
+) -> None:
+    """Apply published cache invalidations to L1 for the lifetime of the worker, then pass them to `on_message`."""
+    while True:
+        try:
+            pubsub = get_async_client().pubsub()
+            try:
+                await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+                # Invalidations published while unsubscribed are lost
+                _local.invalidate()
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        invalidation = serializer.decode_cache_invalidation(message["data"])
+                    except msgspec.DecodeError:
+                        logger.warning("Invalid cache invalidation message: %r", message["data"])
+                        continue
+                    _invalidate(invalidation)
+                    on_message(invalidation)
+            finally:
+                await pubsub.aclose()  # type: ignore[no-untyped-call]
+        except redis.RedisError:
+            logger.warning("Cache invalidation subscription lost, resubscribing", exc_info=True)
+        await asyncio.sleep(CACHE_INVALIDATION_RECONNECT_SECONDS)
+
 
 def _ttl(start_date: date, end_date: date) -> int:
     span = (end_date - start_date).days
@@ -26,47 +140,211 @@ def _key(endpoint: str, line_number: str, start_date: date, end_date: date, incl
     return f"stats:{endpoint}:{line_number}:{start_date}:{end_date}{suffix}"
 
 
-def get_cached(
+class _StatsEntry(msgspec.Struct, array_like=True):
+    # Unix time the response turns stale at, Redis expires the entry STATS_STALE_TTL later
+    fresh_until: float
+    body: EncodedBody
+
+
+_stats_entry_decoder = msgspec.msgpack.Decoder(_StatsEntry)
+_body_decoder = msgspec.msgpack.Decoder(EncodedBody)
+_encoder = msgspec.msgpack.Encoder()
+
+
+@dataclass(frozen=True, slots=True)
+class CachedStats:
+    body: EncodedBody
+    stale: bool
+
+
+async def get_cached(
     endpoint: str, line_number: str, start_date: date, end_date: date, include_estimated: bool = False
-) -> bytes | None:
+) -> CachedStats | None:
+    key = _key(endpoint, line_number, start_date, end_date, include_estimated)
+    raw, from_l1 = await _get_tiered(key, "stats cache")
+    if raw is None:
+        return None
     try:
-        client = get_client()
-        return client.get(_key(endpoint, line_number, start_date, end_date, include_estimated))  # type: ignore
-    except redis.RedisError:
-        logger.warning("Redis read failed for stats cache", exc_info=True)
+        entry = _stats_entry_decoder.decode(raw)
+    except msgspec.DecodeError:
+        # Cached in another format by an earlier version, recomputed
         return None
+    fresh_for = entry.fresh_until - time.time()
+    if not from_l1 and fresh_for > 0:
+        _local.set(key, raw, min(L1_STATS_TTL, fresh_for))
+    return CachedStats(entry.body, fresh_for <= 0)
 
 
-def set_cached(
+async def set_cached(
     endpoint: str,
     line_number: str,
     start_date: date,
     end_date: date,
-    data: msgspec.Struct,
+    body: EncodedBody,
     include_estimated: bool = False,
 ) -> None:
-    raw = msgspec.json.encode(data)
+    key = _key(endpoint, line_number, start_date, end_date, include_estimated)
+    ttl = _ttl(start_date, end_date)
+    raw = _encoder.encode(_StatsEntry(time.time() + ttl, body))
+    _local.set(key, raw, min(L1_STATS_TTL, ttl))
     try:
-        client = get_client()
-        client.setex(
-            _key(endpoint, line_number, start_date, end_date, include_estimated), _ttl(start_date, end_date), raw
-        )
+        client = get_async_client()
+        await client.setex(key, ttl + STATS_STALE_TTL, raw)
     except redis.RedisError:
         logger.warning("Redis write failed for stats cache", exc_info=True)
 
 
-def get_vehicles_cache() -> bytes | None:
+async def _encode(compute: Callable[[], Awaitable[msgspec.Struct]]) -> EncodedBody:
+    # Compressing a large body would hold up every other request of the worker
+    return await asyncio.to_thread(encode_body, await compute())
+
+
+async def get_or_compute_stats(
+    endpoint: str,
+    line_number: str,
+    start_date: date,
+    end_date: date,
+    include_estimated: bool,
+    compute: Callable[[], Awaitable[msgspec.Struct]],
+) -> EncodedBody:
+    """
+    The cached response body, or that of the response `compute` returns, computed once across concurrent requests
+    and cached. A stale body is returned as is while `compute` recomputes it in the background. `compute` must not
+    depend on the request, the computation may outlive it.
+    """
+    key = _key(endpoint, line_number, start_date, end_date, include_estimated)
+
+    async def load() -> EncodedBody | None:
+        cached = await get_cached(endpoint, line_number, start_date, end_date, include_estimated)
+        return None if cached is None else cached.body
+
+    async def compute_and_cache() -> EncodedBody:
+        body = await _encode(compute)
+        await set_cached(endpoint, line_number, start_date, end_date, body, include_estimated)
+        return body
+
+    hit = await get_cached(endpoint, line_number, start_date, end_date, include_estimated)
+    if hit is not None:
+        if hit.stale:
+            _flights.refresh(key, compute_and_cache)
+        return hit.body
+    return await _flights.run(key, load, compute_and_cache)
+
+
+async def warm_stats(
+    endpoint: str,
+    line_number: str,
+    start_date: date,
+    end_date: date,
+    include_estimated: bool,
+    compute: Callable[[], Awaitable[msgspec.Struct]],
+) -> bool:
+    """Cache the body of the response `compute` returns unless a fresh one is cached. Returns whether it computed."""
+    cached = await get_cached(endpoint, line_number, start_date, end_date, include_estimated)
+    if cached is not None and not cached.stale:
+        return False
+    body = await _encode(compute)
+    await set_cached(endpoint, line_number, start_date, end_date, body, include_estimated)
+    return True
+
+
+def _day_key(endpoint: str, line_number: str, day: date, include_estimated: bool) -> str:
+    suffix = ":est" if include_estimated else ""
+    return f"{REDIS_KEY_STATS_DAY_PREFIX}{endpoint}:{line_number}:{day}{suffix}"
+
+
+async def get_day_partials(
+    endpoint: str, line_number: str, days: list[date], include_estimated: bool = False
+) -> dict[date, bytes]:
+    """Cached per-day partial results of `days`, by day. Days missing from the cache are left out."""
+    if not days:
+        return {}
     try:
-        client = get_client()
-        return client.get(REDIS_KEY_VEHICLES_CACHE)  # type: ignore
+        client = get_async_client()
+        values: list[bytes | None] = await client.mget(  # type: ignore[assignment]
+            [_day_key(endpoint, line_number, day, include_estimated) for day in days]
+        )
     except redis.RedisError:
-        logger.warning("Redis read failed for vehicles cache", exc_info=True)
+        logger.warning("Redis read failed for stats day cache", exc_info=True)
+        return {}
+    return {day: value for day, value in zip(days, values, strict=True) if value is not None}
+
+
+async def set_day_partials(
+    endpoint: str,
+    line_number: str,
+    partials: Mapping[date, msgspec.Struct],
+    last_closed: date,
+    include_estimated: bool = False,
+) -> None:
+    """
+    Cache per-day partial results, those of days up to `last_closed` for CLOSED_DAY_TTL. stop_writer deletes the
+    partials of a day when it rolls the day up, again after late events.
+    """
+    if not partials:
+        return
+    try:
+        client = get_async_client()
+        async with client.pipeline(transaction=False) as pipe:
+            for day, partial in partials.items():
+                ttl = CLOSED_DAY_TTL if day <= last_closed else DEFAULT_TTL
+                pipe.setex(_day_key(endpoint, line_number, day, include_estimated), ttl, msgspec.json.encode(partial))
+            await pipe.execute()
+    except redis.RedisError:
+        logger.warning("Redis write failed for stats day cache", exc_info=True)
+
+
+async def get_vehicles_cache() -> EncodedBody | None:
+    raw, from_l1 = await _get_tiered(REDIS_KEY_VEHICLES_CACHE, "vehicles cache")
+    if raw is None:
         return None
+    try:
+        body = _body_decoder.decode(raw)
+    except msgspec.DecodeError:
+        return None
+    if not from_l1:
+        _local.set(REDIS_KEY_VEHICLES_CACHE, raw, L1_VEHICLES_TTL)
+    return body
 
 
-def set_vehicles_cache(data: bytes) -> None:
+async def set_vehicles_cache(body: EncodedBody) -> None:
+    raw = _encoder.encode(body)
+    _local.set(REDIS_KEY_VEHICLES_CACHE, raw, L1_VEHICLES_TTL)
     try:
-        client = get_client()
-        client.setex(REDIS_KEY_VEHICLES_CACHE, VEHICLES_CACHE_TTL, data)
+        client = get_async_client()
+        await client.setex(REDIS_KEY_VEHICLES_CACHE, VEHICLES_CACHE_TTL, raw)
     except redis.RedisError:
         logger.warning("Redis write failed for vehicles cache", exc_info=True)
+
+
+async def get_or_compute_vehicles(compute: Callable[[], Awaitable[msgspec.Struct]]) -> EncodedBody:
+    """
+    The cached vehicles response body, or that of the one `compute` returns, computed once across requests. `compute`
+    must not depend on the request, the computation may outlive it.
+    """
+
+    async def compute_and_cache() -> EncodedBody:
+        body = await _encode(compute)
+        await set_vehicles_cache(body)
+        return body
+
+    hit = await get_vehicles_cache()
+    if hit is not None:
+        return hit
+    return await _flights.run(REDIS_KEY_VEHICLES_CACHE, get_vehicles_cache, compute_and_cache)
+
+
+async def get_or_compute_shape(
+    shape_id: str, resolution: str, shape_format: str, compute: Callable[[], Awaitable[msgspec.Struct]]
+) -> EncodedBody:
+    """
+    The cached shape response body, or that of the one `compute` returns. Kept in L1 only, a miss costs one primary
+    key lookup of the precomputed polyline.
+    """
+    key = f"shape:{shape_id}:{resolution}:{shape_format}"
+    raw = _local.get(key)
+    if raw is not None:
+        return _body_decoder.decode(raw)
+    body = await _encode(compute)
+    _local.set(key, _encoder.encode(body), L1_SHAPES_TTL)
+    return body
@@ -1,15 +1,52 @@
 from datetime import date
 
 # API statistics filters
-MIN_DELAY_SECONDS: int = -90
 ESTIMATED_VALID_FROM: date = date(2026, 3, 19)
 MAX_DATE_RANGE_DAYS: int = 365
+# Rows of the max-delay and route-delay rankings
+STATS_TOP_LIMIT: int = 10
 
 # API cache TTL
 DEFAULT_TTL: int = 90
 LONG_TTL: int = 600
 LONG_TTL_THRESHOLD_DAYS: int = 7
 VEHICLES_CACHE_TTL: int = 3
+# Per-day partial statistics: a closed service day's are final, the current days' are recomputed after DEFAULT_TTL
+CLOSED_DAY_TTL: int = 30 * 24 * 60 * 60
+# Stale-while-revalidate: past its TTL a stats response is still served for up to STATS_STALE_TTL while it is
+# recomputed in the background; only a response missing from the cache is computed in-line
+STATS_STALE_TTL: int = 60 * 60
+# In-process L1 cache in front of Redis, per worker: entries are kept this long at most and never once stale, the
+# least recently used evicted past L1_CACHE_MAX_BYTES. Invalidations published by the importer and stop_writer drop
+# them earlier; after losing the subscription, a worker clears its L1 and resubscribes
+L1_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+L1_STATS_TTL: float = 30.0
+L1_VEHICLES_TTL: float = 1.0
+# Shapes change only with a GTFS reload, whose invalidation drops them, and are kept in L1 alone
+L1_SHAPES_TTL: float = 60 * 60.0
+CACHE_INVALIDATION_RECONNECT_SECONDS: float = 5.0
+
+# Cached response bodies: gzip and brotli variants are kept along the JSON of bodies this large at least
+RESPONSE_COMPRESS_MIN_BYTES: int = 512
+RESPONSE_GZIP_LEVEL: int = 6
+RESPONSE_BROTLI_QUALITY: int = 5
+
+# Single-flight cache fills: the worker holding a key's lease recomputes it, the others poll for its result
+CACHE_LEASE_TTL_MS: int = 15_000
+CACHE_LEASE_WAIT_SECONDS: float = 3.0
+CACHE_LEASE_POLL_SECONDS: float = 0.05
+CACHE_METRICS_LOG_INTERVAL_SECONDS: float = 300.0
+
+# Cache warming: the STATS_WARM_TOP_N most requested stats combinations of the last POPULARITY_WINDOW_DAYS are
+# computed into the cache STATS_WARM_DELAY_SECONDS after a worker starts and after a service day closes, by the worker
+# taking the warm-up lock, at most STATS_WARM_DB_CONCURRENCY at a time
+POPULARITY_FLUSH_INTERVAL_SECONDS: float = 60.0
+POPULARITY_WINDOW_DAYS: int = 7
+POPULARITY_PRESET_MAX_END_OFFSET_DAYS: int = 1
+STATS_WARM_TOP_N: int = 200
+STATS_WARM_DB_CONCURRENCY: int = 2
+STATS_WARM_DELAY_SECONDS: float = 30.0
+STATS_WARM_LOCK_TTL_MS: int = 15 * 60 * 1000
 
 # API rate limits (per IP, per minute)
 RATE_LIMIT_DEFAULT: str = "80/minute"
@@ -17,3 +54,6 @@ RATE_LIMIT_STATS: str = "40/minute"
 
 # API Redis keys
 REDIS_KEY_VEHICLES_CACHE: str = "cache:vehicles:positions"
+REDIS_KEY_CACHE_LEASE_PREFIX: str = "lease:"
+REDIS_KEY_STATS_POPULARITY_PREFIX: str = "popularity:stats:"
+REDIS_KEY_STATS_WARM_LOCK: str = "lease:stats-warm"
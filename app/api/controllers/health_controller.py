@@ -4,7 +4,7 @@ from fastapi import APIRouter, Response, status
 from sqlalchemy import text
 
 from app.api.db import DbSession
-from app.platform.redis.connection import get_client
+from app.platform.redis.connection import get_async_client
 
 router = APIRouter(tags=["health"])
 
@@ -14,10 +14,10 @@ JSON = "application/json"
 
 
 @router.get("/health", summary="Health check")
-def health(db: DbSession) -> Response:
+async def health(db: DbSession) -> Response:
     try:
-        db.execute(text("SELECT 1"))
-        get_client().ping()
+        await db.execute(text("SELECT 1"))
+        await get_async_client().ping()
     except Exception:
         logger.warning("Health check failed", exc_info=True)
         return Response(
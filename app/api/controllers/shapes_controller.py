@@ -7,16 +7,17 @@ from app.api.constants import RATE_LIMIT_DEFAULT
 from app.api.db import DbSession
 from app.api.middleware import limiter
 from app.api.openapi import DOC_SHAPE
-from app.api.response import MsgspecJSONResponse
-from app.api.schemas import ShapeIdPath
+from app.api.repositories.gtfs_static_repository import AsyncGtfsStaticRepository
+from app.api.response import encoded_response
+from app.api.schemas import ShapeFormatQuery, ShapeIdPath, ShapeResolutionQuery
 from app.api.services.shapes_service import ShapesService
-from app.shared.gtfs.repositories.gtfs_static import GtfsStaticRepository
+from app.shared.models.enums import ShapeFormat, ShapeResolution
 
 router = APIRouter(prefix="/shapes", tags=["shapes"])
 
 
 def _get_service(db: DbSession) -> ShapesService:
-    return ShapesService(GtfsStaticRepository(db))
+    return ShapesService(AsyncGtfsStaticRepository(db))
 
 
 Shapes = Annotated[ShapesService, Depends(_get_service)]
@@ -29,10 +30,22 @@ Shapes = Annotated[ShapesService, Depends(_get_service)]
     response_model=None,
 )
 @limiter.limit(RATE_LIMIT_DEFAULT)
-def get_shape(request: Request, shape_id: ShapeIdPath, service: Shapes) -> Response:
+async def get_shape(
+    request: Request,
+    shape_id: ShapeIdPath,
+    service: Shapes,
+    resolution: ShapeResolutionQuery = ShapeResolution.FULL,
+    shape_format: ShapeFormatQuery = ShapeFormat.JSON,
+) -> Response:
     """
     Returns the ordered list of GPS points that define a trip's route geometry.
 
     Use `shape_id` from the `/vehicles/positions` endpoint to fetch the corresponding shape.
+
+    ### Resolution and format
+    `resolution` other than `full` returns the shape simplified to within 1 m (`high`), 5 m (`medium`)
+    or 20 m (`low`) of the original; `full` keeps every point. Coordinates are rounded to 1e-5 degrees
+    (about a metre). `format=polyline` returns the points as an encoded polyline, a fraction of the size
+    of the JSON list.
     """
-    return MsgspecJSONResponse(service.get_shape(shape_id))
+    return encoded_response(request, await service.get_shape(shape_id, resolution, shape_format))
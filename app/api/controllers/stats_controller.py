@@ -4,11 +4,9 @@ from fastapi import APIRouter, Depends, Request
 from fastapi.responses import Response
 
 from app.api.constants import RATE_LIMIT_STATS
-from app.api.db import DbSession
 from app.api.middleware import limiter
 from app.api.openapi import DOC_MAX_DELAY, DOC_PUNCTUALITY, DOC_ROUTE_DELAY, DOC_TREND
-from app.api.repositories.stats_repository import StatsRepository
-from app.api.response import MsgspecJSONResponse
+from app.api.response import encoded_response
 from app.api.schemas import (
     EndDateQuery,
     IncludeEstimatedQuery,
@@ -21,8 +19,8 @@ from app.api.validation import validate_date_range
 router = APIRouter(prefix="/lines", tags=["statistics"])
 
 
-def _get_service(db: DbSession) -> StatsService:
-    return StatsService(StatsRepository(db))
+def _get_service() -> StatsService:
+    return StatsService()
 
 
 Stats = Annotated[StatsService, Depends(_get_service)]
@@ -35,7 +33,7 @@ Stats = Annotated[StatsService, Depends(_get_service)]
     response_model=None,
 )
 @limiter.limit(RATE_LIMIT_STATS)
-def get_max_delay_between_stops(
+async def get_max_delay_between_stops(
     request: Request,
     line_number: LineNumberPath,
     service: Stats,
@@ -56,7 +54,9 @@ def get_max_delay_between_stops(
     (e.g., GPS drift during layovers, driver login delays).
     """
     validate_date_range(start_date, end_date)
-    return MsgspecJSONResponse(service.max_delay_between_stops(line_number, start_date, end_date, include_estimated))
+    return encoded_response(
+        request, await service.max_delay_between_stops(line_number, start_date, end_date, include_estimated)
+    )
 
 
 @router.get(
@@ -66,7 +66,7 @@ def get_max_delay_between_stops(
     response_model=None,
 )
 @limiter.limit(RATE_LIMIT_STATS)
-def get_route_delay(
+async def get_route_delay(
     request: Request,
     line_number: LineNumberPath,
     service: Stats,
@@ -88,7 +88,7 @@ def get_route_delay(
     (e.g., GPS drift during layovers, driver login delays).
     """
     validate_date_range(start_date, end_date)
-    return MsgspecJSONResponse(service.route_delay(line_number, start_date, end_date, include_estimated))
+    return encoded_response(request, await service.route_delay(line_number, start_date, end_date, include_estimated))
 
 
 @router.get(
@@ -98,7 +98,7 @@ def get_route_delay(
     response_model=None,
 )
 @limiter.limit(RATE_LIMIT_STATS)
-def get_punctuality(
+async def get_punctuality(
     request: Request,
     line_number: LineNumberPath,
     service: Stats,
@@ -124,7 +124,7 @@ def get_punctuality(
     (e.g., GPS drift during layovers, driver login delays).
     """
     validate_date_range(start_date, end_date)
-    return MsgspecJSONResponse(service.punctuality(line_number, start_date, end_date, include_estimated))
+    return encoded_response(request, await service.punctuality(line_number, start_date, end_date, include_estimated))
 
 
 @router.get(
@@ -134,7 +134,7 @@ def get_punctuality(
     response_model=None,
 )
 @limiter.limit(RATE_LIMIT_STATS)
-def get_trend(
+async def get_trend(
     request: Request,
     line_number: LineNumberPath,
     service: Stats,
@@ -155,4 +155,4 @@ def get_trend(
     (e.g., GPS drift during layovers, driver login delays).
     """
     validate_date_range(start_date, end_date)
-    return MsgspecJSONResponse(service.trend(line_number, start_date, end_date, include_estimated))
+    return encoded_response(request, await service.trend(line_number, start_date, end_date, include_estimated))
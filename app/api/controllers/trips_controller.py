@@ -7,16 +7,16 @@ from app.api.constants import RATE_LIMIT_DEFAULT
 from app.api.db import DbSession
 from app.api.middleware import limiter
 from app.api.openapi import DOC_TRIP_STOPS
+from app.api.repositories.gtfs_static_repository import AsyncGtfsStaticRepository
 from app.api.response import MsgspecJSONResponse
 from app.api.schemas import TripIdPath
 from app.api.services.trips_service import TripsService
-from app.shared.gtfs.repositories.gtfs_static import GtfsStaticRepository
 
 router = APIRouter(prefix="/trips", tags=["trips"])
 
 
 def _get_service(db: DbSession) -> TripsService:
-    return TripsService(GtfsStaticRepository(db))
+    return TripsService(AsyncGtfsStaticRepository(db))
 
 
 Trips = Annotated[TripsService, Depends(_get_service)]
@@ -29,10 +29,10 @@ Trips = Annotated[TripsService, Depends(_get_service)]
     response_model=None,
 )
 @limiter.limit(RATE_LIMIT_DEFAULT)
-def get_trip_stops(request: Request, trip_id: TripIdPath, service: Trips) -> Response:
+async def get_trip_stops(request: Request, trip_id: TripIdPath, service: Trips) -> Response:
     """
     Returns the ordered list of stops for a specific trip.
 
     Use `trip_id` from the `/vehicles/positions` endpoint to fetch stops for a vehicle's current trip.
     """
-    return MsgspecJSONResponse(service.get_trip_stops(trip_id))
+    return MsgspecJSONResponse(await service.get_trip_stops(trip_id))
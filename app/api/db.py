@@ -1,15 +1,25 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Annotated
 
 from fastapi import Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.platform.db.connection import get_session
+from app.platform.db.async_connection import get_async_session_factory
 
 
-def get_db() -> Generator[Session]:
-    with get_session() as session:
+async def get_db() -> AsyncGenerator[AsyncSession]:
+    # The session checks a pooled connection out on its first query only, so requests answered from
+    # the cache never hold one; it goes back to the pool when the request ends.
+    async with get_async_session_factory()() as session:
         yield session
 
 
-DbSession = Annotated[Session, Depends(get_db)]
+@asynccontextmanager
+async def detached_session() -> AsyncIterator[AsyncSession]:
+    """A session of its own for work outliving the request that started it, like background cache refreshes."""
+    async with get_async_session_factory()() as session:
+        yield session
+
+
+DbSession = Annotated[AsyncSession, Depends(get_db)]
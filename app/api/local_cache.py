@@ -0,0 +1,57 @@
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+
+
+class LocalCache:
+    """
+    In-process cache of byte values in front of Redis, per worker. Entries expire after their own TTL, and past
+    `max_bytes` of keys and values the least recently used ones are evicted.
+    """
+
+    def __init__(self, max_bytes: int, clock: Callable[[], float] = time.monotonic):
+        self._max_bytes = max_bytes
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._remove(key)
+        size = len(key) + len(value)
+        if ttl <= 0 or size > self._max_bytes:
+            return
+        self._entries[key] = (self._clock() + ttl, value)
+        self._size += size
+        while self._size > self._max_bytes:
+            evicted, (_, evicted_value) = self._entries.popitem(last=False)
+            self._size -= len(evicted) + len(evicted_value)
+
+    def invalidate(self, prefix: str = "") -> int:
+        """Drop the entries of keys starting with `prefix`, all of them by default. Returns how many were dropped."""
+        keys = [key for key in self._entries if key.startswith(prefix)]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(key) + len(entry[1])
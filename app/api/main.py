@@ -1,8 +1,13 @@
+import asyncio
+import logging
 from collections.abc import AsyncIterator
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 
+from app.api import popularity
+from app.api.cache import cache_tier_metrics, listen_for_invalidations, single_flight_metrics
+from app.api.constants import CACHE_METRICS_LOG_INTERVAL_SECONDS
 from app.api.controllers.health_controller import router as health_router
 from app.api.controllers.shapes_controller import router as shapes_router
 from app.api.controllers.stats_controller import router as stats_router
@@ -12,18 +17,68 @@ from app.api.exceptions import setup_exception_handlers
 from app.api.middleware import setup_middleware
 from app.api.openapi import make_openapi_fn
 from app.api.response import MsgspecJSONResponse
-from app.platform.db.connection import get_engine
+from app.api.warmer import CacheWarmer
+from app.platform.db.async_connection import get_async_engine
 from app.platform.logging import setup_logging
 from app.platform.sentry import setup_sentry
 
+logger = logging.getLogger(__name__)
+
+
+def _log_cache_metrics() -> None:
+    m = single_flight_metrics()
+    logger.info(
+        "Cache fill metrics: computed=%d coalesced=%d lease_waits=%d lease_timeouts=%d duplicates_avoided=%d "
+        "refreshes=%d",
+        m.computed,
+        m.coalesced,
+        m.lease_waits,
+        m.lease_timeouts,
+        m.duplicates_avoided,
+        m.refreshes,
+    )
+    t = cache_tier_metrics()
+    logger.info(
+        "Cache tier metrics: l1_hit_ratio=%.3f l2_hit_ratio=%.3f l1_hits=%d l2_hits=%d l2_misses=%d l1_entries=%d "
+        "l1_bytes=%d",
+        t.l1_hit_ratio,
+        t.l2_hit_ratio,
+        t.l1_hits,
+        t.l2_hits,
+        t.l2_misses,
+        t.l1_entries,
+        t.l1_bytes,
+    )
+
+
+async def _log_cache_metrics_periodically() -> None:
+    while True:
+        await asyncio.sleep(CACHE_METRICS_LOG_INTERVAL_SECONDS)
+        _log_cache_metrics()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     setup_sentry("api")
     setup_logging()
-    engine = get_engine()
+    engine = get_async_engine()
+    warmer = CacheWarmer()
+    tasks = [
+        asyncio.create_task(_log_cache_metrics_periodically()),
+        asyncio.create_task(listen_for_invalidations(warmer.on_invalidation)),
+        asyncio.create_task(popularity.flush_periodically()),
+    ]
+    warmer.trigger("startup")
     yield
-    engine.dispose()
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        with suppress(asyncio.CancelledError):
+            await task
+    await warmer.close()
+    await popularity.flush()
+    _log_cache_metrics()
+    await engine.dispose()
 
 
 def create_app() -> FastAPI:
@@ -11,6 +11,7 @@ from app.api.schemas import (
     MaxDelayBetweenStopsResponse,
     PunctualityResponse,
     RouteDelayResponse,
+    ShapePolylineResponse,
     ShapeResponse,
     TrendResponse,
     TripStopsResponse,
@@ -23,6 +24,7 @@ _ALL_RESPONSE_TYPES = [
     TrendResponse,
     LiveVehicleResponse,
     ShapeResponse,
+    ShapePolylineResponse,
     TripStopsResponse,
     ErrorResponse,
 ]
@@ -0,0 +1,114 @@
+"""
+Request counts of the stats endpoints, read by the cache warmer.
+
+Requests are counted per endpoint, line, detection class and range preset: the length of the range and how many days
+before today it ends, so "the last 7 days" is one preset whatever the day. Ranges ending earlier than
+POPULARITY_PRESET_MAX_END_OFFSET_DAYS before today are not counted. Each worker counts in memory and adds its counts
+every POPULARITY_FLUSH_INTERVAL_SECONDS to the Redis sorted set of the day, kept for POPULARITY_WINDOW_DAYS.
+"""
+
+import asyncio
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Self
+from zoneinfo import ZoneInfo
+
+import redis
+
+from app.api.constants import (
+    POPULARITY_FLUSH_INTERVAL_SECONDS,
+    POPULARITY_PRESET_MAX_END_OFFSET_DAYS,
+    POPULARITY_WINDOW_DAYS,
+    REDIS_KEY_STATS_POPULARITY_PREFIX,
+)
+from app.platform.constants import TIMEZONE
+from app.platform.redis.connection import get_async_client
+
+logger = logging.getLogger(__name__)
+
+_WARSAW = ZoneInfo(TIMEZONE)
+
+_counts: Counter[str] = Counter()
+
+
+class StatsCombination(NamedTuple):
+    endpoint: str
+    line_number: str
+    days: int
+    end_offset: int
+    include_estimated: bool
+
+    @classmethod
+    def of(
+        cls, endpoint: str, line_number: str, start_date: date, end_date: date, include_estimated: bool, today: date
+    ) -> Self | None:
+        """The preset combination of a requested range, None for ranges ending too long ago."""
+        end_offset = (today - end_date).days
+        if not 0 <= end_offset <= POPULARITY_PRESET_MAX_END_OFFSET_DAYS:
+            return None
+        return cls(endpoint, line_number, (end_date - start_date).days + 1, end_offset, include_estimated)
+
+    def dates(self, today: date) -> tuple[date, date]:
+        end_date = today - timedelta(days=self.end_offset)
+        return end_date - timedelta(days=self.days - 1), end_date
+
+    def member(self) -> str:
+        return f"{self.endpoint}|{self.line_number}|{self.days}|{self.end_offset}|{int(self.include_estimated)}"
+
+    @classmethod
+    def from_member(cls, member: str) -> Self:
+        endpoint, line_number, days, end_offset, include_estimated = member.split("|")
+        return cls(endpoint, line_number, int(days), int(end_offset), include_estimated == "1")
+
+
+def today() -> date:
+    return datetime.now(_WARSAW).date()
+
+
+def _key(day: date) -> str:
+    return f"{REDIS_KEY_STATS_POPULARITY_PREFIX}{day}"
+
+
+def record(endpoint: str, line_number: str, start_date: date, end_date: date, include_estimated: bool) -> None:
+    combination = StatsCombination.of(endpoint, line_number, start_date, end_date, include_estimated, today())
+    if combination is not None:
+        _counts[combination.member()] += 1
+
+
+async def flush() -> None:
+    """Add the counts of this worker to Redis. Counts failing to be written are dropped."""
+    if not _counts:
+        return
+    counts = dict(_counts)
+    _counts.clear()
+    key = _key(today())
+    try:
+        async with get_async_client().pipeline(transaction=False) as pipe:
+            for member, count in counts.items():
+                pipe.zincrby(key, count, member)
+            pipe.expire(key, POPULARITY_WINDOW_DAYS * 24 * 60 * 60)
+            await pipe.execute()
+    except redis.RedisError:
+        logger.warning("Redis write failed for %d stats request counts", len(counts), exc_info=True)
+
+
+async def flush_periodically() -> None:
+    while True:
+        await asyncio.sleep(POPULARITY_FLUSH_INTERVAL_SECONDS)
+        await flush()
+
+
+async def most_requested(limit: int) -> list[StatsCombination]:
+    """The `limit` combinations requested most over the last POPULARITY_WINDOW_DAYS, most requested first."""
+    first = today()
+    keys = [_key(first - timedelta(days=i)) for i in range(POPULARITY_WINDOW_DAYS)]
+    rows: list[tuple[bytes, float]] = await get_async_client().zunion(keys, withscores=True)  # type: ignore[assignment]
+    rows.sort(key=lambda row: row[1], reverse=True)
+    combinations: list[StatsCombination] = []
+    for member, _ in rows[:limit]:
+        try:
+            combinations.append(StatsCombination.from_member(member.decode()))
+        except ValueError:
+            logger.warning("Invalid stats request count member: %r", member)
+    return combinations
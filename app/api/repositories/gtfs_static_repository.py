@@ -0,0 +1,30 @@
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.shared.db.models import CurrentStop, CurrentStopTime, ShapePolyline, TripSummary
+
+
+class AsyncGtfsStaticRepository:
+    """The lookups the API serves, on an asyncio session."""
+
+    def __init__(self, session: AsyncSession):
+        self._session = session
+
+    async def get_trip_info(self, trip_ids: list[str]) -> dict[str, tuple[str, str, str | None]]:
+        stmt = select(
+            TripSummary.trip_id, TripSummary.route_short_name, TripSummary.headsign, TripSummary.shape_id
+        ).where(TripSummary.trip_id.in_(trip_ids))
+        rows = (await self._session.execute(stmt)).all()
+        return {row.trip_id: (row.route_short_name, row.headsign or "", row.shape_id) for row in rows}
+
+    async def get_shape_polyline(self, shape_id: str, resolution: str) -> ShapePolyline | None:
+        return await self._session.get(ShapePolyline, (shape_id, resolution))
+
+    async def get_stops_for_trip(self, trip_id: str) -> list[Row[tuple[CurrentStopTime, CurrentStop]]]:
+        stmt = (
+            select(CurrentStopTime, CurrentStop)
+            .join(CurrentStop, CurrentStopTime.stop_id == CurrentStop.stop_id)
+            .where(CurrentStopTime.trip_id == trip_id)
+            .order_by(CurrentStopTime.stop_sequence)
+        )
+        return list((await self._session.execute(stmt)).all())
@@ -3,10 +3,16 @@ from typing import Any
 
 import sqlalchemy as sa
 from sqlalchemy import and_, distinct, func, or_
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.constants import ESTIMATED_VALID_FROM, MIN_DELAY_SECONDS
+from app.api.constants import ESTIMATED_VALID_FROM, STATS_TOP_LIMIT
 from app.platform.constants import TIMEZONE
+from app.shared.constants import (
+    MIN_DELAY_SECONDS,
+    PUNCTUALITY_ON_TIME_MAX_SECONDS,
+    PUNCTUALITY_SLIGHTLY_DELAYED_MAX_SECONDS,
+)
+from app.shared.db.models import LineDailyStats, LineDailyStatsDay
 
 _TZ = TIMEZONE
 
@@ -48,14 +54,32 @@ def _prev_det_filter(tbl: Any, include_estimated: bool) -> Any:
     return and_(tbl.c.detection_method == 1, tbl.c.prev_detection_method == 1)
 
 
+def _rollup_class_filter(include_estimated: bool) -> Any:
+    """The line_daily_stats detection class _det_filter selects on each day."""
+    if include_estimated:
+        return LineDailyStats.includes_estimated == (LineDailyStats.service_date >= ESTIMATED_VALID_FROM)
+    return sa.not_(LineDailyStats.includes_estimated)
+
+
+def _top_of_each_day(ranked: sa.Subquery) -> sa.Select[Any]:
+    """The rows of `ranked` with a day_rank up to STATS_TOP_LIMIT, without the rank."""
+    return sa.select(*(c for c in ranked.c if c.name != "day_rank")).where(ranked.c.day_rank <= STATS_TOP_LIMIT)
+
+
 class StatsRepository:
-    def __init__(self, session: Session):
+    """
+    Line statistics per service day, for the stats service to cache and merge over date ranges. Punctuality, trend
+    and trip counts read the line_daily_stats rollups of closed days and the stop events of the remaining days,
+    with the same results as reading stop_events throughout.
+    """
+
+    def __init__(self, session: AsyncSession):
         self._session = session
 
-    def max_delay_between_stops(
-        self, line_number: str, start_date: date, end_date: date, include_estimated: bool = False
+    async def max_delay_between_stops(
+        self, line_number: str, days: list[date], include_estimated: bool = False
     ) -> list[dict[str, Any]]:
-        """Generated delay = delay at stop N+1 - delay at stop N."""
+        """Generated delay = delay at stop N+1 - delay at stop N. The STATS_TOP_LIMIT highest of each day."""
         e = _stop_events.alias("e")
 
         filtered = (
@@ -75,7 +99,7 @@ class StatsRepository:
             .where(
                 and_(
                     e.c.line_number == line_number,
-                    e.c.service_date.between(start_date, end_date),
+                    e.c.service_date.in_(days),
                     e.c.stop_sequence > 1,
                     e.c.stop_sequence < e.c.max_stop_sequence,
                     _det_filter(e, include_estimated),
@@ -118,7 +142,7 @@ class StatsRepository:
             .label("prev_detection_method"),
         ).cte("consecutive")
 
-        q = (
+        ranked = (
             sa.select(
                 consecutive.c.trip_id,
                 consecutive.c.service_date,
@@ -138,6 +162,9 @@ class StatsRepository:
                     consecutive.c.detection_method != 1,
                     consecutive.c.prev_detection_method != 1,
                 ).label("is_estimated"),
+                func.row_number()
+                .over(partition_by=consecutive.c.service_date, order_by=consecutive.c.generated_delay.desc())
+                .label("day_rank"),
             )
             .where(
                 and_(
@@ -148,35 +175,36 @@ class StatsRepository:
                     _prev_det_filter(consecutive, include_estimated),
                 )
             )
-            .order_by(consecutive.c.generated_delay.desc())
-            .limit(10)
+            .subquery("ranked")
         )
+        q = _top_of_each_day(ranked)
 
-        result = self._session.execute(q)
+        result = await self._session.execute(q)
         return [dict(r) for r in result.mappings().all()]
 
-    def trips_count(self, line_number: str, start_date: date, end_date: date) -> int:
-        """Count distinct trips for a line in the given period."""
+    async def trips_per_day(self, line_number: str, days: list[date]) -> dict[date, int]:
+        """Distinct trips of a line on each of `days` that has any."""
         e = _stop_events.alias("e")
-        # COUNT(DISTINCT (trip_id, service_date)) via subquery — equivalent, avoids row-constructor syntax.
-        subq = (
-            sa.select(e.c.trip_id, e.c.service_date)
-            .distinct()
-            .where(
-                and_(
-                    e.c.line_number == line_number,
-                    e.c.service_date.between(start_date, end_date),
-                )
-            )
-            .subquery()
+        ls = LineDailyStats
+        rolled_up, open_days = await self._split_days(days)
+
+        rollup = sa.select(ls.service_date.label("date"), ls.trips_total.label("trips")).where(
+            ls.line_number == line_number, ls.service_date.in_(rolled_up), sa.not_(ls.includes_estimated)
+        )
+        raw = (
+            sa.select(e.c.service_date.label("date"), func.count(distinct(e.c.trip_id)).label("trips"))
+            .where(and_(e.c.line_number == line_number, e.c.service_date.in_(open_days)))
+            .group_by(e.c.service_date)
         )
-        result = self._session.execute(sa.select(func.count()).select_from(subq))
-        return result.scalar() or 0
+        result = await self._session.execute(sa.union_all(rollup, raw))
+        return {row.date: row.trips for row in result}
 
-    def max_route_delay(
-        self, line_number: str, start_date: date, end_date: date, include_estimated: bool = False
+    async def max_route_delay(
+        self, line_number: str, days: list[date], include_estimated: bool = False
     ) -> list[dict[str, Any]]:
-        """Route delay = delay at second-to-last stop - delay at second stop."""
+        """
+        Route delay = delay at second-to-last stop - delay at second stop. The STATS_TOP_LIMIT highest of each day.
+        """
         e = _stop_events.alias("e")
 
         filtered = (
@@ -197,7 +225,7 @@ class StatsRepository:
             .where(
                 and_(
                     e.c.line_number == line_number,
-                    e.c.service_date.between(start_date, end_date),
+                    e.c.service_date.in_(days),
                     e.c.stop_sequence > 1,
                     e.c.stop_sequence < e.c.max_stop_sequence,
                     _det_filter(e, include_estimated),
@@ -316,48 +344,91 @@ class StatsRepository:
             .subquery("ranked")
         )
 
-        q = sa.select(inner_q).order_by(inner_q.c.delay_generated_seconds.desc()).limit(10)
+        ranked_days = sa.select(
+            inner_q,
+            func.row_number()
+            .over(partition_by=inner_q.c.service_date, order_by=inner_q.c.delay_generated_seconds.desc())
+            .label("day_rank"),
+        ).subquery("ranked_days")
+        q = _top_of_each_day(ranked_days)
 
-        result = self._session.execute(q)
+        result = await self._session.execute(q)
         return [dict(r) for r in result.mappings().all()]
 
-    def punctuality(
-        self, line_number: str, start_date: date, end_date: date, include_estimated: bool = False
-    ) -> dict[str, Any]:
+    async def punctuality_per_day(
+        self, line_number: str, days: list[date], include_estimated: bool = False
+    ) -> dict[date, dict[str, int]]:
         """
-        For each stop in [2, n-1] range, classify individually:
+        For each stop in [2, n-1] range, classify individually, counted per day:
         - on_time: delay <= 120s
         - slightly_delayed: 120s < delay <= 360s
         - delayed: delay > 360s
         """
         e = _stop_events.alias("e")
-
-        q = sa.select(
-            func.count().label("total"),
-            func.count().filter(e.c.delay_seconds <= 120).label("on_time"),
-            func.count().filter(and_(e.c.delay_seconds > 120, e.c.delay_seconds <= 360)).label("slightly_delayed"),
-            func.count().filter(e.c.delay_seconds > 360).label("delayed"),
+        ls = LineDailyStats
+        rolled_up, open_days = await self._split_days(days)
+
+        rollup = sa.select(
+            ls.service_date.label("date"),
+            ls.stop_count.label("total"),
+            ls.on_time_count.label("on_time"),
+            ls.slightly_delayed_count.label("slightly_delayed"),
+            ls.delayed_count.label("delayed"),
         ).where(
-            and_(
-                e.c.line_number == line_number,
-                e.c.service_date.between(start_date, end_date),
-                e.c.stop_sequence > 1,
-                e.c.stop_sequence < e.c.max_stop_sequence,
-                e.c.delay_seconds >= MIN_DELAY_SECONDS,
-                _det_filter(e, include_estimated),
+            ls.line_number == line_number,
+            ls.service_date.in_(rolled_up),
+            ls.stop_count > 0,
+            _rollup_class_filter(include_estimated),
+        )
+        raw = (
+            sa.select(
+                e.c.service_date.label("date"),
+                func.count().label("total"),
+                func.count().filter(e.c.delay_seconds <= PUNCTUALITY_ON_TIME_MAX_SECONDS).label("on_time"),
+                func.count()
+                .filter(
+                    and_(
+                        e.c.delay_seconds > PUNCTUALITY_ON_TIME_MAX_SECONDS,
+                        e.c.delay_seconds <= PUNCTUALITY_SLIGHTLY_DELAYED_MAX_SECONDS,
+                    )
+                )
+                .label("slightly_delayed"),
+                func.count().filter(e.c.delay_seconds > PUNCTUALITY_SLIGHTLY_DELAYED_MAX_SECONDS).label("delayed"),
+            )
+            .where(
+                and_(
+                    e.c.line_number == line_number,
+                    e.c.service_date.in_(open_days),
+                    e.c.stop_sequence > 1,
+                    e.c.stop_sequence < e.c.max_stop_sequence,
+                    e.c.delay_seconds >= MIN_DELAY_SECONDS,
+                    _det_filter(e, include_estimated),
+                )
             )
+            .group_by(e.c.service_date)
         )
 
-        row = self._session.execute(q).mappings().first()
-        return dict(row) if row else {"total": 0, "on_time": 0, "slightly_delayed": 0, "delayed": 0}
+        result = await self._session.execute(sa.union_all(rollup, raw))
+        return {row["date"]: {k: v for k, v in row.items() if k != "date"} for row in result.mappings()}
 
-    def trend(
-        self, line_number: str, start_date: date, end_date: date, include_estimated: bool = False
-    ) -> list[dict[str, Any]]:
-        """Average delay per day for a line."""
+    async def trend(self, line_number: str, days: list[date], include_estimated: bool = False) -> list[dict[str, Any]]:
+        """Average delay on each of `days` a line has any events, in date order."""
         e = _stop_events.alias("e")
-
-        q = (
+        ls = LineDailyStats
+        rolled_up, open_days = await self._split_days(days)
+
+        # avg(integer) is sum / count in numeric, so both halves round the same value
+        rollup = sa.select(
+            ls.service_date.label("date"),
+            func.round(sa.cast(ls.delay_sum, sa.Numeric) / ls.stop_count, 1).label("avg_delay_seconds"),
+            ls.trips_count.label("trips_count"),
+        ).where(
+            ls.line_number == line_number,
+            ls.service_date.in_(rolled_up),
+            ls.stop_count > 0,
+            _rollup_class_filter(include_estimated),
+        )
+        raw = (
             sa.select(
                 e.c.service_date.label("date"),
                 func.round(sa.cast(func.avg(e.c.delay_seconds), sa.Numeric), 1).label("avg_delay_seconds"),
@@ -367,7 +438,7 @@ class StatsRepository:
             .where(
                 and_(
                     e.c.line_number == line_number,
-                    e.c.service_date.between(start_date, end_date),
+                    e.c.service_date.in_(open_days),
                     e.c.stop_sequence > 1,
                     e.c.stop_sequence < e.c.max_stop_sequence,
                     e.c.delay_seconds >= MIN_DELAY_SECONDS,
@@ -375,8 +446,24 @@ class StatsRepository:
                 )
             )
             .group_by(e.c.service_date)
-            .order_by(e.c.service_date)
         )
+        combined = sa.union_all(rollup, raw).subquery()
+        q = sa.select(combined).order_by(combined.c.date)
 
-        result = self._session.execute(q)
+        result = await self._session.execute(q)
         return [dict(r) for r in result.mappings().all()]
+
+    async def _split_days(self, days: list[date]) -> tuple[list[date], list[date]]:
+        """
+        `days` with complete line_daily_stats rollups, and the open days (still running, or with events added since
+        the rollup) to read from stop_events.
+        """
+        if not days:
+            return [], []
+        q = sa.select(LineDailyStatsDay.service_date).where(
+            LineDailyStatsDay.service_date.between(min(days), max(days)), sa.not_(LineDailyStatsDay.stale)
+        )
+        complete = set((await self._session.execute(q)).scalars().all())
+        rolled_up = [day for day in days if day in complete]
+        open_days = [day for day in days if day not in complete]
+        return rolled_up, open_days
@@ -1,9 +1,86 @@
+import gzip
+import hashlib
 from typing import Any
 
+import brotli
 import msgspec
-from fastapi.responses import JSONResponse
+from fastapi import Request, status
+from fastapi.responses import JSONResponse, Response
+
+from app.api.constants import RESPONSE_BROTLI_QUALITY, RESPONSE_COMPRESS_MIN_BYTES, RESPONSE_GZIP_LEVEL
 
 
 class MsgspecJSONResponse(JSONResponse):
     def render(self, content: Any) -> bytes:
         return msgspec.json.encode(content)
+
+
+class EncodedBody(msgspec.Struct, array_like=True):
+    """JSON response body encoded once, as cached: with its compressed variants and a weak ETag of its content."""
+
+    etag: str
+    identity: bytes
+    gzip: bytes | None = None
+    br: bytes | None = None
+
+
+def encode_body(content: msgspec.Struct) -> EncodedBody:
+    raw = msgspec.json.encode(content)
+    # Weak: the compressed variants share it
+    etag = f'W/"{hashlib.blake2b(raw, digest_size=16).hexdigest()}"'
+    if len(raw) < RESPONSE_COMPRESS_MIN_BYTES:
+        return EncodedBody(etag, raw)
+    return EncodedBody(
+        etag,
+        raw,
+        gzip=gzip.compress(raw, compresslevel=RESPONSE_GZIP_LEVEL),
+        br=brotli.compress(raw, quality=RESPONSE_BROTLI_QUALITY),
+    )
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, RFC 9110 13.1.2
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def _accepted_encodings(accept_encoding: str) -> dict[str, float]:
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        name, _, value = params.partition("=")
+        if name.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        if coding.strip():
+            accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def _pick_variant(accept_encoding: str, body: EncodedBody) -> tuple[str | None, bytes]:
+    """The content coding and content of the variant the client prefers, brotli on a tie, identity if none."""
+    accepted = _accepted_encodings(accept_encoding)
+    best: tuple[float, str, bytes] | None = None
+    for coding, variant in (("br", body.br), ("gzip", body.gzip)):
+        quality = accepted.get(coding, accepted.get("*", 0.0))
+        if variant is not None and quality > 0 and (best is None or quality > best[0]):
+            best = (quality, coding, variant)
+    return (None, body.identity) if best is None else (best[1], best[2])
+
+
+def encoded_response(request: Request, body: EncodedBody) -> Response:
+    """`body` as is, in the variant `Accept-Encoding` prefers, or 304 Not Modified if `If-None-Match` matches."""
+    headers = {"ETag": body.etag, "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and _etag_matches(if_none_match, body.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    encoding, content = _pick_variant(request.headers.get("accept-encoding", ""), body)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=content, media_type="application/json", headers=headers)
@@ -4,6 +4,8 @@ from typing import Annotated
 import msgspec
 from fastapi import Path, Query
 
+from app.shared.models.enums import ShapeFormat, ShapeResolution
+
 StartDateQuery = Annotated[
     date,
     Query(
@@ -47,6 +49,16 @@ ShapeIdPath = Annotated[
     ),
 ]
 
+ShapeResolutionQuery = Annotated[
+    ShapeResolution,
+    Query(description="Detail level: full returns every point, high, medium and low are simplified to 1, 5 and 20 m."),
+]
+
+ShapeFormatQuery = Annotated[
+    ShapeFormat,
+    Query(alias="format", description="json returns a list of points, polyline an encoded polyline."),
+]
+
 TripIdPath = Annotated[
     str,
     Path(
@@ -176,6 +188,13 @@ class ShapeResponse(msgspec.Struct):
     points: list[ShapePoint]
 
 
+class ShapePolylineResponse(msgspec.Struct):
+    shape_id: str
+    resolution: str
+    point_count: int
+    polyline: str
+
+
 class TripStop(msgspec.Struct):
     stop_id: str
     stop_name: str
@@ -1,26 +1,45 @@
-from app.api.schemas import ShapePoint, ShapeResponse
+from app.api.cache import get_or_compute_shape
+from app.api.repositories.gtfs_static_repository import AsyncGtfsStaticRepository
+from app.api.response import EncodedBody
+from app.api.schemas import ShapePoint, ShapePolylineResponse, ShapeResponse
 from app.shared.exceptions import ResourceNotFoundError
-from app.shared.gtfs.repositories.gtfs_static import GtfsStaticRepository
+from app.shared.gtfs.polyline import decode_polyline
+from app.shared.models.enums import ShapeFormat, ShapeResolution
 
 
 class ShapesService:
-    def __init__(self, static_repo: GtfsStaticRepository):
+    def __init__(self, static_repo: AsyncGtfsStaticRepository):
         self._static_repo = static_repo
 
-    def get_shape(self, shape_id: str) -> ShapeResponse:
-        points = self._static_repo.get_shape_points(shape_id)
-        if not points:
+    async def get_shape(
+        self,
+        shape_id: str,
+        resolution: ShapeResolution = ShapeResolution.FULL,
+        shape_format: ShapeFormat = ShapeFormat.JSON,
+    ) -> EncodedBody:
+        return await get_or_compute_shape(
+            shape_id, resolution, shape_format, lambda: self._build_shape(shape_id, resolution, shape_format)
+        )
+
+    async def _build_shape(
+        self, shape_id: str, resolution: ShapeResolution, shape_format: ShapeFormat
+    ) -> ShapeResponse | ShapePolylineResponse:
+        # Every resolution is precomputed, `full` keeping every point at the polyline precision of 1e-5 degrees
+        shape = await self._static_repo.get_shape_polyline(shape_id, resolution)
+        if shape is None:
             raise ResourceNotFoundError("Shape", shape_id)
 
-        response = ShapeResponse(
+        if shape_format is ShapeFormat.POLYLINE:
+            return ShapePolylineResponse(
+                shape_id=shape_id,
+                resolution=resolution,
+                point_count=shape.point_count,
+                polyline=shape.polyline,
+            )
+        return ShapeResponse(
             shape_id=shape_id,
             points=[
-                ShapePoint(
-                    latitude=p.shape_pt_lat,
-                    longitude=p.shape_pt_lon,
-                    sequence=p.shape_pt_sequence,
-                )
-                for p in points
+                ShapePoint(latitude=lat, longitude=lon, sequence=sequence)
+                for (lat, lon), sequence in zip(decode_polyline(shape.polyline), shape.sequences, strict=True)
             ],
         )
-        return response
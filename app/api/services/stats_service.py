@@ -1,10 +1,15 @@
-from datetime import date
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from datetime import UTC, date, datetime, timedelta
 from typing import Any
 
 import msgspec
 
-from app.api import cache
+from app.api import cache, popularity
+from app.api.constants import STATS_TOP_LIMIT
+from app.api.db import detached_session
 from app.api.repositories.stats_repository import StatsRepository
+from app.api.response import EncodedBody
 from app.api.schemas import (
     MaxDelayBetweenStops,
     MaxDelayBetweenStopsResponse,
@@ -15,110 +20,289 @@ from app.api.schemas import (
     TrendResponse,
 )
 from app.shared.exceptions import ResourceNotFoundError
+from app.shared.gtfs.timeparse import last_closed_service_date
 
 
 def _to_str(row: dict[str, Any]) -> dict[str, Any]:
     return {k: str(v) if not isinstance(v, (str, int, float)) else v for k, v in row.items()}
 
 
-def _check_line_exists(trips: int, line_number: str, start_date: date, end_date: date) -> None:
+def _check_line_exists(trips: int, line_number: str) -> None:
     if not trips:
         raise ResourceNotFoundError("Line", line_number)
 
 
-class StatsService:
+def _days(start_date: date, end_date: date) -> list[date]:
+    return [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+
+# Per-day partial results, cached per day and merged over the requested range
+
+
+class _DayTrips(msgspec.Struct):
+    trips: int = 0
+
+
+class _DayPunctuality(msgspec.Struct):
+    total: int = 0
+    on_time: int = 0
+    slightly_delayed: int = 0
+    delayed: int = 0
+
+
+class _DayTrend(msgspec.Struct):
+    day: TrendDay | None = None
+
+
+class _DayMaxDelay(msgspec.Struct):
+    top: list[MaxDelayBetweenStops] = []
+
+
+class _DayRouteDelay(msgspec.Struct):
+    top: list[RouteDelay] = []
+
+
+async def _day_partials[P: msgspec.Struct](
+    endpoint: str,
+    line_number: str,
+    days: list[date],
+    include_estimated: bool,
+    partial_type: type[P],
+    compute: Callable[[list[date]], Awaitable[dict[date, P]]],
+) -> list[P]:
+    """
+    The partials of `days` in order: cached ones, and the rest computed in one call to `compute` and cached. Days
+    `compute` leaves out get an empty partial, so they are not queried again either.
+    """
+    cached = await cache.get_day_partials(endpoint, line_number, days, include_estimated)
+    partials = {day: msgspec.json.decode(raw, type=partial_type) for day, raw in cached.items()}
+    missing = [day for day in days if day not in partials]
+    if missing:
+        computed = await compute(missing)
+        fresh = {day: computed[day] if day in computed else partial_type() for day in missing}
+        last_closed = last_closed_service_date(datetime.now(UTC))
+        await cache.set_day_partials(endpoint, line_number, fresh, last_closed, include_estimated)
+        partials.update(fresh)
+    return [partials[day] for day in days]
+
+
+def _by_day[S](rows: list[dict[str, Any]], make: Callable[[dict[str, Any]], S]) -> dict[date, list[S]]:
+    grouped: dict[date, list[S]] = {}
+    for row in rows:
+        grouped.setdefault(row["service_date"], []).append(make(row))
+    return grouped
+
+
+@asynccontextmanager
+async def _detached_repo() -> AsyncIterator[StatsRepository]:
+    async with detached_session() as session:
+        yield StatsRepository(session)
+
+
+class _LineStats:
+    """Line statistics of a date range computed on one repository, from per-day partials."""
+
     def __init__(self, repo: StatsRepository):
         self._repo = repo
 
-    def max_delay_between_stops(
-        self, line_number: str, start_date: date, end_date: date, include_estimated: bool = False
+    async def _trips(self, line_number: str, days: list[date]) -> int:
+        async def compute(missing: list[date]) -> dict[date, _DayTrips]:
+            return {
+                day: _DayTrips(trips) for day, trips in (await self._repo.trips_per_day(line_number, missing)).items()
+            }
+
+        partials = await _day_partials("trips", line_number, days, False, _DayTrips, compute)
+        return sum(partial.trips for partial in partials)
+
+    async def max_delay_between_stops(
+        self, line_number: str, start_date: date, end_date: date, include_estimated: bool
     ) -> MaxDelayBetweenStopsResponse:
-        cached = cache.get_cached("max-delay", line_number, start_date, end_date, include_estimated)
-        if cached is not None:
-            return msgspec.json.decode(cached, type=MaxDelayBetweenStopsResponse)
+        days = _days(start_date, end_date)
+        trips = await self._trips(line_number, days)
+        _check_line_exists(trips, line_number)
 
-        trips = self._repo.trips_count(line_number, start_date, end_date)
-        _check_line_exists(trips, line_number, start_date, end_date)
+        async def compute(missing: list[date]) -> dict[date, _DayMaxDelay]:
+            rows = await self._repo.max_delay_between_stops(line_number, missing, include_estimated)
+            grouped = _by_day(rows, lambda row: MaxDelayBetweenStops(**_to_str(row)))
+            return {day: _DayMaxDelay(top) for day, top in grouped.items()}
 
-        rows = self._repo.max_delay_between_stops(line_number, start_date, end_date, include_estimated)
+        partials = await _day_partials("max-delay", line_number, days, include_estimated, _DayMaxDelay, compute)
+        candidates = [row for partial in partials for row in partial.top]
+        candidates.sort(key=lambda row: row.delay_generated_seconds, reverse=True)
 
         result = MaxDelayBetweenStopsResponse(
             line_number=line_number,
             start_date=str(start_date),
             end_date=str(end_date),
-            max_delay=[MaxDelayBetweenStops(**_to_str(row)) for row in rows],
+            max_delay=candidates[:STATS_TOP_LIMIT],
             trips_analyzed=trips,
         )
-        cache.set_cached("max-delay", line_number, start_date, end_date, result, include_estimated)
         return result
 
-    def route_delay(
-        self, line_number: str, start_date: date, end_date: date, include_estimated: bool = False
+    async def route_delay(
+        self, line_number: str, start_date: date, end_date: date, include_estimated: bool
     ) -> RouteDelayResponse:
-        cached = cache.get_cached("route-delay", line_number, start_date, end_date, include_estimated)
-        if cached is not None:
-            return msgspec.json.decode(cached, type=RouteDelayResponse)
+        days = _days(start_date, end_date)
+        trips = await self._trips(line_number, days)
+        _check_line_exists(trips, line_number)
 
-        trips = self._repo.trips_count(line_number, start_date, end_date)
-        _check_line_exists(trips, line_number, start_date, end_date)
+        async def compute(missing: list[date]) -> dict[date, _DayRouteDelay]:
+            rows = await self._repo.max_route_delay(line_number, missing, include_estimated)
+            grouped = _by_day(rows, lambda row: RouteDelay(**_to_str(row)))
+            return {day: _DayRouteDelay(top) for day, top in grouped.items()}
 
-        rows = self._repo.max_route_delay(line_number, start_date, end_date, include_estimated)
+        partials = await _day_partials("route-delay", line_number, days, include_estimated, _DayRouteDelay, compute)
+        candidates = [row for partial in partials for row in partial.top]
+        candidates.sort(key=lambda row: row.delay_generated_seconds, reverse=True)
 
         result = RouteDelayResponse(
             line_number=line_number,
             start_date=str(start_date),
             end_date=str(end_date),
-            max_route_delay=[RouteDelay(**_to_str(row)) for row in rows],
+            max_route_delay=candidates[:STATS_TOP_LIMIT],
             trips_analyzed=trips,
         )
-        cache.set_cached("route-delay", line_number, start_date, end_date, result, include_estimated)
         return result
 
-    def punctuality(
-        self, line_number: str, start_date: date, end_date: date, include_estimated: bool = False
+    async def punctuality(
+        self, line_number: str, start_date: date, end_date: date, include_estimated: bool
     ) -> PunctualityResponse:
-        cached = cache.get_cached("punctuality", line_number, start_date, end_date, include_estimated)
-        if cached is not None:
-            return msgspec.json.decode(cached, type=PunctualityResponse)
+        days = _days(start_date, end_date)
+        trips = await self._trips(line_number, days)
+        _check_line_exists(trips, line_number)
 
-        trips = self._repo.trips_count(line_number, start_date, end_date)
-        _check_line_exists(trips, line_number, start_date, end_date)
+        async def compute(missing: list[date]) -> dict[date, _DayPunctuality]:
+            rows = await self._repo.punctuality_per_day(line_number, missing, include_estimated)
+            return {day: _DayPunctuality(**counts) for day, counts in rows.items()}
 
-        row = self._repo.punctuality(line_number, start_date, end_date, include_estimated)
-        total = row["total"]
+        partials = await _day_partials("punctuality", line_number, days, include_estimated, _DayPunctuality, compute)
+        total = sum(p.total for p in partials)
+        on_time = sum(p.on_time for p in partials)
+        slightly_delayed = sum(p.slightly_delayed for p in partials)
+        delayed = sum(p.delayed for p in partials)
 
         result = PunctualityResponse(
             line_number=line_number,
             start_date=str(start_date),
             end_date=str(end_date),
             total_stops=total,
-            on_time_count=row["on_time"],
-            on_time_percent=round(row["on_time"] / total * 100, 1) if total else 0.0,
-            slightly_delayed_count=row["slightly_delayed"],
-            slightly_delayed_percent=round(row["slightly_delayed"] / total * 100, 1) if total else 0.0,
-            delayed_count=row["delayed"],
-            delayed_percent=round(row["delayed"] / total * 100, 1) if total else 0.0,
+            on_time_count=on_time,
+            on_time_percent=round(on_time / total * 100, 1) if total else 0.0,
+            slightly_delayed_count=slightly_delayed,
+            slightly_delayed_percent=round(slightly_delayed / total * 100, 1) if total else 0.0,
+            delayed_count=delayed,
+            delayed_percent=round(delayed / total * 100, 1) if total else 0.0,
         )
-        cache.set_cached("punctuality", line_number, start_date, end_date, result, include_estimated)
         return result
 
-    def trend(
-        self, line_number: str, start_date: date, end_date: date, include_estimated: bool = False
-    ) -> TrendResponse:
-        cached = cache.get_cached("trend", line_number, start_date, end_date, include_estimated)
-        if cached is not None:
-            return msgspec.json.decode(cached, type=TrendResponse)
+    async def trend(self, line_number: str, start_date: date, end_date: date, include_estimated: bool) -> TrendResponse:
+        days = _days(start_date, end_date)
+        trips = await self._trips(line_number, days)
+        _check_line_exists(trips, line_number)
 
-        trips = self._repo.trips_count(line_number, start_date, end_date)
-        _check_line_exists(trips, line_number, start_date, end_date)
+        async def compute(missing: list[date]) -> dict[date, _DayTrend]:
+            rows = await self._repo.trend(line_number, missing, include_estimated)
+            return {
+                r["date"]: _DayTrend(
+                    TrendDay(
+                        date=str(r["date"]),
+                        avg_delay_seconds=float(r["avg_delay_seconds"]),
+                        trips_count=r["trips_count"],
+                    )
+                )
+                for r in rows
+            }
 
-        rows = self._repo.trend(line_number, start_date, end_date, include_estimated)
+        partials = await _day_partials("trend", line_number, days, include_estimated, _DayTrend, compute)
 
         result = TrendResponse(
             line_number=line_number,
             start_date=str(start_date),
             end_date=str(end_date),
-            days=[TrendDay(**_to_str(r)) for r in rows],
+            days=[p.day for p in partials if p.day is not None],
         )
-        cache.set_cached("trend", line_number, start_date, end_date, result, include_estimated)
         return result
+
+
+_COMPUTE: dict[str, Callable[[_LineStats, str, date, date, bool], Awaitable[msgspec.Struct]]] = {
+    "max-delay": _LineStats.max_delay_between_stops,
+    "route-delay": _LineStats.route_delay,
+    "punctuality": _LineStats.punctuality,
+    "trend": _LineStats.trend,
+}
+
+
+def _computation(
+    open_repo: Callable[[], AbstractAsyncContextManager[StatsRepository]],
+    endpoint: str,
+    line_number: str,
+    start_date: date,
+    end_date: date,
+    include_estimated: bool,
+) -> Callable[[], Awaitable[msgspec.Struct]]:
+    """The computation of an `endpoint` response, on a repository of its own."""
+    compute = _COMPUTE[endpoint]
+
+    async def compute_detached() -> msgspec.Struct:
+        async with open_repo() as repo:
+            return await compute(_LineStats(repo), line_number, start_date, end_date, include_estimated)
+
+    return compute_detached
+
+
+class StatsService:
+    """
+    Cached line statistics. Responses missing from the cache are computed on a session of their own rather than the
+    request's, as the computation is shared with concurrent requests and may outlive the one that started it.
+    """
+
+    def __init__(self, open_repo: Callable[[], AbstractAsyncContextManager[StatsRepository]] = _detached_repo):
+        self._open_repo = open_repo
+
+    async def _cached(
+        self, endpoint: str, line_number: str, start_date: date, end_date: date, include_estimated: bool
+    ) -> EncodedBody:
+        """The body of the `endpoint` response. Counts the request for cache warming."""
+        compute = _computation(self._open_repo, endpoint, line_number, start_date, end_date, include_estimated)
+        body = await cache.get_or_compute_stats(endpoint, line_number, start_date, end_date, include_estimated, compute)
+        popularity.record(endpoint, line_number, start_date, end_date, include_estimated)
+        return body
+
+    async def max_delay_between_stops(
+        self, line_number: str, start_date: date, end_date: date, include_estimated: bool = False
+    ) -> EncodedBody:
+        return await self._cached("max-delay", line_number, start_date, end_date, include_estimated)
+
+    async def route_delay(
+        self, line_number: str, start_date: date, end_date: date, include_estimated: bool = False
+    ) -> EncodedBody:
+        return await self._cached("route-delay", line_number, start_date, end_date, include_estimated)
+
+    async def punctuality(
+        self, line_number: str, start_date: date, end_date: date, include_estimated: bool = False
+    ) -> EncodedBody:
+        return await self._cached("punctuality", line_number, start_date, end_date, include_estimated)
+
+    async def trend(
+        self, line_number: str, start_date: date, end_date: date, include_estimated: bool = False
+    ) -> EncodedBody:
+        return await self._cached("trend", line_number, start_date, end_date, include_estimated)
+
+
+async def warm_stats(combination: popularity.StatsCombination, today: date) -> bool:
+    """
+    Cache the response of a popular combination unless a fresh one is cached, on a session of its own. Returns
+    whether it was computed.
+    """
+    start_date, end_date = combination.dates(today)
+    compute = _computation(
+        _detached_repo,
+        combination.endpoint,
+        combination.line_number,
+        start_date,
+        end_date,
+        combination.include_estimated,
+    )
+    return await cache.warm_stats(
+        combination.endpoint, combination.line_number, start_date, end_date, combination.include_estimated, compute
+    )
@@ -1,14 +1,14 @@
+from app.api.repositories.gtfs_static_repository import AsyncGtfsStaticRepository
 from app.api.schemas import TripStop, TripStopsResponse
 from app.shared.exceptions import ResourceNotFoundError
-from app.shared.gtfs.repositories.gtfs_static import GtfsStaticRepository
 
 
 class TripsService:
-    def __init__(self, static_repo: GtfsStaticRepository):
+    def __init__(self, static_repo: AsyncGtfsStaticRepository):
         self._static_repo = static_repo
 
-    def get_trip_stops(self, trip_id: str) -> TripStopsResponse:
-        rows = self._static_repo.get_stops_for_trip(trip_id)
+    async def get_trip_stops(self, trip_id: str) -> TripStopsResponse:
+        rows = await self._static_repo.get_stops_for_trip(trip_id)
         if not rows:
             raise ResourceNotFoundError("Trip", trip_id)
 
@@ -1,23 +1,41 @@
-import msgspec
+from collections.abc import AsyncIterator, Callable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
 
-from app.api.cache import get_vehicles_cache, set_vehicles_cache
+from app.api.cache import get_or_compute_vehicles
+from app.api.db import detached_session
+from app.api.repositories.gtfs_static_repository import AsyncGtfsStaticRepository
+from app.api.response import EncodedBody
 from app.api.schemas import LiveVehicle, LiveVehicleResponse
-from app.shared.gtfs.repositories.gtfs_static import GtfsStaticRepository
-from app.shared.redis.repositories.live_vehicles import LiveVehiclePositionRepository
+from app.shared.redis.repositories.live_vehicles import AsyncLiveVehiclePositionRepository
+
+
+@asynccontextmanager
+async def _detached_static_repo() -> AsyncIterator[AsyncGtfsStaticRepository]:
+    async with detached_session() as session:
+        yield AsyncGtfsStaticRepository(session)
 
 
 class VehiclesService:
-    def __init__(self, static_repo: GtfsStaticRepository, vehicles_repo: LiveVehiclePositionRepository):
-        self._static_repo = static_repo
+    """
+    Live vehicles. A response missing from the cache is built on a session of its own rather than the request's, as
+    it is shared with concurrent requests and may outlive the one that started it.
+    """
+
+    def __init__(
+        self,
+        vehicles_repo: AsyncLiveVehiclePositionRepository,
+        open_static_repo: Callable[[], AbstractAsyncContextManager[AsyncGtfsStaticRepository]] = _detached_static_repo,
+    ):
         self._vehicles_repo = vehicles_repo
+        self._open_static_repo = open_static_repo
 
-    def get_live_vehicles(self) -> LiveVehicleResponse:
-        cached = get_vehicles_cache()
-        if cached is not None:
-            return msgspec.json.decode(cached, type=LiveVehicleResponse)
+    async def get_live_vehicles(self) -> EncodedBody:
+        return await get_or_compute_vehicles(self._build_live_vehicles)
 
-        positions = self._vehicles_repo.get_all()
-        trip_info = self._static_repo.get_all_trip_info()
+    async def _build_live_vehicles(self) -> LiveVehicleResponse:
+        positions = await self._vehicles_repo.get_all()
+        async with self._open_static_repo() as static_repo:
+            trip_info = await static_repo.get_trip_info(list({pos.trip_id for pos in positions}))
 
         vehicles: list[LiveVehicle] = []
         for pos in positions:
@@ -41,6 +59,4 @@ class VehiclesService:
                 )
             )
 
-        response = LiveVehicleResponse(count=len(vehicles), vehicles=vehicles)
-        set_vehicles_cache(msgspec.json.encode(response))
-        return response
+        return LiveVehicleResponse(count=len(vehicles), vehicles=vehicles)
@@ -0,0 +1,173 @@
+"""
+Single-flight fills of expired cache entries.
+
+Within a worker, concurrent requests for the same key share one computation. Across workers, the one that takes a
+Redis lease on the key computes it, and the others poll the cache for its result for up to CACHE_LEASE_WAIT_SECONDS
+before computing it themselves. Counters of computations run and avoided are kept per worker.
+
+Stale entries are refreshed in the background under the same lease, by one worker at a time.
+"""
+
+import asyncio
+import logging
+import secrets
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, replace
+from typing import Any, cast
+
+import redis
+
+from app.api.constants import (
+    CACHE_LEASE_POLL_SECONDS,
+    CACHE_LEASE_TTL_MS,
+    CACHE_LEASE_WAIT_SECONDS,
+    REDIS_KEY_CACHE_LEASE_PREFIX,
+)
+from app.platform.redis.connection import get_async_client
+
+logger = logging.getLogger(__name__)
+
+# Delete the lease only while it is still ours, it may have expired and been taken by another worker
+_RELEASE_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+async def release_lease(lease_key: str, token: str) -> None:
+    """Release a lease taken with `token` by SET NX, unless it expired meanwhile."""
+    try:
+        await get_async_client().eval(_RELEASE_LEASE, 1, lease_key, token)
+    except redis.RedisError:
+        logger.warning("Redis lease release failed for %s", lease_key, exc_info=True)
+
+
+@dataclass(slots=True)
+class SingleFlightMetrics:
+    """Snapshot of single-flight counters of this worker."""
+
+    computed: int = 0
+    # Joined a computation already running in this worker
+    coalesced: int = 0
+    # Served the result another worker computed under its lease
+    lease_waits: int = 0
+    # Gave up waiting for another worker's lease and computed anyway
+    lease_timeouts: int = 0
+    # Recomputed a stale entry in the background
+    refreshes: int = 0
+
+    @property
+    def duplicates_avoided(self) -> int:
+        return self.coalesced + self.lease_waits
+
+
+class SingleFlight:
+    def __init__(
+        self,
+        lease_ttl_ms: int = CACHE_LEASE_TTL_MS,
+        wait_seconds: float = CACHE_LEASE_WAIT_SECONDS,
+        poll_seconds: float = CACHE_LEASE_POLL_SECONDS,
+    ):
+        self._lease_ttl_ms = lease_ttl_ms
+        self._wait_seconds = wait_seconds
+        self._poll_seconds = poll_seconds
+        self._inflight: dict[str, asyncio.Task[Any]] = {}
+        self._refreshing: dict[str, asyncio.Task[None]] = {}
+        self._metrics = SingleFlightMetrics()
+
+    def metrics(self) -> SingleFlightMetrics:
+        return replace(self._metrics)
+
+    async def run[T](self, key: str, load: Callable[[], Awaitable[T | None]], compute: Callable[[], Awaitable[T]]) -> T:
+        """
+        The value of `key`, after its cache entry was found missing: `load` reads the entry, `compute` produces the
+        value and stores it. The computation runs as a task of its own, so it is not cancelled with the request
+        that started it while others wait for it.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fill(key, load, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self._metrics.coalesced += 1
+        return cast(T, await asyncio.shield(task))
+
+    def refresh(self, key: str, compute: Callable[[], Awaitable[object]]) -> None:
+        """
+        Start recomputing `key` in the background, its stale entry being served meanwhile: `compute` produces the
+        value and stores it. Nothing is started while a refresh of the key runs in this worker, or in another one
+        holding the key's lease.
+        """
+        if key in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh(key, compute))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _refresh(self, key: str, compute: Callable[[], Awaitable[object]]) -> None:
+        lease_key, token = self._lease(key)
+        try:
+            if not await get_async_client().set(lease_key, token, nx=True, px=self._lease_ttl_ms):
+                return
+        except redis.RedisError:
+            # The stale entry stays until it expires, then a request computes it
+            logger.warning("Redis lease failed for %s", key, exc_info=True)
+            return
+
+        try:
+            self._metrics.refreshes += 1
+            await compute()
+        except Exception:
+            logger.exception("Background refresh of %s failed", key)
+        finally:
+            await release_lease(lease_key, token)
+
+    async def _fill[T](
+        self, key: str, load: Callable[[], Awaitable[T | None]], compute: Callable[[], Awaitable[T]]
+    ) -> T:
+        lease_key, token = self._lease(key)
+        try:
+            leased = bool(await get_async_client().set(lease_key, token, nx=True, px=self._lease_ttl_ms))
+        except redis.RedisError:
+            # Nothing to coordinate through, each worker computes
+            logger.warning("Redis lease failed for %s", key, exc_info=True)
+            return await self._compute(compute)
+
+        if not leased:
+            value = await self._wait_for_lease(load)
+            if value is not None:
+                self._metrics.lease_waits += 1
+                return value
+            self._metrics.lease_timeouts += 1
+            return await self._compute(compute)
+
+        try:
+            # Another worker may have filled the entry and released its lease since our cache miss
+            value = await load()
+            if value is not None:
+                self._metrics.lease_waits += 1
+                return value
+            return await self._compute(compute)
+        finally:
+            await release_lease(lease_key, token)
+
+    @staticmethod
+    def _lease(key: str) -> tuple[str, str]:
+        return f"{REDIS_KEY_CACHE_LEASE_PREFIX}{key}", secrets.token_hex(8)
+
+    async def _compute[T](self, compute: Callable[[], Awaitable[T]]) -> T:
+        self._metrics.computed += 1
+        return await compute()
+
+    async def _wait_for_lease[T](self, load: Callable[[], Awaitable[T | None]]) -> T | None:
+        deadline = time.monotonic() + self._wait_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self._poll_seconds)
+            value = await load()
+            if value is not None:
+                return value
+        return None
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import secrets
+import time
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from dataclasses import dataclass
+from datetime import date
+
+import redis
+
+from app.api import popularity
+from app.api.constants import (
+    REDIS_KEY_STATS_WARM_LOCK,
+    STATS_WARM_DB_CONCURRENCY,
+    STATS_WARM_DELAY_SECONDS,
+    STATS_WARM_LOCK_TTL_MS,
+    STATS_WARM_TOP_N,
+)
+from app.api.services.stats_service import warm_stats
+from app.api.single_flight import release_lease
+from app.platform.redis.connection import get_async_client
+from app.shared.models.enums import CacheInvalidationReason
+from app.shared.redis.schemas import CacheInvalidationMessage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class WarmReport:
+    combinations: int = 0
+    warmed: int = 0
+    already_fresh: int = 0
+    failed: int = 0
+    duration_seconds: float = 0.0
+
+    @property
+    def coverage(self) -> float:
+        """Share of the combinations cached fresh after the run."""
+        return (self.warmed + self.already_fresh) / self.combinations if self.combinations else 1.0
+
+
+class CacheWarmer:
+    """
+    Computes the most requested stats combinations into the cache, STATS_WARM_DELAY_SECONDS after being triggered.
+    A trigger while a run is pending or running in this worker is dropped, and of the workers triggered together only
+    the one taking the warm-up lock runs.
+    """
+
+    def __init__(
+        self,
+        top_n: int = STATS_WARM_TOP_N,
+        db_concurrency: int = STATS_WARM_DB_CONCURRENCY,
+        delay_seconds: float = STATS_WARM_DELAY_SECONDS,
+        lock_ttl_ms: int = STATS_WARM_LOCK_TTL_MS,
+        warm: Callable[[popularity.StatsCombination, date], Awaitable[bool]] = warm_stats,
+    ):
+        self._top_n = top_n
+        self._db_concurrency = db_concurrency
+        self._delay_seconds = delay_seconds
+        self._lock_ttl_ms = lock_ttl_ms
+        self._warm = warm
+        self._task: asyncio.Task[None] | None = None
+
+    def trigger(self, reason: str) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run_after_delay(reason))
+
+    def on_invalidation(self, message: CacheInvalidationMessage) -> None:
+        if message.reason == CacheInvalidationReason.DAY_CLOSED:
+            self.trigger(f"service day {message.service_date} closed")
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+
+    async def run_once(self, reason: str) -> WarmReport | None:
+        """Warm the cache unless another worker holds the warm-up lock. Returns the report of the run."""
+        token = secrets.token_hex(8)
+        try:
+            client = get_async_client()
+            if not await client.set(REDIS_KEY_STATS_WARM_LOCK, token, nx=True, px=self._lock_ttl_ms):
+                logger.info("Cache warm-up after %s skipped, another worker is warming", reason)
+                return None
+        except redis.RedisError:
+            logger.warning("Redis lock failed for cache warm-up", exc_info=True)
+            return None
+
+        try:
+            return await self._warm_most_requested(reason)
+        finally:
+            await release_lease(REDIS_KEY_STATS_WARM_LOCK, token)
+
+    async def _warm_most_requested(self, reason: str) -> WarmReport:
+        started = time.monotonic()
+        combinations = await popularity.most_requested(self._top_n)
+        today = popularity.today()
+        report = WarmReport(combinations=len(combinations))
+        # Each warm-up holds a database connection while computing
+        budget = asyncio.Semaphore(self._db_concurrency)
+
+        async def warm_one(combination: popularity.StatsCombination) -> None:
+            async with budget:
+                try:
+                    if await self._warm(combination, today):
+                        report.warmed += 1
+                    else:
+                        report.already_fresh += 1
+                except Exception:
+                    report.failed += 1
+                    logger.warning("Cache warm-up of %s failed", combination, exc_info=True)
+
+        await asyncio.gather(*(warm_one(combination) for combination in combinations))
+        report.duration_seconds = time.monotonic() - started
+        logger.info(
+            "Cache warm-up after %s: %d of %d most requested combinations cached (coverage %.1f%%), "
+            "%d warmed, %d already fresh, %d failed in %.1fs",
+            reason,
+            report.warmed + report.already_fresh,
+            report.combinations,
+            report.coverage * 100,
+            report.warmed,
+            report.already_fresh,
+            report.failed,
+            report.duration_seconds,
+        )
+        return report
+
+    async def _run_after_delay(self, reason: str) -> None:
+        await asyncio.sleep(self._delay_seconds)
+        try:
+            await self.run_once(reason)
+        except Exception:
+            logger.exception("Cache warm-up after %s failed", reason)
@@ -2,3 +2,21 @@ IMPORT_CYCLE_SLEEP: int = 3600
 IMPORT_FETCH_TIMEOUT_SECONDS: int = 60
 IMPORT_FETCH_RETRY_ATTEMPTS: int = 3
 IMPORT_FETCH_RETRY_BACKOFF_SECONDS: list[int] = [5, 15]
+# Size of the chunks a GTFS zip is streamed to disk and hashed in
+IMPORT_DOWNLOAD_CHUNK_BYTES: int = 1 << 20
+
+# Rows per chunk streamed from a GTFS file into COPY
+IMPORT_LOAD_CHUNK_ROWS: int = 50_000
+
+# Feeds downloaded and loaded at the same time, each on its own connection and transaction
+IMPORT_PARALLEL_FEEDS: int = 3
+
+# Blue/green reload: name prefix of the staging tables (and their indexes) the next GTFS data is built in
+IMPORT_STAGING_PREFIX: str = "staging_"
+# How long the swap waits for readers to release the live tables before retrying
+IMPORT_SWAP_LOCK_TIMEOUT_MS: int = 2000
+IMPORT_SWAP_ATTEMPTS: int = 5
+IMPORT_SWAP_RETRY_BACKOFF_SECONDS: list[int] = [1, 5, 15]
+
+# Diff import: above this share of the changed files' rows inserted, updated or deleted, reload the feed in full
+IMPORT_DIFF_MAX_CHANGED_FRACTION: float = 0.2
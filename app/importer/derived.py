@@ -0,0 +1,172 @@
+"""
+Lookup tables derived from the GTFS tables at import time, so realtime services read one indexed row instead of
+aggregating stop_times, and the API serves shapes as precomputed simplified polylines. They are rebuilt from the
+staging tables on a full reload and diffed like the source tables on a diff import, so they always change in the
+same transaction as the data they are derived from.
+"""
+
+import logging
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, cast
+
+import numpy as np
+import psycopg
+from psycopg import sql
+from sqlalchemy.orm import Session
+
+from app.importer.staging import staging_name
+from app.shared.constants import SHAPE_RESOLUTION_TOLERANCES_M
+from app.shared.gtfs.polyline import encode_polyline
+from app.shared.gtfs.simplify import simplify
+
+logger = logging.getLogger(__name__)
+
+_TRIP_SUMMARY = """
+    SELECT t.trip_id, t.agency_id, r.route_short_name, t.headsign, t.shape_id,
+           s.max_stop_sequence, s.first_stop_id, s.last_stop_id, s.first_arrival_seconds, s.last_arrival_seconds
+    FROM {current_trips} t
+    JOIN {current_routes} r ON r.route_id = t.route_id
+    LEFT JOIN (
+        SELECT trip_id,
+               max(stop_sequence) AS max_stop_sequence,
+               (array_agg(stop_id ORDER BY stop_sequence))[1] AS first_stop_id,
+               (array_agg(stop_id ORDER BY stop_sequence DESC))[1] AS last_stop_id,
+               (array_agg(arrival_seconds ORDER BY stop_sequence))[1] AS first_arrival_seconds,
+               (array_agg(arrival_seconds ORDER BY stop_sequence DESC))[1] AS last_arrival_seconds
+        FROM {current_stop_times}
+        WHERE agency_id = ANY(%(agency_ids)s)
+        GROUP BY trip_id
+    ) s ON s.trip_id = t.trip_id
+    WHERE t.agency_id = ANY(%(agency_ids)s)
+"""
+
+# A stop visited twice in one trip maps to its last visit
+_TRIP_STOP_INDEX = """
+    SELECT trip_id, stop_id, agency_id, max(stop_sequence)
+    FROM {current_stop_times}
+    WHERE agency_id = ANY(%(agency_ids)s)
+    GROUP BY trip_id, stop_id, agency_id
+"""
+
+_SHAPE_POINTS = """
+    SELECT shape_id, agency_id, shape_pt_lat, shape_pt_lon, shape_pt_sequence
+    FROM {current_shapes}
+    WHERE agency_id = ANY(%(agency_ids)s)
+    ORDER BY shape_id, shape_pt_sequence
+"""
+
+
+def _shape_polylines_transformer(rows: Iterable[tuple[Any, ...]]) -> Iterator[tuple[Any, ...]]:
+    """One encoded polyline per shape and resolution, from shape points ordered by shape and sequence."""
+    for shape_id, points in groupby(rows, key=itemgetter(0)):
+        shape = list(points)
+        agency_id = shape[0][1]
+        lat = np.array([point[2] for point in shape], dtype=np.float64)
+        lon = np.array([point[3] for point in shape], dtype=np.float64)
+        sequences = np.array([point[4] for point in shape], dtype=np.int64)
+        for resolution, tolerance in SHAPE_RESOLUTION_TOLERANCES_M.items():
+            kept = simplify(lat, lon, tolerance)
+            yield (
+                shape_id,
+                resolution,
+                agency_id,
+                len(kept),
+                encode_polyline(lat[kept].tolist(), lon[kept].tolist()),
+                sequences[kept].tolist(),
+            )
+
+
+@dataclass(frozen=True)
+class DerivedTable:
+    """
+    A table filled from `query`, a SELECT over the source tables named in braces. Without a transformer the query
+    returns the rows of `columns`; with one, its rows are transformed in Python and copied in.
+    """
+
+    table_name: str
+    columns: list[str]
+    key_columns: list[str]
+    query: str
+    sources: list[str]
+    transformer: Callable[[Iterable[tuple[Any, ...]]], Iterator[tuple[Any, ...]]] | None = None
+
+    def select(self, source_table: Callable[[str], str]) -> sql.Composed:
+        """The SELECT over the source tables named by `source_table`, for the agencies in %(agency_ids)s."""
+        return sql.SQL(self.query).format(
+            **{name: sql.Identifier("gtfs_static", source_table(name)) for name in self.sources}
+        )
+
+    def fill(
+        self,
+        cursor: psycopg.Cursor[Any],
+        target: sql.Identifier,
+        source_table: Callable[[str], str],
+        agency_ids: list[str],
+    ) -> int:
+        """Insert the agencies' rows derived from the tables named by `source_table` into `target`."""
+        columns = sql.SQL(", ").join(map(sql.Identifier, self.columns))
+        params = {"agency_ids": agency_ids}
+        if self.transformer is None:
+            cursor.execute(sql.SQL("INSERT INTO {} ({}) {}").format(target, columns, self.select(source_table)), params)
+            return cursor.rowcount
+
+        rows = cursor.execute(self.select(source_table), params).fetchall()
+        count = 0
+        with cursor.copy(sql.SQL("COPY {} ({}) FROM STDIN").format(target, columns)) as copy:
+            for row in self.transformer(rows):
+                copy.write_row(row)
+                count += 1
+        return count
+
+
+DERIVED_TABLES = [
+    DerivedTable(
+        "trip_summary",
+        [
+            "trip_id",
+            "agency_id",
+            "route_short_name",
+            "headsign",
+            "shape_id",
+            "max_stop_sequence",
+            "first_stop_id",
+            "last_stop_id",
+            "first_arrival_seconds",
+            "last_arrival_seconds",
+        ],
+        ["trip_id"],
+        _TRIP_SUMMARY,
+        ["current_trips", "current_routes", "current_stop_times"],
+    ),
+    DerivedTable(
+        "trip_stop_index",
+        ["trip_id", "stop_id", "agency_id", "stop_sequence"],
+        ["trip_id", "stop_id"],
+        _TRIP_STOP_INDEX,
+        ["current_stop_times"],
+    ),
+    DerivedTable(
+        "shape_polylines",
+        ["shape_id", "resolution", "agency_id", "point_count", "polyline", "sequences"],
+        ["shape_id", "resolution"],
+        _SHAPE_POINTS,
+        ["current_shapes"],
+        _shape_polylines_transformer,
+    ),
+]
+
+
+def fill_staging_derived_tables(session: Session, agency_ids: list[str]) -> None:
+    """Derive the rows of reloaded agencies from the loaded staging tables into the derived staging tables."""
+    raw_conn = session.connection().connection.dbapi_connection
+    if raw_conn is None:
+        raise RuntimeError("No database connection available")
+
+    cursor = cast(psycopg.Cursor[Any], raw_conn.cursor())
+    for table in DERIVED_TABLES:
+        target = sql.Identifier("gtfs_static", staging_name(table.table_name))
+        rows = table.fill(cursor, target, staging_name, agency_ids)
+        logger.info("Derived %d %s rows of %s", rows, table.table_name, ", ".join(agency_ids))
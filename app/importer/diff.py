@@ -0,0 +1,241 @@
+"""
+Row-level diff import of a GTFS feed into the live gtfs_static tables.
+
+Files whose SHA-256 matches the last import are skipped. A changed file is copied into a temporary table keyed by
+the table's natural key and compared with the agency's live rows: rows with different values are updated, new ones
+inserted and missing ones deleted. Upserts run in foreign key order and deletes in reverse, in the caller's
+transaction. When the delta is a large part of the changed files a full reload is cheaper, and diff_feed leaves
+the feed to one. Derived tables reading a changed table are then recomputed for the agency and diffed the same way.
+"""
+
+import logging
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, cast
+
+import psycopg
+from psycopg import sql
+from sqlalchemy.orm import Session
+
+from app.importer.constants import IMPORT_DIFF_MAX_CHANGED_FRACTION
+from app.importer.derived import DERIVED_TABLES, DerivedTable
+from app.importer.load import TABLE_MAPPINGS, TableMapping, copy_to_table, transform_to_csv
+from app.shared.gtfs.feeds import FeedConfig
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class TableDelta:
+    name: str  # GTFS file or derived table
+    rows: int
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+
+    @property
+    def touched(self) -> int:
+        return self.inserted + self.updated + self.deleted
+
+
+@dataclass(slots=True)
+class DiffReport:
+    deltas: list[TableDelta] = field(default_factory=list)
+    unchanged_files: list[str] = field(default_factory=list)
+    derived: list[TableDelta] = field(default_factory=list)
+
+    @property
+    def rows_touched(self) -> int:
+        return sum(delta.touched for delta in self.deltas)
+
+    def summary(self) -> str:
+        changed = ", ".join(f"{d.name} +{d.inserted} ~{d.updated} -{d.deleted}" for d in self.deltas + self.derived)
+        return f"{changed or 'no files changed'}; {len(self.unchanged_files)} files unchanged"
+
+
+@dataclass(frozen=True, slots=True)
+class _DiffQueries:
+    """Conditions comparing a temporary table `n` of new rows with the agency's live rows `l`."""
+
+    inserted: sql.Composed  # over n: no live row has the same key
+    updated: sql.Composed  # over l and n: same key, different values
+    deleted: sql.Composed  # over l: no new row has the same key
+
+    @classmethod
+    def for_mapping(cls, mapping: TableMapping | DerivedTable, temp: sql.Identifier) -> "_DiffQueries":
+        live = sql.Identifier("gtfs_static", mapping.table_name)
+        values = _value_columns(mapping)
+
+        def columns(alias: str, names: list[str]) -> sql.Composable:
+            return sql.SQL(", ").join(sql.Identifier(alias, name) for name in names)
+
+        same_key = sql.SQL(" AND ").join(
+            sql.SQL("{} = {}").format(sql.Identifier("l", c), sql.Identifier("n", c)) for c in mapping.key_columns
+        )
+        return cls(
+            inserted=sql.SQL("NOT EXISTS (SELECT 1 FROM {} l WHERE l.agency_id = %(agency_id)s AND {})").format(
+                live, same_key
+            ),
+            updated=sql.SQL("l.agency_id = %(agency_id)s AND {} AND ROW({}) IS DISTINCT FROM ROW({})").format(
+                same_key, columns("l", values), columns("n", values)
+            ),
+            deleted=sql.SQL("l.agency_id = %(agency_id)s AND NOT EXISTS (SELECT 1 FROM {} n WHERE {})").format(
+                temp, same_key
+            ),
+        )
+
+
+def _temp_table(mapping: TableMapping | DerivedTable) -> sql.Identifier:
+    return sql.Identifier(f"diff_{mapping.table_name}")
+
+
+def _value_columns(mapping: TableMapping | DerivedTable) -> list[str]:
+    return [c for c in mapping.columns if c not in mapping.key_columns and c != "agency_id"]
+
+
+def _create_temp_table(cursor: psycopg.Cursor[Any], mapping: TableMapping | DerivedTable) -> sql.Identifier:
+    temp = _temp_table(mapping)
+    live = sql.Identifier("gtfs_static", mapping.table_name)
+    columns = sql.SQL(", ").join(map(sql.Identifier, mapping.columns))
+    cursor.execute(
+        sql.SQL("CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA").format(temp, columns, live)
+    )
+    cursor.execute(
+        sql.SQL("ALTER TABLE {} ADD PRIMARY KEY ({})").format(
+            temp, sql.SQL(", ").join(map(sql.Identifier, mapping.key_columns))
+        )
+    )
+    return temp
+
+
+def _count_delta(
+    cursor: psycopg.Cursor[Any], mapping: TableMapping | DerivedTable, name: str, rows: int, agency_id: str
+) -> tuple[TableDelta, _DiffQueries]:
+    """Count the rows the filled temporary table of `mapping` would insert, update and delete."""
+    temp = _temp_table(mapping)
+    live = sql.Identifier("gtfs_static", mapping.table_name)
+    cursor.execute(sql.SQL("ANALYZE {}").format(temp))
+
+    queries = _DiffQueries.for_mapping(mapping, temp)
+    params = {"agency_id": agency_id}
+
+    def count(query: sql.Composed) -> int:
+        row = cursor.execute(query, params).fetchone()
+        return int(row[0]) if row else 0
+
+    delta = TableDelta(
+        name,
+        rows,
+        inserted=count(sql.SQL("SELECT count(*) FROM {} n WHERE {}").format(temp, queries.inserted)),
+        updated=count(sql.SQL("SELECT count(*) FROM {} l, {} n WHERE {}").format(live, temp, queries.updated)),
+        deleted=count(sql.SQL("SELECT count(*) FROM {} l WHERE {}").format(live, queries.deleted)),
+    )
+    return delta, queries
+
+
+def _stage_file(
+    session: Session, cursor: psycopg.Cursor[Any], zf: zipfile.ZipFile, mapping: TableMapping, feed: FeedConfig
+) -> tuple[TableDelta, _DiffQueries]:
+    """Copy a changed file into a temporary table and count the rows it would insert, update and delete."""
+    agency_id = feed.agency.value
+    temp = _create_temp_table(cursor, mapping)
+    with zf.open(mapping.gtfs_file) as f:
+        rows = copy_to_table(session, temp, mapping.columns, transform_to_csv(f, mapping, agency_id, feed.prefix_id))
+    return _count_delta(cursor, mapping, mapping.gtfs_file, rows, agency_id)
+
+
+def _stage_derived(cursor: psycopg.Cursor[Any], table: DerivedTable, agency_id: str) -> tuple[TableDelta, _DiffQueries]:
+    """Derive the agency's rows of `table` from the updated live tables into a temporary table and count the delta."""
+    temp = _create_temp_table(cursor, table)
+    rows = table.fill(cursor, temp, lambda name: name, [agency_id])
+    return _count_delta(cursor, table, table.table_name, rows, agency_id)
+
+
+def _apply(
+    cursor: psycopg.Cursor[Any],
+    staged: list[tuple[TableMapping | DerivedTable, TableDelta, _DiffQueries]],
+    agency_id: str,
+) -> None:
+    params = {"agency_id": agency_id}
+    # Parents before children for new and changed rows, children before parents for removed ones
+    for mapping, delta, queries in staged:
+        live = sql.Identifier("gtfs_static", mapping.table_name)
+        temp = _temp_table(mapping)
+        if delta.updated:
+            assignments = sql.SQL(", ").join(
+                sql.SQL("{} = {}").format(sql.Identifier(c), sql.Identifier("n", c)) for c in _value_columns(mapping)
+            )
+            cursor.execute(
+                sql.SQL("UPDATE {} l SET {} FROM {} n WHERE {}").format(live, assignments, temp, queries.updated),
+                params,
+            )
+        if delta.inserted:
+            cursor.execute(
+                sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {} n WHERE {}").format(
+                    live,
+                    sql.SQL(", ").join(map(sql.Identifier, mapping.columns)),
+                    sql.SQL(", ").join(sql.Identifier("n", c) for c in mapping.columns),
+                    temp,
+                    queries.inserted,
+                ),
+                params,
+            )
+    for mapping, delta, queries in reversed(staged):
+        if delta.deleted:
+            live = sql.Identifier("gtfs_static", mapping.table_name)
+            cursor.execute(sql.SQL("DELETE FROM {} l WHERE {}").format(live, queries.deleted), params)
+
+
+def diff_feed(
+    session: Session, zip_path: Path, feed: FeedConfig, file_hashes: dict[str, str], recorded_hashes: dict[str, str]
+) -> DiffReport | None:
+    """
+    Apply the rows that changed since the last import of `feed` to the live tables. `file_hashes` are the SHA-256
+    of the new zip's files, `recorded_hashes` those of the last import. Returns None without applying anything
+    when more than IMPORT_DIFF_MAX_CHANGED_FRACTION of the changed files' rows differ; the caller should roll the
+    session back and reload the feed in full.
+    """
+    agency_id = feed.agency.value
+    raw_conn = session.connection().connection.dbapi_connection
+    if raw_conn is None:
+        raise RuntimeError("No database connection available")
+    cursor = cast(psycopg.Cursor[Any], raw_conn.cursor())
+
+    report = DiffReport()
+    staged: list[tuple[TableMapping | DerivedTable, TableDelta, _DiffQueries]] = []
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        for mapping in TABLE_MAPPINGS:
+            file_hash = file_hashes.get(mapping.gtfs_file)
+            if file_hash is not None and file_hash == recorded_hashes.get(mapping.gtfs_file):
+                report.unchanged_files.append(mapping.gtfs_file)
+                continue
+            delta, queries = _stage_file(session, cursor, zf, mapping, feed)
+            staged.append((mapping, delta, queries))
+            report.deltas.append(delta)
+
+    changed_rows = sum(delta.rows for delta in report.deltas)
+    if report.rows_touched > IMPORT_DIFF_MAX_CHANGED_FRACTION * changed_rows:
+        logger.info(
+            "[%s] Diff touches %d of %d rows (%s), falling back to a full reload",
+            agency_id,
+            report.rows_touched,
+            changed_rows,
+            report.summary(),
+        )
+        return None
+
+    _apply(cursor, staged, agency_id)
+
+    # The derived tables read the updated live tables and have no foreign keys, so they go last
+    changed_tables = {mapping.table_name for mapping, delta, _ in staged if delta.touched}
+    derived: list[tuple[TableMapping | DerivedTable, TableDelta, _DiffQueries]] = []
+    for table in DERIVED_TABLES:
+        if changed_tables.isdisjoint(table.sources):
+            continue
+        delta, queries = _stage_derived(cursor, table, agency_id)
+        derived.append((table, delta, queries))
+        report.derived.append(delta)
+    _apply(cursor, derived, agency_id)
+
+    return report
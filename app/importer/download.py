@@ -1,9 +1,12 @@
+import hashlib
 import tempfile
+from dataclasses import dataclass
 from pathlib import Path
 
 import requests
 
 from app.importer.constants import (
+    IMPORT_DOWNLOAD_CHUNK_BYTES,
     IMPORT_FETCH_RETRY_ATTEMPTS,
     IMPORT_FETCH_RETRY_BACKOFF_SECONDS,
     IMPORT_FETCH_TIMEOUT_SECONDS,
@@ -15,20 +18,74 @@ from app.shared.gtfs.feeds import FeedConfig
 _HEADERS = {"User-Agent": USER_AGENT}
 
 
-def download_gtfs_zip(feed: FeedConfig, timeout: int = IMPORT_FETCH_TIMEOUT_SECONDS) -> Path:
+@dataclass(frozen=True, slots=True)
+class HttpValidators:
+    """ETag and Last-Modified of the last imported download, for a conditional request."""
+
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+@dataclass(frozen=True, slots=True)
+class DownloadedZip:
+    path: Path
+    sha256: str
+    validators: HttpValidators
+
+
+def _stream_to_file(response: requests.Response) -> tuple[Path, str]:
+    """Write the response body to a temporary file in chunks, hashing it on the way."""
+    digest = hashlib.sha256()
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".zip")
+    try:
+        with temp_file:
+            for chunk in response.iter_content(IMPORT_DOWNLOAD_CHUNK_BYTES):
+                temp_file.write(chunk)
+                digest.update(chunk)
+    except BaseException:
+        Path(temp_file.name).unlink(missing_ok=True)
+        raise
+    return Path(temp_file.name), digest.hexdigest()
+
+
+def download_gtfs_zip(
+    feed: FeedConfig, validators: HttpValidators | None = None, timeout: int = IMPORT_FETCH_TIMEOUT_SECONDS
+) -> DownloadedZip | None:
     """
-    Download GTFS Static ZIP to temporary file. Returns path to downloaded ZIP.
+    Stream GTFS Static ZIP to temporary file, computing its SHA-256 while it downloads. With `validators` the
+    request is conditional, and None is returned when the server answers 304 Not Modified.
     """
-    response = retry_sync(
-        lambda: requests.get(feed.static_url, timeout=timeout, headers=_HEADERS),
+    headers = _HEADERS | (validators.conditional_headers() if validators else {})
+
+    def fetch() -> tuple[requests.Response, Path | None, str]:
+        with requests.get(feed.static_url, timeout=timeout, headers=headers, stream=True) as response:
+            if response.status_code != requests.codes.ok:
+                return response, None, ""
+            path, sha256 = _stream_to_file(response)
+            return response, path, sha256
+
+    response, path, sha256 = retry_sync(
+        fetch,
         attempts=IMPORT_FETCH_RETRY_ATTEMPTS,
         backoff_seconds=IMPORT_FETCH_RETRY_BACKOFF_SECONDS,
         retriable_exceptions=(requests.RequestException,),
     )
+    if response.status_code == requests.codes.not_modified:
+        return None
     response.raise_for_status()
+    if path is None:
+        raise requests.HTTPError(f"Unexpected status {response.status_code} for {feed.static_url}", response=response)
 
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".zip")
-    temp_file.write(response.content)
-    temp_file.close()
-
-    return Path(temp_file.name)
+    return DownloadedZip(
+        path=path,
+        sha256=sha256,
+        validators=HttpValidators(response.headers.get("ETag"), response.headers.get("Last-Modified")),
+    )
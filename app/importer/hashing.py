@@ -1,4 +1,5 @@
 import hashlib
+import zipfile
 from pathlib import Path
 
 
@@ -12,3 +13,22 @@ def sha256_file(path: str | Path) -> str:
 
     with p.open("rb") as f:
         return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def sha256_zip_members(path: str | Path, names: list[str]) -> dict[str, str]:
+    """
+    Compute SHA-256 of the uncompressed content of each of `names` present in a ZIP.
+    Returns hex digests by member name.
+    """
+
+    with zipfile.ZipFile(path) as zf:
+        present = set(zf.namelist())
+        digests = {}
+        for name in names:
+            if name in present:
+                digest = hashlib.sha256()
+                with zf.open(name) as f:
+                    while chunk := f.read(1 << 20):
+                        digest.update(chunk)
+                digests[name] = digest.hexdigest()
+        return digests
@@ -2,20 +2,31 @@ import csv
 import io
 import logging
 import zipfile
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator
 from dataclasses import dataclass
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
 from psycopg import sql
 from sqlalchemy.orm import Session
 
+from app.importer.constants import IMPORT_LOAD_CHUNK_ROWS
+from app.importer.derived import DERIVED_TABLES, DerivedTable
+from app.importer.staging import staging_name
+from app.importer.timings import StageTimings
 from app.shared.gtfs.feeds import FeedConfig
-from app.shared.gtfs.timeparse import parse_gtfs_time_to_seconds
+from app.shared.gtfs.timetable import parse_gtfs_times
 
 logger = logging.getLogger(__name__)
 
 
+# The GTFS columns a mapping reads, in TableMapping.source_columns order
+SourceRow = tuple[str, ...]
+Prefix = Callable[[str], str]
+
+
 @dataclass(frozen=True)
 class TableMapping:
     """Configuration for loading a GTFS file into a database table."""
@@ -23,150 +34,192 @@ class TableMapping:
     gtfs_file: str
     table_name: str
     columns: list[str]
-    row_transformer: Callable[[dict[str, str], str, Callable[[str], str]], list[Any]]
+    source_columns: list[str]
+    # Transforms a chunk of source rows into table rows
+    transformer: Callable[[list[SourceRow], str, Prefix], list[list[Any]]]
+    # Natural key of a row within an agency, matched by diff imports
+    key_columns: list[str]
 
 
-def _routes_transformer(row: dict[str, str], agency_id: str, prefix: Callable[[str], str]) -> list[Any]:
-    return [prefix(row["route_id"]), agency_id, row["route_short_name"]]
+def _routes_transformer(rows: list[SourceRow], agency_id: str, prefix: Prefix) -> list[list[Any]]:
+    return [[prefix(route_id), agency_id, short_name] for route_id, short_name in rows]
 
 
-def _stops_transformer(row: dict[str, str], agency_id: str, prefix: Callable[[str], str]) -> list[Any]:
-    return [
-        prefix(row["stop_id"]),
-        agency_id,
-        row["stop_name"],
-        row["stop_code"],
-        row["stop_desc"],
-        row["stop_lat"],
-        row["stop_lon"],
-    ]
+def _stops_transformer(rows: list[SourceRow], agency_id: str, prefix: Prefix) -> list[list[Any]]:
+    return [[prefix(stop_id), agency_id, name, code, desc, lat, lon] for stop_id, name, code, desc, lat, lon in rows]
 
 
-def _trips_transformer(row: dict[str, str], agency_id: str, prefix: Callable[[str], str]) -> list[Any]:
+def _trips_transformer(rows: list[SourceRow], agency_id: str, prefix: Prefix) -> list[list[Any]]:
     return [
-        prefix(row["trip_id"]),
-        prefix(row["route_id"]),
-        agency_id,
-        row["service_id"],
-        row["direction_id"],
-        row["trip_headsign"],
-        prefix(row["shape_id"]),
+        [prefix(trip_id), prefix(route_id), agency_id, service_id, direction_id, headsign, prefix(shape_id)]
+        for trip_id, route_id, service_id, direction_id, headsign, shape_id in rows
     ]
 
 
-def _stop_times_transformer(row: dict[str, str], agency_id: str, prefix: Callable[[str], str]) -> list[Any]:
+def _stop_times_transformer(rows: list[SourceRow], agency_id: str, prefix: Prefix) -> list[list[Any]]:
+    arrivals = parse_gtfs_times([row[3] for row in rows]).tolist()
+    departures = parse_gtfs_times([row[4] for row in rows]).tolist()
     return [
-        prefix(row["trip_id"]),
-        row["stop_sequence"],
-        prefix(row["stop_id"]),
-        agency_id,
-        parse_gtfs_time_to_seconds(row["arrival_time"]),
-        parse_gtfs_time_to_seconds(row["departure_time"]),
+        [prefix(trip_id), stop_sequence, prefix(stop_id), agency_id, arrival, departure]
+        for (trip_id, stop_sequence, stop_id, _, _), arrival, departure in zip(rows, arrivals, departures, strict=True)
     ]
 
 
-def _shapes_transformer(row: dict[str, str], agency_id: str, prefix: Callable[[str], str]) -> list[Any]:
-    return [agency_id, prefix(row["shape_id"]), row["shape_pt_lat"], row["shape_pt_lon"], row["shape_pt_sequence"]]
+def _shapes_transformer(rows: list[SourceRow], agency_id: str, prefix: Prefix) -> list[list[Any]]:
+    return [[agency_id, prefix(shape_id), lat, lon, seq] for shape_id, lat, lon, seq in rows]
 
 
 TABLE_MAPPINGS = [
-    TableMapping("routes.txt", "current_routes", ["route_id", "agency_id", "route_short_name"], _routes_transformer),
+    TableMapping(
+        "routes.txt",
+        "current_routes",
+        ["route_id", "agency_id", "route_short_name"],
+        ["route_id", "route_short_name"],
+        _routes_transformer,
+        ["route_id"],
+    ),
     TableMapping(
         "stops.txt",
         "current_stops",
         ["stop_id", "agency_id", "stop_name", "stop_code", "stop_desc", "stop_lat", "stop_lon"],
+        ["stop_id", "stop_name", "stop_code", "stop_desc", "stop_lat", "stop_lon"],
         _stops_transformer,
+        ["stop_id"],
     ),
     TableMapping(
         "trips.txt",
         "current_trips",
         ["trip_id", "route_id", "agency_id", "service_id", "direction_id", "headsign", "shape_id"],
+        ["trip_id", "route_id", "service_id", "direction_id", "trip_headsign", "shape_id"],
         _trips_transformer,
+        ["trip_id"],
     ),
     TableMapping(
         "stop_times.txt",
         "current_stop_times",
         ["trip_id", "stop_sequence", "stop_id", "agency_id", "arrival_seconds", "departure_seconds"],
+        ["trip_id", "stop_sequence", "stop_id", "arrival_time", "departure_time"],
         _stop_times_transformer,
+        ["trip_id", "stop_sequence"],
     ),
     TableMapping(
         "shapes.txt",
         "current_shapes",
         ["agency_id", "shape_id", "shape_pt_lat", "shape_pt_lon", "shape_pt_sequence"],
+        ["shape_id", "shape_pt_lat", "shape_pt_lon", "shape_pt_sequence"],
         _shapes_transformer,
+        ["shape_id", "shape_pt_sequence"],
     ),
 ]
 
 
-_DELETE_ORDER = [
-    "current_stop_times",
-    "current_shapes",
-    "current_trips",
-    "current_stops",
-    "current_routes",
-]
-
-
-def _delete_agency_data(session: Session, agency_id: str) -> None:
-    """Delete all GTFS data for a specific agency."""
-    logger.info("[%s] Deleting old data...", agency_id)
-
-    raw_conn = session.connection().connection.dbapi_connection
-    if raw_conn is None:
-        raise RuntimeError("No database connection available")
-
-    cursor = raw_conn.cursor()
-    for table_name in _DELETE_ORDER:
-        stmt = sql.SQL("DELETE FROM {} WHERE agency_id = %s").format(sql.Identifier("gtfs_static", table_name))
-        cursor.execute(stmt, (agency_id,))
-
-    logger.info("[%s] Delete complete", agency_id)
+# Loaded tables, in foreign key dependency order
+GTFS_TABLES = [mapping.table_name for mapping in TABLE_MAPPINGS]
+# Every table a full reload rebuilds and swaps in; the derived tables have no foreign keys
+STATIC_TABLES = [*GTFS_TABLES, *(table.table_name for table in DERIVED_TABLES)]
 
 
-def _copy_to_table(session: Session, table_name: str, columns: list[str], data: io.StringIO) -> None:
-    """Bulk load via COPY."""
+def copy_to_table(session: Session, table: sql.Composable, columns: list[str], chunks: Iterable[str]) -> int:
+    """Bulk load via COPY, writing CSV text chunk by chunk as it is produced. Returns the number of rows loaded."""
     raw_conn = session.connection().connection.dbapi_connection
     if raw_conn is None:
         raise RuntimeError("No database connection available")
 
     cursor = raw_conn.cursor()
-    data.seek(0)
 
     stmt = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT CSV)").format(
-        sql.Identifier("gtfs_static", table_name),
+        table,
         sql.SQL(", ").join(map(sql.Identifier, columns)),
     )
 
     with cursor.copy(stmt) as copy:
-        copy.write(data.getvalue())
-
-
-def _load_table(
-    session: Session, zf: zipfile.ZipFile, mapping: TableMapping, agency_id: str, prefix: Callable[[str], str]
-) -> None:
-    """Load a single GTFS file into its corresponding database table."""
-    logger.info("[%s] Loading %s...", agency_id, mapping.gtfs_file)
-
+        for chunk in chunks:
+            copy.write(chunk)
+    rows: int = cursor.rowcount
+    return rows
+
+
+def read_source_chunks(f: IO[bytes], mapping: TableMapping, size: int) -> Iterator[list[SourceRow]]:
+    """
+    Read a GTFS file in chunks of positional rows holding only `mapping.source_columns`. Blank lines are skipped
+    and short rows padded with empty values (loaded as NULL).
+    """
+    reader = csv.reader(io.TextIOWrapper(f, encoding="utf-8-sig", newline=""))
+    header = next(reader, [])
+    missing = [column for column in mapping.source_columns if column not in header]
+    if missing:
+        raise ValueError(f"{mapping.gtfs_file} is missing columns: {', '.join(missing)}")
+
+    positions = [header.index(column) for column in mapping.source_columns]
+    project = itemgetter(*positions)
+    width = max(positions) + 1
+    while rows := list(islice(reader, size)):
+        yield [project(row if len(row) >= width else row + [""] * (width - len(row))) for row in rows if row]
+
+
+def transform_to_csv(
+    f: IO[bytes], mapping: TableMapping, agency_id: str, prefix: Prefix, size: int = IMPORT_LOAD_CHUNK_ROWS
+) -> Iterator[str]:
+    """Stream a GTFS file as CSV text chunks in table column order, ready for COPY."""
     buf = io.StringIO()
     writer = csv.writer(buf)
+    for rows in read_source_chunks(f, mapping, size):
+        writer.writerows(mapping.transformer(rows, agency_id, prefix))
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
 
-    with zf.open(mapping.gtfs_file) as f:
-        reader = csv.DictReader(line.decode("utf-8-sig") for line in f)
-        for row in reader:
-            writer.writerow(mapping.row_transformer(row, agency_id, prefix))
-
-    _copy_to_table(session, mapping.table_name, mapping.columns, buf)
 
+def _load_table(session: Session, zf: zipfile.ZipFile, mapping: TableMapping, agency_id: str, prefix: Prefix) -> int:
+    """Load a single GTFS file into the staging table of its corresponding database table."""
+    logger.info("[%s] Loading %s...", agency_id, mapping.gtfs_file)
 
-def load_gtfs_zip(session: Session, zip_path: Path, feed: FeedConfig) -> None:
-    """Load GTFS static data."""
+    with zf.open(mapping.gtfs_file) as f:
+        return copy_to_table(
+            session,
+            sql.Identifier("gtfs_static", staging_name(mapping.table_name)),
+            mapping.columns,
+            transform_to_csv(f, mapping, agency_id, prefix),
+        )
+
+
+def load_gtfs_zip(
+    session: Session, zip_path: Path, feed: FeedConfig, timings: StageTimings | None = None
+) -> dict[str, int]:
+    """
+    Load GTFS static data into the staging tables. Tables are loaded in TABLE_MAPPINGS order, which satisfies the
+    foreign keys, in the session's transaction, so a feed that fails leaves nothing of itself behind. Returns the
+    number of rows loaded from each file.
+    """
     agency_id = feed.agency.value
+    timings = timings if timings is not None else StageTimings()
     logger.info("[%s] Opening ZIP: %s", agency_id, zip_path)
 
+    rows = {}
     with zipfile.ZipFile(zip_path, "r") as zf:
-        _delete_agency_data(session, agency_id)
-
         for mapping in TABLE_MAPPINGS:
-            _load_table(session, zf, mapping, agency_id, feed.prefix_id)
+            with timings.stage(mapping.table_name):
+                rows[mapping.gtfs_file] = _load_table(session, zf, mapping, agency_id, feed.prefix_id)
 
         logger.info("[%s] All data loaded, committing...", agency_id)
+    return rows
+
+
+def carry_over_agencies(session: Session, agency_ids: list[str]) -> None:
+    """Copy the live rows of agencies that are not reloaded this cycle into the staging tables."""
+    raw_conn = session.connection().connection.dbapi_connection
+    if raw_conn is None:
+        raise RuntimeError("No database connection available")
+
+    cursor = raw_conn.cursor()
+    tables: list[TableMapping | DerivedTable] = [*TABLE_MAPPINGS, *DERIVED_TABLES]
+    for table in tables:
+        columns = sql.SQL(", ").join(map(sql.Identifier, table.columns))
+        stmt = sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {} WHERE agency_id = ANY(%s)").format(
+            sql.Identifier("gtfs_static", staging_name(table.table_name)),
+            columns,
+            columns,
+            sql.Identifier("gtfs_static", table.table_name),
+        )
+        cursor.execute(stmt, (agency_ids,))
+        logger.info("Carried over %d %s rows of %s", cursor.rowcount, table.table_name, ", ".join(agency_ids))
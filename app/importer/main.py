@@ -1,24 +1,40 @@
 import logging
 import shutil
 import signal
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from pathlib import Path
 from threading import Event
 from typing import Any
 
-from app.importer.constants import IMPORT_CYCLE_SLEEP
-from app.importer.download import download_gtfs_zip
-from app.importer.hashing import sha256_file
-from app.importer.load import load_gtfs_zip
+import psycopg
+
+from app.importer.constants import (
+    IMPORT_CYCLE_SLEEP,
+    IMPORT_PARALLEL_FEEDS,
+    IMPORT_SWAP_ATTEMPTS,
+    IMPORT_SWAP_RETRY_BACKOFF_SECONDS,
+)
+from app.importer.derived import fill_staging_derived_tables
+from app.importer.diff import DiffReport, diff_feed
+from app.importer.download import HttpValidators, download_gtfs_zip
+from app.importer.hashing import sha256_zip_members
+from app.importer.load import STATIC_TABLES, TABLE_MAPPINGS, carry_over_agencies, load_gtfs_zip
+from app.importer.staging import build_staging_indexes, create_staging_tables, swap_staging_tables
+from app.importer.timings import StageTimings
 from app.platform.config import get_config
 from app.platform.db.connection import get_session
 from app.platform.logging import setup_logging
 from app.platform.redis.connection import get_client
+from app.platform.retry import retry_sync
 from app.platform.sentry import capture_exception, setup_sentry
 from app.shared.constants import REDIS_KEY_GTFS_READY
-from app.shared.gtfs.feeds import get_all_feed_configs
+from app.shared.gtfs.feeds import FeedConfig, get_all_feed_configs
 from app.shared.gtfs.reload_marker import bump_reload_marker
 from app.shared.gtfs.repositories.gtfs_meta import GtfsMetaRepository
+from app.shared.models.enums import CacheInvalidationReason
+from app.shared.redis.cache_invalidation import publish_cache_invalidation
+from app.shared.redis.schemas import CacheInvalidationMessage
 
 logger = logging.getLogger(__name__)
 
@@ -36,56 +52,234 @@ def signal_handler(*args: Any) -> None:
     shutdown_event.set()
 
 
+@dataclass(slots=True)
+class FetchedFeed:
+    feed: FeedConfig
+    zip_path: Path
+    new_hash: str
+    validators: HttpValidators
+    file_hashes: dict[str, str]
+    timings: StageTimings
+    rows: dict[str, int] = field(default_factory=dict)
+
+
+def _report_feed_failure(result: ImportCycleResult, agency_name: str, e: Exception) -> None:
+    result.all_ok = False
+    logger.exception("Failed to import %s: %s", agency_name, e)
+    capture_exception(
+        e,
+        tags={
+            "agency": agency_name,
+            "component": "importer",
+            "failure_scope": "feed",
+        },
+    )
+
+
+def _fetch_feed(feed_config: FeedConfig) -> FetchedFeed | None:
+    """
+    Download, hash and archive one feed. Returns None when the server reports it not modified since the current
+    import, or when its hash is unchanged.
+    """
+    agency = feed_config.agency
+    timings = StageTimings()
+
+    with get_session() as session:
+        meta_repo = GtfsMetaRepository(session)
+        current_hash = meta_repo.get_current_hash(agency)
+        validators = HttpValidators(*meta_repo.get_validators(agency)) if current_hash else None
+
+    logger.info("Downloading %s from %s", agency.value, feed_config.static_url)
+    with timings.stage("download"):
+        download = download_gtfs_zip(feed_config, validators)
+    if download is None:
+        logger.info("Skipping %s - not modified (%s)", agency.value, timings.summary())
+        return None
+
+    zip_path = download.path
+    try:
+        logger.info("Downloaded %s, hash: %s...", agency.value, download.sha256[:16])
+        if current_hash == download.sha256:
+            # Same content under new validators, keep them so the next request can be answered with 304
+            with get_session() as session:
+                GtfsMetaRepository(session).set_validators(
+                    agency, download.validators.etag, download.validators.last_modified
+                )
+            logger.info("Skipping %s - hash unchanged (%s)", agency.value, timings.summary())
+            zip_path.unlink(missing_ok=True)
+            return None
+
+        with timings.stage("hash"):
+            file_hashes = sha256_zip_members(zip_path, [mapping.gtfs_file for mapping in TABLE_MAPPINGS])
+
+        archive_dir = get_config().data_dir
+        archive_dir.mkdir(exist_ok=True)
+        archive_path = archive_dir / f"{download.sha256}.zip"
+        if not archive_path.exists():
+            with timings.stage("archive"):
+                shutil.copy2(zip_path, archive_path)
+            logger.info("Archived %s as %s...zip", agency.value, download.sha256[:16])
+    except Exception:
+        zip_path.unlink(missing_ok=True)
+        raise
+    return FetchedFeed(feed_config, zip_path, download.sha256, download.validators, file_hashes, timings)
+
+
+def _diff_feed(fetched: FetchedFeed) -> DiffReport | None:
+    """
+    Apply only the changed rows of a feed to the live tables, in its own transaction. Returns None, changing
+    nothing, when the feed has no recorded files yet or changed too much, and needs a full reload.
+    """
+    agency = fetched.feed.agency
+    with get_session() as session:
+        meta_repo = GtfsMetaRepository(session)
+        files = meta_repo.get_files(agency)
+        if not files:
+            return None
+
+        with fetched.timings.stage("diff"):
+            recorded_hashes = {name: file.sha256 for name, file in files.items()}
+            report = diff_feed(session, fetched.zip_path, fetched.feed, fetched.file_hashes, recorded_hashes)
+        if report is None:
+            session.rollback()
+            return None
+
+        for delta in report.deltas:
+            meta_repo.set_file(agency, delta.name, fetched.file_hashes[delta.name], delta.rows)
+        meta_repo.set_current_hash(agency, fetched.new_hash, fetched.validators.etag, fetched.validators.last_modified)
+        with fetched.timings.stage("commit"):
+            session.commit()
+
+    elapsed = fetched.timings.stages["diff"] + fetched.timings.stages["commit"]
+    full_reload = sum(file.load_seconds for file in files.values())
+    logger.info(
+        "Diff-imported %s: %s; %d rows touched in %.2fs, a full reload last took %.2fs to load (%.2fs saved)",
+        agency.value,
+        report.summary(),
+        report.rows_touched,
+        elapsed,
+        full_reload,
+        full_reload - elapsed,
+    )
+    return report
+
+
+def _load_feed(fetched: FetchedFeed) -> None:
+    """Load one feed into the staging tables in its own transaction."""
+    agency_name = fetched.feed.agency.value
+    logger.info("Loading %s into staging tables...", agency_name)
+    with get_session() as session:
+        fetched.rows = load_gtfs_zip(session, fetched.zip_path, fetched.feed, fetched.timings)
+        with fetched.timings.stage("commit"):
+            session.commit()
+    logger.info("Loaded %s (%s)", agency_name, fetched.timings.summary())
+
+
+def _swap(loaded: list[FetchedFeed], timings: StageTimings) -> None:
+    """Swap the staging tables in and record the loaded feeds' hashes and files, atomically."""
+    with get_session() as session:
+        swap_staging_tables(session, STATIC_TABLES, timings)
+        meta_repo = GtfsMetaRepository(session)
+        for fetched in loaded:
+            meta_repo.set_current_hash(
+                fetched.feed.agency, fetched.new_hash, fetched.validators.etag, fetched.validators.last_modified
+            )
+            for mapping in TABLE_MAPPINGS:
+                meta_repo.set_file(
+                    fetched.feed.agency,
+                    mapping.gtfs_file,
+                    fetched.file_hashes[mapping.gtfs_file],
+                    fetched.rows[mapping.gtfs_file],
+                    fetched.timings.stages[mapping.table_name],
+                )
+        with timings.stage("swap commit"):
+            session.commit()
+
+
 def run_import() -> ImportCycleResult:
-    """Run GTFS static import for all configured feeds."""
+    """
+    Run GTFS static import for all configured feeds.
+
+    Feeds are downloaded concurrently. A changed feed that was imported before is first diffed against the live
+    tables and only its changed rows applied (see app.importer.diff). The others are loaded concurrently into
+    staging tables, which then replace the live gtfs_static tables in one transaction (see app.importer.staging).
+    Agencies not reloaded keep their current data, carried over into the staging tables. The derived lookup
+    tables (see app.importer.derived) change with the tables they are derived from, in the same transaction.
+    """
     feed_configs = get_all_feed_configs()
     logger.info("Starting import for %d feeds", len(feed_configs))
     result = ImportCycleResult()
+    timings = StageTimings()
+    fetched: list[FetchedFeed] = []
 
-    for feed_config in feed_configs:
-        agency_name = feed_config.agency.value
-
+    with ThreadPoolExecutor(max_workers=IMPORT_PARALLEL_FEEDS, thread_name_prefix="import") as executor:
         try:
-            logger.info("Downloading %s from %s", agency_name, feed_config.static_url)
-            zip_path = download_gtfs_zip(feed_config)
-            new_hash = sha256_file(zip_path)
-            logger.info("Downloaded %s, hash: %s...", agency_name, new_hash[:16])
+            with timings.stage("fetch"):
+                fetch_futures = {executor.submit(_fetch_feed, feed_config): feed_config for feed_config in feed_configs}
+                for future in as_completed(fetch_futures):
+                    try:
+                        if (feed := future.result()) is not None:
+                            fetched.append(feed)
+                    except Exception as e:
+                        _report_feed_failure(result, fetch_futures[future].agency.value, e)
+            if not fetched:
+                return result
 
-            with get_session() as session:
-                meta_repo = GtfsMetaRepository(session)
-                current_hash = meta_repo.get_current_hash(feed_config.agency)
+            full_reload: list[FetchedFeed] = []
+            with timings.stage("diff"):
+                diff_futures = {executor.submit(_diff_feed, feed): feed for feed in fetched}
+                for diff_future in as_completed(diff_futures):
+                    try:
+                        if diff_future.result() is None:
+                            full_reload.append(diff_futures[diff_future])
+                        else:
+                            result.any_changed = True
+                    except Exception as e:
+                        _report_feed_failure(result, diff_futures[diff_future].feed.agency.value, e)
+            if not full_reload:
+                return result
 
-                if current_hash == new_hash:
-                    logger.info("Skipping %s - hash unchanged", agency_name)
-                    Path(zip_path).unlink()
-                    continue
+            with timings.stage("staging"), get_session() as session:
+                create_staging_tables(session, STATIC_TABLES)
 
-                archive_dir = get_config().data_dir
-                archive_dir.mkdir(exist_ok=True)
-                archive_path = archive_dir / f"{new_hash}.zip"
-                if not archive_path.exists():
-                    shutil.copy2(zip_path, archive_path)
-                    logger.info("Archived %s as %s...zip", agency_name, new_hash[:16])
+            loaded: list[FetchedFeed] = []
+            with timings.stage("load"):
+                load_futures = {executor.submit(_load_feed, feed): feed for feed in full_reload}
+                for load_future in as_completed(load_futures):
+                    try:
+                        load_future.result()
+                        loaded.append(load_futures[load_future])
+                    except Exception as e:
+                        _report_feed_failure(result, load_futures[load_future].feed.agency.value, e)
+            if not loaded:
+                return result
 
-                logger.info("Loading %s into database...", agency_name)
-                load_gtfs_zip(session, zip_path, feed_config)
-                meta_repo.set_current_hash(feed_config.agency, new_hash)
-                result.any_changed = True
-                logger.info("Successfully imported %s", agency_name)
+            reloaded = {feed.feed.agency for feed in loaded}
+            kept = [feed_config.agency.value for feed_config in feed_configs if feed_config.agency not in reloaded]
+            with timings.stage("carry over"), get_session() as session:
+                carry_over_agencies(session, kept)
 
-            Path(zip_path).unlink()
+            with timings.stage("derive"), get_session() as session:
+                fill_staging_derived_tables(session, [agency.value for agency in reloaded])
 
-        except Exception as e:
-            result.all_ok = False
-            logger.exception("Failed to import %s: %s", agency_name, e)
-            capture_exception(
-                e,
-                tags={
-                    "agency": agency_name,
-                    "component": "importer",
-                    "failure_scope": "feed",
-                },
+            with timings.stage("indexes"), get_session() as session:
+                build_staging_indexes(session, STATIC_TABLES)
+
+            retry_sync(
+                lambda: _swap(loaded, timings),
+                attempts=IMPORT_SWAP_ATTEMPTS,
+                backoff_seconds=IMPORT_SWAP_RETRY_BACKOFF_SECONDS,
+                retriable_exceptions=(psycopg.errors.LockNotAvailable,),
+                on_retry=lambda exc, attempt, delay: logger.warning(
+                    "Swap attempt %d could not lock the live tables, retrying in %.0fs", attempt, delay
+                ),
             )
+            result.any_changed = True
+            logger.info("Imported %s", ", ".join(feed.feed.agency.value for feed in loaded))
+        finally:
+            for feed in fetched:
+                feed.zip_path.unlink(missing_ok=True)
+            logger.info("Import of %d feeds finished (%s)", len(feed_configs), timings.summary())
 
     return result
 
@@ -108,6 +302,7 @@ def main() -> None:
                 if result.any_changed:
                     marker = bump_reload_marker(redis)
                     logger.info("GTFS reload marker updated to %s", marker.decode())
+                    publish_cache_invalidation(redis, CacheInvalidationMessage(CacheInvalidationReason.GTFS_RELOADED))
                 logger.info("Import cycle completed, sleeping for 1 hour")
             else:
                 logger.warning("Import cycle completed with feed failures, skipping GTFS reload marker update")
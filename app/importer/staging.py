@@ -0,0 +1,194 @@
+"""
+Blue/green reload of the gtfs_static.current_* tables.
+
+Every import cycle that has changed feeds builds a full copy of the tables under staging names: changed agencies
+are loaded from their zips, the other agencies' rows are carried over from the live tables. Keys and foreign keys
+are copied from the live tables before loading, so a broken feed fails on its own; secondary indexes are built
+once the data is in. The staging tables then replace the live ones in one short transaction, so readers never
+wait on a bulk DELETE and the live tables never accumulate dead rows.
+
+Table, index and constraint definitions are read from the catalog, the live tables stay the single source of
+truth maintained by migrations.
+"""
+
+import logging
+from typing import Any, cast
+
+import psycopg
+from psycopg import sql
+from sqlalchemy.orm import Session
+
+from app.importer.constants import IMPORT_STAGING_PREFIX, IMPORT_SWAP_LOCK_TIMEOUT_MS
+from app.importer.timings import StageTimings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = "gtfs_static"
+
+
+def staging_name(name: str) -> str:
+    return f"{IMPORT_STAGING_PREFIX}{name}"
+
+
+def _cursor(session: Session) -> psycopg.Cursor[Any]:
+    raw_conn = session.connection().connection.dbapi_connection
+    if raw_conn is None:
+        raise RuntimeError("No database connection available")
+    cursor = cast(psycopg.Cursor[Any], raw_conn.cursor())
+    # Catalog functions then schema-qualify every name they print
+    cursor.execute("SELECT set_config('search_path', 'pg_catalog', true)")
+    return cursor
+
+
+def _table(name: str) -> sql.Composable:
+    return sql.Identifier(SCHEMA, name)
+
+
+def _table_list(names: list[str]) -> sql.Composable:
+    return sql.SQL(", ").join(_table(name) for name in names)
+
+
+def _retarget(definition: str, tables: list[str]) -> str:
+    """Point references to live tables in a catalog definition at their staging tables."""
+    for table in tables:
+        definition = definition.replace(f"{SCHEMA}.{table}(", f"{SCHEMA}.{staging_name(table)}(")
+    return definition
+
+
+def _copy_grants(cursor: psycopg.Cursor[Any], table: str) -> None:
+    rows = cursor.execute(
+        """
+        SELECT pg_get_userbyid(acl.grantee), acl.privilege_type
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        CROSS JOIN aclexplode(c.relacl) acl
+        WHERE n.nspname = %s AND c.relname = %s AND acl.grantee NOT IN (0, c.relowner)
+        """,
+        (SCHEMA, table),
+    ).fetchall()
+    for grantee, privilege in rows:
+        cursor.execute(
+            sql.SQL("GRANT {} ON {} TO {}").format(
+                sql.SQL(privilege), _table(staging_name(table)), sql.Identifier(grantee)
+            )
+        )
+
+
+def create_staging_tables(session: Session, tables: list[str]) -> None:
+    """
+    (Re)create empty staging tables for `tables`, given in foreign key dependency order, with the live tables'
+    columns, keys, foreign keys (pointing at the staging tables) and grants.
+    """
+    cursor = _cursor(session)
+    cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(_table_list([staging_name(t) for t in tables])))
+
+    for table in tables:
+        cursor.execute(
+            sql.SQL(
+                "CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING GENERATED "
+                "INCLUDING CONSTRAINTS INCLUDING STORAGE)"
+            ).format(_table(staging_name(table)), _table(table))
+        )
+        _copy_grants(cursor, table)
+
+    # Keys before foreign keys, which need the referenced key's index
+    constraints = cursor.execute(
+        """
+        SELECT c.relname, con.conname, pg_get_constraintdef(con.oid)
+        FROM pg_constraint con
+        JOIN pg_class c ON c.oid = con.conrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = %s AND c.relname = ANY(%s) AND con.contype IN ('p', 'u', 'f')
+        ORDER BY con.contype = 'f', array_position(%s, c.relname::text)
+        """,
+        (SCHEMA, tables, tables),
+    ).fetchall()
+    for table, name, definition in constraints:
+        cursor.execute(
+            sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} {}").format(
+                _table(staging_name(table)), sql.Identifier(staging_name(name)), sql.SQL(_retarget(definition, tables))
+            )
+        )
+
+
+def build_staging_indexes(session: Session, tables: list[str]) -> None:
+    """Create the live tables' secondary indexes on the loaded staging tables and analyze them."""
+    cursor = _cursor(session)
+    indexes = cursor.execute(
+        """
+        SELECT c.relname, i.relname, pg_get_indexdef(x.indexrelid)
+        FROM pg_index x
+        JOIN pg_class c ON c.oid = x.indrelid
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = %s AND c.relname = ANY(%s)
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint con WHERE con.conindid = x.indexrelid)
+        """,
+        (SCHEMA, tables),
+    ).fetchall()
+    for table, name, definition in indexes:
+        head = f" INDEX {name} ON {SCHEMA}.{table} "
+        if head not in definition:
+            raise RuntimeError(f"Unexpected definition of index {name}: {definition}")
+        cursor.execute(
+            sql.SQL(definition.replace(head, f" INDEX {staging_name(name)} ON {SCHEMA}.{staging_name(table)} "))
+        )
+
+    for table in tables:
+        cursor.execute(sql.SQL("ANALYZE {}").format(_table(staging_name(table))))
+
+
+def swap_staging_tables(session: Session, tables: list[str], timings: StageTimings) -> None:
+    """
+    Replace the live tables with their staging tables and give the staging indexes, constraints and sequences the
+    live names. Readers are blocked only while the exclusive locks are held, until the session commits; waiting
+    for the locks gives up after IMPORT_SWAP_LOCK_TIMEOUT_MS with psycopg.errors.LockNotAvailable.
+    """
+    cursor = _cursor(session)
+    cursor.execute("SELECT set_config('lock_timeout', %s, true)", (f"{IMPORT_SWAP_LOCK_TIMEOUT_MS}ms",))
+
+    with timings.stage("swap lock"):
+        cursor.execute(sql.SQL("LOCK TABLE {} IN ACCESS EXCLUSIVE MODE").format(_table_list(tables)))
+
+    cursor.execute(sql.SQL("DROP TABLE {}").format(_table_list(tables)))
+    for table in tables:
+        cursor.execute(
+            sql.SQL("ALTER TABLE {} RENAME TO {}").format(_table(staging_name(table)), sql.Identifier(table))
+        )
+
+    # Renaming an index also renames the key constraint it backs
+    relations = cursor.execute(
+        """
+        SELECT r.relname, r.relkind
+        FROM pg_class r
+        JOIN pg_namespace n ON n.oid = r.relnamespace
+        WHERE n.nspname = %s AND r.relkind IN ('i', 'S')
+        """,
+        (SCHEMA,),
+    ).fetchall()
+    for name, kind in relations:
+        if name.startswith(IMPORT_STAGING_PREFIX):
+            statement = "ALTER INDEX {} RENAME TO {}" if kind == "i" else "ALTER SEQUENCE {} RENAME TO {}"
+            cursor.execute(
+                sql.SQL(statement).format(_table(name), sql.Identifier(name.removeprefix(IMPORT_STAGING_PREFIX)))
+            )
+
+    foreign_keys = cursor.execute(
+        """
+        SELECT c.relname, con.conname
+        FROM pg_constraint con
+        JOIN pg_class c ON c.oid = con.conrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = %s AND c.relname = ANY(%s) AND con.contype = 'f'
+        """,
+        (SCHEMA, tables),
+    ).fetchall()
+    for table, name in foreign_keys:
+        if name.startswith(IMPORT_STAGING_PREFIX):
+            cursor.execute(
+                sql.SQL("ALTER TABLE {} RENAME CONSTRAINT {} TO {}").format(
+                    _table(table), sql.Identifier(name), sql.Identifier(name.removeprefix(IMPORT_STAGING_PREFIX))
+                )
+            )
+
+    logger.info("Swapped staging tables into %s", ", ".join(tables))
@@ -47,6 +47,7 @@ class AppConfig:
     redis: RedisConfig | None
     timezone: str
     data_dir: Path
+    rt_archive_enabled: bool
     sentry_dsn: str | None
     sentry_environment: str | None
 
@@ -80,6 +81,7 @@ def get_config() -> AppConfig:
         redis=redis,
         timezone=os.getenv("TZ", TIMEZONE),
         data_dir=Path(os.getenv("DATA_DIR", "/app/data")),
+        rt_archive_enabled=os.getenv("RT_ARCHIVE_ENABLED", "").lower() in ("1", "true", "yes"),
         sentry_dsn=os.getenv("SENTRY_DSN") or None,
         sentry_environment=os.getenv("SENTRY_ENVIRONMENT") or None,
     )
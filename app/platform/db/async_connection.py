@@ -0,0 +1,30 @@
+"""
+Database engine of asyncio services. Kept apart from app.platform.db.connection, as importing SQLAlchemy's asyncio
+extension requires greenlet, which only the api extra installs.
+"""
+
+from functools import lru_cache
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.platform.config import get_config
+from app.platform.constants import DB_MAX_OVERFLOW, DB_POOL_SIZE
+
+
+@lru_cache(maxsize=1)
+def get_async_engine() -> AsyncEngine:
+    """Engine for asyncio services, on psycopg's async connections."""
+    config = get_config()
+
+    return create_async_engine(
+        config.database.url,
+        pool_pre_ping=True,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        echo=False,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_async_session_factory() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(bind=get_async_engine(), expire_on_commit=False)
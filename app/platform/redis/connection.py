@@ -1,6 +1,7 @@
 from functools import lru_cache
 
 import redis
+import redis.asyncio
 
 from app.platform.config import get_config
 
@@ -24,6 +25,26 @@ def get_client() -> redis.Redis:
     )
 
 
+@lru_cache
+def get_async_client() -> redis.asyncio.Redis:
+    """Client for asyncio services. Its connections belong to the event loop that first uses them."""
+    config = get_config()
+    if config.redis is None:
+        raise RuntimeError("Redis is not configured (REDIS_PASSWORD not set)")
+
+    return redis.asyncio.Redis(
+        host=config.redis.host,
+        port=config.redis.port,
+        db=config.redis.db,
+        username=config.redis.username,
+        password=config.redis.password,
+        decode_responses=False,
+        socket_connect_timeout=5,
+        socket_keepalive=True,
+        health_check_interval=30,
+    )
+
+
 def ensure_available() -> None:
     client = get_client()
     if not client.ping():
@@ -12,3 +12,6 @@ PB_MIN_PAYLOAD_BYTES: int = 10
 
 # In-memory cache limits
 CACHE_MAX_STOP_ID_TO_SEQ: int = 5000
+
+# Warm-restart checkpoint of the stop_id -> stop_sequence cache (in data_dir)
+STOP_ID_TO_SEQ_CHECKPOINT_FILENAME: str = "stop_id_to_seq.checkpoint"
@@ -3,16 +3,22 @@ import signal
 from threading import Event
 from typing import Any
 
+from app.platform.config import get_config
+from app.platform.db.connection import get_session
 from app.platform.logging import setup_logging
 from app.platform.redis.connection import get_client
 from app.platform.sentry import capture_exception, setup_sentry
 from app.rt_poller.circuit_breaker import CircuitBreaker
-from app.rt_poller.constants import POLL_INTERVAL_SECONDS
+from app.rt_poller.constants import POLL_INTERVAL_SECONDS, STOP_ID_TO_SEQ_CHECKPOINT_FILENAME
 from app.rt_poller.fetcher import fetch_trip_updates, fetch_vehicle_positions
 from app.rt_poller.publisher import Publisher
+from app.shared.constants import RT_ARCHIVE_DIRNAME, RT_ARCHIVE_RETENTION_DAYS
+from app.shared.gtfs.checkpoint import load_checkpoint, save_checkpoint
 from app.shared.gtfs.feeds import FeedConfig, get_all_feed_configs
 from app.shared.gtfs.readiness import wait_for_gtfs_ready
 from app.shared.gtfs.reload_marker import ReloadRequiredError, ReloadWatcher
+from app.shared.gtfs.repositories.gtfs_meta import GtfsMetaRepository
+from app.shared.gtfs.rt_archive import RtArchiveWriter
 
 logger = logging.getLogger(__name__)
 
@@ -55,21 +61,41 @@ def _poll_feed(feed: FeedConfig, publisher: Publisher, breaker: CircuitBreaker)
 def run_poller() -> None:
     """Run the GTFS Realtime poller loop"""
     redis = get_client()
-    publisher = Publisher(redis)
+    config = get_config()
+    archive = (
+        RtArchiveWriter(config.data_dir / RT_ARCHIVE_DIRNAME, RT_ARCHIVE_RETENTION_DAYS)
+        if config.rt_archive_enabled
+        else None
+    )
+    publisher = Publisher(redis, archive)
     reload_watcher = ReloadWatcher(redis)
     feeds = get_all_feed_configs()
     breakers = {feed.agency: CircuitBreaker() for feed in feeds}
 
-    logger.info("Starting poller for %d feeds", len(feeds))
+    checkpoint_path = config.data_dir / STOP_ID_TO_SEQ_CHECKPOINT_FILENAME
+    with get_session() as session:
+        static_hashes = GtfsMetaRepository(session).get_all_hashes()
+    stop_id_to_seq = load_checkpoint(checkpoint_path, static_hashes, dict[str, dict[str, int]])
+    if stop_id_to_seq:
+        publisher.warm_stop_id_to_seq(stop_id_to_seq)
+        logger.info("Loaded stop_id -> sequence maps for %d trips from checkpoint", len(stop_id_to_seq))
 
-    while not shutdown_event.is_set():
-        reload_watcher.raise_if_changed()
-        for feed in feeds:
-            if shutdown_event.is_set():
-                break
-            _poll_feed(feed, publisher, breakers[feed.agency])
+    logger.info("Starting poller for %d feeds", len(feeds))
 
-        shutdown_event.wait(timeout=POLL_INTERVAL_SECONDS)
+    try:
+        while not shutdown_event.is_set():
+            reload_watcher.raise_if_changed()
+            for feed in feeds:
+                if shutdown_event.is_set():
+                    break
+                _poll_feed(feed, publisher, breakers[feed.agency])
+
+            shutdown_event.wait(timeout=POLL_INTERVAL_SECONDS)
+    finally:
+        try:
+            save_checkpoint(checkpoint_path, static_hashes, publisher.stop_id_to_seq_snapshot())
+        except Exception:
+            logger.warning("Failed to write stop_id -> sequence checkpoint", exc_info=True)
 
 
 def main() -> None:
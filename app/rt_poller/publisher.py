@@ -8,6 +8,7 @@ from app.rt_poller.constants import CACHE_MAX_STOP_ID_TO_SEQ
 from app.rt_poller.parser import parse_trip_updates, parse_vehicle_positions
 from app.shared.gtfs.feeds import FeedConfig
 from app.shared.gtfs.repositories.gtfs_static import GtfsStaticRepository
+from app.shared.gtfs.rt_archive import RtArchiveWriter
 from app.shared.redis import serializer
 from app.shared.redis.constants import VEHICLE_POSITIONS_CHANNEL
 from app.shared.redis.repositories.live_vehicles import LiveVehiclePositionRepository
@@ -20,8 +21,9 @@ logger = logging.getLogger(__name__)
 class Publisher:
     """Publishes parsed GTFS RT data to Redis Pub/Sub."""
 
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: redis.Redis, archive: RtArchiveWriter | None = None):
         self._redis = redis_client
+        self._archive = archive
         self._trip_updates_repository = TripUpdatesRepository(redis_client)
         self._live_vehicles_repository = LiveVehiclePositionRepository(redis_client)
         self._stop_id_to_seq_cache: LRUCache[str, dict[str, int]] = LRUCache(maxsize=CACHE_MAX_STOP_ID_TO_SEQ)
@@ -33,6 +35,7 @@ class Publisher:
         """
         positions = parse_vehicle_positions(pb_data, feed)
 
+        messages: list[VehiclePositionMessage] = []
         pipe = self._redis.pipeline(transaction=False)
         for pos in positions:
             message = VehiclePositionMessage(
@@ -46,6 +49,7 @@ class Publisher:
                 timestamp=pos.timestamp.isoformat(),
             )
             pipe.publish(VEHICLE_POSITIONS_CHANNEL, serializer.encode_vp_message(message))
+            messages.append(message)
 
             if pos.has_position and pos.license_plate:
                 live = LiveVehiclePosition(
@@ -60,6 +64,12 @@ class Publisher:
                 self._live_vehicles_repository.pipe_save(pipe, live)
         pipe.execute()
 
+        if self._archive is not None:
+            try:
+                self._archive.append_vehicle_positions(feed.agency, messages)
+            except OSError:
+                logger.warning("Failed to archive %s vehicle positions", feed.agency.value, exc_info=True)
+
         return len(positions)
 
     def process_trip_updates(self, feed: FeedConfig, pb_data: bytes) -> int:
@@ -68,6 +78,12 @@ class Publisher:
         """
         updates = parse_trip_updates(pb_data, feed)
 
+        if self._archive is not None:
+            try:
+                self._archive.append_trip_updates(feed.agency, updates)
+            except OSError:
+                logger.warning("Failed to archive %s trip updates", feed.agency.value, exc_info=True)
+
         with get_session() as session:
             static_repo = GtfsStaticRepository(session)
 
@@ -82,3 +98,10 @@ class Publisher:
         if trip_id not in self._stop_id_to_seq_cache:
             self._stop_id_to_seq_cache[trip_id] = repo.build_stop_id_to_sequence_map(trip_id)
         return self._stop_id_to_seq_cache[trip_id]
+
+    def stop_id_to_seq_snapshot(self) -> dict[str, dict[str, int]]:
+        return dict(self._stop_id_to_seq_cache)
+
+    def warm_stop_id_to_seq(self, maps: dict[str, dict[str, int]]) -> None:
+        for trip_id, stop_id_to_seq in maps.items():
+            self._stop_id_to_seq_cache[trip_id] = stop_id_to_seq
@@ -1,6 +1,28 @@
+from datetime import timedelta
+
 REDIS_KEY_GTFS_READY: str = "gtfs:ready"
 REDIS_KEY_GTFS_RELOAD_MARKER: str = "gtfs:reload_marker"
 
 # GTFS readiness
 GTFS_READINESS_TIMEOUT: int = 180
 GTFS_READINESS_POLL_INTERVAL: int = 5
+
+# GTFS-RT payload archive (in rt_poller data_dir), read by the stop_writer replay CLI
+RT_ARCHIVE_DIRNAME: str = "rt_archive"
+RT_ARCHIVE_RETENTION_DAYS: int = 14
+
+# Years covered by the precomputed UTC offset table of the batch timetable functions
+TIMETABLE_OFFSET_TABLE_YEARS: tuple[int, int] = (1999, 2100)
+
+# Shape polylines precomputed by the importer: simplification tolerance in metres per resolution, 0 keeps every point
+SHAPE_RESOLUTION_TOLERANCES_M: dict[str, float] = {"full": 0.0, "high": 1.0, "medium": 5.0, "low": 20.0}
+SHAPE_POLYLINE_PRECISION: int = 100_000
+
+# Line statistics, shared by the API queries and the stop_writer daily rollups: events with a lower delay are
+# detection errors and left out, the rest are classed as on time, slightly delayed or delayed by these bounds
+MIN_DELAY_SECONDS: int = -90
+PUNCTUALITY_ON_TIME_MAX_SECONDS: int = 120
+PUNCTUALITY_SLIGHTLY_DELAYED_MAX_SECONDS: int = 360
+
+# A service day is closed, and its statistics final, this long after its calendar end (trips past midnight)
+SERVICE_DAY_CLOSE_DELAY: timedelta = timedelta(hours=6)
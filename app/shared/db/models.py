@@ -14,6 +14,7 @@ from sqlalchemy import (
     Text,
     text,
 )
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -27,6 +28,20 @@ class GtfsMeta(Base):
 
     agency: Mapped[str] = mapped_column(Text, primary_key=True)
     current_hash: Mapped[str] = mapped_column(Text, nullable=False)
+    etag: Mapped[str | None] = mapped_column(Text, nullable=True)
+    last_modified: Mapped[str | None] = mapped_column(Text, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
+
+
+class GtfsFile(Base):
+    __tablename__ = "gtfs_files"
+    __table_args__ = {"schema": "gtfs_static"}
+
+    agency: Mapped[str] = mapped_column(Text, primary_key=True)
+    gtfs_file: Mapped[str] = mapped_column(Text, primary_key=True)
+    sha256: Mapped[str] = mapped_column(Text, nullable=False)
+    row_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    load_seconds: Mapped[float] = mapped_column(Double, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
 
 
@@ -117,6 +132,55 @@ class CurrentShape(Base):
     )
 
 
+class TripSummary(Base):
+    """Per-trip lookups derived by the importer from current_trips, current_routes and current_stop_times."""
+
+    __tablename__ = "trip_summary"
+
+    trip_id: Mapped[str] = mapped_column(Text, primary_key=True)
+    agency_id: Mapped[str] = mapped_column(Text, nullable=False)
+    route_short_name: Mapped[str] = mapped_column(Text, nullable=False)
+    headsign: Mapped[str | None] = mapped_column(Text, nullable=True)
+    shape_id: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # NULL for a trip without stop times
+    max_stop_sequence: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    first_stop_id: Mapped[str | None] = mapped_column(Text, nullable=True)
+    last_stop_id: Mapped[str | None] = mapped_column(Text, nullable=True)
+    first_arrival_seconds: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    last_arrival_seconds: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    __table_args__ = (Index("idx_trip_summary_agency", "agency_id"), {"schema": "gtfs_static"})
+
+
+class TripStopIndex(Base):
+    """The stop_sequence of each stop of a trip, its last visit for a stop visited twice."""
+
+    __tablename__ = "trip_stop_index"
+
+    trip_id: Mapped[str] = mapped_column(Text, primary_key=True)
+    stop_id: Mapped[str] = mapped_column(Text, primary_key=True)
+    agency_id: Mapped[str] = mapped_column(Text, nullable=False)
+    stop_sequence: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (Index("idx_trip_stop_index_agency", "agency_id"), {"schema": "gtfs_static"})
+
+
+class ShapePolyline(Base):
+    """A shape simplified at one resolution and encoded as a polyline, derived by the importer from current_shapes."""
+
+    __tablename__ = "shape_polylines"
+
+    shape_id: Mapped[str] = mapped_column(Text, primary_key=True)
+    resolution: Mapped[str] = mapped_column(Text, primary_key=True)
+    agency_id: Mapped[str] = mapped_column(Text, nullable=False)
+    point_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    polyline: Mapped[str] = mapped_column(Text, nullable=False)
+    # shape_pt_sequence of each point kept
+    sequences: Mapped[list[int]] = mapped_column(ARRAY(Integer), nullable=False)
+
+    __table_args__ = (Index("idx_shape_polylines_agency", "agency_id"), {"schema": "gtfs_static"})
+
+
 class StopEventModel(Base):
     __tablename__ = "stop_events"
     __table_args__ = {"schema": "events"}
@@ -145,6 +209,40 @@ class StopEventModel(Base):
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False, server_default=text("now()"))
 
 
+class LineDailyStats(Base):
+    """Rollup of a line's stop events on one service day, see the line_daily_stats migration."""
+
+    __tablename__ = "line_daily_stats"
+    __table_args__ = {"schema": "events"}
+
+    line_number: Mapped[str] = mapped_column(Text, primary_key=True)
+    service_date: Mapped[date] = mapped_column(Date, primary_key=True)
+    # False: detection_method 1 only, True: every detection method
+    includes_estimated: Mapped[bool] = mapped_column(Boolean, primary_key=True)
+    stop_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    on_time_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    slightly_delayed_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    delayed_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    delay_sum: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    delay_min: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    delay_max: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    trips_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    trips_total: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class LineDailyStatsDay(Base):
+    """A service day whose line_daily_stats rows are complete, unless a later flush marked it stale."""
+
+    __tablename__ = "line_daily_stats_days"
+    __table_args__ = {"schema": "events"}
+
+    service_date: Mapped[date] = mapped_column(Date, primary_key=True)
+    stale: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default=text("false"))
+    rolled_up_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
+    )
+
+
 class WeatherObservation(Base):
     __tablename__ = "hourly_observations"
     __table_args__ = {"schema": "weather"}
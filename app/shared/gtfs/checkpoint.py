@@ -0,0 +1,51 @@
+import logging
+import os
+from pathlib import Path
+
+import msgspec
+
+logger = logging.getLogger(__name__)
+
+
+class _Envelope(msgspec.Struct, frozen=True):
+    static_hashes: dict[str, str]
+    payload: msgspec.Raw
+
+
+def save_checkpoint(path: Path, static_hashes: dict[str, str], payload: object) -> None:
+    """
+    Write a msgpack checkpoint of in-memory state tagged with the GTFS static hashes it was built from.
+    Written to a temporary file and renamed, so a crash never leaves a partial checkpoint behind.
+    """
+    envelope = _Envelope(static_hashes=static_hashes, payload=msgspec.Raw(msgspec.msgpack.encode(payload)))
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tmp_path.open("wb") as f:
+        f.write(msgspec.msgpack.encode(envelope))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint[T](path: Path, static_hashes: dict[str, str], payload_type: type[T]) -> T | None:
+    """
+    Read a checkpoint written by `save_checkpoint`. Returns None if it is missing, unreadable or was built
+    from different GTFS static data.
+    """
+    try:
+        envelope = msgspec.msgpack.decode(path.read_bytes(), type=_Envelope)
+    except FileNotFoundError:
+        return None
+    except (OSError, msgspec.DecodeError):
+        logger.warning("Ignoring unreadable checkpoint %s", path, exc_info=True)
+        return None
+
+    if envelope.static_hashes != static_hashes:
+        logger.info("Ignoring checkpoint %s built from different GTFS static data", path)
+        return None
+
+    try:
+        return msgspec.msgpack.decode(envelope.payload, type=payload_type)
+    except msgspec.DecodeError:
+        logger.warning("Ignoring checkpoint %s with incompatible payload", path, exc_info=True)
+        return None
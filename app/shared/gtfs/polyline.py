@@ -0,0 +1,46 @@
+"""
+The encoded polyline format of shapes, at the common 1e-5 degree precision (about a metre). Pure Python, the API
+decodes polylines without numpy.
+"""
+
+from collections.abc import Iterable
+from itertools import accumulate
+
+from app.shared.constants import SHAPE_POLYLINE_PRECISION
+
+
+def _encode_value(value: int, out: list[str]) -> None:
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def encode_polyline(lat: Iterable[float], lon: Iterable[float]) -> str:
+    """Encode coordinates in the encoded polyline format, latitude first."""
+    out: list[str] = []
+    prev_lat = prev_lon = 0
+    for a, b in zip(lat, lon, strict=True):
+        lat_e = round(a * SHAPE_POLYLINE_PRECISION)
+        lon_e = round(b * SHAPE_POLYLINE_PRECISION)
+        _encode_value(lat_e - prev_lat, out)
+        _encode_value(lon_e - prev_lon, out)
+        prev_lat, prev_lon = lat_e, lon_e
+    return "".join(out)
+
+
+def decode_polyline(polyline: str) -> list[tuple[float, float]]:
+    """Decode an encoded polyline into (latitude, longitude) pairs."""
+    values: list[int] = []
+    value = shift = 0
+    for char in polyline:
+        byte = ord(char) - 63
+        value |= (byte & 0x1F) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    lat = (value / SHAPE_POLYLINE_PRECISION for value in accumulate(values[0::2]))
+    lon = (value / SHAPE_POLYLINE_PRECISION for value in accumulate(values[1::2]))
+    return list(zip(lat, lon, strict=True))
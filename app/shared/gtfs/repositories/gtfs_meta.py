@@ -1,8 +1,9 @@
 from datetime import UTC, datetime
 
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.shared.db.models import GtfsMeta
+from app.shared.db.models import GtfsFile, GtfsMeta
 from app.shared.models.enums import Agency
 
 
@@ -14,12 +15,58 @@ class GtfsMetaRepository:
         meta = self._session.get(GtfsMeta, agency.value)
         return meta.current_hash if meta else None
 
-    def set_current_hash(self, agency: Agency, hash_value: str) -> None:
+    def get_validators(self, agency: Agency) -> tuple[str | None, str | None]:
+        """ETag and Last-Modified of the download the current hash was imported from."""
+        meta = self._session.get(GtfsMeta, agency.value)
+        return (meta.etag, meta.last_modified) if meta else (None, None)
+
+    def set_validators(self, agency: Agency, etag: str | None, last_modified: str | None) -> None:
+        meta = self._session.get(GtfsMeta, agency.value)
+
+        if meta:
+            meta.etag = etag
+            meta.last_modified = last_modified
+
+    def get_all_hashes(self) -> dict[str, str]:
+        rows = self._session.execute(select(GtfsMeta.agency, GtfsMeta.current_hash)).all()
+        return {row.agency: row.current_hash for row in rows}
+
+    def set_current_hash(
+        self, agency: Agency, hash_value: str, etag: str | None = None, last_modified: str | None = None
+    ) -> None:
         meta = self._session.get(GtfsMeta, agency.value)
 
         if meta:
             meta.current_hash = hash_value
+            meta.etag = etag
+            meta.last_modified = last_modified
             meta.updated_at = datetime.now(UTC)
         else:
-            meta = GtfsMeta(agency=agency.value, current_hash=hash_value)
+            meta = GtfsMeta(agency=agency.value, current_hash=hash_value, etag=etag, last_modified=last_modified)
             self._session.add(meta)
+
+    def get_files(self, agency: Agency) -> dict[str, GtfsFile]:
+        rows = self._session.scalars(select(GtfsFile).where(GtfsFile.agency == agency.value)).all()
+        return {row.gtfs_file: row for row in rows}
+
+    def set_file(
+        self, agency: Agency, gtfs_file: str, sha256: str, row_count: int, load_seconds: float | None = None
+    ) -> None:
+        """Record a loaded file. `load_seconds` is the time of a full load, None keeps the previous one."""
+        file = self._session.get(GtfsFile, (agency.value, gtfs_file))
+
+        if file:
+            file.sha256 = sha256
+            file.row_count = row_count
+            if load_seconds is not None:
+                file.load_seconds = load_seconds
+            file.updated_at = datetime.now(UTC)
+        else:
+            file = GtfsFile(
+                agency=agency.value,
+                gtfs_file=gtfs_file,
+                sha256=sha256,
+                row_count=row_count,
+                load_seconds=load_seconds or 0.0,
+            )
+            self._session.add(file)
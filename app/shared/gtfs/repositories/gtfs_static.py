@@ -1,7 +1,13 @@
-from sqlalchemy import Row, func, select
+from sqlalchemy import select
 from sqlalchemy.orm import Session, joinedload
 
-from app.shared.db.models import CurrentRoute, CurrentShape, CurrentStop, CurrentStopTime, CurrentTrip
+from app.shared.db.models import (
+    CurrentStop,
+    CurrentStopTime,
+    CurrentTrip,
+    TripStopIndex,
+    TripSummary,
+)
 
 
 class GtfsStaticRepository:
@@ -21,29 +27,31 @@ class GtfsStaticRepository:
         return list(self._session.scalars(stmt).all())
 
     def get_max_stop_sequence(self, trip_id: str) -> int | None:
-        stmt = select(func.max(CurrentStopTime.stop_sequence)).where(CurrentStopTime.trip_id == trip_id)
+        stmt = select(TripSummary.max_stop_sequence).where(TripSummary.trip_id == trip_id)
         return self._session.scalars(stmt).first()
 
-    def build_stop_id_to_sequence_map(self, trip_id: str) -> dict[str, int]:
-        stop_times = self.get_stop_times_for_trip(trip_id)
-        return {st.stop_id: st.stop_sequence for st in stop_times}
-
-    def get_all_trip_info(self) -> dict[str, tuple[str, str, str | None]]:
-        stmt = select(
-            CurrentTrip.trip_id, CurrentRoute.route_short_name, CurrentTrip.headsign, CurrentTrip.shape_id
-        ).join(CurrentRoute, CurrentTrip.route_id == CurrentRoute.route_id)
-        rows = self._session.execute(stmt).all()
-        return {row.trip_id: (row.route_short_name, row.headsign or "", row.shape_id) for row in rows}
+    def get_trips(self, trip_ids: list[str]) -> list[CurrentTrip]:
+        stmt = select(CurrentTrip).options(joinedload(CurrentTrip.route)).where(CurrentTrip.trip_id.in_(trip_ids))
+        return list(self._session.scalars(stmt).all())
 
-    def get_shape_points(self, shape_id: str) -> list[CurrentShape]:
-        stmt = select(CurrentShape).where(CurrentShape.shape_id == shape_id).order_by(CurrentShape.shape_pt_sequence)
+    def get_stops(self, stop_ids: list[str]) -> list[CurrentStop]:
+        stmt = select(CurrentStop).where(CurrentStop.stop_id.in_(stop_ids))
         return list(self._session.scalars(stmt).all())
 
-    def get_stops_for_trip(self, trip_id: str) -> list[Row[tuple[CurrentStopTime, CurrentStop]]]:
+    def get_stop_times_for_trips(self, trip_ids: list[str]) -> list[CurrentStopTime]:
         stmt = (
-            select(CurrentStopTime, CurrentStop)
-            .join(CurrentStop, CurrentStopTime.stop_id == CurrentStop.stop_id)
-            .where(CurrentStopTime.trip_id == trip_id)
-            .order_by(CurrentStopTime.stop_sequence)
+            select(CurrentStopTime)
+            .where(CurrentStopTime.trip_id.in_(trip_ids))
+            .order_by(CurrentStopTime.trip_id, CurrentStopTime.stop_sequence)
         )
-        return list(self._session.execute(stmt).all())
+        return list(self._session.scalars(stmt).all())
+
+    def get_max_stop_sequences(self, trip_ids: list[str]) -> dict[str, int]:
+        stmt = select(TripSummary.trip_id, TripSummary.max_stop_sequence).where(TripSummary.trip_id.in_(trip_ids))
+        # Trips without stop times have no max_stop_sequence
+        rows = self._session.execute(stmt).all()
+        return {trip_id: max_seq for trip_id, max_seq in rows if max_seq is not None}
+
+    def build_stop_id_to_sequence_map(self, trip_id: str) -> dict[str, int]:
+        stmt = select(TripStopIndex.stop_id, TripStopIndex.stop_sequence).where(TripStopIndex.trip_id == trip_id)
+        return {stop_id: stop_sequence for stop_id, stop_sequence in self._session.execute(stmt).all()}
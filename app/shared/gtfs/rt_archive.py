@@ -0,0 +1,161 @@
+import gzip
+import hashlib
+import logging
+import shutil
+import struct
+import zlib
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, timedelta
+from enum import IntEnum
+from pathlib import Path
+
+import msgspec
+
+from app.shared.models.enums import Agency
+from app.shared.models.gtfs_realtime import TripUpdate
+from app.shared.redis.schemas import VehiclePositionMessage
+
+logger = logging.getLogger(__name__)
+
+# Record header: payload length + CRC32 of payload (little-endian u32 each)
+_HEADER = struct.Struct("<II")
+
+
+class RtFeedKind(IntEnum):
+    VEHICLE_POSITIONS = 1
+    TRIP_UPDATES = 2
+
+
+class _Record(msgspec.Struct, array_like=True):
+    agency: str
+    kind: int
+    fetched_at: float
+    payload: bytes
+
+
+@dataclass(frozen=True, slots=True)
+class RtArchiveRecord:
+    agency: Agency
+    kind: RtFeedKind
+    fetched_at: datetime
+    payload: bytes
+
+
+def _hour_path(root: Path, at: datetime) -> Path:
+    at = at.astimezone(UTC)
+    return root / at.date().isoformat() / f"{at.hour:02d}.rtlog.gz"
+
+
+_vp_decoder = msgspec.msgpack.Decoder(list[VehiclePositionMessage])
+_tu_decoder = msgspec.msgpack.Decoder(list[TripUpdate])
+
+
+def decode_vehicle_positions(payload: bytes) -> list[VehiclePositionMessage]:
+    return _vp_decoder.decode(payload)
+
+
+def decode_trip_updates(payload: bytes) -> list[TripUpdate]:
+    return _tu_decoder.decode(payload)
+
+
+class RtArchiveWriter:
+    """
+    Append-only archive of parsed GTFS-RT feeds, one gzip file per UTC hour.
+
+    Vehicle positions are stored as the exact pub/sub messages stop_writer consumes, trip updates as parsed
+    TripUpdate lists. A poll identical to the previous one of the same agency and feed kind is skipped (the feeds
+    refresh less often than they are polled). Day directories older than `retention_days` are removed on day
+    rollover.
+    """
+
+    def __init__(self, root: Path, retention_days: int):
+        self._root = root
+        self._retention_days = retention_days
+        self._last_digest: dict[tuple[Agency, RtFeedKind], bytes] = {}
+        self._current_day: date | None = None
+        root.mkdir(parents=True, exist_ok=True)
+
+    def append_vehicle_positions(
+        self, agency: Agency, messages: list[VehiclePositionMessage], fetched_at: datetime | None = None
+    ) -> bool:
+        return self._append(agency, RtFeedKind.VEHICLE_POSITIONS, msgspec.msgpack.encode(messages), fetched_at)
+
+    def append_trip_updates(
+        self, agency: Agency, updates: list[TripUpdate], fetched_at: datetime | None = None
+    ) -> bool:
+        return self._append(agency, RtFeedKind.TRIP_UPDATES, msgspec.msgpack.encode(updates), fetched_at)
+
+    def _append(self, agency: Agency, kind: RtFeedKind, payload: bytes, fetched_at: datetime | None) -> bool:
+        """Archive an encoded poll. Returns False if it was skipped as unchanged."""
+        digest = hashlib.blake2b(payload, digest_size=16).digest()
+        if self._last_digest.get((agency, kind)) == digest:
+            return False
+
+        fetched_at = fetched_at or datetime.now(UTC)
+        path = _hour_path(self._root, fetched_at)
+        self._rollover(fetched_at.astimezone(UTC).date())
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        body = msgspec.msgpack.encode(_Record(agency.value, int(kind), fetched_at.timestamp(), payload))
+        # Each append is a separate gzip member, so a torn write only loses the last record
+        with gzip.open(path, "ab", compresslevel=6) as f:
+            f.write(_HEADER.pack(len(body), zlib.crc32(body)) + body)
+
+        self._last_digest[(agency, kind)] = digest
+        return True
+
+    def _rollover(self, day: date) -> None:
+        if day == self._current_day:
+            return
+        self._current_day = day
+
+        cutoff = day - timedelta(days=self._retention_days)
+        for day_dir in self._root.iterdir():
+            try:
+                dir_day = date.fromisoformat(day_dir.name)
+            except ValueError:
+                continue
+            if dir_day < cutoff:
+                shutil.rmtree(day_dir, ignore_errors=True)
+                logger.info("Removed expired RT archive %s", day_dir)
+
+
+def _read_file(path: Path) -> Iterator[RtArchiveRecord]:
+    try:
+        with gzip.open(path, "rb") as f:
+            while True:
+                header = f.read(_HEADER.size)
+                if not header:
+                    return
+                if len(header) < _HEADER.size:
+                    logger.warning("RT archive %s: truncated record header, ignoring tail", path)
+                    return
+
+                length, checksum = _HEADER.unpack(header)
+                body = f.read(length)
+                if len(body) < length or zlib.crc32(body) != checksum:
+                    logger.warning("RT archive %s: corrupt or truncated record, ignoring tail", path)
+                    return
+
+                record = msgspec.msgpack.decode(body, type=_Record)
+                yield RtArchiveRecord(
+                    agency=Agency(record.agency),
+                    kind=RtFeedKind(record.kind),
+                    fetched_at=datetime.fromtimestamp(record.fetched_at, tz=UTC),
+                    payload=record.payload,
+                )
+    except (EOFError, gzip.BadGzipFile, zlib.error):
+        logger.warning("RT archive %s: damaged gzip stream, ignoring tail", path)
+
+
+def read_rt_archive(root: Path, start: datetime, end: datetime) -> Iterator[RtArchiveRecord]:
+    """Yield archived payloads fetched in [start, end), in fetch order."""
+    hour = start.astimezone(UTC).replace(minute=0, second=0, microsecond=0)
+    while hour < end:
+        path = _hour_path(root, hour)
+        if path.exists():
+            for record in _read_file(path):
+                if start <= record.fetched_at < end:
+                    yield record
+        hour += timedelta(hours=1)
@@ -0,0 +1,53 @@
+"""
+Shape simplification with Douglas-Peucker, run by the importer before encoding shapes as polylines.
+
+Simplification runs on an equirectangular projection around the shape's mean latitude, which is accurate to well
+under a metre over the extent of a city route.
+"""
+
+import numpy as np
+import numpy.typing as npt
+
+_EARTH_RADIUS_M = 6_371_000.0
+
+FloatArray = npt.NDArray[np.float64]
+IndexArray = npt.NDArray[np.intp]
+
+
+def simplify(lat: FloatArray, lon: FloatArray, tolerance_m: float) -> IndexArray:
+    """
+    Indices of the points Douglas-Peucker keeps at `tolerance_m` metres, always including both ends. A tolerance of
+    0 keeps every point.
+    """
+    n = len(lat)
+    if tolerance_m <= 0 or n < 3:
+        return np.arange(n)
+
+    scale = np.radians(1.0) * _EARTH_RADIUS_M
+    y = lat * scale
+    x = lon * scale * np.cos(np.radians(lat.mean()))
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1 : last] - x[first], y[first + 1 : last] - y[first]
+        length_sq = dx * dx + dy * dy
+        if length_sq == 0:
+            distance_sq = px * px + py * py
+        else:
+            # Distance to the segment, not the infinite line, so shapes doubling back are not collapsed
+            t = np.clip((px * dx + py * dy) / length_sq, 0.0, 1.0)
+            ex, ey = px - t * dx, py - t * dy
+            distance_sq = ex * ex + ey * ey
+        farthest = int(np.argmax(distance_sq))
+        if distance_sq[farthest] > tolerance_m * tolerance_m:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return np.flatnonzero(keep)
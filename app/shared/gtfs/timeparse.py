@@ -2,6 +2,9 @@ from datetime import date, datetime, timedelta
 from zoneinfo import ZoneInfo
 
 from app.platform.constants import TIMEZONE
+from app.shared.constants import SERVICE_DAY_CLOSE_DELAY
+
+TZ = ZoneInfo(TIMEZONE)
 
 
 def parse_gtfs_time_to_seconds(value: str) -> int:
@@ -42,7 +45,7 @@ def compute_service_date(event_time: datetime, scheduled_seconds: int) -> date:
 
     For overnight trips (scheduled_seconds >= 86400) date is the previous calendar day
     """
-    local_time = event_time.astimezone(ZoneInfo(TIMEZONE))
+    local_time = event_time.astimezone(TZ)
     service_date = local_time.date()
 
     if scheduled_seconds >= 86400:
@@ -53,7 +56,12 @@ def compute_service_date(event_time: datetime, scheduled_seconds: int) -> date:
     return service_date
 
 
-def compute_planned_time(service_date: date, scheduled_seconds: int, tz: ZoneInfo = ZoneInfo(TIMEZONE)) -> datetime:
+def last_closed_service_date(now: datetime) -> date:
+    """Latest service day no running trip can belong to: its calendar day ended SERVICE_DAY_CLOSE_DELAY before `now`."""
+    return (now.astimezone(TZ) - SERVICE_DAY_CLOSE_DELAY).date() - timedelta(days=1)
+
+
+def compute_planned_time(service_date: date, scheduled_seconds: int, tz: ZoneInfo = TZ) -> datetime:
     """
     Converts GTFS time (seconds since service start) to actual datetime.
 
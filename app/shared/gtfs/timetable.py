@@ -0,0 +1,182 @@
+"""
+Batch versions of the timeparse functions, over NumPy arrays.
+
+Results match the scalar functions in `timeparse` exactly. Event and planned times are UTC `datetime64` values;
+local time is resolved through a table of Europe/Warsaw UTC offsets precomputed from zoneinfo, with the same fold=0
+rule `datetime` applies to wall times falling into a DST gap or overlap.
+"""
+
+import functools
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import numpy.typing as npt
+
+from app.platform.constants import TIMEZONE
+from app.shared.constants import TIMETABLE_OFFSET_TABLE_YEARS
+from app.shared.gtfs.timeparse import parse_gtfs_time_to_seconds
+
+_DAY = 86400
+_US = 1_000_000
+_COLON = ord(":")
+_ZERO = ord("0")
+_SPACE = ord(" ")
+_MAX_FAST_WIDTH = 12
+
+IntArray = npt.NDArray[np.int64]
+DateArray = npt.NDArray[np.datetime64]
+
+
+@dataclass(frozen=True, slots=True)
+class _OffsetTable:
+    starts: IntArray  # UTC epoch seconds at which each offset takes effect
+    offsets: IntArray  # UTC offset in seconds
+    wall_starts: IntArray  # local wall time from which fold=0 resolves to each offset
+    end: int  # UTC epoch seconds the table is valid until
+
+    def utc_to_local(self, utc: IntArray) -> IntArray:
+        self._check(utc)
+        result: IntArray = utc + self.offsets[np.searchsorted(self.starts, utc, side="right") - 1]
+        return result
+
+    def local_to_utc(self, wall: IntArray) -> IntArray:
+        index = np.maximum(np.searchsorted(self.wall_starts, wall, side="right") - 1, 0)
+        result: IntArray = wall - self.offsets[index]
+        self._check(result)
+        return result
+
+    def _check(self, utc: IntArray) -> None:
+        if utc.size and (utc.min() < self.starts[0] or utc.max() >= self.end):
+            first, last = TIMETABLE_OFFSET_TABLE_YEARS
+            raise ValueError(f"Time outside the precomputed {TIMEZONE} offset table ({first}-{last})")
+
+
+def _utc_offset(tz: ZoneInfo, ts: int) -> int:
+    offset = datetime.fromtimestamp(ts, tz).utcoffset()
+    assert offset is not None
+    return int(offset.total_seconds())
+
+
+@functools.cache
+def _offset_table() -> _OffsetTable:
+    """Scan the zone day by day and bisect each day whose offset changed down to the second."""
+    tz = ZoneInfo(TIMEZONE)
+    first_year, last_year = TIMETABLE_OFFSET_TABLE_YEARS
+    start = int(datetime(first_year, 1, 1, tzinfo=UTC).timestamp())
+    end = int(datetime(last_year, 1, 1, tzinfo=UTC).timestamp())
+
+    starts, offsets = [start], [_utc_offset(tz, start)]
+    for day in range(start + _DAY, end, _DAY):
+        offset = _utc_offset(tz, day)
+        if offset == offsets[-1]:
+            continue
+        lo, hi = day - _DAY, day  # offset changes in (lo, hi]
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if _utc_offset(tz, mid) == offsets[-1]:
+                lo = mid
+            else:
+                hi = mid
+        starts.append(hi)
+        offsets.append(offset)
+
+    # A wall time keeps the earlier offset until it is unambiguous under the later one: through the whole gap
+    # when clocks go forward, through the first pass of the repeated hour when they go back.
+    wall_starts = [start + offsets[0]] + [
+        t + max(before, after) for t, before, after in zip(starts[1:], offsets, offsets[1:], strict=False)
+    ]
+    return _OffsetTable(
+        starts=np.array(starts, dtype=np.int64),
+        offsets=np.array(offsets, dtype=np.int64),
+        wall_starts=np.array(wall_starts, dtype=np.int64),
+        end=end,
+    )
+
+
+def preload_offset_table() -> None:
+    """Build the offset table now (a fraction of a second) rather than in the first conversion that needs it."""
+    _offset_table()
+
+
+def parse_gtfs_times(values: Sequence[str | None]) -> IntArray:
+    """
+    Vectorized parse_gtfs_time_to_seconds. Plain ASCII "H:MM:SS" values are decoded as a block of code points,
+    anything else goes through the scalar parser, so invalid values raise the same ValueError.
+    """
+    if not values:
+        return np.empty(0, dtype=np.int64)
+
+    # Non-strings and values too long for int64 hour arithmetic are left blank here and fall through to the scalar
+    # parser below
+    text = np.array(
+        [v if isinstance(v, str) and len(v) <= _MAX_FAST_WIDTH else "" for v in values],
+        dtype=np.str_,
+    )
+    width = max(text.dtype.itemsize // 4, 7)
+    codes = np.char.rjust(text, width).view(np.uint32).reshape(len(text), width).astype(np.int64)
+
+    digits = codes - _ZERO
+    is_digit = (digits >= 0) & (digits <= 9)
+    hour_digits = is_digit[:, :-6]
+    minutes = digits[:, -5] * 10 + digits[:, -4]
+    seconds = digits[:, -2] * 10 + digits[:, -1]
+
+    valid = (
+        (codes[:, -3] == _COLON)
+        & (codes[:, -6] == _COLON)
+        & is_digit[:, [-5, -4, -2, -1]].all(axis=1)
+        & (minutes <= 59)
+        & (seconds <= 59)
+        # Hours: at least one digit, only left padding before it
+        & hour_digits[:, -1]
+        & (hour_digits | (codes[:, :-6] == _SPACE)).all(axis=1)
+        & (hour_digits >= np.maximum.accumulate(hour_digits, axis=1)).all(axis=1)
+    )
+
+    hour_weights = 10 ** np.arange(width - 7, -1, -1, dtype=np.int64)
+    hours = (np.where(hour_digits, digits[:, :-6], 0) * hour_weights).sum(axis=1)
+    result: IntArray = hours * 3600 + minutes * 60 + seconds
+
+    for i in np.flatnonzero(~valid):
+        result[i] = parse_gtfs_time_to_seconds(values[int(i)])  # type: ignore[arg-type]
+    return result
+
+
+def to_datetime64(times: Iterable[datetime]) -> DateArray:
+    """Aware datetimes as UTC microsecond datetime64 values."""
+    epoch = datetime(1970, 1, 1, tzinfo=UTC)
+    return np.array([(t - epoch) // timedelta(microseconds=1) for t in times], dtype="datetime64[us]")
+
+
+def _epoch_us(times: DateArray) -> IntArray:
+    result: IntArray = times.astype("datetime64[us]").astype(np.int64)
+    return result
+
+
+def compute_service_dates(event_times: DateArray, scheduled_seconds: IntArray) -> DateArray:
+    """Vectorized compute_service_date."""
+    utc = _epoch_us(event_times) // _US
+    local = _offset_table().utc_to_local(utc)
+    local_day, local_seconds = np.divmod(local, _DAY)
+
+    scheduled = np.asarray(scheduled_seconds, dtype=np.int64)
+    overnight = (scheduled >= _DAY) | ((scheduled >= 79200) & (local_seconds < 3 * 3600))
+    result: DateArray = (local_day - overnight).astype("datetime64[D]")
+    return result
+
+
+def compute_planned_times(service_dates: DateArray, scheduled_seconds: IntArray) -> DateArray:
+    """Vectorized compute_planned_time, as UTC datetime64 seconds."""
+    wall = service_dates.astype("datetime64[D]").astype(np.int64) * _DAY + np.asarray(scheduled_seconds, np.int64)
+    result: DateArray = _offset_table().local_to_utc(wall).astype("datetime64[s]")
+    return result
+
+
+def compute_delays(event_times: DateArray, planned_times: DateArray) -> IntArray:
+    """Vectorized compute_delay_seconds, truncating toward zero like int()."""
+    diff = _epoch_us(event_times) - _epoch_us(planned_times)
+    result: IntArray = np.sign(diff) * (np.abs(diff) // _US)
+    return result
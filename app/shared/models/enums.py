@@ -29,3 +29,26 @@ class DetectionMethod(IntEnum):
     STOPPED_AT = 1
     SEQ_JUMP = 2
     TIMEOUT = 3
+
+
+class ShapeResolution(StrEnum):
+    """Detail levels shapes are precomputed at, see SHAPE_RESOLUTION_TOLERANCES_M"""
+
+    FULL = "full"
+    HIGH = "high"
+    MEDIUM = "medium"
+    LOW = "low"
+
+
+class ShapeFormat(StrEnum):
+    JSON = "json"
+    POLYLINE = "polyline"
+
+
+class CacheInvalidationReason(StrEnum):
+    """Why API workers are told to drop their in-process cache entries"""
+
+    # Static GTFS data was reimported: every entry
+    GTFS_RELOADED = "gtfs_reloaded"
+    # A service day was rolled up, closed or corrected by late events: statistics entries
+    DAY_CLOSED = "day_closed"
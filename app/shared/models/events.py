@@ -4,7 +4,7 @@ from datetime import date, datetime
 from app.shared.models.enums import Agency, DetectionMethod
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class StopEvent:
     agency: Agency
     trip_id: str
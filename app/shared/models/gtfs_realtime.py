@@ -4,7 +4,7 @@ from datetime import datetime
 from app.shared.models.enums import Agency, VehicleStatus
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class VehiclePosition:
     """Parsed vehicle position from VehiclePositions.pb feed."""
 
@@ -25,7 +25,7 @@ class VehiclePosition:
         return self.latitude is not None and self.longitude is not None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class StopTimeUpdate:
     """Single stop time update from TripUpdates.pb feed."""
 
@@ -35,7 +35,7 @@ class StopTimeUpdate:
     departure_time: datetime | None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class TripUpdate:
     """Parsed trip update from TripUpdates.pb feed."""
 
@@ -0,0 +1,37 @@
+import logging
+from datetime import date
+
+import redis
+
+from app.shared.models.enums import CacheInvalidationReason
+from app.shared.redis import serializer
+from app.shared.redis.constants import CACHE_INVALIDATION_CHANNEL, REDIS_KEY_STATS_DAY_PREFIX
+from app.shared.redis.schemas import CacheInvalidationMessage
+
+logger = logging.getLogger(__name__)
+
+
+def publish_cache_invalidation(redis_client: redis.Redis, message: CacheInvalidationMessage) -> None:
+    """
+    Tell the API workers to drop the in-process cache entries `message` affects. Best effort: a worker missing it
+    serves its entries until their short TTL ends.
+    """
+    try:
+        redis_client.publish(CACHE_INVALIDATION_CHANNEL, serializer.encode_cache_invalidation(message))
+    except redis.RedisError:
+        logger.warning("Cache invalidation publish failed (%s)", message.reason, exc_info=True)
+
+
+def invalidate_rolled_up_day(redis_client: redis.Redis, day: date) -> None:
+    """
+    Delete the cached per-day stats partials of `day`, computed from its raw stop events or an earlier rollup, then
+    publish the day closed. Best effort like the publish: partials failing to be deleted expire after CLOSED_DAY_TTL.
+    """
+    try:
+        keys = list(redis_client.scan_iter(match=f"{REDIS_KEY_STATS_DAY_PREFIX}*:{day}*", count=1000))
+        if keys:
+            redis_client.delete(*keys)
+        logger.info("Deleted %d cached stats partials of %s", len(keys), day)
+    except redis.RedisError:
+        logger.warning("Cached stats partials of %s failed to be deleted", day, exc_info=True)
+    publish_cache_invalidation(redis_client, CacheInvalidationMessage(CacheInvalidationReason.DAY_CLOSED, day))
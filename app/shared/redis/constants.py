@@ -1,5 +1,9 @@
 # Redis Pub/Sub channels
 VEHICLE_POSITIONS_CHANNEL: str = "vehicle_positions"
+CACHE_INVALIDATION_CHANNEL: str = "cache_invalidation"
+
+# Per-day stats partials cached by the API, dropped by stop_writer when it rolls a day up
+REDIS_KEY_STATS_DAY_PREFIX: str = "stats:day:"
 
 # Redis TTLs for shared RT caches
 REDIS_TRIP_UPDATES_TTL: int = 3 * 60 * 60
@@ -1,6 +1,7 @@
 import logging
 
 import redis
+import redis.asyncio
 
 from app.shared.redis import serializer
 from app.shared.redis.constants import REDIS_LIVE_VEHICLE_TTL
@@ -34,12 +35,30 @@ class LiveVehiclePositionRepository:
             return []
         # values: raw msgpack bytes per key, None if key expired between SCAN and MGET
         values: list[bytes | None] = self._redis.mget(keys)  # type: ignore[assignment]
-        result: list[LiveVehiclePosition] = []
-        for raw in values:
-            if raw is None:
-                continue
-            try:
-                result.append(serializer.decode_live_vehicle_position(raw))
-            except Exception:
-                logger.warning("Failed to decode live vehicle cache entry", exc_info=True)
-        return result
+        return _decode_all(values)
+
+
+class AsyncLiveVehiclePositionRepository:
+    """Reads the live vehicle positions cached by rt_poller, on an asyncio client."""
+
+    def __init__(self, client: redis.asyncio.Redis):
+        self._redis = client
+
+    async def get_all(self) -> list[LiveVehiclePosition]:
+        keys = [key async for key in self._redis.scan_iter("lvp:*")]
+        if not keys:
+            return []
+        values: list[bytes | None] = await self._redis.mget(keys)  # type: ignore[assignment]
+        return _decode_all(values)
+
+
+def _decode_all(values: list[bytes | None]) -> list[LiveVehiclePosition]:
+    result: list[LiveVehiclePosition] = []
+    for raw in values:
+        if raw is None:
+            continue
+        try:
+            result.append(serializer.decode_live_vehicle_position(raw))
+        except Exception:
+            logger.warning("Failed to decode live vehicle cache entry", exc_info=True)
+    return result
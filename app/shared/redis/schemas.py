@@ -1,7 +1,9 @@
-from datetime import UTC, datetime
+from datetime import UTC, date, datetime
 
 import msgspec
 
+from app.shared.models.enums import CacheInvalidationReason
+
 
 class VehiclePositionMessage(msgspec.Struct):
     """Pub/Sub message published by rt_poller on vehicle_positions channel."""
@@ -16,6 +18,13 @@ class VehiclePositionMessage(msgspec.Struct):
     timestamp: str  # ISO 8601
 
 
+class CacheInvalidationMessage(msgspec.Struct):
+    """Pub/Sub message published on cache_invalidation channel by importer and stop_writer, read by API workers."""
+
+    reason: CacheInvalidationReason
+    service_date: date | None = None
+
+
 class LiveVehiclePosition(msgspec.Struct):
     """Live vehicle position cached by rt_poller in Redis."""
 
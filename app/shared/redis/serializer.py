@@ -1,6 +1,7 @@
 import msgspec
 
 from app.shared.redis.schemas import (
+    CacheInvalidationMessage,
     LiveVehiclePosition,
     SavedSequenceData,
     TripUpdateCache,
@@ -16,6 +17,8 @@ _live_vehicle_decoder = msgspec.msgpack.Decoder(LiveVehiclePosition)
 _saved_seq_decoder = msgspec.msgpack.Decoder(SavedSequenceData)
 _vp_message_encoder = msgspec.json.Encoder()
 _vp_message_decoder = msgspec.json.Decoder(VehiclePositionMessage)
+_cache_invalidation_encoder = msgspec.json.Encoder()
+_cache_invalidation_decoder = msgspec.json.Decoder(CacheInvalidationMessage)
 
 
 def encode(obj: msgspec.Struct) -> bytes:
@@ -48,3 +51,11 @@ def encode_vp_message(msg: VehiclePositionMessage) -> bytes:
 
 def decode_vp_message(data: bytes) -> VehiclePositionMessage:
     return _vp_message_decoder.decode(data)
+
+
+def encode_cache_invalidation(msg: CacheInvalidationMessage) -> bytes:
+    return _cache_invalidation_encoder.encode(msg)
+
+
+def decode_cache_invalidation(data: bytes) -> CacheInvalidationMessage:
+    return _cache_invalidation_decoder.decode(data)
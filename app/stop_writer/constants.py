@@ -5,6 +5,47 @@ WRITER_BATCH_SIZE: int = 100
 WRITER_FLUSH_INTERVAL: timedelta = timedelta(seconds=10)
 SUBSCRIBER_TIMEOUT: float = 1.0
 STOP_WRITER_FLUSH_RETRY_BACKOFF_SECONDS: list[int] = [1, 5, 15, 30]
+WRITER_MAX_BUFFERED_EVENTS: int = 5000
+STOP_EVENT_INSERT_CHUNK_SIZE: int = 1000
+WRITER_SPOOL_FILENAME: str = "stop_events.spool"
+WRITER_SPOOL_REPLAY_BATCH_SIZE: int = 10000
+WRITER_BACKPRESSURE_POLL_SECONDS: float = 1.0
+WRITER_CLOSE_TIMEOUT_SECONDS: float = 30.0
+WRITER_METRICS_LOG_INTERVAL: timedelta = timedelta(minutes=5)
+
+# Stop Writer adaptive flush scheduling
+WRITER_MIN_BATCH_SIZE: int = 20
+WRITER_MAX_BATCH_SIZE: int = 2000
+WRITER_MIN_FLUSH_INTERVAL: timedelta = timedelta(seconds=1)
+WRITER_MAX_FLUSH_INTERVAL: timedelta = timedelta(seconds=30)
+WRITER_TARGET_COMMIT_PERIOD: timedelta = timedelta(seconds=5)
+WRITER_COMMIT_PERIOD_STEP: timedelta = timedelta(seconds=1)
+WRITER_MAX_COMMIT_SECONDS: float = 1.0
+WRITER_POLICY_EWMA_ALPHA: float = 0.3
+WRITER_RATE_WINDOW_SECONDS: float = 5.0
+WRITER_POLICY_TICK_SECONDS: float = 1.0
+WRITER_BATCH_SIZE_BUCKETS: tuple[float, ...] = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+WRITER_FLUSH_SECONDS_BUCKETS: tuple[float, ...] = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Stop Writer intake (pub/sub -> detector)
+INTAKE_MAX_QUEUED_UPDATES: int = 20000
+INTAKE_BACKPRESSURE_POLL_SECONDS: float = 1.0
+INTAKE_CLOSE_TIMEOUT_SECONDS: float = 5.0
+
+# Warm-restart checkpoint of GtfsCache (in data_dir)
+GTFS_CACHE_CHECKPOINT_FILENAME: str = "gtfs_cache.checkpoint"
+
+# Offline replay / backfill
+REPLAY_WINDOW_LEAD: timedelta = timedelta(hours=1)  # before the first service day, to warm vehicle state
+REPLAY_WINDOW_TAIL: timedelta = timedelta(hours=6)  # after the last service day, for trips past midnight
+REPLAY_PROGRESS_LOG_POLLS: int = 5000
+REPLAY_SHADOW_TABLE: str = "stop_events_replay"
+
+# Daily line statistics rollups: the job rolls up closed service days of the last ROLLUP_LOOKBACK_DAYS days plus
+# days marked stale by later flushes
+ROLLUP_INTERVAL: timedelta = timedelta(minutes=15)
+ROLLUP_LOOKBACK_DAYS: int = 7
+ROLLUP_CLOSE_TIMEOUT_SECONDS: float = 60.0
 
 # Detector rules
 DELAY_DROP_THRESHOLD: int = 180
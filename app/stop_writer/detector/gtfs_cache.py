@@ -1,5 +1,12 @@
+import sys
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+import msgspec
 from cachetools import LRUCache
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.shared.db.models import CurrentStop, CurrentStopTime, CurrentTrip
 from app.shared.gtfs.repositories.gtfs_meta import GtfsMetaRepository
@@ -8,6 +15,51 @@ from app.shared.models.enums import Agency
 from app.stop_writer.constants import CACHE_MAX_SEQUENCES, CACHE_MAX_STOP_TIMES, CACHE_MAX_STOPS, CACHE_MAX_TRIPS
 
 
+class GtfsCacheSnapshot(msgspec.Struct, frozen=True):
+    """Keys of the hot cache entries, enough to reload them in bulk after a restart."""
+
+    trip_ids: list[str]
+    stop_ids: list[str]
+    stop_times_trip_ids: list[str]
+    max_seq_trip_ids: list[str]
+
+
+def _intern_columns(instance: object, *names: str) -> None:
+    """
+    Swap loaded string columns for their interned copy, without marking the instance dirty. Headsigns, line
+    numbers and stop names repeat across thousands of rows, and every StopEvent references them.
+    """
+    for name in names:
+        value = getattr(instance, name)
+        if isinstance(value, str):
+            set_committed_value(instance, name, sys.intern(value))
+
+
+def _intern_trip(trip: CurrentTrip) -> CurrentTrip:
+    _intern_columns(trip, "trip_id", "route_id", "headsign")
+    _intern_columns(trip.route, "route_short_name")
+    return trip
+
+
+def _intern_stop(stop: CurrentStop) -> CurrentStop:
+    _intern_columns(stop, "stop_id", "stop_name", "stop_desc")
+    return stop
+
+
+def _index_stop_times(stop_times: Iterable[CurrentStopTime]) -> dict[int, CurrentStopTime]:
+    indexed = {}
+    for st in stop_times:
+        _intern_columns(st, "stop_id")
+        indexed[st.stop_sequence] = st
+    return indexed
+
+
+@dataclass(slots=True)
+class GtfsCacheStats:
+    lookups: int = 0
+    misses: int = 0
+
+
 class GtfsCache:
     def __init__(self, session: Session):
         self._static_repo = GtfsStaticRepository(session)
@@ -17,29 +69,37 @@ class GtfsCache:
         self._stop_cache: LRUCache[str, CurrentStop] = LRUCache(maxsize=CACHE_MAX_STOPS)
         self._stop_times_cache: LRUCache[str, dict[int, CurrentStopTime]] = LRUCache(maxsize=CACHE_MAX_STOP_TIMES)
         self._max_seq_cache: LRUCache[str, int] = LRUCache(maxsize=CACHE_MAX_SEQUENCES)
+        self._stats = GtfsCacheStats()
 
     def get_trip(self, trip_id: str) -> CurrentTrip | None:
+        self._stats.lookups += 1
         if trip_id not in self._trip_cache:
+            self._stats.misses += 1
             trip = self._static_repo.get_trip(trip_id)
             if trip:
-                self._trip_cache[trip_id] = trip
+                self._trip_cache[trip_id] = _intern_trip(trip)
         return self._trip_cache.get(trip_id)
 
     def get_stop(self, stop_id: str) -> CurrentStop | None:
+        self._stats.lookups += 1
         if stop_id not in self._stop_cache:
+            self._stats.misses += 1
             stop = self._static_repo.get_stop(stop_id)
             if stop:
-                self._stop_cache[stop_id] = stop
+                self._stop_cache[stop_id] = _intern_stop(stop)
         return self._stop_cache.get(stop_id)
 
     def get_stop_time(self, trip_id: str, stop_sequence: int) -> CurrentStopTime | None:
+        self._stats.lookups += 1
         if trip_id not in self._stop_times_cache:
-            stop_times = self._static_repo.get_stop_times_for_trip(trip_id)
-            self._stop_times_cache[trip_id] = {st.stop_sequence: st for st in stop_times}
+            self._stats.misses += 1
+            self._stop_times_cache[trip_id] = _index_stop_times(self._static_repo.get_stop_times_for_trip(trip_id))
         return self._stop_times_cache.get(trip_id, {}).get(stop_sequence)
 
     def get_max_stop_sequence(self, trip_id: str) -> int | None:
+        self._stats.lookups += 1
         if trip_id not in self._max_seq_cache:
+            self._stats.misses += 1
             max_seq = self._static_repo.get_max_stop_sequence(trip_id)
             if max_seq:
                 self._max_seq_cache[trip_id] = max_seq
@@ -47,3 +107,46 @@ class GtfsCache:
 
     def get_current_hash(self, agency: Agency) -> str | None:
         return self._meta_repo.get_current_hash(agency)
+
+    def stats(self) -> GtfsCacheStats:
+        """Lookup and miss (DB query) counters since startup."""
+        return GtfsCacheStats(lookups=self._stats.lookups, misses=self._stats.misses)
+
+    def snapshot(self) -> GtfsCacheSnapshot:
+        return GtfsCacheSnapshot(
+            trip_ids=list(self._trip_cache),
+            stop_ids=list(self._stop_cache),
+            stop_times_trip_ids=list(self._stop_times_cache),
+            max_seq_trip_ids=list(self._max_seq_cache),
+        )
+
+    def warm(self, snapshot: GtfsCacheSnapshot) -> int:
+        """
+        Load the entries listed in a snapshot with one query per cache. Returns the number of entries loaded.
+        """
+        loaded = 0
+
+        for trip in self._static_repo.get_trips(snapshot.trip_ids[-int(self._trip_cache.maxsize) :]):
+            self._trip_cache[trip.trip_id] = _intern_trip(trip)
+            loaded += 1
+
+        for stop in self._static_repo.get_stops(snapshot.stop_ids[-int(self._stop_cache.maxsize) :]):
+            self._stop_cache[stop.stop_id] = _intern_stop(stop)
+            loaded += 1
+
+        stop_times_by_trip: defaultdict[str, list[CurrentStopTime]] = defaultdict(list)
+        trip_ids = snapshot.stop_times_trip_ids[-int(self._stop_times_cache.maxsize) :]
+        for st in self._static_repo.get_stop_times_for_trips(trip_ids):
+            stop_times_by_trip[st.trip_id].append(st)
+        for trip_id in trip_ids:
+            self._stop_times_cache[trip_id] = _index_stop_times(stop_times_by_trip.get(trip_id, []))
+            loaded += 1
+
+        max_seqs = self._static_repo.get_max_stop_sequences(
+            snapshot.max_seq_trip_ids[-int(self._max_seq_cache.maxsize) :]
+        )
+        for trip_id, max_seq in max_seqs.items():
+            self._max_seq_cache[trip_id] = max_seq
+            loaded += 1
+
+        return loaded
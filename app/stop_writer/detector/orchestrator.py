@@ -22,16 +22,20 @@ from app.stop_writer.repositories.vehicle_state import VehicleStateRepository
 class StopEventDetector:
     def __init__(
         self,
-        session: Session,
+        session: Session | None,
         redis_vehicle_state: VehicleStateRepository,
         redis_trip_updates: TripUpdatesRepository,
         redis_saved_seqs: SavedSequencesRepository,
+        gtfs_cache: GtfsCache | None = None,
     ):
         self._vehicle_state = redis_vehicle_state
         self._trip_updates = redis_trip_updates
         self._saved_seqs = redis_saved_seqs
 
-        gtfs_cache = GtfsCache(session)
+        if gtfs_cache is None:
+            if session is None:
+                raise ValueError("Either session or gtfs_cache is required")
+            gtfs_cache = GtfsCache(session)
         factory = EventFactory(gtfs_cache)
 
         self._strategies: list[DetectionStrategy] = [
@@ -42,6 +46,10 @@ class StopEventDetector:
         self._validator = EventValidator(redis_saved_seqs)
         self._gtfs_cache = gtfs_cache
 
+    @property
+    def gtfs_cache(self) -> GtfsCache:
+        return self._gtfs_cache
+
     def process_update(self, vp: VehiclePosition) -> list[StopEvent]:
         if vp.stop_sequence is None or vp.license_plate is None:
             return []
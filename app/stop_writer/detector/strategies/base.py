@@ -8,7 +8,7 @@ from app.shared.models.gtfs_realtime import VehiclePosition
 from app.shared.redis.schemas import VehicleState
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DetectionContext:
     vp: VehiclePosition
     prev_state: VehicleState | None
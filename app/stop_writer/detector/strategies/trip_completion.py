@@ -1,4 +1,8 @@
-from app.shared.gtfs.timeparse import compute_service_date
+from datetime import date
+
+import numpy as np
+
+from app.shared.gtfs.timetable import compute_service_dates, preload_offset_table, to_datetime64
 from app.shared.models.enums import Agency, DetectionMethod
 from app.shared.models.events import StopEvent
 from app.shared.redis.repositories.trip_updates import TripUpdatesRepository
@@ -20,6 +24,8 @@ class TripFinalizer:
         self._cache = gtfs_cache
         self._saved_seqs = saved_seqs
         self._trip_updates = trip_updates
+        # Built at startup, not in the first finalization on the live path
+        preload_offset_table()
 
     def finalize(self, prev_state: VehicleState) -> list[StopEvent]:
         events: list[StopEvent] = []
@@ -34,13 +40,20 @@ class TripFinalizer:
         if not max_seq:
             return events
 
-        for seq in range(prev_state.current_stop_sequence + 1, max_seq + 1):
-            stop_time = self._cache.get_stop_time(trip_id, seq)
-            if not stop_time:
-                continue
+        remaining = [
+            (seq, stop_time)
+            for seq in range(prev_state.current_stop_sequence + 1, max_seq + 1)
+            if (stop_time := self._cache.get_stop_time(trip_id, seq))
+        ]
+        if not remaining:
+            return events
 
-            service_date = compute_service_date(prev_state.last_timestamp, stop_time.arrival_seconds)
+        service_dates: list[date] = compute_service_dates(
+            to_datetime64([prev_state.last_timestamp]).repeat(len(remaining)),
+            np.array([stop_time.arrival_seconds for _, stop_time in remaining], dtype=np.int64),
+        ).tolist()
 
+        for (seq, stop_time), service_date in zip(remaining, service_dates, strict=True):
             if self._saved_seqs.is_saved(agency_str, trip_id, service_date, seq):
                 continue
 
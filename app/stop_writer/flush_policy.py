@@ -0,0 +1,151 @@
+import time
+from datetime import timedelta
+from typing import Protocol
+
+from app.stop_writer.constants import (
+    WRITER_BATCH_SIZE,
+    WRITER_COMMIT_PERIOD_STEP,
+    WRITER_FLUSH_INTERVAL,
+    WRITER_MAX_BATCH_SIZE,
+    WRITER_MAX_COMMIT_SECONDS,
+    WRITER_MAX_FLUSH_INTERVAL,
+    WRITER_MIN_BATCH_SIZE,
+    WRITER_MIN_FLUSH_INTERVAL,
+    WRITER_POLICY_EWMA_ALPHA,
+    WRITER_RATE_WINDOW_SECONDS,
+    WRITER_TARGET_COMMIT_PERIOD,
+)
+
+
+class FlushPolicy(Protocol):
+    @property
+    def batch_size(self) -> int: ...
+
+    @property
+    def flush_interval(self) -> timedelta: ...
+
+    def record_events(self, count: int) -> None: ...
+
+    def tick(self) -> None: ...
+
+    def record_commit(self, events: int, seconds: float) -> None: ...
+
+
+class StaticFlushPolicy:
+    """Fixed batch size and flush interval."""
+
+    def __init__(self, batch_size: int = WRITER_BATCH_SIZE, flush_interval: timedelta = WRITER_FLUSH_INTERVAL):
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size
+
+    @property
+    def flush_interval(self) -> timedelta:
+        return self._flush_interval
+
+    def record_events(self, count: int) -> None:
+        pass
+
+    def tick(self) -> None:
+        pass
+
+    def record_commit(self, events: int, seconds: float) -> None:
+        pass
+
+
+class AdaptiveFlushPolicy:
+    """
+    Derives batch size and flush interval from incoming event rate and measured commit latency.
+
+    Aims for one commit per `target_period`, so batch size follows traffic (large at peak, small at night).
+    The commit period is AIMD-controlled: a commit slower than `max_commit_seconds` doubles it (fewer, larger
+    transactions while the DB is under pressure), every fast commit moves it back by `period_step`. At low traffic
+    the flush interval waits for `min_batch_size` events, always within [min_interval, max_interval].
+
+    The event rate is measured over windows of `rate_window_seconds`, closed by incoming events or by `tick`, so
+    it decays toward zero while no events arrive.
+    """
+
+    def __init__(
+        self,
+        min_batch_size: int = WRITER_MIN_BATCH_SIZE,
+        max_batch_size: int = WRITER_MAX_BATCH_SIZE,
+        min_interval: timedelta = WRITER_MIN_FLUSH_INTERVAL,
+        max_interval: timedelta = WRITER_MAX_FLUSH_INTERVAL,
+        target_period: timedelta = WRITER_TARGET_COMMIT_PERIOD,
+        period_step: timedelta = WRITER_COMMIT_PERIOD_STEP,
+        max_commit_seconds: float = WRITER_MAX_COMMIT_SECONDS,
+        alpha: float = WRITER_POLICY_EWMA_ALPHA,
+        rate_window_seconds: float = WRITER_RATE_WINDOW_SECONDS,
+    ):
+        self._min_batch = min_batch_size
+        self._max_batch = max_batch_size
+        self._min_interval = min_interval.total_seconds()
+        self._max_interval = max_interval.total_seconds()
+        self._target_period = self._clamp(target_period.total_seconds(), self._min_interval, self._max_interval)
+        self._period_step = period_step.total_seconds()
+        self._max_commit_seconds = max_commit_seconds
+        self._alpha = alpha
+        self._rate_window = rate_window_seconds
+
+        self._commit_period = self._target_period
+        self._event_rate: float | None = None
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    @property
+    def event_rate(self) -> float:
+        """Smoothed incoming events per second."""
+        return self._event_rate or 0.0
+
+    @property
+    def commit_period(self) -> float:
+        """Current target seconds between commits."""
+        return self._commit_period
+
+    @property
+    def batch_size(self) -> int:
+        size = round(self.event_rate * self._commit_period)
+        return int(self._clamp(size, self._min_batch, self._max_batch))
+
+    @property
+    def flush_interval(self) -> timedelta:
+        if self.event_rate > 0:
+            seconds = max(self._commit_period, self._min_batch / self.event_rate)
+        else:
+            seconds = self._max_interval
+        return timedelta(seconds=self._clamp(seconds, self._min_interval, self._max_interval))
+
+    def record_events(self, count: int, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._window_count += count
+        elapsed = now - self._window_start
+        if elapsed < self._rate_window:
+            return
+
+        rate = self._window_count / elapsed
+        if self._event_rate is None:
+            self._event_rate = rate
+        else:
+            self._event_rate = self._alpha * rate + (1 - self._alpha) * self._event_rate
+        self._window_start = now
+        self._window_count = 0
+
+    def tick(self, now: float | None = None) -> None:
+        """Close the rate window if it has elapsed, counting no events."""
+        self.record_events(0, now)
+
+    def record_commit(self, events: int, seconds: float) -> None:
+        if events <= 0:
+            return
+        if seconds > self._max_commit_seconds:
+            self._commit_period = min(self._commit_period * 2, self._max_interval)
+        else:
+            self._commit_period = max(self._commit_period - self._period_step, self._target_period)
+
+    @staticmethod
+    def _clamp(value: float, low: float, high: float) -> float:
+        return max(low, min(high, value))
@@ -0,0 +1,188 @@
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, replace
+
+from app.shared.models.enums import VehicleStatus
+from app.shared.models.gtfs_realtime import VehiclePosition
+from app.stop_writer.constants import (
+    INTAKE_BACKPRESSURE_POLL_SECONDS,
+    INTAKE_CLOSE_TIMEOUT_SECONDS,
+    INTAKE_MAX_QUEUED_UPDATES,
+    SUBSCRIBER_TIMEOUT,
+)
+from app.stop_writer.subscriber import Subscriber
+
+logger = logging.getLogger(__name__)
+
+_VehicleKey = tuple[str, str]
+
+
+class IntakeReaderError(RuntimeError):
+    """Raised in the consumer when the intake reader thread died."""
+
+
+@dataclass(slots=True)
+class IntakeMetrics:
+    """Snapshot of intake queue counters."""
+
+    received: int = 0
+    delivered: int = 0
+    # Redundant update replaced the vehicle's queued one (fresher timestamp)
+    coalesced: int = 0
+    # Redundant update dropped because the queued one is a STOPPED_AT that must be kept
+    dropped: int = 0
+    backpressure_waits: int = 0
+    depth: int = 0
+    max_depth: int = 0
+
+
+class _Slot:
+    __slots__ = ("vp",)
+
+    def __init__(self, vp: VehiclePosition):
+        self.vp = vp
+
+
+def _vehicle_key(vp: VehiclePosition) -> _VehicleKey | None:
+    if vp.license_plate is None:
+        return None
+    return vp.agency.value, vp.license_plate
+
+
+def _is_redundant(queued: VehiclePosition, vp: VehiclePosition) -> bool:
+    """
+    New update carries nothing the detector can act on beyond the queued one: same trip and stop sequence,
+    and not a STOPPED_AT.
+    """
+    return (
+        vp.status != VehicleStatus.STOPPED_AT
+        and vp.trip_id == queued.trip_id
+        and vp.stop_sequence == queued.stop_sequence
+    )
+
+
+class CoalescingQueue:
+    """
+    Bounded FIFO of vehicle positions that merges consecutive queued updates per vehicle.
+
+    Only updates still waiting in the queue are merged, so nothing is coalesced while the consumer keeps up.
+    A redundant update replaces the vehicle's queued one, unless that one is a STOPPED_AT, in which case the
+    new update is dropped. Updates with a STOPPED_AT status or a changed trip / stop sequence are always kept.
+    """
+
+    def __init__(self, maxsize: int = INTAKE_MAX_QUEUED_UPDATES):
+        self._maxsize = maxsize
+        self._cond = threading.Condition()
+        self._queue: deque[_Slot] = deque()
+        self._latest: dict[_VehicleKey, _Slot] = {}
+        self._closed = False
+        self._metrics = IntakeMetrics()
+
+    def put(self, vp: VehiclePosition) -> bool:
+        """
+        Enqueue or coalesce an update. Blocks while the queue is full. Returns False if the queue was closed.
+        """
+        key = _vehicle_key(vp)
+        with self._cond:
+            if self._closed:
+                return False
+            self._metrics.received += 1
+
+            slot = self._latest.get(key) if key is not None else None
+            if slot is not None and _is_redundant(slot.vp, vp):
+                if slot.vp.status == VehicleStatus.STOPPED_AT:
+                    self._metrics.dropped += 1
+                else:
+                    slot.vp = vp
+                    self._metrics.coalesced += 1
+                return True
+
+            if len(self._queue) >= self._maxsize:
+                self._metrics.backpressure_waits += 1
+            while len(self._queue) >= self._maxsize and not self._closed:
+                self._cond.wait(timeout=INTAKE_BACKPRESSURE_POLL_SECONDS)
+            if self._closed:
+                return False
+
+            slot = _Slot(vp)
+            self._queue.append(slot)
+            if key is not None:
+                self._latest[key] = slot
+            self._metrics.max_depth = max(self._metrics.max_depth, len(self._queue))
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout: float = SUBSCRIBER_TIMEOUT) -> VehiclePosition | None:
+        """Take the oldest update. Returns None if nothing arrives within timeout or the queue is closed."""
+        with self._cond:
+            if not self._queue and not self._closed:
+                self._cond.wait(timeout=timeout)
+            if not self._queue:
+                return None
+
+            slot = self._queue.popleft()
+            key = _vehicle_key(slot.vp)
+            if key is not None and self._latest.get(key) is slot:
+                del self._latest[key]
+            self._metrics.delivered += 1
+            self._cond.notify_all()
+            return slot.vp
+
+    def close(self) -> None:
+        """Wake up blocked producers and consumers. Queued updates can still be drained with `get`."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def metrics(self) -> IntakeMetrics:
+        with self._cond:
+            return replace(self._metrics, depth=len(self._queue))
+
+
+class IntakeReader:
+    """
+    Dedicated thread draining pub/sub into a CoalescingQueue, so Redis is read at full speed even while the
+    detector is behind. The subscriber is owned by this thread once started.
+    """
+
+    def __init__(
+        self,
+        subscriber: Subscriber,
+        queue: CoalescingQueue,
+        timeout: float = SUBSCRIBER_TIMEOUT,
+    ):
+        self._subscriber = subscriber
+        self._queue = queue
+        self._timeout = timeout
+        self._stop = threading.Event()
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(target=self._run, name="stop-writer-intake", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise IntakeReaderError("Intake reader stopped") from self._error
+
+    def close(self, timeout: float = INTAKE_CLOSE_TIMEOUT_SECONDS) -> None:
+        self._stop.set()
+        self._queue.close()
+        if self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                vp = self._subscriber.get_next(timeout=self._timeout)
+                if vp is not None and not self._queue.put(vp):
+                    return
+        except Exception as e:
+            logger.exception("Intake reader failed: %s", e)
+            self._error = e
+            self._queue.close()
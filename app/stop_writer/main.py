@@ -1,23 +1,39 @@
 import logging
 import signal
-from collections.abc import Iterator
-from itertools import chain, repeat
+import time
+from datetime import UTC, datetime
+from pathlib import Path
 from threading import Event
 from typing import Any
 
+from sqlalchemy.orm import Session
+
+from app.platform.config import get_config
 from app.platform.db.connection import get_session
 from app.platform.logging import setup_logging
 from app.platform.redis.connection import get_client
 from app.platform.sentry import capture_exception, setup_sentry
+from app.shared.gtfs.checkpoint import load_checkpoint, save_checkpoint
 from app.shared.gtfs.readiness import wait_for_gtfs_ready
 from app.shared.gtfs.reload_marker import ReloadRequiredError, ReloadWatcher
+from app.shared.gtfs.repositories.gtfs_meta import GtfsMetaRepository
+from app.shared.redis.cache_invalidation import invalidate_rolled_up_day
 from app.shared.redis.repositories.trip_updates import TripUpdatesRepository
-from app.stop_writer.constants import STOP_WRITER_FLUSH_RETRY_BACKOFF_SECONDS
+from app.stop_writer.constants import (
+    GTFS_CACHE_CHECKPOINT_FILENAME,
+    WRITER_METRICS_LOG_INTERVAL,
+    WRITER_SPOOL_FILENAME,
+)
 from app.stop_writer.detector import StopEventDetector
+from app.stop_writer.detector.gtfs_cache import GtfsCache, GtfsCacheSnapshot
+from app.stop_writer.flush_policy import AdaptiveFlushPolicy
+from app.stop_writer.intake import CoalescingQueue, IntakeReader
 from app.stop_writer.repositories.saved_sequences import SavedSequencesRepository
 from app.stop_writer.repositories.vehicle_state import VehicleStateRepository
+from app.stop_writer.rollup import DailyRollupJob
+from app.stop_writer.spool import EventSpool
 from app.stop_writer.subscriber import Subscriber
-from app.stop_writer.writer import BatchWriteError, BatchWriter
+from app.stop_writer.writer import BackgroundBatchWriter
 
 logger = logging.getLogger(__name__)
 
@@ -29,41 +45,94 @@ def signal_handler(*args: Any) -> None:
     shutdown_event.set()
 
 
-def _flush_retry_delays() -> Iterator[int]:
-    if not STOP_WRITER_FLUSH_RETRY_BACKOFF_SECONDS:
-        return repeat(0)
+def _log_writer_metrics(writer: BackgroundBatchWriter) -> None:
+    m = writer.metrics()
+    avg_flush = m.total_flush_seconds / m.flushes if m.flushes else 0.0
+    logger.info(
+        "Writer metrics: flushes=%d events=%d failed=%d backpressure=%d spooled=%d replayed=%d queue=%d "
+        "flush_avg=%.3fs flush_max=%.3fs batch_size=%d flush_interval=%.1fs",
+        m.flushes,
+        m.events_written,
+        m.failed_flushes,
+        m.backpressure_waits,
+        m.spooled_events,
+        m.replayed_events,
+        m.queue_depth,
+        avg_flush,
+        m.max_flush_seconds,
+        m.batch_size,
+        m.flush_interval_seconds,
+    )
+    logger.info("Writer histograms: batch_size=%s flush_seconds=%s", m.batch_size_histogram, m.flush_seconds_histogram)
+
+
+def _log_intake_metrics(intake: CoalescingQueue) -> None:
+    m = intake.metrics()
+    logger.info(
+        "Intake metrics: received=%d delivered=%d coalesced=%d dropped=%d backpressure=%d queue=%d max_queue=%d",
+        m.received,
+        m.delivered,
+        m.coalesced,
+        m.dropped,
+        m.backpressure_waits,
+        m.depth,
+        m.max_depth,
+    )
 
-    return chain(
-        STOP_WRITER_FLUSH_RETRY_BACKOFF_SECONDS,
-        repeat(STOP_WRITER_FLUSH_RETRY_BACKOFF_SECONDS[-1]),
+
+def _log_gtfs_cache_stats(cache: GtfsCache, started_at: float) -> None:
+    stats = cache.stats()
+    hit_ratio = 1 - stats.misses / stats.lookups if stats.lookups else 0.0
+    logger.info(
+        "GTFS cache: lookups=%d misses=%d hit_ratio=%.3f uptime=%.0fs",
+        stats.lookups,
+        stats.misses,
+        hit_ratio,
+        time.monotonic() - started_at,
     )
 
 
-def _recover_writer(writer: BatchWriter) -> bool:
-    delays = _flush_retry_delays()
-    first_failure = True
+def _warm_gtfs_cache(cache: GtfsCache, path: Path, static_hashes: dict[str, str]) -> None:
+    snapshot = load_checkpoint(path, static_hashes, GtfsCacheSnapshot)
+    if snapshot is None:
+        logger.info("No usable GTFS cache checkpoint, starting cold")
+        return
 
-    while not shutdown_event.is_set():
-        try:
-            writer.flush()
-            logger.info("Stop writer recovered and flushed pending events")
-            return True
-        except BatchWriteError as e:
-            delay = next(delays)
-            logger.warning("Stop writer degraded: retrying batch flush in %ds", delay)
-            if first_failure:
-                capture_exception(
-                    e,
-                    tags={
-                        "component": "stop_writer",
-                        "failure_scope": "db_flush",
-                        "service_state": "degraded_write",
-                    },
-                )
-                first_failure = False
-            shutdown_event.wait(timeout=delay)
-
-    return False
+    start = time.monotonic()
+    loaded = cache.warm(snapshot)
+    logger.info("GTFS cache warmed with %d entries in %.2fs", loaded, time.monotonic() - start)
+
+
+def _checkpoint_gtfs_cache(cache: GtfsCache, path: Path, static_hashes: dict[str, str]) -> None:
+    try:
+        save_checkpoint(path, static_hashes, cache.snapshot())
+        logger.info("GTFS cache checkpoint written to %s", path)
+    except Exception:
+        logger.warning("Failed to write GTFS cache checkpoint", exc_info=True)
+
+
+def _end_detector_transaction(session: Session) -> None:
+    """
+    End the detector's read transaction so it holds no locks on gtfs_static tables between updates (the importer
+    swaps them under an exclusive lock) and the next lookup reads the current gtfs_meta. Expunging rather than
+    expiring keeps the rows held by GtfsCache loaded, they stay usable detached.
+    """
+    session.commit()
+    session.expunge_all()
+
+
+def _process_next(
+    intake: CoalescingQueue, detector: StopEventDetector, writer: BackgroundBatchWriter, session: Session
+) -> None:
+    """Detect the events of the next update, or hand off a due flush when none arrives."""
+    update = intake.get()
+    if update:
+        events = detector.process_update(update)
+        if events:
+            writer.add_many(events)
+    else:
+        writer.flush()
+    _end_detector_transaction(session)
 
 
 def run_writer() -> None:
@@ -74,6 +143,8 @@ def run_writer() -> None:
     saved_seqs_repo = SavedSequencesRepository(redis_client)
 
     subscriber = Subscriber(redis_client)
+    intake = CoalescingQueue()
+    intake_reader = IntakeReader(subscriber, intake)
     reload_watcher = ReloadWatcher(redis_client)
 
     logger.info("Starting stop writer")
@@ -85,22 +156,28 @@ def run_writer() -> None:
             redis_trip_updates=trip_updates_repo,
             redis_saved_seqs=saved_seqs_repo,
         )
-        writer = BatchWriter(session)
+        started_at = time.monotonic()
+        data_dir = get_config().data_dir
+        checkpoint_path = data_dir / GTFS_CACHE_CHECKPOINT_FILENAME
+        static_hashes = GtfsMetaRepository(session).get_all_hashes()
+        _warm_gtfs_cache(detector.gtfs_cache, checkpoint_path, static_hashes)
+
+        spool = EventSpool(data_dir / WRITER_SPOOL_FILENAME)
+        writer = BackgroundBatchWriter(
+            get_session, stop_event=shutdown_event, spool=spool, policy=AdaptiveFlushPolicy()
+        )
+        writer.start()
+        intake_reader.start()
+        rollup_job = DailyRollupJob(get_session, on_rolled_up=lambda day: invalidate_rolled_up_day(redis_client, day))
+        rollup_job.start()
+        last_metrics_log = datetime.now(UTC)
 
         try:
             while not shutdown_event.is_set():
                 reload_watcher.raise_if_changed()
+                intake_reader.raise_if_failed()
                 try:
-                    update = subscriber.get_next()
-                    if update:
-                        events = detector.process_update(update)
-                        if events:
-                            writer.add_many(events)
-                    else:
-                        writer.flush()
-                except BatchWriteError:
-                    if not _recover_writer(writer):
-                        break
+                    _process_next(intake, detector, writer, session)
                 except Exception as e:
                     capture_exception(
                         e,
@@ -110,11 +187,24 @@ def run_writer() -> None:
                         },
                     )
                     raise
+
+                if datetime.now(UTC) - last_metrics_log > WRITER_METRICS_LOG_INTERVAL:
+                    _log_intake_metrics(intake)
+                    _log_writer_metrics(writer)
+                    _log_gtfs_cache_stats(detector.gtfs_cache, started_at)
+                    last_metrics_log = datetime.now(UTC)
         finally:
-            try:
-                writer.flush()
-            except BatchWriteError as e:
-                logger.warning("Stop writer shutdown with unflushed events: %s", e)
+            rollup_job.close()
+            intake_reader.close()
+            if len(intake):
+                logger.info("Stop writer shutdown with %d unprocessed vehicle positions", len(intake))
+            unflushed = writer.close()
+            if unflushed:
+                logger.warning("Stop writer shutdown with %d unflushed events", unflushed)
+            _log_intake_metrics(intake)
+            _log_writer_metrics(writer)
+            _log_gtfs_cache_stats(detector.gtfs_cache, started_at)
+            _checkpoint_gtfs_cache(detector.gtfs_cache, checkpoint_path, static_hashes)
             subscriber.close()
 
 
@@ -0,0 +1,157 @@
+import csv
+import io
+import logging
+import sys
+import zipfile
+from collections import defaultdict
+from collections.abc import Iterator
+from pathlib import Path
+
+from app.shared.db.models import CurrentRoute, CurrentStop, CurrentStopTime, CurrentTrip
+from app.shared.gtfs.feeds import FeedConfig
+from app.shared.gtfs.timetable import parse_gtfs_times
+from app.shared.models.enums import Agency
+from app.stop_writer.detector.gtfs_cache import GtfsCache
+
+logger = logging.getLogger(__name__)
+
+# (stop_sequence, stop_id, arrival_seconds, departure_seconds)
+_StopTimeRow = tuple[int, str, int, int | None]
+
+
+def _rows(zf: zipfile.ZipFile, name: str) -> Iterator[dict[str, str]]:
+    with zf.open(name) as f:
+        yield from csv.DictReader(io.TextIOWrapper(f, encoding="utf-8-sig"))
+
+
+def _optional_int(value: str | None) -> int | None:
+    return int(value) if value else None
+
+
+def _optional_str(value: str | None) -> str | None:
+    return sys.intern(value) if value else None
+
+
+class SnapshotGtfsCache(GtfsCache):
+    """
+    GtfsCache served from archived GTFS static zips instead of the database, for replaying days whose
+    timetable is no longer current. Everything is held in memory, stop times are materialized per trip on
+    first access. Only the lookup methods are supported (no stats, snapshot or warm).
+    """
+
+    def __init__(self, feeds: dict[FeedConfig, tuple[str, Path]]):
+        """`feeds` maps each feed to its static hash and archived zip path."""
+        self._hashes: dict[Agency, str] = {}
+        self._trips: dict[str, CurrentTrip] = {}
+        self._stops: dict[str, CurrentStop] = {}
+        self._stop_time_rows: dict[str, list[_StopTimeRow]] = {}
+        self._stop_times: dict[str, dict[int, CurrentStopTime]] = {}
+        self._trip_agency: dict[str, str] = {}
+
+        for feed, (static_hash, zip_path) in feeds.items():
+            self._hashes[feed.agency] = static_hash
+            self._load(feed, zip_path)
+
+    def _load(self, feed: FeedConfig, zip_path: Path) -> None:
+        agency_id = feed.agency.value
+
+        def prefix(raw_id: str) -> str:
+            return sys.intern(feed.prefix_id(raw_id))
+
+        logger.info("[%s] Loading GTFS snapshot %s", agency_id, zip_path.name)
+
+        with zipfile.ZipFile(zip_path) as zf:
+            routes: dict[str, CurrentRoute] = {}
+            for row in _rows(zf, "routes.txt"):
+                route = CurrentRoute(
+                    route_id=prefix(row["route_id"]),
+                    agency_id=agency_id,
+                    route_short_name=sys.intern(row["route_short_name"]),
+                )
+                routes[route.route_id] = route
+
+            for row in _rows(zf, "stops.txt"):
+                stop = CurrentStop(
+                    stop_id=prefix(row["stop_id"]),
+                    agency_id=agency_id,
+                    stop_name=sys.intern(row["stop_name"]),
+                    stop_code=row.get("stop_code") or None,
+                    stop_desc=_optional_str(row.get("stop_desc")),
+                )
+                self._stops[stop.stop_id] = stop
+
+            for row in _rows(zf, "trips.txt"):
+                trip = CurrentTrip(
+                    trip_id=prefix(row["trip_id"]),
+                    route_id=prefix(row["route_id"]),
+                    agency_id=agency_id,
+                    service_id=row["service_id"],
+                    direction_id=_optional_int(row.get("direction_id")),
+                    headsign=_optional_str(row.get("trip_headsign")),
+                    shape_id=prefix(row["shape_id"]) if row.get("shape_id") else None,
+                )
+                trip_route = routes.get(trip.route_id)
+                if trip_route is None:
+                    continue
+                trip.route = trip_route
+                self._trips[trip.trip_id] = trip
+                self._trip_agency[trip.trip_id] = agency_id
+
+            rows = list(_rows(zf, "stop_times.txt"))
+            arrivals = parse_gtfs_times([row["arrival_time"] for row in rows]).tolist()
+            departure_values = [row.get("departure_time") or None for row in rows]
+            departures = parse_gtfs_times([d for d in departure_values if d is not None]).tolist()
+            departure_iter = iter(departures)
+
+            stop_time_rows: defaultdict[str, list[_StopTimeRow]] = defaultdict(list)
+            for row, arrival, departure in zip(rows, arrivals, departure_values, strict=True):
+                stop_time_rows[prefix(row["trip_id"])].append(
+                    (
+                        int(row["stop_sequence"]),
+                        prefix(row["stop_id"]),
+                        arrival,
+                        next(departure_iter) if departure is not None else None,
+                    )
+                )
+            for trip_rows in stop_time_rows.values():
+                trip_rows.sort()
+            self._stop_time_rows.update(stop_time_rows)
+
+        logger.info("[%s] Loaded %d trips", agency_id, len(self._trips))
+
+    def _trip_stop_times(self, trip_id: str) -> dict[int, CurrentStopTime]:
+        stop_times = self._stop_times.get(trip_id)
+        if stop_times is None:
+            agency_id = self._trip_agency.get(trip_id, "")
+            stop_times = self._stop_times[trip_id] = {
+                seq: CurrentStopTime(
+                    trip_id=trip_id,
+                    stop_sequence=seq,
+                    stop_id=stop_id,
+                    agency_id=agency_id,
+                    arrival_seconds=arrival,
+                    departure_seconds=departure,
+                )
+                for seq, stop_id, arrival, departure in self._stop_time_rows.get(trip_id, [])
+            }
+        return stop_times
+
+    def get_trip(self, trip_id: str) -> CurrentTrip | None:
+        return self._trips.get(trip_id)
+
+    def get_stop(self, stop_id: str) -> CurrentStop | None:
+        return self._stops.get(stop_id)
+
+    def get_stop_time(self, trip_id: str, stop_sequence: int) -> CurrentStopTime | None:
+        return self._trip_stop_times(trip_id).get(stop_sequence)
+
+    def get_max_stop_sequence(self, trip_id: str) -> int | None:
+        rows = self._stop_time_rows.get(trip_id)
+        return rows[-1][0] if rows else None
+
+    def get_current_hash(self, agency: Agency) -> str | None:
+        return self._hashes.get(agency)
+
+    def get_stop_id_to_seq(self, trip_id: str) -> dict[str, int]:
+        """Same mapping rt_poller builds for trip update caching."""
+        return {stop_id: seq for seq, stop_id, _, _ in self._stop_time_rows.get(trip_id, [])}
@@ -0,0 +1,158 @@
+"""
+Rebuild stop events for past service days from the rt_poller archive into events.stop_events_replay.
+
+    python -m app.stop_writer.replay.main --from 2026-03-02 --to 2026-03-08 \
+        --rt-archive /data/rt_poller/rt_archive --gtfs-archive /data
+
+Each agency is replayed against the archived GTFS static zip (`<static_hash>.zip`) the live writer used for
+those days, taken from existing stop events, or from --static-hash AGENCY=HASH.
+"""
+
+import argparse
+import logging
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.platform.config import get_config
+from app.platform.constants import TIMEZONE
+from app.platform.db.connection import get_session
+from app.platform.logging import setup_logging
+from app.shared.constants import RT_ARCHIVE_DIRNAME
+from app.shared.db.models import StopEventModel
+from app.shared.gtfs.feeds import FeedConfig, get_feed_config
+from app.shared.gtfs.repositories.gtfs_meta import GtfsMetaRepository
+from app.shared.gtfs.rt_archive import read_rt_archive
+from app.shared.models.enums import Agency
+from app.stop_writer.constants import REPLAY_WINDOW_LEAD, REPLAY_WINDOW_TAIL
+from app.stop_writer.replay.engine import ReplayEngine
+from app.stop_writer.replay.gtfs_snapshot import SnapshotGtfsCache
+from app.stop_writer.replay.shadow import load_shadow_table
+
+logger = logging.getLogger(__name__)
+
+TZ = ZoneInfo(TIMEZONE)
+
+
+def _parse_static_hash(value: str) -> tuple[Agency, str]:
+    agency, sep, static_hash = value.partition("=")
+    if not sep or not static_hash:
+        raise argparse.ArgumentTypeError(f"Expected AGENCY=HASH, got {value!r}")
+    try:
+        return Agency(agency), static_hash
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Unknown agency {agency!r}") from None
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    data_dir = get_config().data_dir
+    parser = argparse.ArgumentParser(description="Replay archived GTFS-RT feeds into the stop events shadow table")
+    parser.add_argument("--from", dest="first_date", type=date.fromisoformat, required=True)
+    parser.add_argument("--to", dest="last_date", type=date.fromisoformat, required=True)
+    parser.add_argument("--rt-archive", type=Path, default=data_dir / RT_ARCHIVE_DIRNAME)
+    parser.add_argument("--gtfs-archive", type=Path, default=data_dir, help="Importer archive of <hash>.zip files")
+    parser.add_argument("--static-hash", type=_parse_static_hash, action="append", default=[])
+    parser.add_argument("--dry-run", action="store_true", help="Detect and report without loading the shadow table")
+    args = parser.parse_args(argv)
+    if args.last_date < args.first_date:
+        parser.error("--to must not be before --from")
+    return args
+
+
+def _resolve_static_hashes(
+    session: Session, first_date: date, last_date: date, overrides: dict[Agency, str]
+) -> dict[Agency, str]:
+    """Explicit overrides, else the single hash live events used in the range, else the current hash."""
+    hashes = {Agency(agency): h for agency, h in GtfsMetaRepository(session).get_all_hashes().items()}
+
+    stmt = (
+        select(StopEventModel.agency, StopEventModel.static_hash)
+        .where(StopEventModel.service_date.between(first_date, last_date))
+        .distinct()
+    )
+    used: dict[Agency, set[str]] = {}
+    for agency, static_hash in session.execute(stmt).all():
+        used.setdefault(Agency(agency), set()).add(static_hash)
+
+    for agency, agency_hashes in used.items():
+        if agency in overrides:
+            continue
+        if len(agency_hashes) > 1:
+            raise SystemExit(
+                f"{agency.value}: GTFS changed within the range ({len(agency_hashes)} hashes), "
+                "replay the days separately or pass --static-hash"
+            )
+        hashes[agency] = agency_hashes.pop()
+
+    hashes.update(overrides)
+    return hashes
+
+
+def _snapshot_feeds(hashes: dict[Agency, str], gtfs_archive: Path) -> dict[FeedConfig, tuple[str, Path]]:
+    feeds: dict[FeedConfig, tuple[str, Path]] = {}
+    for agency, static_hash in hashes.items():
+        zip_path = gtfs_archive / f"{static_hash}.zip"
+        if not zip_path.exists():
+            raise SystemExit(f"{agency.value}: GTFS archive {zip_path} not found")
+        feeds[get_feed_config(agency)] = (static_hash, zip_path)
+    return feeds
+
+
+def run_replay(args: argparse.Namespace) -> None:
+    started = time.perf_counter()
+
+    with get_session() as session:
+        hashes = _resolve_static_hashes(session, args.first_date, args.last_date, dict(args.static_hash))
+    for agency, static_hash in hashes.items():
+        logger.info("%s: replaying against GTFS %s...", agency.value, static_hash[:16])
+
+    gtfs = SnapshotGtfsCache(_snapshot_feeds(hashes, args.gtfs_archive))
+    gtfs_seconds = time.perf_counter() - started
+
+    window_start = datetime(args.first_date.year, args.first_date.month, args.first_date.day, tzinfo=TZ)
+    window_end = datetime(args.last_date.year, args.last_date.month, args.last_date.day, tzinfo=TZ) + timedelta(days=1)
+    engine = ReplayEngine(gtfs, (args.first_date, args.last_date))
+    stats = engine.run(
+        read_rt_archive(args.rt_archive, window_start - REPLAY_WINDOW_LEAD, window_end + REPLAY_WINDOW_TAIL)
+    )
+
+    logger.info(
+        "Replay: vp_polls=%d tu_polls=%d positions=%d duplicates=%d trip_updates=%d events=%d "
+        "detect=%.1fs (%.0f positions/s) gtfs_load=%.1fs",
+        stats.vp_polls,
+        stats.tu_polls,
+        stats.positions,
+        stats.duplicate_positions,
+        stats.trip_updates,
+        stats.events,
+        stats.elapsed_seconds,
+        stats.positions_per_second,
+        gtfs_seconds,
+    )
+
+    if args.dry_run:
+        logger.info("Dry run, shadow table not modified")
+        return
+
+    load_start = time.perf_counter()
+    with get_session() as session:
+        loaded = load_shadow_table(session, engine.events, args.first_date, args.last_date)
+    logger.info(
+        "Loaded %d events into shadow table in %.1fs, total %.1fs",
+        loaded,
+        time.perf_counter() - load_start,
+        time.perf_counter() - started,
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    setup_logging()
+    run_replay(_parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+from collections.abc import Callable
+from typing import Any
+
+
+class MemoryRedis:
+    """
+    In-process stand-in for the subset of the redis.Redis API used by stop_writer state repositories.
+
+    Expiry is evaluated against `clock` (seconds), which replay drives from archived fetch times, so TTLs behave
+    as they did live regardless of replay speed.
+    """
+
+    def __init__(self, clock: Callable[[], float]):
+        self._clock = clock
+        self._values: dict[str, Any] = {}
+        self._expires: dict[str, float] = {}
+
+    def _live(self, key: str) -> Any:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= self._clock():
+            del self._expires[key]
+            self._values.pop(key, None)
+            return None
+        return self._values.get(key)
+
+    def get(self, key: str) -> bytes | None:
+        value: bytes | None = self._live(key)
+        return value
+
+    def setex(self, key: str, ttl: int, value: bytes) -> None:
+        self._values[key] = value
+        self._expires[key] = self._clock() + ttl
+
+    def delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            self._expires.pop(key, None)
+            if self._values.pop(key, None) is not None:
+                removed += 1
+        return removed
+
+    def expire(self, key: str, ttl: int) -> bool:
+        if self._live(key) is None:
+            return False
+        self._expires[key] = self._clock() + ttl
+        return True
+
+    def hexists(self, key: str, field: str) -> bool:
+        return field in (self._live(key) or {})
+
+    def hkeys(self, key: str) -> list[bytes]:
+        return [field.encode() for field in self._live(key) or {}]
+
+    def hget(self, key: str, field: str) -> bytes | None:
+        return (self._live(key) or {}).get(field)
+
+    def hset(self, key: str, field: str, value: bytes) -> int:
+        hash_ = self._live(key)
+        if hash_ is None:
+            hash_ = self._values[key] = {}
+        is_new = field not in hash_
+        hash_[field] = value
+        return int(is_new)
+
+    def pipeline(self, transaction: bool = True) -> "_MemoryPipeline":
+        return _MemoryPipeline(self)
+
+    def purge_expired(self) -> int:
+        """Drop expired keys. Returns the number removed."""
+        now = self._clock()
+        expired = [key for key, expires_at in self._expires.items() if expires_at <= now]
+        for key in expired:
+            self.delete(key)
+        return len(expired)
+
+
+class _MemoryPipeline:
+    """Commands run immediately; `execute` is a no-op kept for API compatibility."""
+
+    def __init__(self, store: MemoryRedis):
+        self._store = store
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._store, name)
+
+    def execute(self) -> list[Any]:
+        return []
@@ -0,0 +1,78 @@
+import logging
+from datetime import date
+
+from psycopg import sql
+from sqlalchemy.orm import Session
+
+from app.shared.models.events import StopEvent
+from app.stop_writer.constants import REPLAY_SHADOW_TABLE
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = [
+    "agency",
+    "trip_id",
+    "service_date",
+    "stop_sequence",
+    "stop_id",
+    "line_number",
+    "stop_name",
+    "stop_desc",
+    "direction_id",
+    "headsign",
+    "planned_time",
+    "event_time",
+    "delay_seconds",
+    "vehicle_id",
+    "license_plate",
+    "detection_method",
+    "is_estimated",
+    "static_hash",
+    "max_stop_sequence",
+]
+
+
+def load_shadow_table(session: Session, events: list[StopEvent], first_date: date, last_date: date) -> int:
+    """
+    Replace replayed events for the service date range in the shadow table via COPY. Returns rows loaded.
+    """
+    raw_conn = session.connection().connection.dbapi_connection
+    if raw_conn is None:
+        raise RuntimeError("No database connection available")
+
+    table = sql.Identifier("events", REPLAY_SHADOW_TABLE)
+    cursor = raw_conn.cursor()
+    cursor.execute(
+        sql.SQL("DELETE FROM {} WHERE service_date BETWEEN %s AND %s").format(table),
+        (first_date, last_date),
+    )
+    logger.info("Cleared %d previously replayed rows", cursor.rowcount)
+
+    stmt = sql.SQL("COPY {} ({}) FROM STDIN").format(table, sql.SQL(", ").join(map(sql.Identifier, _COLUMNS)))
+    with cursor.copy(stmt) as copy:
+        for e in events:
+            copy.write_row(
+                (
+                    e.agency.value,
+                    e.trip_id,
+                    e.service_date,
+                    e.stop_sequence,
+                    e.stop_id,
+                    e.line_number,
+                    e.stop_name,
+                    e.stop_desc,
+                    e.direction_id,
+                    e.headsign,
+                    e.planned_time,
+                    e.event_time,
+                    e.delay_seconds,
+                    e.vehicle_id,
+                    e.license_plate,
+                    e.detection_method.value,
+                    e.is_estimated,
+                    e.static_hash,
+                    e.max_stop_sequence,
+                )
+            )
+
+    return len(events)
@@ -0,0 +1,92 @@
+from collections.abc import Iterable
+from datetime import date, timedelta
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.shared.constants import (
+    MIN_DELAY_SECONDS,
+    PUNCTUALITY_ON_TIME_MAX_SECONDS,
+    PUNCTUALITY_SLIGHTLY_DELAYED_MAX_SECONDS,
+)
+from app.shared.db.models import LineDailyStats, LineDailyStatsDay
+
+# Both detection classes of every line with events that day. `ok` is the filter of the API statistics queries.
+_ROLL_UP_DAY = sa.text("""
+    INSERT INTO events.line_daily_stats
+    SELECT e.line_number, e.service_date, c.includes_estimated,
+           count(*) FILTER (WHERE q.ok),
+           count(*) FILTER (WHERE q.ok AND e.delay_seconds <= :on_time_max),
+           count(*) FILTER (WHERE q.ok AND e.delay_seconds > :on_time_max AND e.delay_seconds <= :slightly_delayed_max),
+           count(*) FILTER (WHERE q.ok AND e.delay_seconds > :slightly_delayed_max),
+           coalesce(sum(e.delay_seconds) FILTER (WHERE q.ok), 0),
+           min(e.delay_seconds) FILTER (WHERE q.ok),
+           max(e.delay_seconds) FILTER (WHERE q.ok),
+           count(DISTINCT e.trip_id) FILTER (WHERE q.ok),
+           count(DISTINCT e.trip_id)
+    FROM events.stop_events e
+    CROSS JOIN (VALUES (false), (true)) c(includes_estimated)
+    CROSS JOIN LATERAL (
+        SELECT e.stop_sequence > 1 AND e.stop_sequence < e.max_stop_sequence AND e.delay_seconds >= :min_delay
+               AND (c.includes_estimated OR e.detection_method = 1) AS ok
+    ) q
+    WHERE e.service_date = :service_date
+    GROUP BY e.line_number, e.service_date, c.includes_estimated
+""")
+
+
+class LineDailyStatsRepository:
+    def __init__(self, session: Session) -> None:
+        self._session = session
+
+    def days_to_roll_up(self, last_closed: date, lookback_days: int) -> list[date]:
+        """
+        Closed days of the last `lookback_days` not rolled up yet, and days of any age marked stale, oldest first.
+        """
+        first = last_closed - timedelta(days=lookback_days - 1)
+        recent = {first + timedelta(days=i) for i in range(lookback_days)}
+        rows = self._session.execute(
+            sa.select(LineDailyStatsDay.service_date, LineDailyStatsDay.stale).where(
+                sa.or_(LineDailyStatsDay.stale, LineDailyStatsDay.service_date.between(first, last_closed))
+            )
+        ).all()
+        done = {day for day, stale in rows if not stale}
+        stale = {day for day, is_stale in rows if is_stale and day <= last_closed}
+        return sorted((recent - done) | stale)
+
+    def roll_up(self, service_date: date) -> int:
+        """
+        Replace the rollups of `service_date` and mark the day complete. The caller commits.
+
+        Blocks writer flushes until the commit, so a flush adding events to the day either commits before the
+        rollup reads them or marks the day stale after it.
+        """
+        self._session.execute(sa.text("LOCK TABLE events.line_daily_stats_days IN SHARE ROW EXCLUSIVE MODE"))
+        self._session.execute(sa.delete(LineDailyStats).where(LineDailyStats.service_date == service_date))
+        result = self._session.execute(
+            _ROLL_UP_DAY,
+            {
+                "service_date": service_date,
+                "min_delay": MIN_DELAY_SECONDS,
+                "on_time_max": PUNCTUALITY_ON_TIME_MAX_SECONDS,
+                "slightly_delayed_max": PUNCTUALITY_SLIGHTLY_DELAYED_MAX_SECONDS,
+            },
+        )
+        stmt = insert(LineDailyStatsDay).values(service_date=service_date, stale=False)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["service_date"], set_={"stale": False, "rolled_up_at": sa.func.now()}
+        )
+        self._session.execute(stmt)
+        return int(result.rowcount)  # type: ignore[attr-defined]
+
+    def mark_stale(self, service_dates: Iterable[date]) -> None:
+        """Mark rolled up days as stale, in the transaction that adds events to them."""
+        days = sorted(set(service_dates))
+        if not days:
+            return
+        self._session.execute(
+            sa.update(LineDailyStatsDay)
+            .where(LineDailyStatsDay.service_date.in_(days), sa.not_(LineDailyStatsDay.stale))
+            .values(stale=True)
+        )
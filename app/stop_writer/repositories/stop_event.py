@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 
 from app.shared.db.models import StopEventModel
 from app.shared.models.events import StopEvent
+from app.stop_writer.constants import STOP_EVENT_INSERT_CHUNK_SIZE
 
 
 class StopEventRepository:
@@ -39,8 +40,9 @@ class StopEventRepository:
         if not rows:
             return 0
 
-        stmt = insert(StopEventModel).values(rows)
-        stmt = stmt.on_conflict_do_nothing(index_elements=["trip_id", "service_date", "stop_sequence"])
-
-        self._session.execute(stmt)
+        # Chunked to stay below the PostgreSQL bind parameter limit for large (backlogged) batches
+        for i in range(0, len(rows), STOP_EVENT_INSERT_CHUNK_SIZE):
+            stmt = insert(StopEventModel).values(rows[i : i + STOP_EVENT_INSERT_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_nothing(index_elements=["trip_id", "service_date", "stop_sequence"])
+            self._session.execute(stmt)
         return len(rows)
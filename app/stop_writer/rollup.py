@@ -0,0 +1,77 @@
+import logging
+import threading
+import time
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+from datetime import UTC, date, datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.platform.sentry import capture_exception
+from app.shared.gtfs.timeparse import last_closed_service_date
+from app.stop_writer.constants import (
+    ROLLUP_CLOSE_TIMEOUT_SECONDS,
+    ROLLUP_INTERVAL,
+    ROLLUP_LOOKBACK_DAYS,
+)
+from app.stop_writer.repositories.line_daily_stats import LineDailyStatsRepository
+
+logger = logging.getLogger(__name__)
+
+
+class DailyRollupJob:
+    """
+    Background thread closing service days into the line_daily_stats rollups every ROLLUP_INTERVAL, each day in
+    its own transaction. Failures are reported and retried on the next run; until a day is rolled up the API
+    reads its raw stop events. `on_rolled_up` is called with each day committed.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AbstractContextManager[Session]],
+        interval: timedelta = ROLLUP_INTERVAL,
+        lookback_days: int = ROLLUP_LOOKBACK_DAYS,
+        clock: Callable[[], datetime] = lambda: datetime.now(UTC),
+        on_rolled_up: Callable[[date], None] = lambda day: None,
+    ):
+        self._session_factory = session_factory
+        self._interval = interval
+        self._lookback_days = lookback_days
+        self._clock = clock
+        self._on_rolled_up = on_rolled_up
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stop-writer-rollup", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def close(self, timeout: float = ROLLUP_CLOSE_TIMEOUT_SECONDS) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+    def run_once(self) -> list[date]:
+        """Roll up every day due, returns the days due."""
+        last_closed = last_closed_service_date(self._clock())
+        with self._session_factory() as session:
+            repo = LineDailyStatsRepository(session)
+            days = repo.days_to_roll_up(last_closed, self._lookback_days)
+            session.commit()
+            for day in days:
+                if self._stop.is_set():
+                    break
+                started = time.monotonic()
+                rows = repo.roll_up(day)
+                session.commit()
+                logger.info("Rolled up %s: %d line stats rows in %.1fs", day, rows, time.monotonic() - started)
+                self._on_rolled_up(day)
+        return days
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception("Daily stats rollup failed: %s", e)
+                capture_exception(e, tags={"component": "stop_writer", "failure_scope": "rollup"})
+            self._stop.wait(timeout=self._interval.total_seconds())
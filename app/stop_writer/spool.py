@@ -0,0 +1,174 @@
+import logging
+import os
+import struct
+import threading
+import zlib
+from collections.abc import Iterator
+from pathlib import Path
+from typing import BinaryIO
+
+import msgspec
+
+from app.shared.models.events import StopEvent
+
+logger = logging.getLogger(__name__)
+
+# Record header: payload length + CRC32 of payload (little-endian u32 each)
+_HEADER = struct.Struct("<II")
+
+_encoder = msgspec.msgpack.Encoder()
+_decoder = msgspec.msgpack.Decoder(list[StopEvent])
+
+
+def _record(events: list[StopEvent]) -> bytes:
+    payload = _encoder.encode(events)
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _valid_records(path: Path) -> Iterator[bytes]:
+    """Record payloads in append order, up to the first torn or corrupt record."""
+    with path.open("rb") as f:
+        while True:
+            header = f.read(_HEADER.size)
+            if not header:
+                return
+            if len(header) < _HEADER.size:
+                logger.warning("Spool %s: truncated record header, ignoring tail", path)
+                return
+
+            length, checksum = _HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                logger.warning("Spool %s: corrupt or truncated record, ignoring tail", path)
+                return
+            yield payload
+
+
+def _truncate_torn_tail(path: Path) -> None:
+    """Cut the file after its last valid record, so records appended after a crash mid-write stay readable."""
+    if not path.exists():
+        return
+    valid = sum(_HEADER.size + len(payload) for payload in _valid_records(path))
+    size = path.stat().st_size
+    if valid == size:
+        return
+    logger.warning("Spool %s: truncating %d bytes of torn records", path, size - valid)
+    with path.open("r+b") as f:
+        f.truncate(valid)
+        os.fsync(f.fileno())
+
+
+class EventSpool:
+    """
+    Append-only, checksummed on-disk spool for stop events that could not be written to the database.
+
+    Each append is a single record (header + msgpack-encoded list of events) synced to disk. Replay claims the
+    whole file by renaming it, so new appends go to a fresh file while the claimed one is being written.
+
+    Next to it, a write-ahead journal of the events buffered for the database in the same record format: each batch
+    is journaled before it is buffered, the journal is sealed when its events are handed off for writing and the
+    sealed journal is released after their commit. Journal appends are written without fsync, they survive a crash
+    of the process but not of the host; sealing syncs them. Journals left by a crash are moved into the spool.
+
+    A record torn by a crash mid-write would hide every record appended after it, so the spool and the journal are
+    truncated to their last valid record when opened.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._claimed_path = path.with_name(f"{path.name}.replay")
+        self._journal_path = path.with_name(f"{path.name}.journal")
+        self._sealed_journal_path = path.with_name(f"{path.name}.journal.sealed")
+        self._journal: BinaryIO | None = None
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _truncate_torn_tail(self._path)
+        _truncate_torn_tail(self._journal_path)
+
+    def append(self, events: list[StopEvent]) -> None:
+        if not events:
+            return
+
+        record = _record(events)
+        with self._lock, self._path.open("ab") as f:
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def journal(self, events: list[StopEvent]) -> None:
+        """Append events about to be buffered to the journal."""
+        if not events:
+            return
+
+        record = _record(events)
+        with self._lock:
+            if self._journal is None:
+                self._journal = self._journal_path.open("ab")
+            self._journal.write(record)
+            self._journal.flush()
+
+    def seal_journal(self) -> None:
+        """Sync the journal and set it aside, its events were handed off for writing. The previous seal was released."""
+        with self._lock:
+            if self._journal is None:
+                return
+            os.fsync(self._journal.fileno())
+            self._journal.close()
+            self._journal = None
+            os.replace(self._journal_path, self._sealed_journal_path)
+
+    def release_journal(self) -> None:
+        """Delete the sealed journal after its events were committed."""
+        self._sealed_journal_path.unlink(missing_ok=True)
+
+    def clear_journal(self) -> None:
+        """Delete both journals, once every event in them was committed or spooled."""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            self._journal_path.unlink(missing_ok=True)
+            self._sealed_journal_path.unlink(missing_ok=True)
+
+    def recover_journal(self) -> int:
+        """Move the events of journals left by a crash into the spool. Returns their number."""
+        recovered = 0
+        for path in (self._sealed_journal_path, self._journal_path):
+            if not path.exists():
+                continue
+            for events in self.read(path):
+                self.append(events)
+                recovered += len(events)
+            path.unlink()
+        return recovered
+
+    def has_pending(self) -> bool:
+        return self._claimed_path.exists() or (self._path.exists() and self._path.stat().st_size > 0)
+
+    def claim(self) -> Path | None:
+        """
+        Move spooled records aside for replay. A claim left over from an interrupted replay is returned first.
+        """
+        with self._lock:
+            if self._claimed_path.exists():
+                return self._claimed_path
+            if not self._path.exists() or self._path.stat().st_size == 0:
+                return None
+            os.replace(self._path, self._claimed_path)
+            return self._claimed_path
+
+    def release(self) -> None:
+        """Delete the claimed file after all of its records were persisted."""
+        self._claimed_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def read(path: Path) -> Iterator[list[StopEvent]]:
+        """
+        Yield event batches in append order. Stops at the first torn or corrupt record.
+        """
+        for payload in _valid_records(path):
+            try:
+                yield _decoder.decode(payload)
+            except msgspec.DecodeError:
+                logger.warning("Spool %s: undecodable record, ignoring tail", path, exc_info=True)
+                return
@@ -1,4 +1,5 @@
 import logging
+import sys
 from datetime import datetime
 
 import redis
@@ -7,11 +8,33 @@ from app.shared.models.enums import Agency, VehicleStatus
 from app.shared.models.gtfs_realtime import VehiclePosition
 from app.shared.redis import serializer
 from app.shared.redis.constants import VEHICLE_POSITIONS_CHANNEL
+from app.shared.redis.schemas import VehiclePositionMessage
 from app.stop_writer.constants import SUBSCRIBER_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
 
+def _intern(value: str | None) -> str | None:
+    return sys.intern(value) if value is not None else None
+
+
+def vehicle_position_from_message(msg: VehiclePositionMessage) -> VehiclePosition:
+    # Interned so the ids repeated in every message of a trip, and in the events buffered for it, share one string
+    return VehiclePosition(
+        agency=Agency(msg.agency),
+        trip_id=sys.intern(msg.trip_id),
+        vehicle_id=sys.intern(msg.vehicle_id),
+        license_plate=_intern(msg.license_plate),
+        latitude=None,
+        longitude=None,
+        bearing=None,
+        stop_id=_intern(msg.stop_id),
+        stop_sequence=msg.stop_sequence,
+        status=VehicleStatus(msg.status) if msg.status is not None else None,
+        timestamp=datetime.fromisoformat(msg.timestamp),
+    )
+
+
 class Subscriber:
     def __init__(self, redis_client: redis.Redis):
         self._redis = redis_client
@@ -34,20 +57,7 @@ class Subscriber:
             return None
 
         try:
-            msg = serializer.decode_vp_message(message["data"])
-            return VehiclePosition(
-                agency=Agency(msg.agency),
-                trip_id=msg.trip_id,
-                vehicle_id=msg.vehicle_id,
-                license_plate=msg.license_plate,
-                latitude=None,
-                longitude=None,
-                bearing=None,
-                stop_id=msg.stop_id,
-                stop_sequence=msg.stop_sequence,
-                status=VehicleStatus(msg.status) if msg.status is not None else None,
-                timestamp=datetime.fromisoformat(msg.timestamp),
-            )
+            return vehicle_position_from_message(serializer.decode_vp_message(message["data"]))
         except Exception as e:
             logger.exception("Failed to parse message: %s", e)
             return None
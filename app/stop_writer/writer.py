@@ -1,11 +1,32 @@
 import logging
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import AbstractContextManager
+from dataclasses import dataclass, field, replace
 from datetime import UTC, datetime, timedelta
+from itertools import chain, repeat
 
 from sqlalchemy.orm import Session
 
+from app.platform.sentry import capture_exception
 from app.shared.models.events import StopEvent
-from app.stop_writer.constants import WRITER_BATCH_SIZE, WRITER_FLUSH_INTERVAL
+from app.stop_writer.constants import (
+    STOP_WRITER_FLUSH_RETRY_BACKOFF_SECONDS,
+    WRITER_BACKPRESSURE_POLL_SECONDS,
+    WRITER_BATCH_SIZE,
+    WRITER_BATCH_SIZE_BUCKETS,
+    WRITER_CLOSE_TIMEOUT_SECONDS,
+    WRITER_FLUSH_INTERVAL,
+    WRITER_FLUSH_SECONDS_BUCKETS,
+    WRITER_MAX_BUFFERED_EVENTS,
+    WRITER_POLICY_TICK_SECONDS,
+    WRITER_SPOOL_REPLAY_BATCH_SIZE,
+)
+from app.stop_writer.flush_policy import FlushPolicy, StaticFlushPolicy
+from app.stop_writer.repositories.line_daily_stats import LineDailyStatsRepository
 from app.stop_writer.repositories.stop_event import StopEventRepository
+from app.stop_writer.spool import EventSpool
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +44,7 @@ class BatchWriter:
     ):
         self._session = session
         self._repo = StopEventRepository(session)
+        self._stats_repo = LineDailyStatsRepository(session)
         self._batch_size = batch_size
         self._flush_interval = flush_interval
         self._buffer: list[StopEvent] = []
@@ -37,6 +59,12 @@ class BatchWriter:
         if self._should_flush():
             self.flush()
 
+    def extend(self, events: list[StopEvent]) -> None:
+        """
+        Add events to buffer without triggering a flush.
+        """
+        self._buffer.extend(events)
+
     def flush(self) -> int:
         """
         Write buffered events to database.
@@ -49,6 +77,8 @@ class BatchWriter:
 
         try:
             count = self._repo.insert_batch(self._buffer)
+            # Late events (spool replay, trips past midnight) get their day rolled up again
+            self._stats_repo.mark_stale(event.service_date for event in self._buffer)
             self._session.commit()
             self._session.expire_all()
             logger.info("Wrote %d stop events", count)
@@ -67,3 +97,308 @@ class BatchWriter:
         if datetime.now(UTC) - self._last_flush > self._flush_interval:
             return True
         return False
+
+
+@dataclass(slots=True)
+class WriterMetrics:
+    """Snapshot of background writer counters."""
+
+    flushes: int = 0
+    events_written: int = 0
+    failed_flushes: int = 0
+    backpressure_waits: int = 0
+    spooled_events: int = 0
+    replayed_events: int = 0
+    last_flush_seconds: float = 0.0
+    max_flush_seconds: float = 0.0
+    total_flush_seconds: float = 0.0
+    active_depth: int = 0
+    pending_depth: int = 0
+    batch_size: int = 0
+    flush_interval_seconds: float = 0.0
+    # Upper bucket bound -> count (last bucket is +inf)
+    batch_size_histogram: dict[float, int] = field(default_factory=dict)
+    flush_seconds_histogram: dict[float, int] = field(default_factory=dict)
+
+    @property
+    def queue_depth(self) -> int:
+        return self.active_depth + self.pending_depth
+
+
+def _observe(histogram: dict[float, int], buckets: Sequence[float], value: float) -> None:
+    bound = next((b for b in buckets if value <= b), float("inf"))
+    histogram[bound] = histogram.get(bound, 0) + 1
+
+
+def _flush_retry_delays(backoff_seconds: Sequence[int]) -> Iterator[int]:
+    if not backoff_seconds:
+        return repeat(0)
+
+    return chain(backoff_seconds, repeat(backoff_seconds[-1]))
+
+
+class BackgroundBatchWriter:
+    """
+    Double-buffered stop event writer.
+
+    Detection appends into the active buffer while a background thread, with its own session, commits the
+    previously handed-off buffer and retries it through DB outages. When the active buffer reaches `max_buffered`
+    while the previous one is still being written, it is spilled to the on-disk spool (or, without a spool, the
+    caller blocks). Spooled events are replayed in bulk at startup and after each successful write.
+
+    With a spool, every batch is journaled there before it is buffered and the journal is released once the batch
+    is committed, so buffered events survive a crash of the process and are replayed on the next start. Without
+    one, a crash loses up to both buffers.
+
+    Batch size and flush interval come from `policy`, which is fed with incoming event counts and commit latency,
+    and ticked every WRITER_POLICY_TICK_SECONDS while the flusher is idle.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AbstractContextManager[Session]],
+        stop_event: threading.Event | None = None,
+        batch_size: int = WRITER_BATCH_SIZE,
+        flush_interval: timedelta = WRITER_FLUSH_INTERVAL,
+        max_buffered: int = WRITER_MAX_BUFFERED_EVENTS,
+        retry_backoff_seconds: Sequence[int] = STOP_WRITER_FLUSH_RETRY_BACKOFF_SECONDS,
+        spool: EventSpool | None = None,
+        policy: FlushPolicy | None = None,
+    ):
+        self._session_factory = session_factory
+        self._spool = spool
+        self._policy = policy or StaticFlushPolicy(batch_size, flush_interval)
+        self._stop_event = stop_event or threading.Event()
+        self._max_buffered = max_buffered
+        self._retry_backoff_seconds = retry_backoff_seconds
+
+        self._cond = threading.Condition()
+        self._active: list[StopEvent] = []
+        self._pending: list[StopEvent] = []
+        self._closing = False
+        self._last_flush = datetime.now(UTC)
+        self._metrics = WriterMetrics()
+        self._thread = threading.Thread(target=self._run, name="stop-writer-flusher", daemon=True)
+
+    def start(self) -> None:
+        if self._spool is not None:
+            recovered = self._spool.recover_journal()
+            if recovered:
+                logger.warning("Recovered %d buffered stop events journaled before a crash", recovered)
+        self._thread.start()
+
+    def add_many(self, events: list[StopEvent]) -> None:
+        """
+        Append events to the active buffer, handing it off to the flusher when due.
+        Spills to the spool, or blocks without one, while both buffers are full.
+        """
+        with self._cond:
+            if self._is_full() and self._spool is not None:
+                logger.warning("Stop writer buffers full, spooling %d events to disk", len(self._active))
+                self._spill(self._spool, self._active)
+                self._active = []
+            elif self._is_full():
+                self._metrics.backpressure_waits += 1
+                logger.warning("Stop writer buffers full (%d pending), applying backpressure", len(self._pending))
+            while self._is_full() and not self._stop_event.is_set():
+                if not self._thread.is_alive():
+                    raise BatchWriteError("Background flusher is not running")
+                self._cond.wait(timeout=WRITER_BACKPRESSURE_POLL_SECONDS)
+
+            if self._spool is not None:
+                self._spool.journal(events)
+            self._active.extend(events)
+            self._policy.record_events(len(events))
+            if self._should_hand_off():
+                self._hand_off()
+
+    def flush(self) -> None:
+        """
+        Hand off the active buffer to the flusher if it is idle and a flush is due. Does not wait for the write.
+        """
+        with self._cond:
+            if self._should_hand_off():
+                self._hand_off()
+
+    def close(self, timeout: float = WRITER_CLOSE_TIMEOUT_SECONDS) -> int:
+        """
+        Stop the flusher after a final write attempt. Unflushed events are moved to the spool if there is one.
+        Returns the number of events lost.
+        """
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._stop_event.set()
+
+        if self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+        with self._cond:
+            unflushed = self._pending + self._active
+            if self._spool is not None:
+                if unflushed:
+                    self._spill(self._spool, unflushed)
+                    logger.info("Spooled %d unflushed stop events for replay on next start", len(unflushed))
+                    self._pending, self._active = [], []
+                self._spool.clear_journal()
+                return 0
+            return len(unflushed)
+
+    def metrics(self) -> WriterMetrics:
+        with self._cond:
+            return replace(
+                self._metrics,
+                active_depth=len(self._active),
+                pending_depth=len(self._pending),
+                batch_size=self._policy.batch_size,
+                flush_interval_seconds=self._policy.flush_interval.total_seconds(),
+                batch_size_histogram=dict(self._metrics.batch_size_histogram),
+                flush_seconds_histogram=dict(self._metrics.flush_seconds_histogram),
+            )
+
+    def _is_full(self) -> bool:
+        return bool(self._pending) and len(self._active) >= self._max_buffered
+
+    def _should_hand_off(self) -> bool:
+        if self._pending or not self._active:
+            return False
+        if len(self._active) >= self._policy.batch_size:
+            return True
+        return datetime.now(UTC) - self._last_flush > self._policy.flush_interval
+
+    def _spill(self, spool: EventSpool, events: list[StopEvent]) -> None:
+        spool.append(events)
+        self._metrics.spooled_events += len(events)
+
+    def _hand_off(self) -> None:
+        if self._spool is not None:
+            self._spool.seal_journal()
+        self._pending, self._active = self._active, []
+        self._last_flush = datetime.now(UTC)
+        self._cond.notify_all()
+
+    def _run(self) -> None:
+        try:
+            with self._session_factory() as session:
+                writer = BatchWriter(session)
+                if not self._replay_spool(writer):
+                    return
+                while self._write_next(writer) and self._replay_spool(writer):
+                    pass
+        except Exception as e:
+            logger.exception("Stop writer flusher crashed: %s", e)
+            capture_exception(e, tags={"component": "stop_writer", "failure_scope": "flusher"})
+        finally:
+            with self._cond:
+                self._cond.notify_all()
+
+    def _write_next(self, writer: BatchWriter) -> bool:
+        with self._cond:
+            # Ticks the policy while idle, so its event rate decays when no events arrive
+            while not (self._pending or self._closing):
+                if not self._cond.wait(timeout=WRITER_POLICY_TICK_SECONDS):
+                    self._policy.tick()
+            if not self._pending:
+                if not self._active:
+                    return False
+                self._hand_off()
+            batch = self._pending
+
+        writer.extend(batch)
+        written = self._write_with_retry(writer)
+
+        with self._cond:
+            if written:
+                if self._spool is not None:
+                    self._spool.release_journal()
+                self._pending = []
+            self._cond.notify_all()
+        return written
+
+    def _replay_spool(self, writer: BatchWriter) -> bool:
+        """
+        Write spooled events back in large batches. Returns False if the replay was interrupted by shutdown;
+        the claimed file is kept and replayed again on next start (inserts are idempotent).
+        """
+        if self._spool is None or self._closing or not self._spool.has_pending():
+            return True
+
+        path = self._spool.claim()
+        if path is None:
+            return True
+
+        started = time.monotonic()
+        replayed = 0
+        batch: list[StopEvent] = []
+        for events in self._spool.read(path):
+            batch.extend(events)
+            if len(batch) >= WRITER_SPOOL_REPLAY_BATCH_SIZE:
+                if not self._replay_batch(writer, batch):
+                    return False
+                replayed += len(batch)
+                batch = []
+
+        if batch:
+            if not self._replay_batch(writer, batch):
+                return False
+            replayed += len(batch)
+
+        self._spool.release()
+        logger.info("Replayed %d spooled stop events in %.1fs", replayed, time.monotonic() - started)
+        return True
+
+    def _replay_batch(self, writer: BatchWriter, batch: list[StopEvent]) -> bool:
+        writer.extend(batch)
+        if not self._write_with_retry(writer, replay=True):
+            return False
+        with self._cond:
+            self._metrics.replayed_events += len(batch)
+        return True
+
+    def _write_with_retry(self, writer: BatchWriter, replay: bool = False) -> bool:
+        delays = _flush_retry_delays(self._retry_backoff_seconds)
+        first_failure = True
+
+        while True:
+            started = time.monotonic()
+            try:
+                count = writer.flush()
+            except BatchWriteError as e:
+                with self._cond:
+                    self._metrics.failed_flushes += 1
+                if self._stop_event.is_set():
+                    return False
+
+                delay = next(delays)
+                logger.warning("Stop writer degraded: retrying batch flush in %ds", delay)
+                if first_failure:
+                    capture_exception(
+                        e,
+                        tags={
+                            "component": "stop_writer",
+                            "failure_scope": "db_flush",
+                            "service_state": "degraded_write",
+                        },
+                    )
+                    first_failure = False
+                self._stop_event.wait(timeout=delay)
+                continue
+
+            elapsed = time.monotonic() - started
+            with self._cond:
+                m = self._metrics
+                m.flushes += 1
+                m.events_written += count
+                m.last_flush_seconds = elapsed
+                m.max_flush_seconds = max(m.max_flush_seconds, elapsed)
+                m.total_flush_seconds += elapsed
+                _observe(m.batch_size_histogram, WRITER_BATCH_SIZE_BUCKETS, count)
+                _observe(m.flush_seconds_histogram, WRITER_FLUSH_SECONDS_BUCKETS, elapsed)
+                if not replay:
+                    self._policy.record_commit(count, elapsed)
+                depth = len(self._active)
+
+            if not first_failure:
+                logger.info("Stop writer recovered and flushed pending events")
+            logger.debug("Flushed %d stop events in %.3fs, %d queued", count, elapsed, depth)
+            return True
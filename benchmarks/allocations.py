@@ -0,0 +1,165 @@
+"""
+Allocation profile of the stop_writer hot path over a synthetic workload.
+
+    python -m benchmarks.allocations --preset city
+    python -m benchmarks.allocations --preset city --save-baseline
+
+Positions go through the pub/sub wire format and `vehicle_position_from_message`, like in stop_writer. Reported
+per processed vehicle update: the transient allocation high-water mark and the net retained growth
+(vehicle state, trip update and saved sequence caches), plus GC generation 0 collections per 1000 updates. The
+detected events are held in a list like the BatchWriter buffer, and their retained size is reported per event.
+Values are deterministic for a given Python version; a rise beyond --tolerance exits with status 1.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from app.shared.models.events import StopEvent
+from app.shared.models.gtfs_realtime import VehiclePosition
+from app.shared.redis import serializer
+from app.shared.redis.schemas import VehiclePositionMessage
+from app.stop_writer.subscriber import vehicle_position_from_message
+from benchmarks.detector import PRESETS, DetectorHarness
+from benchmarks.synthetic_gtfs import GtfsConfig, generate_gtfs
+from benchmarks.workload import Workload, WorkloadConfig
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "allocations.json"
+
+
+@dataclass
+class AllocationProfile:
+    updates: int
+    events: int
+    peak_bytes_per_update: float
+    retained_bytes_per_update: float
+    retained_blocks_per_update: float
+    bytes_per_buffered_event: float
+    blocks_per_buffered_event: float
+    gen0_collections_per_1k_updates: float
+
+
+def _wire_message(vp: VehiclePosition) -> bytes:
+    message = VehiclePositionMessage(
+        agency=vp.agency.value,
+        trip_id=vp.trip_id,
+        vehicle_id=vp.vehicle_id,
+        license_plate=vp.license_plate,
+        stop_id=vp.stop_id,
+        stop_sequence=vp.stop_sequence,
+        status=vp.status.value if vp.status is not None else None,
+        timestamp=vp.timestamp.isoformat(),
+    )
+    return serializer.encode_vp_message(message)
+
+
+def _traced_blocks() -> int:
+    return sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+
+
+def run_allocation_profile(gtfs_config: GtfsConfig, workload_config: WorkloadConfig) -> AllocationProfile:
+    gtfs = generate_gtfs(gtfs_config)
+    harness = DetectorHarness(gtfs)
+    ticks = [(tick, [_wire_message(vp) for vp in tick.positions]) for tick in Workload(gtfs, workload_config).ticks()]
+    process_update = harness.detector.process_update
+
+    buffer: list[StopEvent] = []
+    peak_total = 0
+    updates = 0
+
+    gc.collect()
+    collections_before = gc.get_stats()[0]["collections"]
+    tracemalloc.start()
+    start_bytes, _ = tracemalloc.get_traced_memory()
+    start_blocks = _traced_blocks()
+
+    for tick, messages in ticks:
+        harness.begin_tick(tick)
+        for data in messages:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            vp = vehicle_position_from_message(serializer.decode_vp_message(data))
+            buffer.extend(process_update(vp))
+            _, peak = tracemalloc.get_traced_memory()
+            peak_total += peak - before
+            updates += 1
+
+    gc.collect()
+    end_bytes, _ = tracemalloc.get_traced_memory()
+    end_blocks = _traced_blocks()
+
+    collections = gc.get_stats()[0]["collections"] - collections_before
+
+    # Size of the buffered events alone: release them and measure what is freed
+    events_count = len(buffer)
+    buffer.clear()
+    gc.collect()
+    released_bytes, _ = tracemalloc.get_traced_memory()
+    event_bytes = end_bytes - released_bytes
+    event_blocks = end_blocks - _traced_blocks()
+    tracemalloc.stop()
+    per_update = max(updates, 1)
+    per_event = max(events_count, 1)
+    return AllocationProfile(
+        updates=updates,
+        events=events_count,
+        peak_bytes_per_update=round(peak_total / per_update, 1),
+        retained_bytes_per_update=round((end_bytes - start_bytes - event_bytes) / per_update, 1),
+        retained_blocks_per_update=round((end_blocks - start_blocks - event_blocks) / per_update, 2),
+        bytes_per_buffered_event=round(event_bytes / per_event, 1),
+        blocks_per_buffered_event=round(event_blocks / per_event, 2),
+        gen0_collections_per_1k_updates=round(collections * 1000 / per_update, 2),
+    )
+
+
+def compare_to_baseline(profile: AllocationProfile, baseline: dict[str, float], tolerance: float) -> list[str]:
+    """Metrics of `profile` that grew beyond `tolerance` over the baseline, empty if none."""
+    regressions = []
+    for name, value in asdict(profile).items():
+        if name in ("updates", "events"):
+            continue
+        limit = baseline.get(name)
+        if limit is not None and value > limit * (1 + tolerance) + 1:
+            regressions.append(f"{name}: {value} > baseline {limit}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Allocation profile of StopEventDetector over a synthetic workload")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the preset's baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative growth")
+    args = parser.parse_args(argv)
+
+    profile = run_allocation_profile(*PRESETS[args.preset])
+    for name, value in asdict(profile).items():
+        print(f"{name:>32}: {value}")
+
+    baselines: dict[str, dict[str, float]] = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    if args.save_baseline:
+        baselines[args.preset] = {**asdict(profile), "python": platform.python_version()}  # type: ignore[dict-item]
+        BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        BASELINE_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"Saved baseline for {args.preset!r} to {BASELINE_PATH}")
+        return 0
+
+    baseline = baselines.get(args.preset)
+    if baseline is None:
+        print(f"No baseline for {args.preset!r}, run with --save-baseline to store one")
+        return 0
+
+    regressions = compare_to_baseline(profile, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"Within {args.tolerance:.0%} of the {args.preset!r} baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
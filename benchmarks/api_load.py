@@ -0,0 +1,100 @@
+"""
+Concurrent load test of a running API, to compare requests/s and latency percentiles between deployments.
+
+    python -m benchmarks.api_load --url http://localhost:8000 --concurrency 64 --requests 5000
+    python -m benchmarks.api_load --url http://localhost:8000 --path /v1/shapes/tram:123 --path /v1/vehicles/positions
+
+Each of `concurrency` workers sends its share of the requests back to back over one shared connection pool, cycling
+through the paths. Status codes other than 200 are counted as errors. Run it against the previous and the new build
+with the same arguments; a rate limit of the API under test (per client IP) must be raised or it caps the result.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from itertools import cycle
+
+import httpx
+import numpy as np
+
+DEFAULT_PATHS = [
+    "/health",
+    "/v1/vehicles/positions",
+    "/v1/lines/194/stats/punctuality?start_date=2026-02-01&end_date=2026-02-13",
+]
+
+
+@dataclass(frozen=True, slots=True)
+class LoadResult:
+    requests: int
+    seconds: float
+    latencies_ms: list[float]
+    statuses: Counter[int]
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.requests / self.seconds if self.seconds else 0.0
+
+    def percentile_ms(self, q: float) -> float:
+        return float(np.percentile(self.latencies_ms, q)) if self.latencies_ms else 0.0
+
+    @property
+    def errors(self) -> int:
+        return sum(count for status, count in self.statuses.items() if status != 200)
+
+
+async def run_load(client: httpx.AsyncClient, paths: list[str], requests: int, concurrency: int) -> LoadResult:
+    latencies: list[float] = []
+    statuses: Counter[int] = Counter()
+    next_path = cycle(paths)
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            path = next(next_path)
+            start = time.perf_counter()
+            try:
+                status = (await client.get(path)).status_code
+            except httpx.HTTPError:
+                status = 0
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return LoadResult(requests, time.perf_counter() - start, latencies, statuses)
+
+
+async def _main(args: argparse.Namespace) -> LoadResult:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        # Warm caches and connections so the first requests do not skew the percentiles
+        await run_load(client, args.path or DEFAULT_PATHS, min(args.requests, args.concurrency), args.concurrency)
+        return await run_load(client, args.path or DEFAULT_PATHS, args.requests, args.concurrency)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test a running API")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", action="append", help="Path to request, repeatable (default: a mix of endpoints)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(_main(args))
+    print(
+        f"{result.requests} requests, concurrency {args.concurrency}: {result.requests_per_second:.0f} req/s, "
+        f"p50 {result.percentile_ms(50):.1f} ms, p99 {result.percentile_ms(99):.1f} ms, {result.errors} errors "
+        f"({dict(result.statuses)})"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
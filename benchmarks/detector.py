@@ -0,0 +1,213 @@
+"""
+Throughput benchmark of StopEventDetector.process_update over a synthetic city.
+
+    python -m benchmarks.detector --preset city
+    python -m benchmarks.detector --preset city --save-baseline
+
+Redis state is held in MemoryRedis (driven by the workload clock) and GTFS lookups are served by
+SnapshotGtfsCache from the generated zip, so the numbers cover detection only. Each run is compared with the
+stored baseline of its preset; a drop in events/s or a rise in p99 latency beyond --tolerance exits with status 1.
+Baselines are machine-dependent, save them on the machine you compare on.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from app.shared.gtfs.feeds import get_feed_config
+from app.shared.models.enums import Agency
+from app.shared.models.events import StopEvent
+from app.shared.redis.repositories.trip_updates import TripUpdatesRepository
+from app.shared.redis.schemas import VehicleState
+from app.stop_writer.detector import StopEventDetector
+from app.stop_writer.detector.strategies.base import DetectionContext, DetectionStrategy
+from app.stop_writer.detector.strategies.trip_completion import TripFinalizer
+from app.stop_writer.replay.gtfs_snapshot import SnapshotGtfsCache
+from app.stop_writer.replay.memory_store import MemoryRedis
+from app.stop_writer.repositories.saved_sequences import SavedSequencesRepository
+from app.stop_writer.repositories.vehicle_state import VehicleStateRepository
+from benchmarks.synthetic_gtfs import GtfsConfig, SyntheticGtfs, generate_gtfs, write_gtfs_zip
+from benchmarks.workload import Tick, Workload, WorkloadConfig
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "detector.json"
+
+PRESETS: dict[str, tuple[GtfsConfig, WorkloadConfig]] = {
+    "small": (GtfsConfig(routes=4, stops_per_route=12, vehicles_per_route=2, trips_per_vehicle=3), WorkloadConfig()),
+    "city": (
+        GtfsConfig(routes=120, stops_per_route=30, vehicles_per_route=8, trips_per_vehicle=3),
+        WorkloadConfig(poll_interval_seconds=15),
+    ),
+}
+
+
+@dataclass
+class DetectorBenchResult:
+    vehicles: int
+    updates: int
+    events: int
+    elapsed_seconds: float
+    events_per_second: float
+    updates_per_second: float
+    p50_us: float
+    p99_us: float
+    stopped_at_ms: float
+    seq_jump_ms: float
+    finalizer_ms: float
+
+
+class _TimedStrategy:
+    def __init__(self, inner: DetectionStrategy):
+        self._inner = inner
+        self.seconds = 0.0
+
+    def detect(self, ctx: DetectionContext) -> list[StopEvent]:
+        start = time.perf_counter()
+        try:
+            return self._inner.detect(ctx)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+
+class _TimedFinalizer:
+    def __init__(self, inner: TripFinalizer):
+        self._inner = inner
+        self.seconds = 0.0
+
+    def finalize(self, prev_state: VehicleState) -> list[StopEvent]:
+        start = time.perf_counter()
+        try:
+            return self._inner.finalize(prev_state)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class DetectorHarness:
+    """StopEventDetector over MemoryRedis and a SnapshotGtfsCache of a generated feed."""
+
+    def __init__(self, gtfs: SyntheticGtfs):
+        with tempfile.TemporaryDirectory() as tmp:
+            zip_path = write_gtfs_zip(gtfs, Path(tmp) / "synthetic.zip")
+            self.cache = SnapshotGtfsCache({get_feed_config(Agency.MPK): ("synthetic", zip_path)})
+
+        self.now = 0.0
+        self.store = MemoryRedis(clock=lambda: self.now)
+        # MemoryRedis implements the subset of redis.Redis these repositories use
+        self.trip_updates = TripUpdatesRepository(self.store)  # type: ignore[arg-type]
+        self.detector = StopEventDetector(
+            session=None,
+            redis_vehicle_state=VehicleStateRepository(self.store),  # type: ignore[arg-type]
+            redis_trip_updates=self.trip_updates,
+            redis_saved_seqs=SavedSequencesRepository(self.store),  # type: ignore[arg-type]
+            gtfs_cache=self.cache,
+        )
+
+    def begin_tick(self, tick: Tick) -> None:
+        """Advance the clock and cache the tick's trip updates, like rt_poller does before publishing."""
+        self.now = tick.at.timestamp()
+        for update in tick.trip_updates:
+            self.trip_updates.update(update, self.cache.get_stop_id_to_seq(update.trip_id))
+
+
+def run_detector_bench(gtfs_config: GtfsConfig, workload_config: WorkloadConfig) -> DetectorBenchResult:
+    gtfs = generate_gtfs(gtfs_config)
+    harness = DetectorHarness(gtfs)
+    workload = Workload(gtfs, workload_config)
+    detector = harness.detector
+
+    # Wrap the detector's strategies in place to attribute time per strategy
+    stopped_at, seq_jump = (_TimedStrategy(strategy) for strategy in detector._strategies)
+    finalizer = _TimedFinalizer(detector._finalizer)
+    detector._strategies = [stopped_at, seq_jump]
+    detector._finalizer = finalizer  # type: ignore[assignment]
+
+    latencies: list[float] = []
+    events = 0
+    perf_counter = time.perf_counter
+    for tick in workload.ticks():
+        harness.begin_tick(tick)
+        for vp in tick.positions:
+            start = perf_counter()
+            events += len(detector.process_update(vp))
+            latencies.append(perf_counter() - start)
+
+    elapsed = sum(latencies)
+    latencies.sort()
+    return DetectorBenchResult(
+        vehicles=workload.vehicles,
+        updates=len(latencies),
+        events=events,
+        elapsed_seconds=round(elapsed, 3),
+        events_per_second=round(events / elapsed if elapsed else 0.0, 1),
+        updates_per_second=round(len(latencies) / elapsed if elapsed else 0.0, 1),
+        p50_us=round(_percentile(latencies, 0.50) * 1e6, 1),
+        p99_us=round(_percentile(latencies, 0.99) * 1e6, 1),
+        stopped_at_ms=round(stopped_at.seconds * 1e3, 1),
+        seq_jump_ms=round(seq_jump.seconds * 1e3, 1),
+        finalizer_ms=round(finalizer.seconds * 1e3, 1),
+    )
+
+
+def compare_to_baseline(result: DetectorBenchResult, baseline: dict[str, float], tolerance: float) -> list[str]:
+    """Regressions of `result` against a stored baseline, empty if none."""
+    regressions = []
+    if result.events != baseline["events"]:
+        regressions.append(f"events: {result.events} != baseline {baseline['events']:.0f} (detection changed)")
+    if result.events_per_second < baseline["events_per_second"] * (1 - tolerance):
+        regressions.append(f"events/s: {result.events_per_second} < baseline {baseline['events_per_second']}")
+    if result.p99_us > baseline["p99_us"] * (1 + tolerance):
+        regressions.append(f"p99: {result.p99_us}us > baseline {baseline['p99_us']}us")
+    return regressions
+
+
+def _load_baselines() -> dict[str, dict[str, float]]:
+    if not BASELINE_PATH.exists():
+        return {}
+    baselines: dict[str, dict[str, float]] = json.loads(BASELINE_PATH.read_text())
+    return baselines
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark StopEventDetector over a synthetic workload")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the preset's baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    args = parser.parse_args(argv)
+
+    result = run_detector_bench(*PRESETS[args.preset])
+    for name, value in asdict(result).items():
+        print(f"{name:>20}: {value}")
+
+    baselines = _load_baselines()
+    if args.save_baseline:
+        baselines[args.preset] = {**asdict(result), "python": platform.python_version()}  # type: ignore[dict-item]
+        BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        BASELINE_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"Saved baseline for {args.preset!r} to {BASELINE_PATH}")
+        return 0
+
+    baseline = baselines.get(args.preset)
+    if baseline is None:
+        print(f"No baseline for {args.preset!r}, run with --save-baseline to store one")
+        return 0
+
+    regressions = compare_to_baseline(result, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"Within {args.tolerance:.0%} of the {args.preset!r} baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
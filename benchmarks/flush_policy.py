@@ -0,0 +1,219 @@
+"""
+Flush sizes, commit latency and event write latency of BackgroundBatchWriter under each flush policy.
+
+    python -m benchmarks.flush_policy --preset peak
+
+Replays a traffic profile of stop events (night, rush hour, evening) into the writer in real time, one add_many per
+intake poll and flush() on polls bringing nothing, like stop_writer's main loop, once with StaticFlushPolicy and
+once with AdaptiveFlushPolicy at their production settings. The database is replaced by a session sleeping a fixed
+cost per commit and statement plus a cost per inserted row, so the numbers show how each policy batches, not how
+fast Postgres is. Event latency runs from add_many to the commit of the event.
+"""
+
+import argparse
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import UTC, date, datetime
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from app.shared.db.models import StopEventModel
+from app.shared.models.enums import Agency, DetectionMethod
+from app.shared.models.events import StopEvent
+from app.stop_writer.constants import WRITER_BATCH_SIZE_BUCKETS, WRITER_FLUSH_SECONDS_BUCKETS
+from app.stop_writer.flush_policy import AdaptiveFlushPolicy, FlushPolicy, StaticFlushPolicy
+from app.stop_writer.writer import BackgroundBatchWriter, _observe
+
+EVENT_LATENCY_BUCKETS: tuple[float, ...] = (0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0)
+
+# Inserted rows are keyed by column
+_EVENT_TIME = StopEventModel.__table__.c.event_time
+
+POLICIES: dict[str, Callable[[], FlushPolicy]] = {
+    "static": StaticFlushPolicy,
+    "adaptive": AdaptiveFlushPolicy,
+}
+
+
+@dataclass(frozen=True)
+class Phase:
+    seconds: float
+    events_per_second: float
+
+
+@dataclass(frozen=True)
+class FlushBenchConfig:
+    phases: tuple[Phase, ...]
+    poll_seconds: float = 0.05
+    commit_seconds: float = 0.005
+    statement_seconds: float = 0.002
+    row_seconds: float = 0.00005
+
+
+PRESETS: dict[str, FlushBenchConfig] = {
+    "small": FlushBenchConfig(phases=(Phase(0.25, 20), Phase(0.5, 400), Phase(0.25, 20))),
+    "peak": FlushBenchConfig(phases=(Phase(30, 2), Phase(90, 60), Phase(30, 5))),
+}
+
+
+@dataclass
+class PolicyBenchResult:
+    policy: str
+    events: int
+    flushes: int
+    mean_batch: float
+    mean_flush_ms: float
+    max_flush_ms: float
+    event_p50_seconds: float
+    event_p99_seconds: float
+    # Upper bucket bound -> count (last bucket is +inf), as in WriterMetrics
+    batch_size_histogram: dict[float, int] = field(default_factory=dict)
+    flush_seconds_histogram: dict[float, int] = field(default_factory=dict)
+    event_latency_histogram: dict[float, int] = field(default_factory=dict)
+
+
+class SimulatedSession:
+    """The subset of Session BatchWriter uses, sleeping like a database would and recording event latencies."""
+
+    def __init__(self, config: FlushBenchConfig):
+        self._config = config
+        self._added: list[datetime] = []
+        self.latencies: list[float] = []
+
+    def execute(self, stmt: Any) -> None:
+        seconds = self._config.statement_seconds
+        if stmt.is_insert:
+            rows = stmt._multi_values[0]
+            seconds += len(rows) * self._config.row_seconds
+            self._added.extend(row[_EVENT_TIME] for row in rows)
+        time.sleep(seconds)
+
+    def commit(self) -> None:
+        time.sleep(self._config.commit_seconds)
+        now = datetime.now(UTC)
+        self.latencies.extend((now - added).total_seconds() for added in self._added)
+        self._added.clear()
+
+    def rollback(self) -> None:
+        self._added.clear()
+
+    def expire_all(self) -> None:
+        pass
+
+
+def _event(added: datetime) -> StopEvent:
+    return StopEvent(
+        agency=Agency.MPK,
+        trip_id="block_1_trip_1",
+        service_date=date(2026, 3, 4),
+        stop_sequence=1,
+        stop_id="stop_1",
+        line_number="52",
+        stop_name="Rondo Mogilskie",
+        stop_desc=None,
+        direction_id=0,
+        headsign="Czerwone Maki",
+        planned_time=added,
+        event_time=added,
+        delay_seconds=60,
+        vehicle_id="v1",
+        license_plate="KR001",
+        detection_method=DetectionMethod.STOPPED_AT,
+        is_estimated=False,
+        static_hash="synthetic",
+        max_stop_sequence=30,
+    )
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _replay(writer: BackgroundBatchWriter, config: FlushBenchConfig) -> int:
+    """Add the events of each phase at its rate, poll by poll. Returns the number of events added."""
+    added = 0
+    for phase in config.phases:
+        started = time.monotonic()
+        added_in_phase = 0
+        while (elapsed := time.monotonic() - started) < phase.seconds:
+            count = int(phase.events_per_second * elapsed) - added_in_phase
+            if count > 0:
+                writer.add_many([_event(datetime.now(UTC))] * count)
+                added_in_phase += count
+            else:
+                writer.flush()
+            time.sleep(config.poll_seconds)
+        added += added_in_phase
+    return added
+
+
+def run_policy_bench(name: str, config: FlushBenchConfig) -> PolicyBenchResult:
+    session = SimulatedSession(config)
+
+    @contextmanager
+    def session_factory() -> Iterator[Session]:
+        yield session  # type: ignore[misc]
+
+    writer = BackgroundBatchWriter(session_factory, stop_event=threading.Event(), policy=POLICIES[name]())
+    writer.start()
+    events = _replay(writer, config)
+    writer.close()
+
+    metrics = writer.metrics()
+    latencies = sorted(session.latencies)
+    event_latency_histogram: dict[float, int] = {}
+    for latency in latencies:
+        _observe(event_latency_histogram, EVENT_LATENCY_BUCKETS, latency)
+    flushes = metrics.flushes or 1
+    return PolicyBenchResult(
+        policy=name,
+        events=events,
+        flushes=metrics.flushes,
+        mean_batch=round(metrics.events_written / flushes, 1),
+        mean_flush_ms=round(metrics.total_flush_seconds / flushes * 1e3, 1),
+        max_flush_ms=round(metrics.max_flush_seconds * 1e3, 1),
+        event_p50_seconds=round(_percentile(latencies, 0.50), 2),
+        event_p99_seconds=round(_percentile(latencies, 0.99), 2),
+        batch_size_histogram=metrics.batch_size_histogram,
+        flush_seconds_histogram=metrics.flush_seconds_histogram,
+        event_latency_histogram=event_latency_histogram,
+    )
+
+
+def _format_histogram(histogram: dict[float, int], buckets: tuple[float, ...]) -> str:
+    return "  ".join(f"<={bound:g}: {histogram.get(bound, 0)}" for bound in (*buckets, float("inf")))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the stop writer flush policies on a traffic profile")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--policy", choices=sorted(POLICIES), action="append", help="Run only this policy")
+    args = parser.parse_args(argv)
+
+    config = PRESETS[args.preset]
+    profile = ", ".join(f"{phase.seconds:g}s at {phase.events_per_second:g}/s" for phase in config.phases)
+    print(f"Traffic: {profile}")
+    for name in args.policy or POLICIES:
+        result = run_policy_bench(name, config)
+        print(
+            f"{name:>10}: {result.events} events in {result.flushes} flushes (mean {result.mean_batch}), "
+            f"flush mean {result.mean_flush_ms}ms max {result.max_flush_ms}ms, "
+            f"event latency p50 {result.event_p50_seconds}s p99 {result.event_p99_seconds}s"
+        )
+        print(f"{'batch size':>20}  {_format_histogram(result.batch_size_histogram, WRITER_BATCH_SIZE_BUCKETS)}")
+        print(
+            f"{'flush seconds':>20}  {_format_histogram(result.flush_seconds_histogram, WRITER_FLUSH_SECONDS_BUCKETS)}"
+        )
+        print(f"{'event latency s':>20}  {_format_histogram(result.event_latency_histogram, EVENT_LATENCY_BUCKETS)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Per-table import benchmark on a synthetic GTFS feed of configurable size.
+
+    python -m benchmarks.importer_bench --preset large            # COPY into the local Postgres (DATABASE_* env)
+    python -m benchmarks.importer_bench --preset city --no-db     # parse and transform only
+
+Writes a feed with write_large_gtfs_zip and imports it the way load_gtfs_zip does, file by file in TABLE_MAPPINGS
+order, in a fresh subprocess so the peak RSS is the import's own. For each table it reports rows, the time spent
+reading and transforming the file, the time left to COPY, rows/s and the peak RSS so far. With a database the rows
+go into staging tables created for the run, in one transaction that is rolled back, so the live tables and any
+staging tables of a running importer are untouched. Without one COPY is replaced by a sink that discards the text.
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from collections.abc import Iterable, Iterator
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from psycopg import sql
+from sqlalchemy.orm import Session
+
+from app.importer.load import GTFS_TABLES, TABLE_MAPPINGS, copy_to_table, transform_to_csv
+from app.importer.staging import create_staging_tables, staging_name
+from app.shared.gtfs.feeds import get_feed_config
+from app.shared.models.enums import Agency
+from benchmarks.synthetic_gtfs import FeedSizeConfig, write_large_gtfs_zip
+
+PRESETS: dict[str, FeedSizeConfig] = {
+    "small": FeedSizeConfig(routes=5, stops_per_trip=10, trips_per_route=20, shape_points_per_stop=3),
+    # Roughly one city agency: 2.1M stop_times
+    "city": FeedSizeConfig(routes=200, stops_per_trip=35, trips_per_route=300),
+    "large": FeedSizeConfig(routes=400, stops_per_trip=40, trips_per_route=625),
+    "huge": FeedSizeConfig(routes=1000, stops_per_trip=50, trips_per_route=600),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class TableResult:
+    table: str
+    rows: int
+    transform_seconds: float
+    copy_seconds: float
+    peak_rss_mib: float
+
+    @property
+    def rows_per_second(self) -> float:
+        total = self.transform_seconds + self.copy_seconds
+        return self.rows / total if total else 0.0
+
+
+class _TimedChunks:
+    """Iterates `chunks`, adding the time spent producing each one to `seconds`."""
+
+    def __init__(self, chunks: Iterable[str]):
+        self._chunks = iter(chunks)
+        self.seconds = 0.0
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            start = time.perf_counter()
+            chunk = next(self._chunks, None)
+            self.seconds += time.perf_counter() - start
+            if chunk is None:
+                return
+            yield chunk
+
+
+def _sink(chunks: Iterable[str]) -> int:
+    return sum(chunk.count("\n") for chunk in chunks)
+
+
+def _peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_import_bench(zip_path: Path, session: Session | None) -> list[TableResult]:
+    """Import `zip_path` table by table, into staging tables through `session` or into a sink when it is None."""
+    feed = get_feed_config(Agency.MPK)
+    agency_id = feed.agency.value
+    if session is not None:
+        create_staging_tables(session, GTFS_TABLES)
+
+    results = []
+    with zipfile.ZipFile(zip_path) as zf:
+        for mapping in TABLE_MAPPINGS:
+            start = time.perf_counter()
+            with zf.open(mapping.gtfs_file) as f:
+                chunks = _TimedChunks(transform_to_csv(f, mapping, agency_id, feed.prefix_id))
+                if session is None:
+                    rows = _sink(chunks)
+                else:
+                    table = sql.Identifier("gtfs_static", staging_name(mapping.table_name))
+                    rows = copy_to_table(session, table, mapping.columns, chunks)
+            elapsed = time.perf_counter() - start
+            results.append(
+                TableResult(mapping.table_name, rows, chunks.seconds, elapsed - chunks.seconds, _peak_rss_mib())
+            )
+    return results
+
+
+def _run_child(zip_path: Path, use_db: bool) -> list[TableResult]:
+    if not use_db:
+        return run_import_bench(zip_path, None)
+
+    from app.platform.db.connection import get_session_factory
+
+    with get_session_factory()() as session:
+        try:
+            return run_import_bench(zip_path, session)
+        finally:
+            session.rollback()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the GTFS static import per table")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="city")
+    parser.add_argument("--trips-per-route", type=int, help="Override the preset to scale stop_times")
+    parser.add_argument("--no-db", action="store_true", help="Parse and transform only, discard the COPY input")
+    parser.add_argument("--zip", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.zip:
+        print(json.dumps([asdict(result) for result in _run_child(args.zip, not args.no_db)]))
+        return 0
+
+    config = PRESETS[args.preset]
+    if args.trips_per_route:
+        config = FeedSizeConfig(
+            config.routes, config.stops_per_trip, args.trips_per_route, config.shape_points_per_stop
+        )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        zip_path = write_large_gtfs_zip(Path(tmp) / "feed.zip", config)
+        print(
+            f"Feed {args.preset}: {config.rows['stop_times.txt']} stop_times, "
+            f"zip {zip_path.stat().st_size / 2**20:.1f} MiB, written in {time.perf_counter() - start:.1f}s"
+        )
+        command = [sys.executable, "-m", "benchmarks.importer_bench", "--zip", str(zip_path)]
+        if args.no_db:
+            command.append("--no-db")
+        out = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+
+    results = [TableResult(**result) for result in json.loads(out)]
+    print(f"{'table':<20}{'rows':>12}{'transform s':>13}{'copy s':>10}{'rows/s':>12}{'peak RSS MiB':>14}")
+    for r in results:
+        print(
+            f"{r.table:<20}{r.rows:>12}{r.transform_seconds:>13.2f}{r.copy_seconds:>10.2f}"
+            f"{r.rows_per_second:>12.0f}{r.peak_rss_mib:>14.1f}"
+        )
+    total_rows = sum(r.rows for r in results)
+    total_seconds = sum(r.transform_seconds + r.copy_seconds for r in results)
+    print(f"{'total':<20}{total_rows:>12}{total_seconds:>23.2f}{total_rows / total_seconds:>12.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Peak memory and time of turning a large stop_times.txt into COPY input.
+
+    python -m benchmarks.importer_load --rows 10000000
+
+Runs the importer's streaming transform (`transform_to_csv`) and, for comparison, the previous buffered loader
+(csv.DictReader rows written into one StringIO for a single COPY write), each in a fresh subprocess so the peak
+RSS is its own. COPY itself is replaced by a sink that discards the text, no database is needed.
+"""
+
+import argparse
+import csv
+import io
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import IO
+
+from app.importer.load import TABLE_MAPPINGS, transform_to_csv
+from app.shared.gtfs.feeds import get_feed_config
+from app.shared.gtfs.timeparse import parse_gtfs_time_to_seconds
+from app.shared.models.enums import Agency
+from benchmarks.synthetic_gtfs import write_stop_times_zip
+
+MODES = ("buffered", "streaming")
+
+
+def _buffered(f: IO[bytes], agency_id: str) -> int:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in csv.DictReader(line.decode("utf-8-sig") for line in f):
+        writer.writerow(
+            [
+                row["trip_id"],
+                row["stop_sequence"],
+                row["stop_id"],
+                agency_id,
+                parse_gtfs_time_to_seconds(row["arrival_time"]),
+                parse_gtfs_time_to_seconds(row["departure_time"]),
+            ]
+        )
+    return len(buf.getvalue())
+
+
+def _streaming(f: IO[bytes], agency_id: str) -> int:
+    mapping = next(m for m in TABLE_MAPPINGS if m.gtfs_file == "stop_times.txt")
+    prefix = get_feed_config(Agency.MPK).prefix_id
+    return sum(len(chunk) for chunk in transform_to_csv(f, mapping, agency_id, prefix))
+
+
+def _run_mode(mode: str, zip_path: Path) -> dict[str, float]:
+    baseline_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    with zipfile.ZipFile(zip_path) as zf, zf.open("stop_times.txt") as f:
+        chars = (_buffered if mode == "buffered" else _streaming)(f, "mpk")
+    elapsed = time.perf_counter() - start
+    peak_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "seconds": round(elapsed, 2),
+        "peak_rss_mib": round(peak_kib / 1024, 1),
+        "growth_mib": round((peak_kib - baseline_kib) / 1024, 1),
+        "copy_chars": chars,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the GTFS stop_times COPY transform")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--zip", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        print(json.dumps(_run_mode(args.mode, args.zip)))
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = write_stop_times_zip(Path(tmp) / "stop_times.zip", args.rows)
+        print(f"stop_times.txt: {args.rows} rows, zip {zip_path.stat().st_size / 2**20:.1f} MiB")
+        for mode in MODES:
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.importer_load", "--mode", mode, "--zip", str(zip_path)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(out)
+            print(
+                f"{mode:>10}: {result['seconds']:>7.2f}s  peak RSS {result['peak_rss_mib']:>8.1f} MiB "
+                f"(+{result['growth_mib']:.1f} MiB)"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+Deterministic synthetic GTFS static feed for benchmarks.
+
+Each route runs back and forth along its own chain of stops. Trips are chained into vehicle blocks (a vehicle
+drives its trips back to back with a layover), which is what the movement generator uses for trip rollover.
+"""
+
+import csv
+import io
+import math
+import random
+import zipfile
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass(frozen=True)
+class GtfsConfig:
+    routes: int = 20
+    stops_per_route: int = 25
+    stop_spacing_seconds: int = 90
+    dwell_seconds: int = 20
+    vehicles_per_route: int = 4
+    trips_per_vehicle: int = 6
+    layover_seconds: int = 300
+    first_departure_seconds: int = 5 * 3600
+    shape_points_per_stop: int = 4
+    seed: int = 1
+
+    @property
+    def trip_seconds(self) -> int:
+        return (self.stops_per_route - 1) * (self.stop_spacing_seconds + self.dwell_seconds)
+
+
+@dataclass(frozen=True)
+class SyntheticStopTime:
+    stop_sequence: int
+    stop_id: str
+    arrival_seconds: int
+    departure_seconds: int
+
+    @property
+    def stop_key(self) -> tuple[str, int]:
+        return self.stop_id, self.stop_sequence
+
+
+@dataclass(frozen=True)
+class SyntheticTrip:
+    trip_id: str
+    route_id: str
+    direction_id: int
+    stop_times: list[SyntheticStopTime]
+
+
+@dataclass(frozen=True)
+class SyntheticBlock:
+    """Trips one vehicle runs back to back."""
+
+    license_plate: str
+    vehicle_id: str
+    trips: list[SyntheticTrip]
+
+
+@dataclass(frozen=True)
+class SyntheticGtfs:
+    config: GtfsConfig
+    stops: dict[str, tuple[float, float]]
+    routes: dict[str, str]
+    blocks: list[SyntheticBlock]
+
+    @property
+    def trips(self) -> list[SyntheticTrip]:
+        return [trip for block in self.blocks for trip in block.trips]
+
+
+def generate_gtfs(config: GtfsConfig) -> SyntheticGtfs:
+    rng = random.Random(config.seed)
+    stops: dict[str, tuple[float, float]] = {}
+    routes: dict[str, str] = {}
+    blocks: list[SyntheticBlock] = []
+
+    for r in range(config.routes):
+        route_id = f"R{r}"
+        routes[route_id] = str(100 + r)
+        heading = rng.uniform(0, 2 * math.pi)
+        lat, lon = 50.06 + rng.uniform(-0.05, 0.05), 19.94 + rng.uniform(-0.08, 0.08)
+        chain = []
+        for s in range(config.stops_per_route):
+            stop_id = f"S{r}_{s}"
+            stops[stop_id] = (lat + 0.004 * s * math.sin(heading), lon + 0.006 * s * math.cos(heading))
+            chain.append(stop_id)
+
+        headway = config.trip_seconds // max(config.vehicles_per_route, 1) + 1
+        for v in range(config.vehicles_per_route):
+            start = config.first_departure_seconds + v * headway
+            trips = []
+            for t in range(config.trips_per_vehicle):
+                direction = t % 2
+                ordered = chain if direction == 0 else chain[::-1]
+                stop_times = []
+                for i, stop_id in enumerate(ordered):
+                    arrival = start + i * (config.stop_spacing_seconds + config.dwell_seconds)
+                    stop_times.append(SyntheticStopTime(i + 1, stop_id, arrival, arrival + config.dwell_seconds))
+                trips.append(SyntheticTrip(f"T{r}_{v}_{t}", route_id, direction, stop_times))
+                start += config.trip_seconds + config.layover_seconds
+            blocks.append(SyntheticBlock(license_plate=f"KR{r:03d}{v:02d}", vehicle_id=f"V{r}_{v}", trips=trips))
+
+    return SyntheticGtfs(config=config, stops=stops, routes=routes, blocks=blocks)
+
+
+def _format_time(seconds: int) -> str:
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def _csv(header: list[str], rows: list[list[object]]) -> str:
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buf.getvalue()
+
+
+def write_gtfs_zip(gtfs: SyntheticGtfs, path: Path) -> Path:
+    """Write the feed with the files and columns the importer reads."""
+    trips = gtfs.trips
+    cfg = gtfs.config
+    shape_rows: list[list[object]] = []
+    for route_id in gtfs.routes:
+        for direction in (0, 1):
+            chain = [stop_id for stop_id in gtfs.stops if stop_id.startswith(f"S{route_id[1:]}_")]
+            if direction:
+                chain.reverse()
+            seq = 0
+            for a, b in zip(chain, chain[1:], strict=False):
+                (lat_a, lon_a), (lat_b, lon_b) = gtfs.stops[a], gtfs.stops[b]
+                for k in range(cfg.shape_points_per_stop):
+                    f = k / cfg.shape_points_per_stop
+                    seq += 1
+                    lat, lon = lat_a + f * (lat_b - lat_a), lon_a + f * (lon_b - lon_a)
+                    shape_rows.append([f"SH{route_id}_{direction}", round(lat, 6), round(lon, 6), seq])
+
+    files = {
+        "routes.txt": _csv(
+            ["route_id", "route_short_name"], [[route_id, name] for route_id, name in gtfs.routes.items()]
+        ),
+        "stops.txt": _csv(
+            ["stop_id", "stop_name", "stop_code", "stop_desc", "stop_lat", "stop_lon"],
+            [[stop_id, f"Stop {stop_id}", "", "", lat, lon] for stop_id, (lat, lon) in gtfs.stops.items()],
+        ),
+        "trips.txt": _csv(
+            ["trip_id", "route_id", "service_id", "direction_id", "trip_headsign", "shape_id"],
+            [
+                [t.trip_id, t.route_id, "WD", t.direction_id, f"To {t.route_id}", f"SH{t.route_id}_{t.direction_id}"]
+                for t in trips
+            ],
+        ),
+        "stop_times.txt": _csv(
+            ["trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence"],
+            [
+                [t.trip_id, _format_time(st.arrival_seconds), _format_time(st.departure_seconds), *st.stop_key]
+                for t in trips
+                for st in t.stop_times
+            ],
+        ),
+        "shapes.txt": _csv(["shape_id", "shape_pt_lat", "shape_pt_lon", "shape_pt_sequence"], shape_rows),
+    }
+
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return path
+
+
+def write_stop_times_zip(path: Path, rows: int, stops_per_trip: int = 40) -> Path:
+    """Write a zip holding only a `rows`-row stop_times.txt, streamed so any size fits in memory."""
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        with zf.open("stop_times.txt", "w") as raw, io.TextIOWrapper(raw, encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(["trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence"])
+            for n in range(rows):
+                trip, seq = divmod(n, stops_per_trip)
+                arrival = 5 * 3600 + trip % 1000 * 60 + seq * 110
+                writer.writerow(
+                    [f"T{trip}", _format_time(arrival), _format_time(arrival + 20), f"S{seq + trip % 50}", seq + 1]
+                )
+    return path
+
+
+@dataclass(frozen=True)
+class FeedSizeConfig:
+    """Size of a feed written by write_large_gtfs_zip: every route runs `trips_per_route` trips over its stops."""
+
+    routes: int = 100
+    stops_per_trip: int = 30
+    trips_per_route: int = 200
+    shape_points_per_stop: int = 10
+
+    @property
+    def rows(self) -> dict[str, int]:
+        return {
+            "routes.txt": self.routes,
+            "stops.txt": self.routes * self.stops_per_trip,
+            "trips.txt": self.routes * self.trips_per_route,
+            "stop_times.txt": self.routes * self.trips_per_route * self.stops_per_trip,
+            "shapes.txt": self.routes * 2 * (self.stops_per_trip - 1) * self.shape_points_per_stop,
+        }
+
+
+def _write_member(zf: zipfile.ZipFile, name: str, header: list[str], rows: Iterator[list[object]]) -> None:
+    with zf.open(name, "w") as raw, io.TextIOWrapper(raw, encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def write_large_gtfs_zip(path: Path, config: FeedSizeConfig) -> Path:
+    """
+    Write a feed of `config`'s size with every file the importer reads. Rows are generated as they are written, so
+    tens of millions of stop_times fit in memory; the layout is regular rather than realistic.
+    """
+    spacing = 110
+
+    def stop_lat_lon(route: int, i: int) -> tuple[float, float]:
+        return 49.95 + route % 100 * 0.002 + i * 0.003, 19.80 + route // 100 * 0.004 + i * 0.001
+
+    def routes() -> Iterator[list[object]]:
+        for r in range(config.routes):
+            yield [f"R{r}", str(100 + r)]
+
+    def stops() -> Iterator[list[object]]:
+        for r in range(config.routes):
+            for i in range(config.stops_per_trip):
+                lat, lon = stop_lat_lon(r, i)
+                yield [f"S{r}_{i}", f"Stop {r}/{i}", "", "", round(lat, 6), round(lon, 6)]
+
+    def trips() -> Iterator[list[object]]:
+        for r in range(config.routes):
+            for t in range(config.trips_per_route):
+                yield [f"T{r}_{t}", f"R{r}", "WD", t % 2, f"To {r}/{t % 2}", f"SH{r}_{t % 2}"]
+
+    def stop_times() -> Iterator[list[object]]:
+        for r in range(config.routes):
+            for t in range(config.trips_per_route):
+                start = 4 * 3600 + t * 300
+                for i in range(config.stops_per_trip):
+                    stop = i if t % 2 == 0 else config.stops_per_trip - 1 - i
+                    arrival = start + i * spacing
+                    yield [f"T{r}_{t}", _format_time(arrival), _format_time(arrival + 20), f"S{r}_{stop}", i + 1]
+
+    def shapes() -> Iterator[list[object]]:
+        for r in range(config.routes):
+            for direction in (0, 1):
+                order = range(config.stops_per_trip) if direction == 0 else range(config.stops_per_trip - 1, -1, -1)
+                chain = [stop_lat_lon(r, i) for i in order]
+                seq = 0
+                for (lat_a, lon_a), (lat_b, lon_b) in zip(chain, chain[1:], strict=False):
+                    for k in range(config.shape_points_per_stop):
+                        f = k / config.shape_points_per_stop
+                        seq += 1
+                        lat, lon = lat_a + f * (lat_b - lat_a), lon_a + f * (lon_b - lon_a)
+                        yield [f"SH{r}_{direction}", round(lat, 6), round(lon, 6), seq]
+
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        _write_member(zf, "routes.txt", ["route_id", "route_short_name"], routes())
+        _write_member(
+            zf, "stops.txt", ["stop_id", "stop_name", "stop_code", "stop_desc", "stop_lat", "stop_lon"], stops()
+        )
+        _write_member(
+            zf,
+            "trips.txt",
+            ["trip_id", "route_id", "service_id", "direction_id", "trip_headsign", "shape_id"],
+            trips(),
+        )
+        _write_member(
+            zf,
+            "stop_times.txt",
+            ["trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence"],
+            stop_times(),
+        )
+        _write_member(zf, "shapes.txt", ["shape_id", "shape_pt_lat", "shape_pt_lon", "shape_pt_sequence"], shapes())
+    return path
@@ -0,0 +1,168 @@
+"""
+Vehicle movement streams over a synthetic GTFS feed.
+
+Every vehicle runs its block with a random per-trip delay and reports a position each poll: STOPPED_AT while
+dwelling at a stop, IN_TRANSIT_TO the next stop otherwise. Skipped stops are never reported as STOPPED_AT, so the
+sequence jumps past them. Trip updates with the predicted arrivals of the remaining stops are emitted every
+`trip_update_interval_seconds`, like the TripUpdates feed rt_poller caches.
+"""
+
+import random
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from app.platform.constants import TIMEZONE
+from app.shared.models.enums import Agency, VehicleStatus
+from app.shared.models.gtfs_realtime import StopTimeUpdate, TripUpdate, VehiclePosition
+from benchmarks.synthetic_gtfs import SyntheticBlock, SyntheticGtfs, SyntheticTrip
+
+
+@dataclass(frozen=True)
+class WorkloadConfig:
+    service_date: date = date(2026, 3, 4)
+    poll_interval_seconds: int = 10
+    trip_update_interval_seconds: int = 30
+    skip_probability: float = 0.1
+    mean_delay_seconds: float = 60.0
+    delay_stddev_seconds: float = 90.0
+    seed: int = 1
+
+
+@dataclass(frozen=True)
+class Tick:
+    """Everything the pipeline receives at one poll."""
+
+    at: datetime
+    trip_updates: list[TripUpdate] = field(default_factory=list)
+    positions: list[VehiclePosition] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class _PlannedTrip:
+    trip: SyntheticTrip
+    delay_seconds: int
+    skipped: frozenset[int]
+
+    @property
+    def start(self) -> int:
+        return self.trip.stop_times[0].arrival_seconds + self.delay_seconds
+
+    @property
+    def end(self) -> int:
+        return self.trip.stop_times[-1].departure_seconds + self.delay_seconds
+
+
+def _plan_block(block: SyntheticBlock, config: WorkloadConfig, rng: random.Random) -> list[_PlannedTrip]:
+    planned = []
+    for trip in block.trips:
+        delay = max(-60, round(rng.gauss(config.mean_delay_seconds, config.delay_stddev_seconds)))
+        # First and last stops are always served
+        skipped = frozenset(st.stop_sequence for st in trip.stop_times[1:-1] if rng.random() < config.skip_probability)
+        planned.append(_PlannedTrip(trip, delay, skipped))
+    return planned
+
+
+def _position_on(planned: _PlannedTrip, seconds: int) -> tuple[int, VehicleStatus]:
+    """Stop sequence and status of a vehicle `seconds` after midnight."""
+    stop_times = planned.trip.stop_times
+    if seconds < planned.start:
+        # Layover at the first stop
+        return stop_times[0].stop_sequence, VehicleStatus.STOPPED_AT
+
+    for i, st in enumerate(stop_times):
+        arrival = st.arrival_seconds + planned.delay_seconds
+        departure = st.departure_seconds + planned.delay_seconds
+        if seconds < arrival:
+            return st.stop_sequence, VehicleStatus.IN_TRANSIT_TO
+        if seconds <= departure:
+            if st.stop_sequence in planned.skipped:
+                return stop_times[i + 1].stop_sequence, VehicleStatus.IN_TRANSIT_TO
+            return st.stop_sequence, VehicleStatus.STOPPED_AT
+    return stop_times[-1].stop_sequence, VehicleStatus.STOPPED_AT
+
+
+class Workload:
+    def __init__(self, gtfs: SyntheticGtfs, config: WorkloadConfig, agency: Agency = Agency.MPK):
+        self._gtfs = gtfs
+        self._config = config
+        self._agency = agency
+        self._midnight = datetime(
+            config.service_date.year, config.service_date.month, config.service_date.day, tzinfo=ZoneInfo(TIMEZONE)
+        )
+
+        rng = random.Random(config.seed)
+        self._blocks = [(block, _plan_block(block, config, rng)) for block in gtfs.blocks]
+
+    @property
+    def vehicles(self) -> int:
+        return len(self._blocks)
+
+    def _at(self, seconds: int) -> datetime:
+        return self._midnight + timedelta(seconds=seconds)
+
+    def _span(self) -> tuple[int, int]:
+        starts = [planned[0].start for _, planned in self._blocks if planned]
+        ends = [planned[-1].end for _, planned in self._blocks if planned]
+        layover = self._gtfs.config.layover_seconds
+        return min(starts) - layover, max(ends) + self._config.poll_interval_seconds
+
+    def _active_trip(self, planned: list[_PlannedTrip], seconds: int) -> _PlannedTrip | None:
+        if not planned or seconds < planned[0].start - self._gtfs.config.layover_seconds:
+            return None
+        for trip in planned:
+            if seconds <= trip.end:
+                return trip
+        return None
+
+    def _trip_update(self, planned: _PlannedTrip, from_seq: int, at: datetime) -> TripUpdate:
+        updates = [
+            StopTimeUpdate(
+                stop_id=st.stop_id,
+                stop_sequence=st.stop_sequence,
+                arrival_time=self._at(st.arrival_seconds + planned.delay_seconds),
+                departure_time=self._at(st.departure_seconds + planned.delay_seconds),
+            )
+            for st in planned.trip.stop_times
+            if st.stop_sequence >= from_seq
+        ]
+        return TripUpdate(
+            agency=self._agency, trip_id=planned.trip.trip_id, vehicle_id=None, timestamp=at, stop_time_updates=updates
+        )
+
+    def ticks(self) -> Iterator[Tick]:
+        first, last = self._span()
+        poll = self._config.poll_interval_seconds
+        tu_every = max(1, self._config.trip_update_interval_seconds // poll)
+        stops = self._gtfs.stops
+
+        for n, seconds in enumerate(range(first, last + 1, poll)):
+            at = self._at(seconds)
+            tick = Tick(at=at)
+            for block, planned in self._blocks:
+                active = self._active_trip(planned, seconds)
+                if active is None:
+                    continue
+
+                seq, status = _position_on(active, seconds)
+                stop_id = active.trip.stop_times[seq - 1].stop_id
+                lat, lon = stops[stop_id]
+                tick.positions.append(
+                    VehiclePosition(
+                        agency=self._agency,
+                        trip_id=active.trip.trip_id,
+                        vehicle_id=block.vehicle_id,
+                        license_plate=block.license_plate,
+                        latitude=lat,
+                        longitude=lon,
+                        bearing=None,
+                        stop_id=stop_id,
+                        stop_sequence=seq,
+                        status=status,
+                        timestamp=at,
+                    )
+                )
+                if n % tu_every == 0:
+                    tick.trip_updates.append(self._trip_update(active, seq, at))
+            yield tick
@@ -0,0 +1,24 @@
+"""grant rt_poller SELECT on gtfs_meta
+
+Revision ID: a1c9e4f2b7d3
+Revises: ee27c44c9359
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = 'a1c9e4f2b7d3'
+down_revision: Union[str, Sequence[str], None] = 'ee27c44c9359'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("GRANT SELECT ON gtfs_static.gtfs_meta TO rt_poller")
+
+
+def downgrade() -> None:
+    op.execute("REVOKE SELECT ON gtfs_static.gtfs_meta FROM rt_poller")
@@ -0,0 +1,36 @@
+"""add gtfs_files with per-file hashes for diff imports
+
+Revision ID: a7f3c2d9e8b1
+Revises: d4b7e1c9a2f6
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = 'a7f3c2d9e8b1'
+down_revision: Union[str, Sequence[str], None] = 'd4b7e1c9a2f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SHA-256 and row count of each file of the last imported feed, and how long its last full load took
+    op.execute("""
+        CREATE TABLE gtfs_static.gtfs_files (
+            agency TEXT NOT NULL,
+            gtfs_file TEXT NOT NULL,
+            sha256 TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            load_seconds DOUBLE PRECISION NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (agency, gtfs_file)
+        )
+    """)
+    op.execute("GRANT SELECT, INSERT, UPDATE, DELETE ON gtfs_static.gtfs_files TO importer")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS gtfs_static.gtfs_files")
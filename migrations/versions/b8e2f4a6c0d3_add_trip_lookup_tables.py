@@ -0,0 +1,85 @@
+"""add trip_summary and trip_stop_index lookup tables derived at import
+
+Revision ID: b8e2f4a6c0d3
+Revises: f3a9d6c1b5e2
+Create Date: 2026-10-19 18:00:00.000000
+
+The importer fills these from current_trips, current_routes and current_stop_times in the
+same transaction as the tables they are derived from, so realtime services read one indexed
+row per trip instead of aggregating stop_times.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = 'b8e2f4a6c0d3'
+down_revision: Union[str, Sequence[str], None] = 'f3a9d6c1b5e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE gtfs_static.trip_summary (
+            trip_id TEXT PRIMARY KEY,
+            agency_id TEXT NOT NULL,
+            route_short_name TEXT NOT NULL,
+            headsign TEXT,
+            shape_id TEXT,
+            max_stop_sequence INTEGER,
+            first_stop_id TEXT,
+            last_stop_id TEXT,
+            first_arrival_seconds INTEGER,
+            last_arrival_seconds INTEGER
+        )
+    """)
+    op.execute("CREATE INDEX idx_trip_summary_agency ON gtfs_static.trip_summary (agency_id)")
+
+    op.execute("""
+        CREATE TABLE gtfs_static.trip_stop_index (
+            trip_id TEXT NOT NULL,
+            stop_id TEXT NOT NULL,
+            agency_id TEXT NOT NULL,
+            stop_sequence INTEGER NOT NULL,
+            PRIMARY KEY (trip_id, stop_id)
+        )
+    """)
+    op.execute("CREATE INDEX idx_trip_stop_index_agency ON gtfs_static.trip_stop_index (agency_id)")
+
+    # Backfill from the current import, the importer keeps them up to date from here on
+    op.execute("""
+        INSERT INTO gtfs_static.trip_summary
+        SELECT t.trip_id, t.agency_id, r.route_short_name, t.headsign, t.shape_id,
+               s.max_stop_sequence, s.first_stop_id, s.last_stop_id, s.first_arrival_seconds, s.last_arrival_seconds
+        FROM gtfs_static.current_trips t
+        JOIN gtfs_static.current_routes r ON r.route_id = t.route_id
+        LEFT JOIN (
+            SELECT trip_id,
+                   max(stop_sequence) AS max_stop_sequence,
+                   (array_agg(stop_id ORDER BY stop_sequence))[1] AS first_stop_id,
+                   (array_agg(stop_id ORDER BY stop_sequence DESC))[1] AS last_stop_id,
+                   (array_agg(arrival_seconds ORDER BY stop_sequence))[1] AS first_arrival_seconds,
+                   (array_agg(arrival_seconds ORDER BY stop_sequence DESC))[1] AS last_arrival_seconds
+            FROM gtfs_static.current_stop_times
+            GROUP BY trip_id
+        ) s ON s.trip_id = t.trip_id
+    """)
+    op.execute("""
+        INSERT INTO gtfs_static.trip_stop_index
+        SELECT trip_id, stop_id, agency_id, max(stop_sequence)
+        FROM gtfs_static.current_stop_times
+        GROUP BY trip_id, stop_id, agency_id
+    """)
+
+    # Replaces current_stop_times reads: max_stop_sequence for the writer, trip info for the API,
+    # stop_id -> stop_sequence maps for the RT poller
+    op.execute("GRANT SELECT ON gtfs_static.trip_summary TO api_reader, writer")
+    op.execute("GRANT SELECT ON gtfs_static.trip_stop_index TO rt_poller")
+    for table in ("trip_summary", "trip_stop_index"):
+        op.execute(f"ALTER TABLE gtfs_static.{table} OWNER TO importer")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS gtfs_static.staging_trip_summary, gtfs_static.staging_trip_stop_index")
+    op.execute("DROP TABLE gtfs_static.trip_summary, gtfs_static.trip_stop_index")
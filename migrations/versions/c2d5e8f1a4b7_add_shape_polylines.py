@@ -0,0 +1,44 @@
+"""add shape_polylines with shapes simplified and encoded at import
+
+Revision ID: c2d5e8f1a4b7
+Revises: b8e2f4a6c0d3
+Create Date: 2026-10-19 19:00:00.000000
+
+Filled by the importer from current_shapes; simplification runs in Python, so instead of a
+backfill here the recorded feed hashes are cleared and the next import cycle reloads every
+feed in full.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = 'c2d5e8f1a4b7'
+down_revision: Union[str, Sequence[str], None] = 'b8e2f4a6c0d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE gtfs_static.shape_polylines (
+            shape_id TEXT NOT NULL,
+            resolution TEXT NOT NULL,
+            agency_id TEXT NOT NULL,
+            point_count INTEGER NOT NULL,
+            polyline TEXT NOT NULL,
+            sequences INTEGER[] NOT NULL,
+            PRIMARY KEY (shape_id, resolution)
+        )
+    """)
+    op.execute("CREATE INDEX idx_shape_polylines_agency ON gtfs_static.shape_polylines (agency_id)")
+    op.execute("GRANT SELECT ON gtfs_static.shape_polylines TO api_reader")
+    op.execute("ALTER TABLE gtfs_static.shape_polylines OWNER TO importer")
+
+    op.execute("UPDATE gtfs_static.gtfs_meta SET current_hash = '', etag = NULL, last_modified = NULL")
+    op.execute("DELETE FROM gtfs_static.gtfs_files")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS gtfs_static.staging_shape_polylines")
+    op.execute("DROP TABLE gtfs_static.shape_polylines")
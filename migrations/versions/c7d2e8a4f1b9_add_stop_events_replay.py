@@ -0,0 +1,34 @@
+"""add stop_events_replay shadow table
+
+Revision ID: c7d2e8a4f1b9
+Revises: a1c9e4f2b7d3
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = 'c7d2e8a4f1b9'
+down_revision: Union[str, Sequence[str], None] = 'a1c9e4f2b7d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Same columns as events.stop_events, unpartitioned; filled by the stop_writer replay CLI
+    op.execute("""
+        CREATE TABLE events.stop_events_replay (
+            LIKE events.stop_events INCLUDING DEFAULTS INCLUDING IDENTITY,
+            PRIMARY KEY (id),
+            UNIQUE (trip_id, service_date, stop_sequence)
+        )
+    """)
+    op.execute("CREATE INDEX idx_stop_events_replay_service_date ON events.stop_events_replay (service_date)")
+    op.execute("GRANT SELECT, INSERT, DELETE ON events.stop_events_replay TO writer")
+    op.execute("GRANT SELECT ON events.stop_events_replay TO api_reader")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS events.stop_events_replay")
@@ -0,0 +1,33 @@
+"""importer owns gtfs_static current tables for blue/green reloads
+
+Revision ID: d4b7e1c9a2f6
+Revises: c7d2e8a4f1b9
+Create Date: 2026-10-19 14:00:00.000000
+
+The importer builds each GTFS reload in staging tables and swaps them in place of the
+current_* tables, so it needs CREATE on the schema and ownership of the tables it drops.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = 'd4b7e1c9a2f6'
+down_revision: Union[str, Sequence[str], None] = 'c7d2e8a4f1b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ["current_routes", "current_stops", "current_trips", "current_stop_times", "current_shapes"]
+
+
+def upgrade() -> None:
+    op.execute("GRANT CREATE ON SCHEMA gtfs_static TO importer")
+    for table in TABLES:
+        op.execute(f"ALTER TABLE gtfs_static.{table} OWNER TO importer")
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f"DROP TABLE IF EXISTS gtfs_static.staging_{table}")
+        op.execute(f"ALTER TABLE gtfs_static.{table} OWNER TO CURRENT_USER")
+    op.execute("REVOKE CREATE ON SCHEMA gtfs_static FROM importer")
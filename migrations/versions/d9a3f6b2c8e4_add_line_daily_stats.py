@@ -0,0 +1,87 @@
+"""add line_daily_stats rollups of stop_events
+
+Revision ID: d9a3f6b2c8e4
+Revises: c2d5e8f1a4b7
+Create Date: 2026-10-19 21:00:00.000000
+
+One row per line, service day and detection class, so the punctuality, trend and trip count
+statistics read a row per day instead of the day's stop events. The stop_writer rolls up
+each service day once it is closed and again whenever a flush adds events to a rolled up
+day; line_daily_stats_days records which days are complete.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = 'd9a3f6b2c8e4'
+down_revision: Union[str, Sequence[str], None] = 'c2d5e8f1a4b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # includes_estimated = false aggregates detection_method 1 only, true every detection method.
+    # The counts, sum, min and max are over the events the statistics use: stop_sequence in
+    # (1, max_stop_sequence) and delay_seconds >= -90 (MIN_DELAY_SECONDS); trips_total counts
+    # every trip of the line that day.
+    op.execute("""
+        CREATE TABLE events.line_daily_stats (
+            line_number TEXT NOT NULL,
+            service_date DATE NOT NULL,
+            includes_estimated BOOLEAN NOT NULL,
+            stop_count INTEGER NOT NULL,
+            on_time_count INTEGER NOT NULL,
+            slightly_delayed_count INTEGER NOT NULL,
+            delayed_count INTEGER NOT NULL,
+            delay_sum BIGINT NOT NULL,
+            delay_min INTEGER,
+            delay_max INTEGER,
+            trips_count INTEGER NOT NULL,
+            trips_total INTEGER NOT NULL,
+            PRIMARY KEY (line_number, service_date, includes_estimated)
+        )
+    """)
+    op.execute("""
+        CREATE TABLE events.line_daily_stats_days (
+            service_date DATE PRIMARY KEY,
+            stale BOOLEAN NOT NULL DEFAULT false,
+            rolled_up_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+
+    # Backfill every day that is certainly closed, the stop_writer rolls up later days itself
+    op.execute("""
+        INSERT INTO events.line_daily_stats
+        SELECT e.line_number, e.service_date, c.includes_estimated,
+               count(*) FILTER (WHERE q.ok),
+               count(*) FILTER (WHERE q.ok AND e.delay_seconds <= 120),
+               count(*) FILTER (WHERE q.ok AND e.delay_seconds > 120 AND e.delay_seconds <= 360),
+               count(*) FILTER (WHERE q.ok AND e.delay_seconds > 360),
+               coalesce(sum(e.delay_seconds) FILTER (WHERE q.ok), 0),
+               min(e.delay_seconds) FILTER (WHERE q.ok),
+               max(e.delay_seconds) FILTER (WHERE q.ok),
+               count(DISTINCT e.trip_id) FILTER (WHERE q.ok),
+               count(DISTINCT e.trip_id)
+        FROM events.stop_events e
+        CROSS JOIN (VALUES (false), (true)) c(includes_estimated)
+        CROSS JOIN LATERAL (
+            SELECT e.stop_sequence > 1 AND e.stop_sequence < e.max_stop_sequence AND e.delay_seconds >= -90
+                   AND (c.includes_estimated OR e.detection_method = 1) AS ok
+        ) q
+        WHERE e.service_date < current_date - 1
+        GROUP BY e.line_number, e.service_date, c.includes_estimated
+    """)
+    op.execute("""
+        INSERT INTO events.line_daily_stats_days (service_date)
+        SELECT DISTINCT service_date FROM events.line_daily_stats
+    """)
+
+    # The writer rolls up days and marks the ones its flushes touch as stale
+    op.execute("GRANT SELECT, INSERT, UPDATE, DELETE ON events.line_daily_stats, events.line_daily_stats_days TO writer")
+    op.execute("GRANT SELECT ON events.line_daily_stats, events.line_daily_stats_days TO api_reader")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS events.line_daily_stats_days")
+    op.execute("DROP TABLE IF EXISTS events.line_daily_stats")
@@ -0,0 +1,25 @@
+"""add HTTP validators to gtfs_meta for conditional downloads
+
+Revision ID: f3a9d6c1b5e2
+Revises: a7f3c2d9e8b1
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = 'f3a9d6c1b5e2'
+down_revision: Union[str, Sequence[str], None] = 'a7f3c2d9e8b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ETag and Last-Modified of the download current_hash was imported from
+    op.execute("ALTER TABLE gtfs_static.gtfs_meta ADD COLUMN etag TEXT, ADD COLUMN last_modified TEXT")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE gtfs_static.gtfs_meta DROP COLUMN etag, DROP COLUMN last_modified")
@@ -0,0 +1,18 @@
+from collections import Counter
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.api import cache, popularity
+from app.api.constants import L1_CACHE_MAX_BYTES
+from app.api.local_cache import LocalCache
+
+
+@pytest.fixture(autouse=True)
+def empty_local_cache(mocker: MockerFixture) -> LocalCache:
+    """A fresh in-process L1, tier and request counters for each test, so nothing cached by another is served."""
+    local = LocalCache(L1_CACHE_MAX_BYTES)
+    mocker.patch.object(cache, "_local", local)
+    mocker.patch.object(cache, "_tiers", cache.CacheTierMetrics())
+    mocker.patch.object(popularity, "_counts", Counter())
+    return local
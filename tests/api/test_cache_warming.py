@@ -0,0 +1,187 @@
+import asyncio
+from datetime import date
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.api import cache, popularity, single_flight, warmer
+from app.api.constants import REDIS_KEY_STATS_WARM_LOCK
+from app.api.popularity import StatsCombination
+from app.api.response import encode_body
+from app.api.schemas import TrendResponse
+from app.api.warmer import CacheWarmer
+from app.shared.models.enums import CacheInvalidationReason
+from app.shared.redis.schemas import CacheInvalidationMessage
+
+pytestmark = pytest.mark.anyio
+
+TODAY = date(2026, 3, 20)
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis"):
+        self._redis = redis
+
+    async def __aenter__(self) -> "FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
+
+    def zincrby(self, key: str, amount: float, member: str) -> None:
+        scores = self._redis.sorted_sets.setdefault(key, {})
+        scores[member.encode()] = scores.get(member.encode(), 0) + amount
+
+    def expire(self, key: str, seconds: int) -> None:
+        self._redis.ttls[key] = seconds
+
+    async def execute(self) -> None:
+        return None
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.data: dict[str, bytes] = {}
+        self.ttls: dict[str, int] = {}
+        self.leases: dict[str, str] = {}
+        self.sorted_sets: dict[str, dict[bytes, float]] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        return self.data.get(key)
+
+    async def setex(self, key: str, ttl: int, value: bytes) -> None:
+        self.data[key] = value
+        self.ttls[key] = ttl
+
+    async def set(self, key: str, value: str, nx: bool = False, px: int | None = None) -> bool:
+        if nx and key in self.leases:
+            return False
+        self.leases[key] = value
+        return True
+
+    async def eval(self, script: str, numkeys: int, key: str, token: str) -> int:
+        if self.leases.get(key) != token:
+            return 0
+        del self.leases[key]
+        return 1
+
+    async def zunion(self, keys: list[str], withscores: bool = False) -> list[tuple[bytes, float]]:
+        union: dict[bytes, float] = {}
+        for key in keys:
+            for member, score in self.sorted_sets.get(key, {}).items():
+                union[member] = union.get(member, 0) + score
+        return sorted(union.items(), key=lambda item: item[1])
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+
+@pytest.fixture
+def redis(mocker: MockerFixture) -> FakeRedis:
+    fake = FakeRedis()
+    for module in (cache, single_flight, popularity, warmer):
+        mocker.patch.object(module, "get_async_client", return_value=fake)
+    mocker.patch.object(popularity, "today", return_value=TODAY)
+    return fake
+
+
+def test_ranges_ending_recently_count_as_presets_relative_to_today():
+    week = StatsCombination.of("trend", "52", date(2026, 3, 14), TODAY, False, TODAY)
+
+    assert week == StatsCombination("trend", "52", 7, 0, False)
+    assert week.dates(date(2026, 3, 21)) == (date(2026, 3, 15), date(2026, 3, 21))
+    assert StatsCombination.from_member(week.member()) == week
+    assert StatsCombination.of("trend", "52", date(2026, 3, 1), date(2026, 3, 10), False, TODAY) is None
+
+
+async def test_counts_of_every_day_in_the_window_add_up(redis: FakeRedis):
+    for _ in range(3):
+        popularity.record("trend", "52", date(2026, 3, 14), TODAY, False)
+    popularity.record("punctuality", "194", date(2026, 3, 19), date(2026, 3, 19), True)
+    popularity.record("trend", "52", date(2026, 1, 1), date(2026, 1, 31), False)
+    await popularity.flush()
+    redis.sorted_sets["popularity:stats:2026-03-18"] = {b"punctuality|194|1|1|1": 5, b"not a member": 100}
+
+    most_requested = await popularity.most_requested(limit=2)
+
+    assert redis.sorted_sets["popularity:stats:2026-03-20"] == {
+        b"trend|52|7|0|0": 3,
+        b"punctuality|194|1|1|1": 1,
+    }
+    assert most_requested == [StatsCombination("punctuality", "194", 1, 1, True)]
+
+
+async def test_warm_up_stays_within_the_database_budget_and_reports_coverage(redis: FakeRedis):
+    redis.sorted_sets["popularity:stats:2026-03-20"] = {
+        f"trend|{line}|7|0|0".encode(): float(line) for line in range(1, 13)
+    }
+    running: list[int] = []
+    most_running = 0
+
+    async def warm(combination: StatsCombination, today: date) -> bool:
+        nonlocal most_running
+        running.append(1)
+        most_running = max(most_running, len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+        if combination.line_number == "3":
+            raise RuntimeError("statement timeout")
+        return int(combination.line_number) % 2 == 0
+
+    report = await CacheWarmer(top_n=10, db_concurrency=3, warm=warm).run_once("startup")
+
+    assert report is not None
+    assert most_running == 3
+    # Lines 3 to 12, the even ones computed and line 3 failing
+    assert (report.combinations, report.warmed, report.already_fresh, report.failed) == (10, 5, 4, 1)
+    assert report.coverage == 0.9
+    assert redis.leases == {}
+
+
+async def test_only_the_worker_holding_the_lock_warms(redis: FakeRedis):
+    redis.leases[REDIS_KEY_STATS_WARM_LOCK] = "another worker"
+    warmed: list[StatsCombination] = []
+
+    async def warm(combination: StatsCombination, today: date) -> bool:
+        warmed.append(combination)
+        return True
+
+    assert await CacheWarmer(warm=warm).run_once("startup") is None
+    assert warmed == []
+
+
+async def test_closed_day_triggers_one_warm_up(redis: FakeRedis):
+    redis.sorted_sets["popularity:stats:2026-03-20"] = {b"trend|52|7|0|0": 1}
+    warmed: list[date] = []
+
+    async def warm(combination: StatsCombination, today: date) -> bool:
+        warmed.append(today)
+        return True
+
+    cache_warmer = CacheWarmer(delay_seconds=0.01, warm=warm)
+    cache_warmer.on_invalidation(CacheInvalidationMessage(CacheInvalidationReason.GTFS_RELOADED))
+    for _ in range(3):
+        cache_warmer.on_invalidation(CacheInvalidationMessage(CacheInvalidationReason.DAY_CLOSED, TODAY))
+    await asyncio.sleep(0.05)
+    await cache_warmer.close()
+
+    assert warmed == [TODAY]
+
+
+async def test_fresh_entries_are_not_recomputed(redis: FakeRedis):
+    computed: list[str] = []
+
+    async def compute() -> TrendResponse:
+        computed.append("trend")
+        return TrendResponse(line_number="52", start_date="2026-03-14", end_date="2026-03-20", days=[])
+
+    assert await cache.warm_stats("trend", "52", date(2026, 3, 14), TODAY, False, compute)
+    assert not await cache.warm_stats("trend", "52", date(2026, 3, 14), TODAY, False, compute)
+    assert computed == ["trend"]
+    cached = await cache.get_cached("trend", "52", date(2026, 3, 14), TODAY)
+    assert cached is not None and cached.body == encode_body(await compute())
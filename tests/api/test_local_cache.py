@@ -0,0 +1,58 @@
+from app.api.local_cache import LocalCache
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_after_their_ttl():
+    clock = Clock()
+    local = LocalCache(max_bytes=1024, clock=clock)
+    local.set("short", b"a", ttl=1)
+    local.set("long", b"b", ttl=10)
+
+    clock.now = 5
+
+    assert local.get("short") is None
+    assert local.get("long") == b"b"
+    assert len(local) == 1
+
+
+def test_least_recently_used_entries_are_evicted_past_the_size_limit():
+    local = LocalCache(max_bytes=30)
+    local.set("a", b"x" * 9, ttl=60)
+    local.set("b", b"x" * 9, ttl=60)
+    local.set("c", b"x" * 9, ttl=60)
+    local.get("a")
+
+    local.set("d", b"x" * 9, ttl=60)
+
+    assert local.get("b") is None
+    assert [key for key in "acd" if local.get(key) is not None] == ["a", "c", "d"]
+    assert local.size == 30
+
+
+def test_entries_larger_than_the_cache_or_without_ttl_are_not_kept():
+    local = LocalCache(max_bytes=10)
+    local.set("big", b"x" * 10, ttl=60)
+    local.set("key", b"old", ttl=60)
+    local.set("key", b"new", ttl=0)
+
+    assert len(local) == 0
+    assert local.size == 0
+
+
+def test_invalidate_drops_keys_by_prefix():
+    local = LocalCache(max_bytes=1024)
+    local.set("stats:trend:52", b"a", ttl=60)
+    local.set("stats:punctuality:52", b"b", ttl=60)
+    local.set("cache:vehicles:positions", b"c", ttl=60)
+
+    assert local.invalidate("stats:") == 2
+    assert local.get("cache:vehicles:positions") == b"c"
+    assert local.invalidate() == 1
+    assert local.size == 0
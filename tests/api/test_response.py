@@ -0,0 +1,58 @@
+import msgspec
+from starlette.requests import Request
+
+from app.api.response import EncodedBody, encode_body, encoded_response
+from app.api.schemas import TrendDay, TrendResponse
+
+
+def _request(**headers: str) -> Request:
+    raw = [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def _body(days: int) -> EncodedBody:
+    trend = [TrendDay(date="2026-03-01", avg_delay_seconds=61.5, trips_count=120)] * days
+    return encode_body(TrendResponse(line_number="52", start_date="2026-03-01", end_date="2026-03-31", days=trend))
+
+
+def test_large_bodies_keep_compressed_variants_of_the_same_content():
+    body = _body(30)
+
+    assert body.gzip is not None and body.br is not None
+    assert len(body.br) < len(body.identity)
+    assert msgspec.json.decode(body.identity)["line_number"] == "52"
+    assert body.etag.startswith('W/"')
+    assert _body(30).etag == body.etag != _body(29).etag
+
+
+def test_small_bodies_are_not_compressed():
+    body = _body(0)
+
+    assert body.gzip is None and body.br is None
+    assert encoded_response(_request(accept_encoding="br, gzip"), body).headers.get("content-encoding") is None
+
+
+def test_variant_follows_accept_encoding_preferences():
+    body = _body(30)
+
+    def encoding(accept: str) -> str | None:
+        return encoded_response(_request(accept_encoding=accept), body).headers.get("content-encoding")
+
+    assert encoding("gzip, deflate, br") == "br"
+    assert encoding("gzip;q=1.0, br;q=0.5") == "gzip"
+    assert encoding("br;q=0, gzip") == "gzip"
+    assert encoding("*") == "br"
+    assert encoding("deflate") is None
+    assert encoding("") is None
+
+
+def test_matching_if_none_match_is_not_modified():
+    body = _body(30)
+
+    for if_none_match in (body.etag, body.etag.removeprefix("W/"), f'"other", {body.etag}', "*"):
+        response = encoded_response(_request(if_none_match=if_none_match), body)
+        assert response.status_code == 304
+        assert response.body == b""
+        assert response.headers["etag"] == body.etag
+
+    assert encoded_response(_request(if_none_match='"other"'), body).status_code == 200
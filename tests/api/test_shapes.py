@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import msgspec
+import pytest
+
+from app.api import cache
+from app.api.local_cache import LocalCache
+from app.api.schemas import ShapePolylineResponse, ShapeResponse
+from app.api.services.shapes_service import ShapesService
+from app.shared.exceptions import ResourceNotFoundError
+from app.shared.gtfs.polyline import encode_polyline
+from app.shared.models.enums import CacheInvalidationReason, ShapeFormat, ShapeResolution
+from app.shared.redis.schemas import CacheInvalidationMessage
+
+pytestmark = pytest.mark.anyio
+
+POLYLINE = encode_polyline([50.06143, 50.06201, 50.06288], [19.93658, 19.93712, 19.93801])
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+class FakeStaticRepository:
+    def __init__(self) -> None:
+        self.lookups: list[tuple[str, str]] = []
+
+    async def get_shape_polyline(self, shape_id: str, resolution: str) -> SimpleNamespace | None:
+        self.lookups.append((shape_id, resolution))
+        if shape_id != "sh1":
+            return None
+        return SimpleNamespace(point_count=3, polyline=POLYLINE, sequences=[1, 2, 5])
+
+
+async def test_full_shape_is_decoded_from_its_precomputed_polyline_once():
+    repo = FakeStaticRepository()
+    service = ShapesService(repo)  # type: ignore[arg-type]
+
+    first = await service.get_shape("sh1")
+    second = await service.get_shape("sh1")
+
+    assert repo.lookups == [("sh1", ShapeResolution.FULL)]
+    assert second == first
+    response = msgspec.json.decode(first.identity, type=ShapeResponse)
+    assert [(p.latitude, p.longitude, p.sequence) for p in response.points] == [
+        (50.06143, 19.93658, 1),
+        (50.06201, 19.93712, 2),
+        (50.06288, 19.93801, 5),
+    ]
+
+
+async def test_polyline_format_serves_the_stored_polyline():
+    service = ShapesService(FakeStaticRepository())  # type: ignore[arg-type]
+
+    body = await service.get_shape("sh1", ShapeResolution.LOW, ShapeFormat.POLYLINE)
+
+    assert msgspec.json.decode(body.identity, type=ShapePolylineResponse).polyline == POLYLINE
+
+
+async def test_missing_shape_is_not_cached(empty_local_cache: LocalCache):
+    service = ShapesService(FakeStaticRepository())  # type: ignore[arg-type]
+
+    with pytest.raises(ResourceNotFoundError):
+        await service.get_shape("missing")
+
+    assert len(empty_local_cache) == 0
+
+
+async def test_gtfs_reload_drops_cached_shapes():
+    repo = FakeStaticRepository()
+    service = ShapesService(repo)  # type: ignore[arg-type]
+
+    await service.get_shape("sh1")
+    cache._invalidate(CacheInvalidationMessage(CacheInvalidationReason.GTFS_RELOADED))
+    await service.get_shape("sh1")
+
+    assert len(repo.lookups) == 2
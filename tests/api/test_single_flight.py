@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+import redis
+from pytest_mock import MockerFixture
+
+from app.api import single_flight
+from app.api.single_flight import SingleFlight
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+class FakeRedis:
+    """The lease commands and one cache entry, shared by the workers of a test."""
+
+    def __init__(self) -> None:
+        self.cached: str | None = None
+        self.leases: dict[str, str] = {}
+
+    async def set(self, key: str, value: str, nx: bool = False, px: int | None = None) -> bool:
+        if nx and key in self.leases:
+            return False
+        self.leases[key] = value
+        return True
+
+    async def eval(self, script: str, numkeys: int, key: str, token: str) -> int:
+        if self.leases.get(key) != token:
+            return 0
+        del self.leases[key]
+        return 1
+
+
+@pytest.fixture
+def fake_redis(mocker: MockerFixture) -> FakeRedis:
+    fake = FakeRedis()
+    mocker.patch.object(single_flight, "get_async_client", return_value=fake)
+    return fake
+
+
+def _worker(fake: FakeRedis, computed: list[str], delay: float = 0.05, wait_seconds: float = 1.0):
+    flight = SingleFlight(wait_seconds=wait_seconds, poll_seconds=0.01)
+
+    async def load() -> str | None:
+        return fake.cached
+
+    async def compute() -> str:
+        await asyncio.sleep(delay)
+        computed.append("value")
+        fake.cached = "value"
+        return "value"
+
+    return flight, load, compute
+
+
+async def test_concurrent_requests_in_a_worker_share_one_computation(fake_redis: FakeRedis):
+    computed: list[str] = []
+    flight, load, compute = _worker(fake_redis, computed)
+
+    results = await asyncio.gather(*(flight.run("stats:key", load, compute) for _ in range(20)))
+
+    assert results == ["value"] * 20
+    assert computed == ["value"]
+    assert flight.metrics().coalesced == 19
+    assert flight.metrics().duplicates_avoided == 19
+    assert fake_redis.leases == {}
+
+
+async def test_other_workers_wait_for_the_lease_holder(fake_redis: FakeRedis):
+    computed: list[str] = []
+    workers = [_worker(fake_redis, computed) for _ in range(3)]
+
+    results = await asyncio.gather(*(flight.run("stats:key", load, compute) for flight, load, compute in workers))
+
+    assert results == ["value"] * 3
+    assert computed == ["value"]
+    assert sum(flight.metrics().lease_waits for flight, _, _ in workers) == 2
+
+
+async def test_computes_itself_when_the_lease_holder_takes_too_long(fake_redis: FakeRedis):
+    fake_redis.leases["lease:stats:key"] = "another worker"
+    computed: list[str] = []
+    flight, load, compute = _worker(fake_redis, computed, wait_seconds=0.05)
+
+    assert await flight.run("stats:key", load, compute) == "value"
+    assert computed == ["value"]
+    assert flight.metrics().lease_timeouts == 1
+
+
+async def test_computes_without_redis(fake_redis: FakeRedis, mocker: MockerFixture):
+    mocker.patch.object(fake_redis, "set", side_effect=redis.ConnectionError)
+    computed: list[str] = []
+    flight, load, compute = _worker(fake_redis, computed)
+
+    assert await flight.run("stats:key", load, compute) == "value"
+    assert flight.metrics().computed == 1
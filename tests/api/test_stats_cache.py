@@ -0,0 +1,243 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from datetime import date
+
+import msgspec
+import pytest
+from pytest_mock import MockerFixture
+
+from app.api import cache, single_flight
+from app.api.constants import DEFAULT_TTL, REDIS_KEY_VEHICLES_CACHE, STATS_STALE_TTL
+from app.api.local_cache import LocalCache
+from app.api.response import encode_body
+from app.api.schemas import TrendResponse
+from app.api.single_flight import SingleFlight
+from app.shared.models.enums import CacheInvalidationReason
+from app.shared.redis import serializer
+from app.shared.redis.constants import CACHE_INVALIDATION_CHANNEL
+from app.shared.redis.schemas import CacheInvalidationMessage
+
+pytestmark = pytest.mark.anyio
+
+DAY = date(2026, 3, 20)
+KEY = "stats:trend:52:2026-03-20:2026-03-20"
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+class FakePubSub:
+    def __init__(self, redis: "FakeRedis") -> None:
+        self._redis = redis
+
+    async def subscribe(self, channel: str) -> None:
+        self._redis.subscribed.append(channel)
+
+    async def listen(self) -> AsyncIterator[dict[str, object]]:
+        yield {"type": "subscribe", "data": 1}
+        while True:
+            yield {"type": "message", "data": await self._redis.published.get()}
+
+    async def aclose(self) -> None:
+        pass
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.data: dict[str, bytes] = {}
+        self.ttls: dict[str, int] = {}
+        self.leases: dict[str, str] = {}
+        self.reads = 0
+        self.published: asyncio.Queue[bytes] = asyncio.Queue()
+        self.subscribed: list[str] = []
+
+    async def get(self, key: str) -> bytes | None:
+        self.reads += 1
+        return self.data.get(key)
+
+    def pubsub(self) -> FakePubSub:
+        return FakePubSub(self)
+
+    async def setex(self, key: str, ttl: int, value: bytes) -> None:
+        self.data[key] = value
+        self.ttls[key] = ttl
+
+    async def set(self, key: str, value: str, nx: bool = False, px: int | None = None) -> bool:
+        if nx and key in self.leases:
+            return False
+        self.leases[key] = value
+        return True
+
+    async def eval(self, script: str, numkeys: int, key: str, token: str) -> int:
+        if self.leases.get(key) != token:
+            return 0
+        del self.leases[key]
+        return 1
+
+
+@pytest.fixture
+def redis(mocker: MockerFixture) -> FakeRedis:
+    fake = FakeRedis()
+    mocker.patch.object(cache, "get_async_client", return_value=fake)
+    mocker.patch.object(single_flight, "get_async_client", return_value=fake)
+    mocker.patch.object(cache, "_flights", SingleFlight())
+    return fake
+
+
+def _response(label: str) -> TrendResponse:
+    return TrendResponse(line_number="52", start_date=label, end_date=str(DAY), days=[])
+
+
+def _store(redis: FakeRedis, label: str, fresh_for: float) -> None:
+    entry = cache._StatsEntry(time.time() + fresh_for, encode_body(_response(label)))
+    redis.data[KEY] = msgspec.msgpack.encode(entry)
+
+
+class Computations:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.computed = asyncio.Event()
+        self.count = 0
+        self._delay = delay
+
+    async def compute(self) -> TrendResponse:
+        await asyncio.sleep(self._delay)
+        self.count += 1
+        self.computed.set()
+        return _response("computed")
+
+
+async def _get(computations: Computations) -> TrendResponse:
+    body = await cache.get_or_compute_stats("trend", "52", DAY, DAY, False, computations.compute)
+    return msgspec.json.decode(body.identity, type=TrendResponse)
+
+
+async def test_missing_entry_is_computed_in_line_and_kept_past_its_ttl(redis: FakeRedis):
+    computations = Computations()
+
+    assert (await _get(computations)).start_date == "computed"
+    assert computations.count == 1
+    assert redis.ttls[KEY] == DEFAULT_TTL + STATS_STALE_TTL
+
+    cached = await cache.get_cached("trend", "52", DAY, DAY)
+    assert cached is not None and not cached.stale
+
+
+async def test_fresh_entry_is_served_without_computing(redis: FakeRedis):
+    _store(redis, "cached", fresh_for=60)
+    computations = Computations()
+
+    assert (await _get(computations)).start_date == "cached"
+    await asyncio.sleep(0)
+    assert computations.count == 0
+
+
+async def test_stale_entry_is_served_at_once_and_refreshed_once_in_the_background(redis: FakeRedis):
+    _store(redis, "stale", fresh_for=-1)
+    computations = Computations(delay=0.02)
+
+    results = await asyncio.gather(*(_get(computations) for _ in range(10)))
+
+    assert [result.start_date for result in results] == ["stale"] * 10
+    await asyncio.wait_for(computations.computed.wait(), timeout=1)
+    await asyncio.sleep(0.01)
+    assert computations.count == 1
+    assert (await _get(computations)).start_date == "computed"
+    assert redis.leases == {}
+
+
+async def test_stale_entry_is_not_refreshed_while_another_worker_holds_the_lease(redis: FakeRedis):
+    _store(redis, "stale", fresh_for=-1)
+    redis.leases[f"lease:{KEY}"] = "another worker"
+    computations = Computations()
+
+    assert (await _get(computations)).start_date == "stale"
+    await asyncio.sleep(0.01)
+    assert computations.count == 0
+
+
+async def test_failed_refresh_keeps_serving_the_stale_entry(redis: FakeRedis):
+    _store(redis, "stale", fresh_for=-1)
+    computations = Computations()
+
+    async def failing_compute() -> TrendResponse:
+        raise RuntimeError("database down")
+
+    computations.compute = failing_compute  # type: ignore[method-assign]
+
+    assert (await _get(computations)).start_date == "stale"
+    await asyncio.sleep(0.01)
+    assert (await _get(computations)).start_date == "stale"
+    assert redis.leases == {}
+
+
+async def test_entry_in_an_earlier_format_is_recomputed(redis: FakeRedis):
+    redis.data[KEY] = msgspec.json.encode(_response("old format"))
+    computations = Computations()
+
+    assert (await _get(computations)).start_date == "computed"
+    assert computations.count == 1
+
+
+async def test_fresh_entry_is_served_from_memory_after_the_first_read(redis: FakeRedis):
+    _store(redis, "cached", fresh_for=60)
+    computations = Computations()
+
+    for _ in range(5):
+        assert (await _get(computations)).start_date == "cached"
+
+    assert redis.reads == 1
+    metrics = cache.cache_tier_metrics()
+    assert (metrics.l1_hits, metrics.l1_misses, metrics.l2_hits) == (4, 1, 1)
+    assert metrics.l1_hit_ratio == 0.8
+    assert metrics.l1_entries == 1
+
+
+async def test_stale_entry_is_read_from_redis_every_time(redis: FakeRedis):
+    _store(redis, "stale", fresh_for=-1)
+    redis.leases[f"lease:{KEY}"] = "another worker"
+    computations = Computations()
+
+    await _get(computations)
+    await _get(computations)
+
+    assert redis.reads == 2
+
+
+async def test_closed_day_drops_statistics_and_gtfs_reload_drops_everything(
+    redis: FakeRedis, empty_local_cache: LocalCache
+):
+    await cache.set_cached("trend", "52", DAY, DAY, encode_body(_response("cached")))
+    await cache.set_vehicles_cache(encode_body(_response("vehicles")))
+
+    cache._invalidate(CacheInvalidationMessage(CacheInvalidationReason.DAY_CLOSED, DAY))
+    assert empty_local_cache.get(KEY) is None
+    assert empty_local_cache.get(REDIS_KEY_VEHICLES_CACHE) is not None
+
+    cache._invalidate(CacheInvalidationMessage(CacheInvalidationReason.GTFS_RELOADED))
+    assert len(empty_local_cache) == 0
+
+
+async def test_published_invalidations_are_applied(redis: FakeRedis, empty_local_cache: LocalCache):
+    listener = asyncio.create_task(cache.listen_for_invalidations())
+    await asyncio.sleep(0)
+    await cache.set_cached("trend", "52", DAY, DAY, encode_body(_response("cached")))
+    await cache.set_vehicles_cache(encode_body(_response("vehicles")))
+
+    redis.published.put_nowait(
+        serializer.encode_cache_invalidation(CacheInvalidationMessage(CacheInvalidationReason.DAY_CLOSED, DAY))
+    )
+    await asyncio.sleep(0.01)
+    assert redis.subscribed == [CACHE_INVALIDATION_CHANNEL]
+    assert len(empty_local_cache) == 1
+
+    redis.published.put_nowait(b"not an invalidation")
+    redis.published.put_nowait(
+        serializer.encode_cache_invalidation(CacheInvalidationMessage(CacheInvalidationReason.GTFS_RELOADED))
+    )
+    await asyncio.sleep(0.01)
+    listener.cancel()
+
+    assert len(empty_local_cache) == 0
@@ -0,0 +1,229 @@
+import asyncio
+import fnmatch
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import UTC, date, datetime
+from typing import Any
+
+import msgspec
+import pytest
+from pytest_mock import MockerFixture
+
+from app.api import cache, single_flight
+from app.api.constants import CLOSED_DAY_TTL, DEFAULT_TTL
+from app.api.response import EncodedBody
+from app.api.schemas import MaxDelayBetweenStopsResponse
+from app.api.services import stats_service
+from app.api.services.stats_service import StatsService
+from app.shared.redis import serializer
+from app.shared.redis.cache_invalidation import invalidate_rolled_up_day
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis"):
+        self._redis = redis
+
+    async def __aenter__(self) -> "FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
+
+    def setex(self, key: str, ttl: int, value: bytes) -> None:
+        self._redis.data[key] = value
+        self._redis.ttls[key] = ttl
+
+    async def execute(self) -> None:
+        return None
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.data: dict[str, bytes] = {}
+        self.leases: dict[str, str] = {}
+        self.ttls: dict[str, int] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        return None  # no whole-range hits, every request merges day partials
+
+    async def setex(self, key: str, ttl: int, value: bytes) -> None:
+        pass
+
+    async def mget(self, keys: list[str]) -> list[bytes | None]:
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key: str, value: str, nx: bool = False, px: int | None = None) -> bool:
+        if nx and key in self.leases:
+            return False
+        self.leases[key] = value
+        return True
+
+    async def eval(self, script: str, numkeys: int, key: str, token: str) -> int:
+        if self.leases.get(key) != token:
+            return 0
+        del self.leases[key]
+        return 1
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+
+class FakeSyncRedis:
+    """The stop_writer client of the same data."""
+
+    def __init__(self, redis: FakeRedis) -> None:
+        self._redis = redis
+        self.published: list[bytes] = []
+
+    def scan_iter(self, match: str, count: int) -> list[str]:
+        return [key for key in self._redis.data if fnmatch.fnmatchcase(key, match)]
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            del self._redis.data[key]
+
+    def publish(self, channel: str, message: bytes) -> None:
+        self.published.append(message)
+
+
+class FakeStatsRepository:
+    """Two trips a day, and one max-delay row per day with the day of the month as its delay."""
+
+    def __init__(self) -> None:
+        self.queried: list[list[date]] = []
+        self.late_delay: dict[date, int] = {}
+
+    async def trips_per_day(self, line_number: str, days: list[date]) -> dict[date, int]:
+        self.queried.append(days)
+        return {day: 2 for day in days}
+
+    async def max_delay_between_stops(
+        self, line_number: str, days: list[date], include_estimated: bool = False
+    ) -> list[dict[str, Any]]:
+        return [
+            {
+                "trip_id": f"trip_{day.day}",
+                "service_date": day,
+                "line_number": line_number,
+                "vehicle_number": "RP001",
+                "from_stop": "A",
+                "to_stop": "B",
+                "from_sequence": 2,
+                "to_sequence": 3,
+                "from_planned_time": datetime(2026, 3, 1, 12, tzinfo=UTC),
+                "from_event_time": datetime(2026, 3, 1, 12, tzinfo=UTC),
+                "to_planned_time": datetime(2026, 3, 1, 12, 5, tzinfo=UTC),
+                "to_event_time": datetime(2026, 3, 1, 12, 9, tzinfo=UTC),
+                "delay_generated_seconds": self.late_delay.get(day, day.day),
+                "headsign": "Czerwone Maki",
+                "is_estimated": False,
+            }
+            for day in days
+        ]
+
+
+@pytest.fixture
+def redis(mocker: MockerFixture) -> FakeRedis:
+    fake = FakeRedis()
+    mocker.patch.object(cache, "get_async_client", return_value=fake)
+    mocker.patch.object(single_flight, "get_async_client", return_value=fake)
+    mocker.patch.object(stats_service, "last_closed_service_date", return_value=date(2026, 3, 20))
+    return fake
+
+
+def _service(repo: FakeStatsRepository) -> StatsService:
+    @asynccontextmanager
+    async def open_repo() -> AsyncIterator[Any]:
+        yield repo
+
+    return StatsService(open_repo)
+
+
+def _decoded(body: EncodedBody) -> MaxDelayBetweenStopsResponse:
+    return msgspec.json.decode(body.identity, type=MaxDelayBetweenStopsResponse)
+
+
+async def test_overlapping_ranges_only_query_days_not_cached(redis: FakeRedis):
+    repo = FakeStatsRepository()
+    service = _service(repo)
+
+    first = _decoded(await service.max_delay_between_stops("194", date(2026, 3, 1), date(2026, 3, 3)))
+    second = _decoded(await service.max_delay_between_stops("194", date(2026, 3, 2), date(2026, 3, 4)))
+
+    assert repo.queried == [[date(2026, 3, 1), date(2026, 3, 2), date(2026, 3, 3)], [date(2026, 3, 4)]]
+    assert first.trips_analyzed == 6
+    assert second.trips_analyzed == 6
+    assert [row.delay_generated_seconds for row in second.max_delay] == [4, 3, 2]
+
+
+async def test_ranking_keeps_the_top_of_all_days(redis: FakeRedis):
+    response = _decoded(
+        await _service(FakeStatsRepository()).max_delay_between_stops("194", date(2026, 3, 1), date(2026, 3, 31))
+    )
+
+    assert [row.delay_generated_seconds for row in response.max_delay] == list(range(31, 21, -1))
+    assert response.max_delay[0].service_date == "2026-03-31"
+
+
+async def test_closed_days_are_kept_longer_than_open_ones(redis: FakeRedis):
+    await _service(FakeStatsRepository()).max_delay_between_stops("194", date(2026, 3, 20), date(2026, 3, 21))
+
+    assert redis.ttls["stats:day:max-delay:194:2026-03-20"] == CLOSED_DAY_TTL
+    assert redis.ttls["stats:day:max-delay:194:2026-03-21"] == DEFAULT_TTL
+
+
+async def test_re_rolled_day_is_recomputed_and_others_stay_cached(redis: FakeRedis):
+    repo = FakeStatsRepository()
+    service = _service(repo)
+    await service.max_delay_between_stops("194", date(2026, 3, 18), date(2026, 3, 20))
+    await service.max_delay_between_stops("194", date(2026, 3, 18), date(2026, 3, 20), include_estimated=True)
+
+    # Late events of the 19th rolled up again
+    repo.late_delay[date(2026, 3, 19)] = 99
+    stop_writer_redis = FakeSyncRedis(redis)
+    invalidate_rolled_up_day(stop_writer_redis, date(2026, 3, 19))  # type: ignore[arg-type]
+    cache._invalidate(serializer.decode_cache_invalidation(stop_writer_redis.published[0]))
+    repo.queried.clear()
+    response = _decoded(await service.max_delay_between_stops("194", date(2026, 3, 18), date(2026, 3, 20)))
+
+    assert repo.queried == [[date(2026, 3, 19)]]
+    assert [row.delay_generated_seconds for row in response.max_delay] == [99, 20, 18]
+    assert "stats:day:max-delay:194:2026-03-19:est" not in redis.data
+    assert "stats:day:max-delay:194:2026-03-18:est" in redis.data
+
+
+async def test_computation_runs_on_a_session_of_its_own_outliving_the_request(redis: FakeRedis):
+    repo = FakeStatsRepository()
+    release = asyncio.Event()
+    sessions: list[str] = []
+    trips_per_day = repo.trips_per_day
+
+    async def slow_trips_per_day(line_number: str, days: list[date]) -> dict[date, int]:
+        await release.wait()
+        return await trips_per_day(line_number, days)
+
+    repo.trips_per_day = slow_trips_per_day  # type: ignore[method-assign]
+
+    @asynccontextmanager
+    async def open_repo() -> AsyncIterator[Any]:
+        sessions.append("opened")
+        yield repo
+        sessions.append("closed")
+
+    service = StatsService(open_repo)
+    first = asyncio.create_task(service.max_delay_between_stops("194", date(2026, 3, 1), date(2026, 3, 3)))
+    await asyncio.sleep(0.01)
+    second = asyncio.create_task(service.max_delay_between_stops("194", date(2026, 3, 1), date(2026, 3, 3)))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    release.set()
+
+    assert _decoded(await second).trips_analyzed == 6
+    assert sessions == ["opened", "closed"]
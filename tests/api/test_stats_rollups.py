@@ -0,0 +1,65 @@
+from datetime import date
+from typing import Any
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.api.repositories.stats_repository import StatsRepository
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+class _Result:
+    def __init__(self, rows: list[Any]):
+        self._rows = rows
+
+    def scalars(self) -> "_Result":
+        return self
+
+    def all(self) -> list[Any]:
+        return self._rows
+
+    def mappings(self) -> "_Result":
+        return self
+
+
+class FakeSession:
+    """Answers the rolled up days query with `rolled_up` and records the SQL of every other query."""
+
+    def __init__(self, rolled_up: list[date]):
+        self.rolled_up = rolled_up
+        self.queries: list[str] = []
+
+    async def execute(self, query: Any) -> _Result:
+        sql = str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        if "FROM events.line_daily_stats_days" in sql:
+            return _Result(self.rolled_up)
+        self.queries.append(sql)
+        return _Result([])
+
+
+async def test_split_days_reads_open_days_raw():
+    session = FakeSession([date(2026, 3, 2), date(2026, 3, 1), date(2026, 3, 3)])
+    days = [date(2026, 3, 1), date(2026, 3, 2), date(2026, 3, 4)]
+
+    rolled_up, open_days = await StatsRepository(session)._split_days(days)  # type: ignore[arg-type]
+
+    assert rolled_up == [date(2026, 3, 1), date(2026, 3, 2)]
+    assert open_days == [date(2026, 3, 4)]
+
+
+async def test_trend_combines_rollups_and_raw_events_of_open_days():
+    session = FakeSession([date(2026, 3, 1)])
+
+    await StatsRepository(session).trend("194", [date(2026, 3, 1), date(2026, 3, 2)], include_estimated=True)  # type: ignore[arg-type]
+
+    (sql,) = session.queries
+    assert "events.line_daily_stats.service_date IN ('2026-03-01')" in sql
+    assert "e.service_date IN ('2026-03-02')" in sql
+    # Before ESTIMATED_VALID_FROM the estimated class is excluded, as in the raw detection filter
+    assert "includes_estimated = (events.line_daily_stats.service_date >= '2026-03-19')" in sql
@@ -0,0 +1,31 @@
+from benchmarks.detector import PRESETS, compare_to_baseline, run_detector_bench
+from benchmarks.synthetic_gtfs import GtfsConfig
+from benchmarks.workload import WorkloadConfig
+
+
+def test_small_preset_detects_every_scheduled_stop() -> None:
+    gtfs_config, workload_config = PRESETS["small"]
+
+    result = run_detector_bench(gtfs_config, workload_config)
+
+    scheduled = gtfs_config.routes * gtfs_config.vehicles_per_route * gtfs_config.trips_per_vehicle
+    assert result.vehicles == gtfs_config.routes * gtfs_config.vehicles_per_route
+    assert result.events == scheduled * gtfs_config.stops_per_route
+    assert result.seq_jump_ms > 0
+
+
+def test_skipped_stops_still_produce_events() -> None:
+    gtfs_config = GtfsConfig(routes=1, stops_per_route=10, vehicles_per_route=1, trips_per_vehicle=2)
+
+    result = run_detector_bench(gtfs_config, WorkloadConfig(skip_probability=1.0))
+
+    assert result.events == 2 * 10
+
+
+def test_compare_to_baseline_flags_regressions() -> None:
+    result = run_detector_bench(GtfsConfig(routes=1, stops_per_route=5, vehicles_per_route=1), WorkloadConfig())
+    baseline = {"events": result.events, "events_per_second": result.events_per_second, "p99_us": result.p99_us}
+
+    assert compare_to_baseline(result, baseline, tolerance=0.25) == []
+    assert len(compare_to_baseline(result, {**baseline, "events_per_second": result.events_per_second * 2}, 0.25)) == 1
+    assert "detection changed" in compare_to_baseline(result, {**baseline, "events": result.events + 1}, 0.25)[0]
@@ -0,0 +1,13 @@
+import pytest
+
+from benchmarks.flush_policy import POLICIES, PRESETS, run_policy_bench
+
+
+@pytest.mark.parametrize("policy", sorted(POLICIES))
+def test_every_replayed_event_is_written_once(policy: str) -> None:
+    result = run_policy_bench(policy, PRESETS["small"])
+
+    assert result.events > 0
+    assert sum(result.event_latency_histogram.values()) == result.events
+    assert sum(result.batch_size_histogram.values()) == result.flushes
+    assert sum(result.flush_seconds_histogram.values()) == result.flushes
@@ -0,0 +1,16 @@
+from pathlib import Path
+
+from app.importer.load import GTFS_TABLES
+from benchmarks.importer_bench import PRESETS, run_import_bench
+from benchmarks.synthetic_gtfs import write_large_gtfs_zip
+
+
+def test_every_generated_row_is_imported(tmp_path: Path) -> None:
+    config = PRESETS["small"]
+    zip_path = write_large_gtfs_zip(tmp_path / "feed.zip", config)
+
+    results = run_import_bench(zip_path, None)
+
+    assert [r.table for r in results] == GTFS_TABLES
+    assert [r.rows for r in results] == list(config.rows.values())
+    assert all(r.transform_seconds > 0 and r.peak_rss_mib > 0 for r in results)
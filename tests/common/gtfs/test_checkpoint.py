@@ -0,0 +1,39 @@
+from pathlib import Path
+
+from app.shared.gtfs.checkpoint import load_checkpoint, save_checkpoint
+
+HASHES = {"mpk": "hash_a", "mobilis": "hash_b"}
+
+
+def test_checkpoint_round_trip(tmp_path: Path):
+    path = tmp_path / "cache.checkpoint"
+
+    save_checkpoint(path, HASHES, {"trip_1": {"stop_1": 1, "stop_2": 2}})
+
+    assert load_checkpoint(path, HASHES, dict[str, dict[str, int]]) == {"trip_1": {"stop_1": 1, "stop_2": 2}}
+    assert not path.with_name("cache.checkpoint.tmp").exists()
+
+
+def test_checkpoint_from_different_static_data_is_ignored(tmp_path: Path):
+    path = tmp_path / "cache.checkpoint"
+    save_checkpoint(path, HASHES, {"trip_1": {"stop_1": 1}})
+
+    assert load_checkpoint(path, {**HASHES, "mpk": "hash_new"}, dict[str, dict[str, int]]) is None
+
+
+def test_missing_checkpoint_returns_none(tmp_path: Path):
+    assert load_checkpoint(tmp_path / "missing", HASHES, dict[str, int]) is None
+
+
+def test_corrupt_checkpoint_returns_none(tmp_path: Path):
+    path = tmp_path / "cache.checkpoint"
+    path.write_bytes(b"\x00garbage")
+
+    assert load_checkpoint(path, HASHES, dict[str, int]) is None
+
+
+def test_incompatible_payload_returns_none(tmp_path: Path):
+    path = tmp_path / "cache.checkpoint"
+    save_checkpoint(path, HASHES, ["not", "a", "dict"])
+
+    assert load_checkpoint(path, HASHES, dict[str, int]) is None
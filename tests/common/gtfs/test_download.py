@@ -0,0 +1,65 @@
+import hashlib
+
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from app.importer import download
+from app.importer.download import HttpValidators, download_gtfs_zip
+from app.shared.gtfs.feeds import get_feed_config
+from app.shared.models.enums import Agency
+
+FEED = get_feed_config(Agency.MPK)
+
+
+class _Response:
+    def __init__(self, status_code: int, chunks: list[bytes] | None = None, headers: dict[str, str] | None = None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._chunks = chunks or []
+
+    def __enter__(self) -> "_Response":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        pass
+
+    def iter_content(self, chunk_size: int) -> list[bytes]:
+        return self._chunks
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(str(self.status_code))
+
+
+def test_download_is_streamed_and_hashed(mocker: MockerFixture) -> None:
+    chunks = [b"PK\x03\x04", b"gtfs" * 1000]
+    headers = {"ETag": '"abc"', "Last-Modified": "Mon, 19 Oct 2026 10:00:00 GMT"}
+    mocker.patch.object(download.requests, "get", return_value=_Response(200, chunks, headers))
+
+    result = download_gtfs_zip(FEED)
+
+    assert result is not None
+    assert result.path.read_bytes() == b"".join(chunks)
+    assert result.sha256 == hashlib.sha256(b"".join(chunks)).hexdigest()
+    assert result.validators == HttpValidators('"abc"', "Mon, 19 Oct 2026 10:00:00 GMT")
+    result.path.unlink()
+
+
+def test_not_modified_feed_is_not_downloaded(mocker: MockerFixture) -> None:
+    get = mocker.patch.object(download.requests, "get", return_value=_Response(304))
+
+    result = download_gtfs_zip(FEED, HttpValidators('"abc"', "Mon, 19 Oct 2026 10:00:00 GMT"))
+
+    assert result is None
+    headers = get.call_args.kwargs["headers"]
+    assert headers["If-None-Match"] == '"abc"'
+    assert headers["If-Modified-Since"] == "Mon, 19 Oct 2026 10:00:00 GMT"
+    assert get.call_args.kwargs["stream"] is True
+
+
+def test_http_error_is_raised(mocker: MockerFixture) -> None:
+    mocker.patch.object(download.requests, "get", return_value=_Response(404))
+
+    with pytest.raises(requests.HTTPError):
+        download_gtfs_zip(FEED)
@@ -0,0 +1,55 @@
+import csv
+import io
+
+import pytest
+
+from app.importer.load import TABLE_MAPPINGS, transform_to_csv
+from app.shared.gtfs.feeds import get_feed_config
+from app.shared.models.enums import Agency
+
+MAPPINGS = {mapping.gtfs_file: mapping for mapping in TABLE_MAPPINGS}
+TRAM_PREFIX = get_feed_config(Agency.MPK_TRAM).prefix_id
+
+
+def _transform(gtfs_file: str, content: str, size: int = 2) -> list[list[str]]:
+    f = io.BytesIO(content.encode("utf-8-sig"))
+    text = "".join(transform_to_csv(f, MAPPINGS[gtfs_file], "mpk_tram", TRAM_PREFIX, size=size))
+    return list(csv.reader(io.StringIO(text)))
+
+
+def test_stop_times_stream_in_table_column_order() -> None:
+    content = (
+        "trip_id,arrival_time,departure_time,stop_id,stop_sequence,pickup_type\n"
+        "t1,08:00:00,08:00:30,s1,1,0\n"
+        "t1,08:05:00,08:05:00,s2,2,0\n"
+        "\n"
+        "t1,25:10:00,25:10:00,s3,3,0\n"
+    )
+
+    rows = _transform("stop_times.txt", content)
+
+    assert rows == [
+        ["tram:t1", "1", "tram:s1", "mpk_tram", "28800", "28830"],
+        ["tram:t1", "2", "tram:s2", "mpk_tram", "29100", "29100"],
+        ["tram:t1", "3", "tram:s3", "mpk_tram", "90600", "90600"],
+    ]
+
+
+def test_short_rows_load_missing_values_as_empty() -> None:
+    content = "stop_id,stop_name,stop_code,stop_desc,stop_lat,stop_lon\ns1,Rondo,,,50.0\n"
+
+    rows = _transform("stops.txt", content)
+
+    assert rows == [["tram:s1", "mpk_tram", "Rondo", "", "", "50.0", ""]]
+
+
+def test_missing_column_is_reported() -> None:
+    with pytest.raises(ValueError, match="trip_headsign"):
+        _transform("trips.txt", "trip_id,route_id,service_id,direction_id,shape_id\nt1,r1,svc,0,sh1\n")
+
+
+def test_invalid_time_fails_the_table() -> None:
+    content = "trip_id,arrival_time,departure_time,stop_id,stop_sequence\nt1,8:00,08:00:00,s1,1\n"
+
+    with pytest.raises(ValueError, match="Invalid GTFS time"):
+        _transform("stop_times.txt", content)
@@ -0,0 +1,26 @@
+import numpy as np
+from hypothesis import given
+from hypothesis import strategies as st
+
+from app.shared.gtfs.polyline import decode_polyline, encode_polyline
+
+coordinates = st.lists(
+    st.tuples(st.floats(49.9, 50.2), st.floats(19.7, 20.2)),
+    min_size=1,
+    max_size=50,
+)
+
+
+def test_encodes_reference_polyline() -> None:
+    assert encode_polyline([38.5, 40.7, 43.252], [-120.2, -120.95, -126.453]) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+@given(coordinates)
+def test_decode_round_trips_at_precision(points: list[tuple[float, float]]) -> None:
+    lat = np.array([p[0] for p in points])
+    lon = np.array([p[1] for p in points])
+
+    decoded = np.array(decode_polyline(encode_polyline(lat.tolist(), lon.tolist())))
+
+    assert np.allclose(decoded[:, 0], lat, atol=0.5e-5)
+    assert np.allclose(decoded[:, 1], lon, atol=0.5e-5)
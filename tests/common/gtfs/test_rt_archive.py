@@ -0,0 +1,100 @@
+import gzip
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from app.shared.gtfs.rt_archive import (
+    RtArchiveWriter,
+    RtFeedKind,
+    decode_trip_updates,
+    decode_vehicle_positions,
+    read_rt_archive,
+)
+from app.shared.models.enums import Agency
+from app.shared.models.gtfs_realtime import StopTimeUpdate, TripUpdate
+from app.shared.redis.schemas import VehiclePositionMessage
+
+T0 = datetime(2026, 3, 2, 10, 59, 58, tzinfo=UTC)
+
+
+def _message(timestamp: datetime, stop_sequence: int = 1) -> VehiclePositionMessage:
+    return VehiclePositionMessage(
+        agency="mpk",
+        trip_id="trip_1",
+        vehicle_id="v1",
+        license_plate="AB123",
+        stop_id="stop_1",
+        stop_sequence=stop_sequence,
+        status=1,
+        timestamp=timestamp.isoformat(),
+    )
+
+
+def _trip_update(timestamp: datetime) -> TripUpdate:
+    return TripUpdate(
+        agency=Agency.MPK,
+        trip_id="trip_1",
+        vehicle_id="v1",
+        timestamp=timestamp,
+        stop_time_updates=[StopTimeUpdate("stop_2", 2, timestamp + timedelta(minutes=2), None)],
+    )
+
+
+def test_archive_round_trip_across_hours(tmp_path: Path):
+    archive = RtArchiveWriter(tmp_path, retention_days=14)
+
+    archive.append_vehicle_positions(Agency.MPK, [_message(T0)], fetched_at=T0)
+    archive.append_trip_updates(Agency.MPK, [_trip_update(T0)], fetched_at=T0 + timedelta(seconds=1))
+    archive.append_vehicle_positions(Agency.MPK, [_message(T0, 2)], fetched_at=T0 + timedelta(seconds=3))
+
+    records = list(read_rt_archive(tmp_path, T0, T0 + timedelta(hours=1)))
+
+    assert [r.kind for r in records] == [
+        RtFeedKind.VEHICLE_POSITIONS,
+        RtFeedKind.TRIP_UPDATES,
+        RtFeedKind.VEHICLE_POSITIONS,
+    ]
+    assert decode_vehicle_positions(records[0].payload) == [_message(T0)]
+    assert decode_trip_updates(records[1].payload) == [_trip_update(T0)]
+    assert records[2].fetched_at == T0 + timedelta(seconds=3)
+    assert (tmp_path / "2026-03-02" / "11.rtlog.gz").exists()
+
+
+def test_unchanged_poll_is_skipped(tmp_path: Path):
+    archive = RtArchiveWriter(tmp_path, retention_days=14)
+
+    assert archive.append_vehicle_positions(Agency.MPK, [_message(T0)], fetched_at=T0)
+    assert not archive.append_vehicle_positions(Agency.MPK, [_message(T0)], fetched_at=T0 + timedelta(seconds=3))
+    assert archive.append_vehicle_positions(Agency.MOBILIS, [_message(T0)], fetched_at=T0 + timedelta(seconds=3))
+
+    assert len(list(read_rt_archive(tmp_path, T0, T0 + timedelta(minutes=1)))) == 2
+
+
+def test_read_filters_by_fetch_time(tmp_path: Path):
+    archive = RtArchiveWriter(tmp_path, retention_days=14)
+    archive.append_vehicle_positions(Agency.MPK, [_message(T0)], fetched_at=T0)
+    archive.append_vehicle_positions(Agency.MPK, [_message(T0, 2)], fetched_at=T0 + timedelta(seconds=10))
+
+    records = list(read_rt_archive(tmp_path, T0 + timedelta(seconds=5), T0 + timedelta(minutes=1)))
+
+    assert [r.fetched_at for r in records] == [T0 + timedelta(seconds=10)]
+
+
+def test_torn_tail_is_ignored(tmp_path: Path):
+    archive = RtArchiveWriter(tmp_path, retention_days=14)
+    archive.append_vehicle_positions(Agency.MPK, [_message(T0)], fetched_at=T0)
+    path = tmp_path / "2026-03-02" / "10.rtlog.gz"
+    with path.open("ab") as f:
+        f.write(gzip.compress(b"\x10\x00")[:-4])
+
+    assert len(list(read_rt_archive(tmp_path, T0, T0 + timedelta(minutes=1)))) == 1
+
+
+def test_expired_days_are_removed_on_rollover(tmp_path: Path):
+    (tmp_path / "2026-02-01").mkdir()
+    (tmp_path / "2026-03-01").mkdir()
+    archive = RtArchiveWriter(tmp_path, retention_days=14)
+
+    archive.append_vehicle_positions(Agency.MPK, [_message(T0)], fetched_at=T0)
+
+    assert not (tmp_path / "2026-02-01").exists()
+    assert (tmp_path / "2026-03-01").exists()
@@ -0,0 +1,23 @@
+import numpy as np
+
+from app.shared.gtfs.simplify import simplify
+
+
+def test_simplify_drops_points_within_tolerance() -> None:
+    # A straight line east with a 3 m bump in the middle, about 7 m between points
+    lon = 19.9 + np.arange(11) * 0.0001
+    lat = np.full(11, 50.0)
+    lat[5] += 3 / 111_195
+
+    assert simplify(lat, lon, 5.0).tolist() == [0, 10]
+    # The bump's flanks are 2.4 m off the lines to its tip
+    assert simplify(lat, lon, 1.0).tolist() == [0, 4, 5, 6, 10]
+    assert simplify(lat, lon, 0.0).tolist() == list(range(11))
+
+
+def test_simplify_keeps_a_shape_doubling_back() -> None:
+    # Out and back along the same street: the turnaround is far from the segment joining the ends
+    lon = np.array([19.90, 19.91, 19.92, 19.91, 19.90])
+    lat = np.full(5, 50.0)
+
+    assert simplify(lat, lon, 5.0).tolist() == [0, 2, 4]
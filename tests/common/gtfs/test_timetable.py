@@ -0,0 +1,139 @@
+from datetime import UTC, date, datetime, timedelta
+
+import numpy as np
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from app.shared.gtfs.timeparse import (
+    compute_delay_seconds,
+    compute_planned_time,
+    compute_service_date,
+    parse_gtfs_time_to_seconds,
+)
+from app.shared.gtfs.timetable import (
+    _offset_table,
+    compute_delays,
+    compute_planned_times,
+    compute_service_dates,
+    parse_gtfs_times,
+    preload_offset_table,
+    to_datetime64,
+)
+
+gtfs_times = st.builds(
+    lambda h, m, s, pad: f"{h:0{pad}d}:{m:02d}:{s:02d}",
+    st.integers(0, 48),
+    st.integers(0, 59),
+    st.integers(0, 59),
+    st.integers(1, 3),
+)
+scheduled_seconds = st.integers(0, 30 * 3600)
+
+
+def _last_sunday(year: int, month: int) -> date:
+    last = date(year, month, 31)
+    return last - timedelta(days=(last.weekday() + 1) % 7)
+
+
+# Days the clocks change on, so the DST edges are actually exercised
+dst_days = st.builds(_last_sunday, st.integers(2000, 2099), st.sampled_from([3, 10]))
+event_times = st.one_of(
+    st.datetimes(datetime(2000, 1, 1), datetime(2099, 12, 31), timezones=st.just(UTC)),
+    st.builds(
+        lambda day, seconds, us: (
+            datetime(day.year, day.month, day.day, tzinfo=UTC) + timedelta(seconds=seconds, microseconds=us)
+        ),
+        dst_days,
+        st.integers(-3 * 3600, 6 * 3600),
+        st.integers(0, 999_999),
+    ),
+)
+service_dates = st.one_of(
+    st.dates(date(2000, 1, 1), date(2099, 12, 30)), dst_days, dst_days.map(lambda d: d - timedelta(days=1))
+)
+
+
+@given(st.lists(gtfs_times, max_size=50))
+def test_parse_matches_scalar(values: list[str]) -> None:
+    assert parse_gtfs_times(values).tolist() == [parse_gtfs_time_to_seconds(v) for v in values]
+
+
+@given(st.one_of(st.text(max_size=12), gtfs_times.map(lambda v: f" {v} ")))
+def test_parse_arbitrary_text_matches_scalar(value: str) -> None:
+    try:
+        expected = parse_gtfs_time_to_seconds(value)
+    except ValueError:
+        with pytest.raises(ValueError):
+            parse_gtfs_times(["08:00:00", value])
+        return
+    assert parse_gtfs_times(["08:00:00", value]).tolist() == [28800, expected]
+
+
+def test_parse_rejects_none() -> None:
+    with pytest.raises(ValueError, match="None"):
+        parse_gtfs_times(["08:00:00", None])
+
+
+@given(st.lists(st.tuples(event_times, scheduled_seconds), min_size=1, max_size=50))
+def test_service_dates_match_scalar(pairs: list[tuple[datetime, int]]) -> None:
+    events = to_datetime64([event for event, _ in pairs])
+    scheduled = np.array([s for _, s in pairs], dtype=np.int64)
+
+    result = compute_service_dates(events, scheduled).tolist()
+
+    assert result == [compute_service_date(event, s) for event, s in pairs]
+
+
+@given(st.lists(st.tuples(service_dates, scheduled_seconds), min_size=1, max_size=50))
+def test_planned_times_match_scalar(pairs: list[tuple[date, int]]) -> None:
+    dates = np.array([d for d, _ in pairs], dtype="datetime64[D]")
+    scheduled = np.array([s for _, s in pairs], dtype=np.int64)
+
+    result = compute_planned_times(dates, scheduled)
+
+    assert result.tolist() == [compute_planned_time(d, s).astimezone(UTC).replace(tzinfo=None) for d, s in pairs]
+
+
+@pytest.mark.parametrize(
+    "service_date, scheduled, expected",
+    [
+        # Clocks go forward at 02:00, the missing hour resolves with the winter offset
+        (date(2025, 3, 30), 2 * 3600 + 1800, datetime(2025, 3, 30, 1, 30)),
+        (date(2025, 3, 30), 3 * 3600, datetime(2025, 3, 30, 1, 0)),
+        # Clocks go back at 03:00, the repeated hour resolves to its first (summer) pass
+        (date(2025, 10, 26), 2 * 3600 + 1800, datetime(2025, 10, 26, 0, 30)),
+        (date(2025, 10, 26), 3 * 3600, datetime(2025, 10, 26, 2, 0)),
+        # Overnight trip planned past the October change
+        (date(2025, 10, 25), 26 * 3600 + 1800, datetime(2025, 10, 26, 0, 30)),
+    ],
+)
+def test_planned_times_across_dst(service_date: date, scheduled: int, expected: datetime) -> None:
+    result = compute_planned_times(np.array([service_date], dtype="datetime64[D]"), np.array([scheduled]))
+
+    assert result.tolist() == [expected]
+    assert compute_planned_time(service_date, scheduled).astimezone(UTC).replace(tzinfo=None) == expected
+
+
+@given(st.lists(st.tuples(event_times, service_dates, scheduled_seconds), min_size=1, max_size=50))
+def test_delays_match_scalar(rows: list[tuple[datetime, date, int]]) -> None:
+    planned = [compute_planned_time(d, s) for _, d, s in rows]
+
+    result = compute_delays(to_datetime64([event for event, _, _ in rows]), to_datetime64(planned))
+
+    assert result.tolist() == [compute_delay_seconds(event, p) for (event, _, _), p in zip(rows, planned, strict=True)]
+
+
+def test_outside_offset_table_raises() -> None:
+    with pytest.raises(ValueError, match="offset table"):
+        compute_service_dates(to_datetime64([datetime(2150, 1, 1, tzinfo=UTC)]), np.array([0]))
+
+
+def test_preload_builds_the_offset_table_once() -> None:
+    _offset_table.cache_clear()
+
+    preload_offset_table()
+    compute_service_dates(to_datetime64([datetime(2026, 3, 29, 1, 30, tzinfo=UTC)]), np.array([0]))
+
+    info = _offset_table.cache_info()
+    assert (info.misses, info.hits) == (1, 1)
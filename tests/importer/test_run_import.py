@@ -0,0 +1,154 @@
+import threading
+from contextlib import nullcontext
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.importer import main
+from app.importer.derived import DERIVED_TABLES, _shape_polylines_transformer
+from app.importer.diff import DiffReport, _DiffQueries, _temp_table
+from app.importer.download import HttpValidators
+from app.importer.load import GTFS_TABLES, STATIC_TABLES, TABLE_MAPPINGS
+from app.importer.staging import _retarget, staging_name
+from app.importer.timings import StageTimings
+from app.shared.constants import SHAPE_RESOLUTION_TOLERANCES_M
+from app.shared.gtfs.feeds import FeedConfig, get_all_feed_configs
+
+FEEDS = get_all_feed_configs()
+
+
+@pytest.fixture
+def pipeline(mocker: MockerFixture) -> dict:
+    mocker.patch.object(main, "get_session", side_effect=lambda: nullcontext(mocker.Mock()))
+    mocks = {
+        name: mocker.patch.object(main, name)
+        for name in (
+            "create_staging_tables",
+            "carry_over_agencies",
+            "fill_staging_derived_tables",
+            "build_staging_indexes",
+            "_swap",
+        )
+    }
+    # Feeds without a recorded import are reloaded in full
+    mocks["_diff_feed"] = mocker.patch.object(main, "_diff_feed", return_value=None)
+    return mocks
+
+
+def _fetched(feed: FeedConfig, tmp_path: Path) -> main.FetchedFeed:
+    zip_path = tmp_path / f"{feed.agency.value}.zip"
+    zip_path.touch()
+    return main.FetchedFeed(feed, zip_path, f"hash-{feed.agency.value}", HttpValidators(), {}, StageTimings())
+
+
+def test_feeds_are_fetched_concurrently(mocker: MockerFixture, pipeline: dict) -> None:
+    # Every feed must be in flight at once for the barrier to release
+    barrier = threading.Barrier(len(FEEDS), timeout=5)
+
+    def fetch_feed(feed: FeedConfig) -> None:
+        barrier.wait()
+        return None
+
+    mocker.patch.object(main, "_fetch_feed", side_effect=fetch_feed)
+
+    result = main.run_import()
+
+    assert result.all_ok and not result.any_changed
+    pipeline["create_staging_tables"].assert_not_called()
+    pipeline["_swap"].assert_not_called()
+
+
+def test_failed_feed_keeps_its_current_data(mocker: MockerFixture, pipeline: dict, tmp_path: Path) -> None:
+    fetched = {feed.agency: _fetched(feed, tmp_path) for feed in FEEDS[:2]}
+    mocker.patch.object(main, "_fetch_feed", side_effect=lambda feed: fetched.get(feed.agency))
+
+    def load_feed(feed: main.FetchedFeed) -> None:
+        if feed.feed is FEEDS[0]:
+            raise RuntimeError("broken stop_times.txt")
+
+    mocker.patch.object(main, "_load_feed", side_effect=load_feed)
+    capture = mocker.patch.object(main, "capture_exception")
+
+    result = main.run_import()
+
+    assert not result.all_ok and result.any_changed
+    assert capture.call_args.kwargs["tags"]["agency"] == FEEDS[0].agency.value
+    # The failed feed and the unchanged one are carried over, only the loaded one is marked as imported
+    assert sorted(pipeline["carry_over_agencies"].call_args.args[1]) == sorted([FEEDS[0].agency, FEEDS[2].agency])
+    assert pipeline["fill_staging_derived_tables"].call_args.args[1] == [FEEDS[1].agency.value]
+    assert [feed.feed for feed in pipeline["_swap"].call_args.args[0]] == [FEEDS[1]]
+    assert not any(feed.zip_path.exists() for feed in fetched.values())
+
+
+def test_diffed_feed_skips_the_staging_reload(mocker: MockerFixture, pipeline: dict, tmp_path: Path) -> None:
+    fetched = {feed.agency: _fetched(feed, tmp_path) for feed in FEEDS[:2]}
+    mocker.patch.object(main, "_fetch_feed", side_effect=lambda feed: fetched.get(feed.agency))
+    pipeline["_diff_feed"].side_effect = lambda feed: DiffReport() if feed.feed is FEEDS[0] else None
+    load_feed = mocker.patch.object(main, "_load_feed")
+
+    result = main.run_import()
+
+    assert result.all_ok and result.any_changed
+    assert [call.args[0].feed for call in load_feed.call_args_list] == [FEEDS[1]]
+    # The diffed agency's live rows are already current and are carried over like the unchanged one
+    assert sorted(pipeline["carry_over_agencies"].call_args.args[1]) == sorted([FEEDS[0].agency, FEEDS[2].agency])
+
+
+def test_only_changed_rows_are_compared() -> None:
+    mapping = next(m for m in TABLE_MAPPINGS if m.gtfs_file == "stop_times.txt")
+
+    queries = _DiffQueries.for_mapping(mapping, _temp_table(mapping))
+
+    assert queries.updated.as_string(None) == (
+        'l.agency_id = %(agency_id)s AND "l"."trip_id" = "n"."trip_id" AND "l"."stop_sequence" = "n"."stop_sequence" '
+        'AND ROW("l"."stop_id", "l"."arrival_seconds", "l"."departure_seconds") '
+        'IS DISTINCT FROM ROW("n"."stop_id", "n"."arrival_seconds", "n"."departure_seconds")'
+    )
+
+
+def test_derived_tables_read_the_staging_tables_on_reload() -> None:
+    table = next(t for t in DERIVED_TABLES if t.table_name == "trip_stop_index")
+
+    assert '"gtfs_static"."staging_current_stop_times"' in table.select(staging_name).as_string(None)
+    assert '"gtfs_static"."current_stop_times"' in table.select(lambda name: name).as_string(None)
+
+
+def test_shapes_are_encoded_at_every_resolution() -> None:
+    rows = [("tram:sh1", "mpk_tram", 50.0, 19.9 + i * 0.0001, i + 1) for i in range(5)]
+    rows.append(("tram:sh2", "mpk_tram", 50.1, 19.9, 1))
+
+    polylines = {(shape_id, resolution): row for shape_id, resolution, *row in _shape_polylines_transformer(rows)}
+
+    assert set(polylines) == {(shape, r) for shape in ("tram:sh1", "tram:sh2") for r in SHAPE_RESOLUTION_TOLERANCES_M}
+    # Collinear points only survive at full resolution
+    assert polylines["tram:sh1", "full"][1] == 5 and polylines["tram:sh1", "full"][3] == [1, 2, 3, 4, 5]
+    assert polylines["tram:sh1", "low"][1] == 2 and polylines["tram:sh1", "low"][3] == [1, 5]
+    assert polylines["tram:sh2", "low"][3] == [1]
+
+
+def test_derived_tables_are_swapped_with_the_gtfs_tables() -> None:
+    assert STATIC_TABLES[: len(GTFS_TABLES)] == GTFS_TABLES
+    assert {"trip_summary", "trip_stop_index"} <= set(STATIC_TABLES)
+
+
+def test_foreign_keys_are_pointed_at_staging_tables() -> None:
+    definition = "FOREIGN KEY (stop_id) REFERENCES gtfs_static.current_stops(stop_id)"
+
+    retargeted = _retarget(definition, ["current_stops", "current_stop_times"])
+
+    assert retargeted == "FOREIGN KEY (stop_id) REFERENCES gtfs_static.staging_current_stops(stop_id)"
+
+
+def test_stage_timings_accumulate_in_order() -> None:
+    timings = StageTimings()
+
+    with timings.stage("download"):
+        pass
+    with timings.stage("load"):
+        pass
+    with pytest.raises(ValueError), timings.stage("load"):
+        raise ValueError
+
+    assert list(timings.stages) == ["download", "load"]
+    assert timings.summary().startswith("download 0.00s, load ")
@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+import pytest
+
+from app.stop_writer.flush_policy import AdaptiveFlushPolicy, StaticFlushPolicy
+
+
+def _policy(**kwargs) -> AdaptiveFlushPolicy:
+    defaults = dict(
+        min_batch_size=20,
+        max_batch_size=2000,
+        min_interval=timedelta(seconds=1),
+        max_interval=timedelta(seconds=30),
+        target_period=timedelta(seconds=5),
+        period_step=timedelta(seconds=1),
+        max_commit_seconds=1.0,
+        alpha=1.0,
+        rate_window_seconds=5.0,
+    )
+    defaults.update(kwargs)
+    return AdaptiveFlushPolicy(**defaults)
+
+
+def _feed(policy: AdaptiveFlushPolicy, rate: float, seconds: float = 5.0) -> None:
+    """Simulate a steady event rate over one rate window."""
+    start = policy._window_start
+    policy.record_events(round(rate * seconds), now=start + seconds)
+
+
+def test_static_policy_returns_configured_values() -> None:
+    policy = StaticFlushPolicy(batch_size=50, flush_interval=timedelta(seconds=3))
+
+    policy.record_events(1000)
+    policy.record_commit(1000, 10.0)
+
+    assert policy.batch_size == 50
+    assert policy.flush_interval == timedelta(seconds=3)
+
+
+def test_without_traffic_uses_min_batch_and_max_interval() -> None:
+    policy = _policy()
+
+    assert policy.batch_size == 20
+    assert policy.flush_interval == timedelta(seconds=30)
+
+
+def test_rate_is_not_updated_before_window_elapses() -> None:
+    policy = _policy()
+
+    policy.record_events(500, now=policy._window_start + 1.0)
+
+    assert policy.event_rate == 0.0
+
+
+@pytest.mark.parametrize(
+    "rate,expected_batch,expected_interval",
+    [
+        (100.0, 500, 5.0),  # peak: one commit per target period
+        (1.0, 20, 20.0),  # night: wait for min batch
+        (0.2, 20, 30.0),  # very quiet: capped by max interval
+        (1000.0, 2000, 5.0),  # capped by max batch
+    ],
+)
+def test_batch_and_interval_follow_event_rate(rate: float, expected_batch: int, expected_interval: float) -> None:
+    policy = _policy()
+
+    _feed(policy, rate)
+
+    assert policy.batch_size == expected_batch
+    assert policy.flush_interval == timedelta(seconds=expected_interval)
+
+
+def test_rate_is_smoothed() -> None:
+    policy = _policy(alpha=0.5)
+
+    _feed(policy, 100.0)
+    _feed(policy, 0.0)
+
+    assert policy.event_rate == pytest.approx(50.0)
+
+
+def test_slow_commits_double_period_up_to_max() -> None:
+    policy = _policy()
+    _feed(policy, 100.0)
+
+    policy.record_commit(500, 2.0)
+    assert policy.commit_period == 10.0
+    assert policy.batch_size == 1000
+
+    for _ in range(5):
+        policy.record_commit(1000, 2.0)
+    assert policy.commit_period == 30.0
+    assert policy.flush_interval == timedelta(seconds=30)
+
+
+def test_fast_commits_return_period_to_target() -> None:
+    policy = _policy()
+    policy.record_commit(100, 2.0)
+    policy.record_commit(100, 2.0)
+    assert policy.commit_period == 20.0
+
+    for _ in range(20):
+        policy.record_commit(100, 0.1)
+
+    assert policy.commit_period == 5.0
+
+
+def test_empty_commit_is_ignored() -> None:
+    policy = _policy()
+
+    policy.record_commit(0, 5.0)
+
+    assert policy.commit_period == 5.0
+
+
+def test_ticks_without_events_decay_the_rate() -> None:
+    policy = _policy(alpha=0.5)
+    _feed(policy, 100.0)
+
+    policy.tick(now=policy._window_start + 1.0)
+    assert policy.event_rate == pytest.approx(100.0)
+
+    for _ in range(3):
+        policy.tick(now=policy._window_start + 5.0)
+
+    assert policy.event_rate == pytest.approx(12.5)
+    assert policy.batch_size == 62
@@ -0,0 +1,85 @@
+from pytest_mock import MockerFixture
+
+from app.shared.gtfs.repositories.gtfs_static import GtfsStaticRepository
+from app.stop_writer.detector.gtfs_cache import GtfsCache, GtfsCacheSnapshot
+
+from conftest import make_stop, make_stop_time, make_trip
+
+
+def _warm_cache(mocker: MockerFixture) -> GtfsCache:
+    mocker.patch.object(GtfsStaticRepository, "get_trips", return_value=[make_trip("trip_1")])
+    mocker.patch.object(GtfsStaticRepository, "get_stops", return_value=[make_stop("stop_5")])
+    mocker.patch.object(
+        GtfsStaticRepository,
+        "get_stop_times_for_trips",
+        return_value=[make_stop_time("trip_1", 1), make_stop_time("trip_1", 2)],
+    )
+    mocker.patch.object(GtfsStaticRepository, "get_max_stop_sequences", return_value={"trip_1": 2})
+
+    cache = GtfsCache(mocker.Mock())
+    loaded = cache.warm(
+        GtfsCacheSnapshot(
+            trip_ids=["trip_1"],
+            stop_ids=["stop_5"],
+            stop_times_trip_ids=["trip_1", "trip_unknown"],
+            max_seq_trip_ids=["trip_1"],
+        )
+    )
+    assert loaded == 5
+    return cache
+
+
+def test_warm_cache_serves_lookups_without_queries(mocker: MockerFixture) -> None:
+    cache = _warm_cache(mocker)
+    single_row = [
+        mocker.patch.object(GtfsStaticRepository, name)
+        for name in ("get_trip", "get_stop", "get_stop_times_for_trip", "get_max_stop_sequence")
+    ]
+
+    assert cache.get_trip("trip_1").trip_id == "trip_1"
+    assert cache.get_stop("stop_5").stop_id == "stop_5"
+    assert cache.get_stop_time("trip_1", 2).stop_sequence == 2
+    assert cache.get_stop_time("trip_unknown", 1) is None
+    assert cache.get_max_stop_sequence("trip_1") == 2
+
+    for query in single_row:
+        query.assert_not_called()
+    assert cache.stats().lookups == 5
+    assert cache.stats().misses == 0
+
+
+def test_snapshot_lists_cached_keys(mocker: MockerFixture) -> None:
+    cache = _warm_cache(mocker)
+
+    snapshot = cache.snapshot()
+
+    assert snapshot.trip_ids == ["trip_1"]
+    assert snapshot.stop_ids == ["stop_5"]
+    assert snapshot.stop_times_trip_ids == ["trip_1", "trip_unknown"]
+    assert snapshot.max_seq_trip_ids == ["trip_1"]
+
+
+def test_cold_lookup_counts_miss(mocker: MockerFixture) -> None:
+    mocker.patch.object(GtfsStaticRepository, "get_trip", return_value=make_trip("trip_1"))
+    cache = GtfsCache(mocker.Mock())
+
+    cache.get_trip("trip_1")
+    cache.get_trip("trip_1")
+
+    assert cache.stats().lookups == 2
+    assert cache.stats().misses == 1
+
+
+def test_loaded_strings_are_interned(mocker: MockerFixture) -> None:
+    # Built at runtime so each trip starts with its own copy of the headsign
+    headsign = "".join(["Dworzec ", "Główny"])
+    trips = [make_trip("trip_1"), make_trip("trip_2")]
+    for trip in trips:
+        trip.headsign = "".join(["Dworzec ", "Główny"])
+    mocker.patch.object(GtfsStaticRepository, "get_trip", side_effect=trips)
+    cache = GtfsCache(mocker.Mock())
+
+    first, second = cache.get_trip("trip_1"), cache.get_trip("trip_2")
+
+    assert first.headsign == headsign
+    assert first.headsign is second.headsign
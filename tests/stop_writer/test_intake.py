@@ -0,0 +1,148 @@
+import threading
+import time
+from datetime import UTC, datetime
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.shared.models.enums import VehicleStatus
+from app.stop_writer.intake import CoalescingQueue, IntakeReader, IntakeReaderError
+
+from conftest import make_vehicle_position
+
+IN_TRANSIT = VehicleStatus.IN_TRANSIT_TO
+
+
+def _ts(second: int) -> datetime:
+    return datetime(2026, 2, 9, 12, 0, second, tzinfo=UTC)
+
+
+def _drain(queue: CoalescingQueue) -> list:
+    items = []
+    while (vp := queue.get(timeout=0)) is not None:
+        items.append(vp)
+    return items
+
+
+def test_redundant_update_replaces_queued_one() -> None:
+    queue = CoalescingQueue()
+    queue.put(make_vehicle_position(stop_sequence=5, status=IN_TRANSIT, timestamp=_ts(1)))
+    queue.put(make_vehicle_position(stop_sequence=5, status=IN_TRANSIT, timestamp=_ts(2)))
+
+    items = _drain(queue)
+
+    assert [vp.timestamp for vp in items] == [_ts(2)]
+    assert queue.metrics().coalesced == 1
+
+
+def test_stopped_at_is_never_replaced() -> None:
+    queue = CoalescingQueue()
+    queue.put(make_vehicle_position(stop_sequence=5, status=VehicleStatus.STOPPED_AT, timestamp=_ts(1)))
+    queue.put(make_vehicle_position(stop_sequence=5, status=IN_TRANSIT, timestamp=_ts(2)))
+
+    items = _drain(queue)
+
+    assert [(vp.status, vp.timestamp) for vp in items] == [(VehicleStatus.STOPPED_AT, _ts(1))]
+    assert queue.metrics().dropped == 1
+
+
+def test_stopped_at_and_sequence_changes_are_kept() -> None:
+    queue = CoalescingQueue()
+    queue.put(make_vehicle_position(stop_sequence=5, status=IN_TRANSIT))
+    queue.put(make_vehicle_position(stop_sequence=5, status=VehicleStatus.STOPPED_AT))
+    queue.put(make_vehicle_position(stop_sequence=6, status=IN_TRANSIT))
+    queue.put(make_vehicle_position(trip_id="trip_2", stop_sequence=6, status=IN_TRANSIT))
+
+    items = _drain(queue)
+
+    assert [(vp.trip_id, vp.stop_sequence, vp.status) for vp in items] == [
+        ("trip_1", 5, IN_TRANSIT),
+        ("trip_1", 5, VehicleStatus.STOPPED_AT),
+        ("trip_1", 6, IN_TRANSIT),
+        ("trip_2", 6, IN_TRANSIT),
+    ]
+
+
+def test_vehicles_are_coalesced_independently_in_fifo_order() -> None:
+    queue = CoalescingQueue()
+    queue.put(make_vehicle_position(license_plate="A", status=IN_TRANSIT, timestamp=_ts(1)))
+    queue.put(make_vehicle_position(license_plate="B", status=IN_TRANSIT, timestamp=_ts(2)))
+    queue.put(make_vehicle_position(license_plate="A", status=IN_TRANSIT, timestamp=_ts(3)))
+
+    items = _drain(queue)
+
+    assert [(vp.license_plate, vp.timestamp) for vp in items] == [("A", _ts(3)), ("B", _ts(2))]
+
+
+def test_delivered_update_is_not_coalesced() -> None:
+    queue = CoalescingQueue()
+    queue.put(make_vehicle_position(status=IN_TRANSIT, timestamp=_ts(1)))
+    assert queue.get(timeout=0) is not None
+
+    queue.put(make_vehicle_position(status=IN_TRANSIT, timestamp=_ts(2)))
+
+    assert [vp.timestamp for vp in _drain(queue)] == [_ts(2)]
+    assert queue.metrics().coalesced == 0
+
+
+def test_updates_without_license_plate_pass_through() -> None:
+    queue = CoalescingQueue()
+    queue.put(make_vehicle_position(license_plate=None, status=IN_TRANSIT))
+    queue.put(make_vehicle_position(license_plate=None, status=IN_TRANSIT))
+
+    assert len(_drain(queue)) == 2
+
+
+def test_full_queue_blocks_producer_until_consumed() -> None:
+    queue = CoalescingQueue(maxsize=1)
+    queue.put(make_vehicle_position(license_plate="A"))
+
+    producer = threading.Thread(target=queue.put, args=(make_vehicle_position(license_plate="B"),))
+    producer.start()
+    time.sleep(0.05)
+    assert producer.is_alive()
+
+    assert queue.get(timeout=0).license_plate == "A"
+    producer.join(timeout=1)
+
+    assert not producer.is_alive()
+    assert queue.get(timeout=0).license_plate == "B"
+    assert queue.metrics().backpressure_waits == 1
+
+
+def test_closed_queue_rejects_puts() -> None:
+    queue = CoalescingQueue()
+    queue.close()
+
+    assert queue.put(make_vehicle_position()) is False
+    assert queue.get(timeout=0) is None
+
+
+def test_reader_feeds_queue(mocker: MockerFixture) -> None:
+    subscriber = mocker.Mock()
+    positions = [make_vehicle_position(stop_sequence=seq, status=IN_TRANSIT) for seq in (1, 2)]
+    subscriber.get_next.side_effect = lambda timeout: positions.pop(0) if positions else None
+    queue = CoalescingQueue()
+    reader = IntakeReader(subscriber, queue, timeout=0.01)
+
+    reader.start()
+    first = queue.get(timeout=1)
+    second = queue.get(timeout=1)
+    reader.close()
+
+    assert (first.stop_sequence, second.stop_sequence) == (1, 2)
+    reader.raise_if_failed()
+
+
+def test_reader_failure_is_raised_to_consumer(mocker: MockerFixture) -> None:
+    subscriber = mocker.Mock()
+    subscriber.get_next.side_effect = ValueError("boom")
+    queue = CoalescingQueue()
+    reader = IntakeReader(subscriber, queue, timeout=0.01)
+
+    reader.start()
+    assert queue.get(timeout=1) is None
+    reader.close()
+
+    with pytest.raises(IntakeReaderError):
+        reader.raise_if_failed()
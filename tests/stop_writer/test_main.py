@@ -0,0 +1,61 @@
+from datetime import UTC, datetime
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import create_engine, event, update
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.shared.db.models import GtfsMeta
+from app.shared.models.enums import Agency
+from app.stop_writer.detector.gtfs_cache import GtfsCache
+from app.stop_writer.intake import CoalescingQueue
+from app.stop_writer.main import _process_next
+
+from conftest import make_vehicle_position
+
+
+@pytest.fixture
+def session() -> Session:
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    event.listen(engine, "connect", lambda conn, _: conn.execute("ATTACH DATABASE ':memory:' AS gtfs_static"))
+    GtfsMeta.__table__.create(engine)
+    with Session(engine) as setup:
+        setup.add(GtfsMeta(agency=Agency.MPK.value, current_hash="old", updated_at=datetime.now(UTC)))
+        setup.commit()
+    return Session(engine, expire_on_commit=False)
+
+
+class HashReadingDetector:
+    """Reads the current static hash for every update, like EventFactory does for every event."""
+
+    def __init__(self, session: Session):
+        self.cache = GtfsCache(session)
+        self.hashes: list[str | None] = []
+
+    def process_update(self, vp: object) -> list[object]:
+        self.hashes.append(self.cache.get_current_hash(Agency.MPK))
+        return []
+
+
+def test_detector_session_has_no_open_transaction_between_updates(session: Session, mocker: MockerFixture):
+    detector = HashReadingDetector(session)
+    writer = mocker.MagicMock()
+    intake = CoalescingQueue()
+
+    intake.put(make_vehicle_position(license_plate="AB001"))
+    _process_next(intake, detector, writer, session)  # type: ignore[arg-type]
+    assert not session.in_transaction()
+
+    with Session(session.get_bind()) as importer:
+        importer.execute(update(GtfsMeta).values(current_hash="new"))
+        importer.commit()
+
+    intake.put(make_vehicle_position(license_plate="AB002"))
+    _process_next(intake, detector, writer, session)  # type: ignore[arg-type]
+    intake.close()
+    _process_next(intake, detector, writer, session)  # type: ignore[arg-type]
+
+    assert detector.hashes == ["old", "new"]
+    assert not session.in_transaction()
+    writer.flush.assert_called_once()
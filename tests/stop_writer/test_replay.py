@@ -0,0 +1,109 @@
+import zipfile
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from app.shared.gtfs.feeds import get_feed_config
+from app.shared.gtfs.rt_archive import RtArchiveWriter, read_rt_archive
+from app.shared.models.enums import Agency, DetectionMethod, VehicleStatus
+from app.shared.redis.schemas import VehiclePositionMessage
+from app.stop_writer.replay.engine import ReplayEngine
+from app.stop_writer.replay.gtfs_snapshot import SnapshotGtfsCache
+from app.stop_writer.replay.memory_store import MemoryRedis
+from app.stop_writer.repositories.saved_sequences import SavedSequencesRepository
+
+SERVICE_DATE = date(2026, 3, 2)
+# 12:00 local (CET)
+T0 = datetime(2026, 3, 2, 11, 0, 0, tzinfo=UTC)
+
+GTFS_FILES = {
+    "routes.txt": "route_id,route_short_name\nr1,152\n",
+    "stops.txt": "stop_id,stop_name,stop_code,stop_desc,stop_lat,stop_lon\n"
+    "s1,Dworzec,,,50.0,19.9\ns2,Rondo,,,50.1,19.9\ns3,Plac,,,50.2,19.9\n",
+    "trips.txt": "trip_id,route_id,service_id,direction_id,trip_headsign,shape_id\nt1,r1,svc,0,Plac,sh1\n",
+    "stop_times.txt": "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n"
+    "t1,12:10:00,12:10:00,s3,3\nt1,12:00:00,12:00:00,s1,1\nt1,12:05:00,12:05:30,s2,2\n",
+}
+
+
+@pytest.fixture
+def gtfs(tmp_path: Path) -> SnapshotGtfsCache:
+    zip_path = tmp_path / "hash_a.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        for name, content in GTFS_FILES.items():
+            zf.writestr(name, content)
+    return SnapshotGtfsCache({get_feed_config(Agency.MPK): ("hash_a", zip_path)})
+
+
+def _vp(timestamp: datetime, stop_sequence: int, status: VehicleStatus = VehicleStatus.STOPPED_AT):
+    return VehiclePositionMessage(
+        agency="mpk",
+        trip_id="t1",
+        vehicle_id="v1",
+        license_plate="AB123",
+        stop_id=f"s{stop_sequence}",
+        stop_sequence=stop_sequence,
+        status=int(status),
+        timestamp=timestamp.isoformat(),
+    )
+
+
+def test_memory_store_expires_by_clock() -> None:
+    now = [0.0]
+    store = MemoryRedis(clock=lambda: now[0])
+    saved = SavedSequencesRepository(store)  # type: ignore[arg-type]
+
+    saved.mark_saved("mpk", "t1", SERVICE_DATE, 1, 60, T0)
+    assert saved.get_all_sequences("mpk", "t1", SERVICE_DATE) == {1}
+    assert saved.get_saved_data("mpk", "t1", SERVICE_DATE, 1) == (60, T0)
+
+    now[0] = 24 * 60 * 60 + 1
+    assert not saved.is_saved("mpk", "t1", SERVICE_DATE, 1)
+
+
+def test_snapshot_cache_serves_archived_timetable(gtfs: SnapshotGtfsCache) -> None:
+    trip = gtfs.get_trip("t1")
+
+    assert trip is not None
+    assert trip.route.route_short_name == "152"
+    assert gtfs.get_stop("s2").stop_name == "Rondo"
+    assert gtfs.get_stop_time("t1", 2).arrival_seconds == 12 * 3600 + 5 * 60
+    assert gtfs.get_max_stop_sequence("t1") == 3
+    assert gtfs.get_stop_id_to_seq("t1") == {"s1": 1, "s2": 2, "s3": 3}
+    assert gtfs.get_current_hash(Agency.MPK) == "hash_a"
+    assert gtfs.get_trip("unknown") is None
+
+
+def test_replay_detects_events_from_archive(tmp_path: Path, gtfs: SnapshotGtfsCache) -> None:
+    archive = RtArchiveWriter(tmp_path / "rt", retention_days=14)
+    archive.append_vehicle_positions(Agency.MPK, [_vp(T0, 1)], fetched_at=T0)
+    archive.append_vehicle_positions(
+        Agency.MPK, [_vp(T0, 1), _vp(T0 + timedelta(seconds=10), 1)], fetched_at=T0 + timedelta(seconds=10)
+    )
+    archive.append_vehicle_positions(
+        Agency.MPK, [_vp(T0 + timedelta(minutes=6), 2)], fetched_at=T0 + timedelta(minutes=6)
+    )
+
+    engine = ReplayEngine(gtfs, (SERVICE_DATE, SERVICE_DATE))
+    stats = engine.run(read_rt_archive(tmp_path / "rt", T0, T0 + timedelta(hours=1)))
+
+    events = sorted(engine.events, key=lambda e: e.stop_sequence)
+    assert [(e.stop_sequence, e.detection_method, e.delay_seconds) for e in events] == [
+        (1, DetectionMethod.STOPPED_AT, 0),
+        (2, DetectionMethod.STOPPED_AT, 60),
+    ]
+    assert events[0].static_hash == "hash_a"
+    assert events[0].line_number == "152"
+    assert stats.vp_polls == 3
+    assert stats.positions == 3
+    assert stats.duplicate_positions == 1
+    assert stats.events == 2
+
+
+def test_replay_drops_events_outside_service_dates(gtfs: SnapshotGtfsCache) -> None:
+    engine = ReplayEngine(gtfs, (SERVICE_DATE + timedelta(days=1), SERVICE_DATE + timedelta(days=1)))
+
+    engine.process_vehicle_positions([_vp(T0, 1)])
+
+    assert engine.events == []
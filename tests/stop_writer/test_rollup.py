@@ -0,0 +1,70 @@
+from contextlib import nullcontext
+from datetime import UTC, date, datetime
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.shared.gtfs.timeparse import last_closed_service_date
+from app.stop_writer.repositories.line_daily_stats import LineDailyStatsRepository
+from app.stop_writer.rollup import DailyRollupJob
+
+
+def test_service_day_closes_six_hours_after_midnight():
+    # 05:59 and 06:00 Warsaw time (CET, UTC+1)
+    assert last_closed_service_date(datetime(2026, 3, 10, 4, 59, tzinfo=UTC)) == date(2026, 3, 8)
+    assert last_closed_service_date(datetime(2026, 3, 10, 5, 0, tzinfo=UTC)) == date(2026, 3, 9)
+
+
+def test_days_to_roll_up_are_missing_recent_days_and_stale_days(mocker: MockerFixture):
+    session = mocker.MagicMock()
+    session.execute.return_value.all.return_value = [
+        (date(2026, 3, 7), False),
+        (date(2026, 3, 9), False),
+        (date(2026, 1, 15), True),
+        (date(2026, 3, 10), True),  # not closed yet
+    ]
+
+    days = LineDailyStatsRepository(session).days_to_roll_up(date(2026, 3, 9), lookback_days=3)
+
+    assert days == [date(2026, 1, 15), date(2026, 3, 8)]
+
+
+def test_run_once_rolls_up_each_day_in_its_own_transaction(mocker: MockerFixture):
+    session = mocker.MagicMock()
+    repo = mocker.patch("app.stop_writer.rollup.LineDailyStatsRepository").return_value
+    repo.days_to_roll_up.return_value = [date(2026, 3, 8), date(2026, 3, 9)]
+    repo.roll_up.return_value = 10
+    job = DailyRollupJob(lambda: nullcontext(session), clock=lambda: datetime(2026, 3, 10, 12, tzinfo=UTC))
+
+    days = job.run_once()
+
+    assert days == [date(2026, 3, 8), date(2026, 3, 9)]
+    repo.days_to_roll_up.assert_called_once_with(date(2026, 3, 9), 7)
+    assert [call.args[0] for call in repo.roll_up.call_args_list] == days
+    assert session.commit.call_count == 3
+
+
+def test_each_committed_day_is_announced(mocker: MockerFixture):
+    session = mocker.MagicMock()
+    repo = mocker.patch("app.stop_writer.rollup.LineDailyStatsRepository").return_value
+    repo.days_to_roll_up.return_value = [date(2026, 3, 8), date(2026, 3, 9)]
+    repo.roll_up.side_effect = [10, RuntimeError("lock timeout")]
+    announced: list[date] = []
+    job = DailyRollupJob(lambda: nullcontext(session), on_rolled_up=announced.append)
+
+    with pytest.raises(RuntimeError):
+        job.run_once()
+
+    assert announced == [date(2026, 3, 8)]
+
+
+def test_closed_job_stops_between_days(mocker: MockerFixture):
+    session = mocker.MagicMock()
+    repo = mocker.patch("app.stop_writer.rollup.LineDailyStatsRepository").return_value
+    repo.days_to_roll_up.return_value = [date(2026, 3, 8), date(2026, 3, 9)]
+    job = DailyRollupJob(lambda: nullcontext(session))
+    job.close()
+
+    job.run_once()
+
+    repo.roll_up.assert_not_called()
@@ -0,0 +1,196 @@
+import threading
+import time
+from contextlib import nullcontext
+from datetime import UTC, date, datetime, timedelta
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.shared.models.enums import Agency, DetectionMethod
+from app.shared.models.events import StopEvent
+from app.stop_writer.spool import EventSpool
+from app.stop_writer.writer import BackgroundBatchWriter
+
+
+def _make_event(stop_sequence: int = 1) -> StopEvent:
+    return StopEvent(
+        agency=Agency.MPK,
+        trip_id="trip_1",
+        service_date=date(2026, 2, 9),
+        stop_sequence=stop_sequence,
+        stop_id=f"stop_{stop_sequence}",
+        line_number="152",
+        stop_name="Test Stop",
+        stop_desc=None,
+        direction_id=0,
+        headsign="Dworzec",
+        planned_time=datetime(2026, 2, 9, 12, 0, 0, tzinfo=UTC),
+        event_time=datetime(2026, 2, 9, 12, 1, 0, tzinfo=UTC),
+        delay_seconds=60,
+        vehicle_id="v1",
+        license_plate="AB123",
+        detection_method=DetectionMethod.STOPPED_AT,
+        is_estimated=False,
+        static_hash="abc123",
+        max_stop_sequence=10,
+    )
+
+
+@pytest.fixture
+def spool(tmp_path) -> EventSpool:
+    return EventSpool(tmp_path / "stop_events.spool")
+
+
+@pytest.fixture
+def mock_session(mocker: MockerFixture):
+    return mocker.MagicMock()
+
+
+def test_append_and_read_round_trip(spool):
+    first = [_make_event(1), _make_event(2)]
+    second = [_make_event(3)]
+    spool.append(first)
+    spool.append(second)
+
+    path = spool.claim()
+
+    assert path is not None
+    assert list(EventSpool.read(path)) == [first, second]
+
+
+def test_claim_empty_spool_returns_none(spool):
+    assert spool.claim() is None
+    assert spool.has_pending() is False
+
+
+def test_appends_after_claim_go_to_new_file(spool):
+    spool.append([_make_event(1)])
+    path = spool.claim()
+    spool.append([_make_event(2)])
+
+    spool.release()
+
+    assert not path.exists()
+    assert spool.has_pending() is True
+    assert list(EventSpool.read(spool.claim())) == [[_make_event(2)]]
+
+
+def test_unreleased_claim_is_returned_again(spool):
+    spool.append([_make_event(1)])
+    first = spool.claim()
+
+    assert spool.claim() == first
+
+
+def test_read_stops_at_torn_record(spool, tmp_path):
+    spool.append([_make_event(1)])
+    spool.append([_make_event(2)])
+    path = tmp_path / "stop_events.spool"
+    path.write_bytes(path.read_bytes()[:-5])
+
+    assert list(EventSpool.read(path)) == [[_make_event(1)]]
+
+
+def test_read_stops_at_corrupt_record(spool, tmp_path):
+    spool.append([_make_event(1)])
+    path = tmp_path / "stop_events.spool"
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    assert list(EventSpool.read(path)) == []
+
+
+def test_records_after_a_torn_record_are_read_back_after_restart(tmp_path):
+    spool = EventSpool(tmp_path / "stop_events.spool")
+    spool.append([_make_event(1)])
+    spool.journal([_make_event(2)])
+    # The process dies mid-append, leaving half a record behind
+    path = tmp_path / "stop_events.spool"
+    path.write_bytes(path.read_bytes() + b"\x10\x00\x00")
+
+    restarted = EventSpool(tmp_path / "stop_events.spool")
+    assert restarted.recover_journal() == 1
+    restarted.append([_make_event(3)])
+
+    claimed = restarted.claim()
+    assert claimed is not None
+    assert list(EventSpool.read(claimed)) == [[_make_event(1)], [_make_event(2)], [_make_event(3)]]
+
+
+def test_writer_spools_unflushed_events_on_close(spool, mock_session):
+    mock_session.execute.side_effect = Exception("DB error")
+    writer = BackgroundBatchWriter(
+        lambda: nullcontext(mock_session),
+        batch_size=5,
+        flush_interval=timedelta(seconds=10),
+        retry_backoff_seconds=[60],
+        spool=spool,
+    )
+    writer.start()
+    writer.add_many([_make_event(i) for i in range(3)])
+
+    assert writer.close(timeout=2.0) == 0
+    assert writer.metrics().spooled_events == 3
+    assert sum(len(batch) for batch in EventSpool.read(spool.claim())) == 3
+
+
+def test_writer_replays_spool_on_start(spool, mock_session):
+    spool.append([_make_event(i) for i in range(4)])
+    writer = BackgroundBatchWriter(lambda: nullcontext(mock_session), retry_backoff_seconds=[0], spool=spool)
+
+    writer.start()
+    deadline = time.monotonic() + 2.0
+    while writer.metrics().replayed_events < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.close(timeout=2.0)
+
+    assert writer.metrics().replayed_events == 4
+    assert spool.has_pending() is False
+    mock_session.commit.assert_called_once()
+
+
+def test_buffered_events_survive_a_crash_through_the_journal(tmp_path, mock_session, mocker: MockerFixture):
+    mock_session.execute.side_effect = Exception("DB error")
+    crashed = threading.Event()
+    writer = BackgroundBatchWriter(
+        lambda: nullcontext(mock_session),
+        stop_event=crashed,
+        batch_size=5,
+        flush_interval=timedelta(seconds=10),
+        retry_backoff_seconds=[60],
+        spool=EventSpool(tmp_path / "stop_events.spool"),
+    )
+    writer.start()
+    writer.add_many([_make_event(i) for i in range(5)])
+    writer.add_many([_make_event(i) for i in range(5, 8)])
+    # The process dies with a batch being written and another buffered, close() never runs
+    crashed.set()
+
+    restarted_session = mocker.MagicMock()
+    spool = EventSpool(tmp_path / "stop_events.spool")
+    restarted = BackgroundBatchWriter(lambda: nullcontext(restarted_session), retry_backoff_seconds=[0], spool=spool)
+    restarted.start()
+    deadline = time.monotonic() + 2.0
+    while restarted.metrics().replayed_events < 8 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    restarted.close(timeout=2.0)
+
+    assert restarted.metrics().replayed_events == 8
+    assert spool.has_pending() is False
+
+
+def test_committed_batches_are_released_from_the_journal(tmp_path, mock_session):
+    spool = EventSpool(tmp_path / "stop_events.spool")
+    writer = BackgroundBatchWriter(
+        lambda: nullcontext(mock_session), batch_size=5, flush_interval=timedelta(seconds=10), spool=spool
+    )
+    writer.start()
+    writer.add_many([_make_event(i) for i in range(5)])
+    deadline = time.monotonic() + 2.0
+    while writer.metrics().events_written < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert not (tmp_path / "stop_events.spool.journal.sealed").exists()
+    writer.close(timeout=2.0)
+    assert list(tmp_path.iterdir()) == []
@@ -1,3 +1,5 @@
+import time
+from contextlib import nullcontext
 from datetime import UTC, date, datetime, timedelta
 
 import pytest
@@ -5,7 +7,7 @@ from pytest_mock import MockerFixture
 
 from app.shared.models.enums import Agency, DetectionMethod
 from app.shared.models.events import StopEvent
-from app.stop_writer.writer import BatchWriteError, BatchWriter
+from app.stop_writer.writer import BackgroundBatchWriter, BatchWriteError, BatchWriter
 
 
 def _make_event(stop_sequence: int = 1) -> StopEvent:
@@ -131,3 +133,83 @@ def mocker_side_effect_error(mock_session):
     original = mock_session.execute
     original.side_effect = Exception("DB error")
     return original
+
+
+# Background (double-buffered) writer
+
+
+def _background_writer(mock_session, **kwargs) -> BackgroundBatchWriter:
+    kwargs.setdefault("batch_size", 5)
+    kwargs.setdefault("flush_interval", timedelta(seconds=10))
+    kwargs.setdefault("retry_backoff_seconds", [0])
+    writer = BackgroundBatchWriter(lambda: nullcontext(mock_session), **kwargs)
+    writer.start()
+    return writer
+
+
+def _wait_for(predicate, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def test_background_writer_flushes_full_batch(mock_session):
+    writer = _background_writer(mock_session)
+
+    writer.add_many([_make_event(i) for i in range(5)])
+
+    _wait_for(lambda: writer.metrics().events_written == 5)
+    mock_session.commit.assert_called_once()
+    assert writer.close() == 0
+
+
+def test_background_writer_close_drains_active_buffer(mock_session):
+    writer = _background_writer(mock_session)
+    writer.add_many([_make_event(i) for i in range(3)])
+
+    assert writer.close() == 0
+    assert writer.metrics().events_written == 3
+
+
+def test_background_writer_retries_failed_flush(mock_session):
+    mock_session.execute.side_effect = [Exception("DB error"), None, None]
+    writer = _background_writer(mock_session)
+
+    writer.add_many([_make_event(i) for i in range(5)])
+
+    _wait_for(lambda: writer.metrics().events_written == 5)
+    metrics = writer.metrics()
+    assert metrics.failed_flushes == 1
+    assert metrics.queue_depth == 0
+    writer.close()
+
+
+def test_background_writer_close_reports_unflushed(mock_session):
+    mock_session.execute.side_effect = Exception("DB error")
+    writer = _background_writer(mock_session, retry_backoff_seconds=[60])
+    writer.add_many([_make_event(i) for i in range(5)])
+    _wait_for(lambda: writer.metrics().failed_flushes >= 1)
+
+    assert writer.close(timeout=2.0) == 5
+
+
+def test_idle_flusher_ticks_the_policy(mock_session, mocker: MockerFixture):
+    mocker.patch("app.stop_writer.writer.WRITER_POLICY_TICK_SECONDS", 0.01)
+    policy = mocker.MagicMock(batch_size=5, flush_interval=timedelta(seconds=10))
+    writer = _background_writer(mock_session, policy=policy)
+
+    _wait_for(lambda: policy.tick.call_count >= 2)
+    writer.close()
+
+
+def test_flush_marks_rolled_up_days_stale(mock_session, mocker: MockerFixture):
+    marked: list[date] = []
+    mocker.patch("app.stop_writer.writer.LineDailyStatsRepository.mark_stale", side_effect=marked.extend)
+    writer = BatchWriter(mock_session, batch_size=5, flush_interval=timedelta(seconds=10))
+    writer.extend([_make_event(1), _make_event(2)])
+
+    writer.flush()
+
+    assert marked == [date(2026, 2, 9), date(2026, 2, 9)]
+    mock_session.commit.assert_called_once()